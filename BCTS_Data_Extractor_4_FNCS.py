@@ -18,7 +18,7 @@
 # ---------------------------------------------------------------------------
 
 # Import modules
-import arcpy, os, sys, zipfile
+import arcpy, os, sys
 
 # Set overwrite output to true
 arcpy.env.overwriteOutput = True
@@ -30,6 +30,10 @@ arcpy.Delete_management("in_memory")
 Processing_Variables = {}
 PYTHON_SCRIPT = sys.argv[0]
 Processing_Variables['Script_Directory_Path'] = os.path.split(PYTHON_SCRIPT)[0]
+sys.path.insert(1, Processing_Variables['Script_Directory_Path'])
+import Query_Builder
+import Extraction_Engine
+import KML_Writer
 
 # Get script arguments
 name = sys.argv[1]
@@ -44,12 +48,13 @@ arcpy.env.qualifiedFieldNames = False
 select_type = sys.argv[3]
 identifier = sys.argv[4].upper()
 identifier = identifier.replace (" ", "")
-identifier = identifier.replace (",", "','")
+identifier = Query_Builder.parse_ids(identifier, ",")
 
+# IN lists of at most 1000 IDs joined with OR, Oracle rejects longer lists
 if select_type == "Licence":
-    Expression = "LICENCE_ID in ('" + identifier + "')"
+    Expression = Query_Builder.where_clause("LICENCE_ID", identifier, numeric=False)
 elif select_type == "Block":
-    Expression = "BLOCK_ID in ('" + identifier + "')"
+    Expression = Query_Builder.where_clause("BLOCK_ID", identifier, numeric=False)
 else:
     arcpy.AddMessage("Invalid Expression")
 
@@ -60,6 +65,9 @@ arcpy.AddMessage(Expression)
 exportgdb = sys.argv[5]
 exportshp = sys.argv[6]
 exportKML = sys.argv[7]
+# GeoPackage and FlatGeobuf are optional parameters, off when the tool doesn't pass them
+exportgpkg = sys.argv[8] if len(sys.argv) > 8 else 'false'
+exportfgb = sys.argv[9] if len(sys.argv) > 9 else 'false'
 
 # Set workspace to in-memory
 arcpy.env.workspace = "in_memory"
@@ -80,88 +88,53 @@ def Create_folder():
 def Initialize():
     Processing_Variables['Blocks'] = "Database Connections\DBP06.sde\FORESTVIEW.SV_BLOCK"
 
+    # Layers in the upload, the blocks with no attributes dissolved into one polygon
+    Processing_Variables['Layers'] = [
+        Extraction_Engine.layer('Block', source=Processing_Variables['Blocks'], fields=[], dissolve=True,
+                                style=KML_Writer.style('#ff0000', 2)),
+    ]
+
 def copy_features():
-    # Select and merge the blocks into a single feature
-    arcpy.Select_analysis(Processing_Variables['Blocks'],r'in_memory/blocks',Expression)
-
-    # Get the count of selected features
-    num_features = int(arcpy.GetCount_management(r'in_memory/blocks').getOutput(0))
-
-    # Add a message indicating how many features were selected
-    arcpy.AddMessage(str(num_features) +" Blocks selected.")
-
-    # Delete all the columns besides the mandatory ones
-    mandatory_fields = ["OBJECTID", "SHAPE"]
-    delete_fields = [field.name for field in arcpy.ListFields(r'in_memory/blocks') if not field.required and field.type not in ["OID", "Geometry"]]
-    delete_fields = list(set(delete_fields) - set(mandatory_fields))
-    if len(delete_fields) > 0:
-        arcpy.DeleteField_management(r'in_memory/blocks', delete_fields)
-
-    # Dissolve all polygons into a single polygon
-    arcpy.Dissolve_management(r'in_memory/blocks', r'in_memory/dissolved_blocks')
-
-    # Select the dissolved polygon and delete the original blocks feature
-    arcpy.Select_analysis(r'in_memory/dissolved_blocks', r'in_memory/combined_blocks')
-    arcpy.Delete_management(r'in_memory/blocks')
-
-def copy_2_FC():
-    # Create output FGDB
-    arcpy.CreateFileGDB_management(Processing_Variables['Output_folder'],"FNCS_upload.gdb","Current")
-    Processing_Variables['Output_gdb'] = Processing_Variables['Output_folder'] +"\\FNCS_upload.gdb"
-
-    # Copy features to output FGDB
-    arcpy.CopyFeatures_management(r'in_memory/combined_blocks',Processing_Variables['Output_gdb'] + r'\Block')
-
-def copy_2_SHP():
-    # Create output shapefile folder
-    arcpy.CreateFolder_management(Processing_Variables['Output_folder'],"Shapefiles")
-    Processing_Variables['Shapefile_folder'] = Processing_Variables['Output_folder'] + '\\Shapefiles'
-
-    # Copy features to output shapefile
-    arcpy.CopyFeatures_management(r'in_memory/combined_blocks',Processing_Variables['Shapefile_folder'] + r'\Block.shp')
-
-def kmz_to_kml(kmz_file_path, output_folder_path):
-    with zipfile.ZipFile(kmz_file_path, 'r') as zip_ref:
-        for file_name in zip_ref.namelist():
-            if file_name.endswith('.kml'):
-                kml_file_name = os.path.splitext(os.path.basename(kmz_file_path))[0] + '.kml'
-                kml_file_path = os.path.join(output_folder_path, kml_file_name)
-                zip_ref.extract(file_name, output_folder_path)
-                os.rename(os.path.join(output_folder_path, file_name), kml_file_path)
-                return kml_file_path
+    # Read the selected blocks and merge them into a single polygon, no intermediate copies
+    Processing_Variables['Outputs'] = Extraction_Engine.extract(Processing_Variables['Layers'], Expression, log=arcpy.AddMessage)
+    Processing_Variables['Combined_blocks'] = Processing_Variables['Outputs']['Block'][0]
+
+def Export():
+    # Only the formats the user picked are created, each layer is read once and written to all of them
+    targets = []
+    if exportgdb == 'true':
+        arcpy.CreateFileGDB_management(Processing_Variables['Output_folder'],"FNCS_upload.gdb","Current")
+        Processing_Variables['Output_gdb'] = Processing_Variables['Output_folder'] +"\\FNCS_upload.gdb"
+        targets.append(Extraction_Engine.target('gdb', Processing_Variables['Output_gdb']))
+    if exportshp == 'true':
+        arcpy.CreateFolder_management(Processing_Variables['Output_folder'],"Shapefiles")
+        Processing_Variables['Shapefile_folder'] = Processing_Variables['Output_folder'] + '\\Shapefiles'
+        targets.append(Extraction_Engine.target('shp', Processing_Variables['Shapefile_folder'], '.shp'))
+    if exportgpkg == 'true':
+        Processing_Variables['Output_gpkg'] = Processing_Variables['Output_folder'] + "\\FNCS_upload.gpkg"
+        targets.append(Extraction_Engine.target('gpkg', Processing_Variables['Output_gpkg']))
+    if exportfgb == 'true':
+        arcpy.CreateFolder_management(Processing_Variables['Output_folder'],"FlatGeobuf")
+        Processing_Variables['FlatGeobuf_folder'] = Processing_Variables['Output_folder'] + '\\FlatGeobuf'
+        targets.append(Extraction_Engine.target('fgb', Processing_Variables['FlatGeobuf_folder'], '.fgb'))
+
+    # Record the counts, extents and schema of the extracted layers
+    Processing_Variables['Manifest'] = Processing_Variables['Output_folder'] + "\\" + name + "_manifest.json"
+    Extraction_Engine.export(Processing_Variables['Outputs'], targets, Processing_Variables['Manifest'],
+                             always=['Block'], log=arcpy.AddMessage)
 
 def copy_2_KML():
-    # Add layer to MXD, apply desired symbology, and export map to KMZ file
-    input_fc = arcpy.MakeFeatureLayer_management(r'in_memory/combined_blocks', name)
-
-    # Define the output KMZ file
-    output_kmz = Processing_Variables['Output_folder'] +"\\"+ name +".kmz"
-
-    # Convert layer to KML format and save as KMZ file
-    arcpy.LayerToKML_conversion(input_fc, output_kmz)
-
-    # Convert KMZ file to KML file
-    kml_file_path = Processing_Variables['Output_folder']
-    kmz_to_kml(output_kmz, kml_file_path)
-
-    # Remove KMZ file
-    os.remove(output_kmz)
+    # Write the combined blocks straight to a KML in WGS84
+    Processing_Variables['Output_KML'] = Processing_Variables['Output_folder'] + "\\" + name + ".kml"
+    Extraction_Engine.export_kml(Processing_Variables['Outputs'], Processing_Variables['Layers'],
+                                 Processing_Variables['Output_KML'], name, log=arcpy.AddMessage)
 
 if __name__ == '__main__':
     Create_folder()
     Initialize()
     copy_features()
-    copy_2_FC()
-
-    # Check if shapefile export is desired
-    if exportshp == 'true':
-        copy_2_SHP()
+    Export()
 
     # Check if KML export is desired
     if exportKML == 'true':
         copy_2_KML()
-
-    # Check if GDB export is not desired
-    if exportgdb == 'false':
-        arcpy.Delete_management(Processing_Variables['Output_gdb'])
-
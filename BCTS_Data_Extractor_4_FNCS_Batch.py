@@ -0,0 +1,321 @@
+# ---------------------------------------------------------------------------
+# BCTS_Data_Extractor_4_FNCS_Batch.py
+# Created on: Oct 18, 2026
+#
+# Description: Batch mode of BCTS_Data_Extractor_4_FNCS.py for referral season,
+#           many FNCS upload packages from one read of the block view. The
+#           manifest lists the packages, one per row: package (the name),
+#           select_type (Licence or Block) and identifiers (comma separated).
+#
+#           The blocks of all the packages are selected from SV_BLOCK with one
+#           combined expression and partitioned by package in memory. Each
+#           package is then built into its own <package>_FNCS_upload folder:
+#           the blocks dissolved into one polygon and written to the formats
+#           asked for, like the single package tool. A package that fails (its
+#           folder already exists, none of its blocks were found, a write
+#           error) is reported and the others carry on.
+#
+#           With --workers above 1 the packages are split across that many
+#           worker processes by Worker_Pool, each running this script with
+#           'worker'. Each process is handed its packages' shapes as JSON and
+#           does its own dissolving and arcpy writes. A worker that dies only
+#           fails its unfinished packages.
+#
+#           Every package's status, block count, identifiers not found and
+#           build time go in FNCS_batch_summary.csv in the output folder.
+#
+# Usage:    python BCTS_Data_Extractor_4_FNCS_Batch.py <manifest.csv|.json> <output folder>
+#               [--formats gdb,shp,kml,gpkg,fgb] [--workers 3] [--source FC]
+#
+# Author:   Daniel Otto
+# ---------------------------------------------------------------------------
+
+import csv
+import json
+import os
+import sys
+import time
+from argparse import ArgumentParser
+from collections import OrderedDict, namedtuple
+
+sys.path.insert(1, os.path.split(os.path.abspath(sys.argv[0]))[0])
+import Block_Dissolve
+import Extraction_Engine
+import Geometry_Core
+import KML_Writer
+import Query_Builder
+import Worker_Pool
+
+SOURCE = "Database Connections\\DBP06.sde\\FORESTVIEW.SV_BLOCK"
+SELECT_FIELDS = OrderedDict([('Licence', 'LICENCE_ID'), ('Block', 'BLOCK_ID')])
+FORMATS = ('gdb', 'shp', 'kml', 'gpkg', 'fgb')
+DEFAULT_FORMATS = ('gdb', 'shp', 'kml')
+DEFAULT_WORKERS = 3
+SUMMARY_NAME = 'FNCS_batch_summary.csv'
+SUMMARY_FIELDS = ['PACKAGE', 'STATUS', 'SELECT_TYPE', 'IDENTIFIERS', 'BLOCKS', 'NOT_FOUND', 'SECONDS',
+                  'FOLDER', 'ERROR']
+
+#   name: package (and folder) name, select_type: Licence or Block, identifiers: IDs
+Package = namedtuple('Package', 'name select_type identifiers')
+
+#   The blocks with no attributes dissolved into one polygon, as in the single package tool
+BLOCK_LAYER = Extraction_Engine.layer('Block', fields=[], dissolve=True, style=KML_Writer.style('#ff0000', 2))
+
+
+# ---------------------------------------------------------------------------
+#   Manifest
+# ---------------------------------------------------------------------------
+
+def _package(name, select_type, identifiers):
+    if not isinstance(identifiers, (list, tuple)):
+        identifiers = Query_Builder.parse_ids(identifiers or '')
+    else:
+        identifiers = Query_Builder.parse_ids(','.join(identifiers))
+    select_type = (select_type or '').strip().capitalize()
+    return Package(name.strip(), select_type, identifiers)
+
+
+def read_manifest(path):
+    #A CSV with package, select_type and identifiers columns (any case), or a JSON
+    #list of objects with the same keys
+    if os.path.splitext(path)[1].lower() == '.json':
+        with open(path) as f:
+            rows = [dict((k.lower(), v) for k, v in row.items()) for row in json.load(f)]
+    else:
+        if sys.version_info[0] < 3:
+            f = open(path, 'rb')
+        else:
+            f = open(path, newline='')
+        with f:
+            rows = [dict((k.strip().lower(), v) for k, v in row.items() if k) for row in csv.DictReader(f)]
+    packages = [_package(row.get('package', ''), row.get('select_type'), row.get('identifiers'))
+                for row in rows if (row.get('package') or '').strip()]
+    names = set()
+    for package in packages:
+        if package.name in names:
+            raise ValueError('Package ' + package.name + ' is in the manifest more than once')
+        names.add(package.name)
+    return packages
+
+
+# ---------------------------------------------------------------------------
+#   One read for every package
+# ---------------------------------------------------------------------------
+
+def combined_where(packages):
+    #One expression selecting the blocks of every package
+    clauses = []
+    for select_type, field in SELECT_FIELDS.items():
+        ids = Query_Builder.parse_ids(','.join(i for p in packages if p.select_type == select_type
+                                               for i in p.identifiers))
+        if ids:
+            clauses.append(Query_Builder.where_clause(field, ids, numeric=False))
+    if not clauses:
+        return '1 = 0'
+    return clauses[0] if len(clauses) == 1 else '(' + ') OR ('.join(clauses) + ')'
+
+
+def read_blocks(source, where):
+    #Yields (geometry, licence id, block id) for the selected blocks
+    import arcpy
+    with arcpy.da.SearchCursor(source, ['SHAPE@'] + list(SELECT_FIELDS.values()), where) as cursor:
+        for row in cursor:
+            yield Geometry_Core.from_arcpy(row[0]) if row[0] is not None else None, row[1], row[2]
+
+
+def partition(rows, packages):
+    #Splits the rows by package. A block can be in more than one package.
+    #Returns {package name: [shapes]} and {package name: set of IDs found}.
+    lookup = dict((select_type, {}) for select_type in SELECT_FIELDS)
+    for package in packages:
+        if package.select_type in lookup:
+            for identifier in package.identifiers:
+                lookup[package.select_type].setdefault(identifier, []).append(package.name)
+    shapes = dict((package.name, []) for package in packages)
+    found = dict((package.name, set()) for package in packages)
+    for shape, licence, block in rows:
+        for select_type, value in (('Licence', licence), ('Block', block)):
+            value = (value or '').upper()
+            for name in lookup[select_type].get(value, ()):
+                shapes[name].append(shape)
+                found[name].add(value)
+    return shapes, found
+
+
+# ---------------------------------------------------------------------------
+#   Packages
+# ---------------------------------------------------------------------------
+
+def targets(folder, formats):
+    #Export targets for the formats other than KML, created in the package folder
+    import arcpy
+    result = []
+    if 'gdb' in formats:
+        arcpy.CreateFileGDB_management(folder, "FNCS_upload.gdb", "Current")
+        result.append(Extraction_Engine.target('gdb', os.path.join(folder, 'FNCS_upload.gdb')))
+    if 'shp' in formats:
+        arcpy.CreateFolder_management(folder, "Shapefiles")
+        result.append(Extraction_Engine.target('shp', os.path.join(folder, 'Shapefiles'), '.shp'))
+    if 'gpkg' in formats:
+        result.append(Extraction_Engine.target('gpkg', os.path.join(folder, 'FNCS_upload.gpkg')))
+    if 'fgb' in formats:
+        arcpy.CreateFolder_management(folder, "FlatGeobuf")
+        result.append(Extraction_Engine.target('fgb', os.path.join(folder, 'FlatGeobuf'), '.fgb'))
+    return result
+
+
+def _spatial_reference(text):
+    import arcpy
+    spatial_reference = arcpy.SpatialReference()
+    spatial_reference.loadFromString(text)
+    return spatial_reference
+
+
+def build_package(package, shapes, number, output_path, formats, spatial_reference):
+    #Writes one package from its geometries. Every in_memory name carries the
+    #package number. Returns the folder.
+    import arcpy
+    folder = os.path.join(output_path, package.name + '_FNCS_upload')
+    if arcpy.Exists(folder):
+        raise ValueError('There is already a workspace called ' + package.name + '_FNCS_upload')
+    if not shapes:
+        raise ValueError('None of the ' + package.select_type.lower() + 's were found')
+    dissolved = 'in_memory/FNCS_batch_' + str(number)
+    try:
+        Block_Dissolve.write_dissolved(dissolved, shapes, spatial_reference)
+        arcpy.CreateFolder_management(output_path, package.name + '_FNCS_upload')
+        outputs = OrderedDict([('Block', (dissolved, Extraction_Engine.count(dissolved)))])
+        Extraction_Engine.export(outputs, targets(folder, formats),
+                                 os.path.join(folder, package.name + '_manifest.json'), always=['Block'])
+        if 'kml' in formats:
+            Extraction_Engine.export_kml(outputs, [BLOCK_LAYER], os.path.join(folder, package.name + '.kml'),
+                                         package.name)
+    finally:
+        if arcpy.Exists(dissolved):
+            arcpy.Delete_management(dissolved)
+    return folder
+
+
+def _summary_row(job):
+    package = Package(*job['package'])
+    found = set(job['found'])
+    return OrderedDict([('PACKAGE', package.name), ('STATUS', 'ok'), ('SELECT_TYPE', package.select_type),
+                        ('IDENTIFIERS', len(package.identifiers)), ('BLOCKS', len(job['shapes'])),
+                        ('NOT_FOUND', ','.join(i for i in package.identifiers if i not in found)),
+                        ('SECONDS', 0), ('FOLDER', ''), ('ERROR', '')])
+
+
+def _run_package(job):
+    #Builds one package and returns its summary row, errors are caught so the
+    #other packages carry on
+    package = Package(*job['package'])
+    start = time.time()
+    result = _summary_row(job)
+    try:
+        if package.select_type not in SELECT_FIELDS:
+            raise ValueError('Unknown select_type ' + repr(package.select_type) + ', use Licence or Block')
+        result['FOLDER'] = build_package(package, job['shapes'], job['number'], job['output_path'],
+                                         job['formats'], _spatial_reference(job['spatial_reference']))
+    except Exception as e:
+        result['STATUS'] = 'failed'
+        result['ERROR'] = str(e).strip()
+    result['SECONDS'] = round(time.time() - start, 2)
+    return result
+
+
+# ---------------------------------------------------------------------------
+#   Worker processes
+# ---------------------------------------------------------------------------
+
+def _worker_failed(job, code):
+    result = _summary_row(job)
+    result['STATUS'] = 'failed'
+    result['ERROR'] = 'FNCS batch worker exited with code ' + str(code)
+    return result
+
+
+def _worker(job_file, result_file):
+    #Worker process entry point, appends each package's summary row as soon as it's built
+    import arcpy
+    arcpy.env.overwriteOutput = True
+    arcpy.env.qualifiedFieldNames = False
+    Worker_Pool.run_worker(job_file, result_file, _run_package)
+
+
+def write_summary(path, results):
+    if sys.version_info[0] < 3:
+        f = open(path, 'wb')
+    else:
+        f = open(path, 'w', newline='')
+    with f:
+        writer = csv.writer(f)
+        writer.writerow(SUMMARY_FIELDS)
+        for result in results:
+            writer.writerow([result[field] for field in SUMMARY_FIELDS])
+
+
+def run_batch(manifest, output_path, formats=DEFAULT_FORMATS, source=SOURCE, workers=DEFAULT_WORKERS, log=None):
+    #Builds every package in the manifest. Returns the summary rows, in manifest order.
+    import arcpy
+    log = log or (lambda msg: None)
+    packages = read_manifest(manifest)
+    log(str(len(packages)) + ' packages in ' + manifest)
+    arcpy.env.overwriteOutput = True
+    arcpy.env.qualifiedFieldNames = False
+
+    start = time.time()
+    where = combined_where([p for p in packages if p.select_type in SELECT_FIELDS])
+    shapes, found = partition(read_blocks(source, where), packages)
+    log(str(sum(len(s) for s in shapes.values())) + ' package blocks read from ' + source + ' in ' +
+        str(round(time.time() - start, 1)) + 's')
+
+    spatial_reference = arcpy.Describe(source).spatialReference.exportToString()
+    jobs = [{'number': n, 'package': list(package), 'shapes': shapes[package.name],
+             'found': sorted(found[package.name]), 'output_path': output_path, 'formats': list(formats),
+             'spatial_reference': spatial_reference}
+            for n, package in enumerate(packages)]
+    if workers <= 1 or len(jobs) <= 1:
+        results = [_run_package(job) for job in jobs]
+    else:
+        log('Building ' + str(len(jobs)) + ' packages in ' + str(min(workers, len(jobs))) + ' worker processes')
+        results = Worker_Pool.run_workers(__file__, jobs, workers, _worker_failed, prefix='FNCS_batch_')
+
+    for result in results:
+        msg = result['PACKAGE'] + ': ' + result['STATUS'] + ', ' + str(result['BLOCKS']) + ' blocks in ' + \
+            str(result['SECONDS']) + 's'
+        if result['NOT_FOUND']:
+            msg += ', not found ' + result['NOT_FOUND']
+        if result['ERROR']:
+            msg += ' - ' + result['ERROR']
+        log(msg)
+    summary = os.path.join(output_path, SUMMARY_NAME)
+    write_summary(summary, results)
+    failed = sum(1 for r in results if r['STATUS'] != 'ok')
+    log(str(len(results) - failed) + ' packages built, ' + str(failed) + ' failed in ' +
+        str(round(time.time() - start, 1)) + 's, summary in ' + summary)
+    return results
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'worker':
+        _worker(sys.argv[2], sys.argv[3])
+        sys.exit(0)
+    parser = ArgumentParser(description='FNCS upload packages for many licences or block sets')
+    parser.add_argument('manifest', help='CSV or JSON with package, select_type and identifiers')
+    parser.add_argument('output', help='folder the package folders are created in')
+    parser.add_argument('--formats', default=','.join(DEFAULT_FORMATS),
+                        help='comma separated, any of ' + ', '.join(FORMATS))
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('--source', default=SOURCE)
+    args = parser.parse_args()
+    formats = [f.strip().lower() for f in args.formats.split(',') if f.strip()]
+    unknown = [f for f in formats if f not in FORMATS]
+    if unknown:
+        parser.error('unknown formats ' + ', '.join(unknown))
+
+    def log(msg):
+        import arcpy
+        arcpy.AddMessage(msg)
+
+    results = run_batch(args.manifest, args.output, formats, args.source, args.workers, log)
+    sys.exit(1 if any(r['STATUS'] != 'ok' for r in results) else 0)
@@ -22,6 +22,10 @@ arcpy.Delete_management("in_memory")
 Processing_Variables = {}
 PYTHON_SCRIPT = sys.argv[0]
 Processing_Variables['Script_Directory_Path'] = os.path.split(PYTHON_SCRIPT)[0]
+sys.path.insert(1, Processing_Variables['Script_Directory_Path'])
+import Query_Builder
+import Extraction_Engine
+import KML_Writer
 
 # Script arguments
 #File Geodatabase in which to store output data
@@ -38,12 +42,13 @@ arcpy.env.qualifiedFieldNames = False
 select_type = sys.argv[3]
 identifier = sys.argv[4].upper()
 identifier = identifier.replace (" ", "")
-identifier = identifier.replace (",", "','")
+identifier = Query_Builder.parse_ids(identifier, ",")
 
+# IN lists of at most 1000 IDs joined with OR, Oracle rejects longer lists
 if select_type == "Licence":
-    Expression = "LICENCE_ID in ('" + identifier + "')"
+    Expression = Query_Builder.where_clause("LICENCE_ID", identifier, numeric=False)
 elif select_type == "Block":
-    Expression = "BLOCK_ID in ('" + identifier + "')"
+    Expression = Query_Builder.where_clause("BLOCK_ID", identifier, numeric=False)
 else:
     arcpy.AddMessage("Invalid Expression")
 
@@ -57,6 +62,9 @@ exportKML = sys.argv[7]
 #Get username and password for mapview account
 DBP06_username = sys.argv[8]
 DBP06_password = sys.argv[9]
+#GeoPackage and FlatGeobuf are optional, off when the tool doesn't pass them
+exportgpkg = sys.argv[10] if len(sys.argv) > 10 else 'false'
+exportfgb = sys.argv[11] if len(sys.argv) > 11 else 'false'
 
 #Set workspace
 arcpy.Delete_management("in_memory")
@@ -77,31 +85,6 @@ def Create_folder():
         arcpy.AddMessage("Creating new output folder...")
         arcpy.CreateFolder_management(outPath,newFolder)
 
-def Delete_fields(keep_list, input_layer): #delete unwated fields from a layer
-    #split the users list
-    keepFieldList = keep_list.split(",")
-    # Use ListFields to get a list of fields in Block layer
-    fieldObjList = arcpy.ListFields(input_layer)
-
-    # Create an empty list that will be populated with field names
-    fieldNameList = []
-    # For each field in the object list, add the field name to the
-    #  name list.  If the field is required, exclude it, to prevent errors
-    for field in fieldObjList:
-        if not field.required:
-            fieldNameList.append(field.name)
-##
-##    arcpy.AddMessage(keepFieldList)
-##    arcpy.AddMessage(fieldNameList)
-    #Loop through list of fields to keep and remove them from the field name list
-    for k in keepFieldList:
-        fieldNameList.remove(k)
-
-
-
-    #Delete unwated fields
-    arcpy.DeleteField_management(input_layer, fieldNameList)
-
 def DBP06(username,password,path): # Get and pass DBP06 map_view credtiantls
     arcpy.AddMessage('running DBP06 connection')
 ##    arcpy.AddMessage(username)
@@ -121,156 +104,71 @@ def DBP06(username,password,path): # Get and pass DBP06 map_view credtiantls
     arcpy.CreateDatabaseConnection_management (path,name,database_platform,instance,account_authorization,username ,password,'DO_NOT_SAVE_USERNAME')
 
 def Initialize():
-    #Grab the variables from the script control table
+    #Grab the variables from the script control table, every column in one read
     Processing_Variables['Supporting_Data_GDB'] = Processing_Variables['Script_Directory_Path'] + r'\Supporting_Data.gdb'
     Processing_Variables['ScriptControls'] = Processing_Variables['Supporting_Data_GDB'] + r'\Script_Controls_waste_management'
-
-    Processing_Variables['Variables'] = {}
-    for row in arcpy.da.SearchCursor(Processing_Variables['ScriptControls'],['Script_Variable','Variable_Value']):
-        Processing_Variables['Variables'][row[0]] = row[1]
-
-    Processing_Variables['Variable_Join'] = {}
-    for row in arcpy.da.SearchCursor(Processing_Variables['ScriptControls'],['Script_Variable','Variable_table_join']):
-        Processing_Variables['Variable_Join'][row[0]] = row[1]
-
-    Processing_Variables['Variable_fields'] = {}
-    for row in arcpy.da.SearchCursor(Processing_Variables['ScriptControls'],['Script_Variable','variable_field_list']):
-        Processing_Variables['Variable_fields'][row[0]] = row[1]
-
-
-    Processing_Variables['Blocks'] = Processing_Variables['Temp_DBP06'] + "\\" + Processing_Variables['Variables']['CUT_BLOCK_SHAPE']
-    Processing_Variables['SU'] = Processing_Variables['Temp_DBP06'] + "\\" + Processing_Variables['Variables']['SU_SHAPE']
-    Processing_Variables['SU_TABLE'] = Processing_Variables['Temp_DBP06'] + "\\" + Processing_Variables['Variable_Join']['SU_SHAPE']
-    Processing_Variables['Harvest'] = Processing_Variables['Temp_DBP06'] + "\\" + Processing_Variables['Variables']['HARVEST_SHAPE']
-    Processing_Variables['Falling_Corners'] = Processing_Variables['Temp_DBP06'] + "\\" + Processing_Variables['Variables']['FC_SHAPE']
-    Processing_Variables['ROAD'] = Processing_Variables['Temp_DBP06'] + "\\" + Processing_Variables['Variables']['ROAD_SHAPE']
-    Processing_Variables['ROAD_TABLE'] = Processing_Variables['Temp_DBP06'] + "\\" + Processing_Variables['Variable_Join']['ROAD_SHAPE']
+    Processing_Variables['Controls'] = Extraction_Engine.load_controls(Processing_Variables['ScriptControls'])
+
+    #Layers in the referral package. The blocks are selected with the user's expression, the SUs,
+    #harvest units and falling corners by the cutblock sequence numbers of the selected blocks and
+    #the roads by distance from them. Sources, join tables and kept fields come from the controls table.
+    Processing_Variables['Layers'] = Extraction_Engine.resolve([
+        Extraction_Engine.layer('Block', 'CUT_BLOCK_SHAPE', collect='CUTB_SEQ_NBR',
+                                style=KML_Writer.style('#ff0000', 3)),
+        Extraction_Engine.layer('SU', 'SU_SHAPE', key='CUTB_SEQ_NBR', join_field='STUN_SEQ_NBR',
+                                style=KML_Writer.style('#ffaa00', 2, '#ffaa00', 0.2)),
+        Extraction_Engine.layer('Harvest_Unit', 'HARVEST_SHAPE', key='CUTB_SEQ_NBR',
+                                style=KML_Writer.style('#00a9e6', 2)),
+        Extraction_Engine.layer('Falling_Corners', 'FC_SHAPE', key='CUTB_SEQ_NBR', filter="HUB_TYPE = 'FC'",
+                                style=KML_Writer.style('#ffff00', 1)),
+        Extraction_Engine.layer('Roads', 'ROAD_SHAPE', near='ROAD_INT_DIST',
+                                route=('ROAD_SEQ_NBR', 'ROAD_SEQ_NBR LINE RSTA_START_METRE_NBR RSTA_END_METRE_NBR'),
+                                style=KML_Writer.style('#000000', 2)),
+    ], Processing_Variables['Controls'], Processing_Variables['Temp_DBP06'])
 
 
 def copy_features():
-    #Select the blocks
-    arcpy.Select_analysis(Processing_Variables['Blocks'],r'in_memory/blocks',Expression)
-    #keep only the fields specified in the BLOCK_FIELD_LIST from the script controls table
-    Delete_fields(Processing_Variables['Variable_fields']['CUT_BLOCK_SHAPE'],r'in_memory/blocks')
-
-    #get the cutblock sequence numbers of the selected block
-    Processing_Variables['SEQ_NUM_LIST'] = [str(row[0])[:-2] for row in arcpy.da.SearchCursor(r'in_memory/blocks',['CUTB_SEQ_NBR'])]
-    Processing_Variables['SEQ_NUM_EXP'] = 'CUTB_SEQ_NBR in (' +','.join(Processing_Variables['SEQ_NUM_LIST']) + ')'
-    arcpy.AddMessage(Processing_Variables['SEQ_NUM_EXP'])
-
-    # Join SU table to SU layer
-    arcpy.MakeFeatureLayer_management(Processing_Variables['SU'], "SU_FL")
-    arcpy.AddJoin_management("SU_FL", "STUN_SEQ_NBR", Processing_Variables['SU_TABLE'], "STUN_SEQ_NBR")
-    arcpy.Select_analysis("SU_FL", r'in_memory/SU', Processing_Variables['SEQ_NUM_EXP'])
-    #keep only the fields specified in the SU_FIELD_LIST from the script controls table
-    Delete_fields(Processing_Variables['Variable_fields']['SU_SHAPE'],r'in_memory/SU')
-
-    #Get the harvest unit shapes
-    arcpy.Select_analysis(Processing_Variables['Harvest'], r'in_memory/Harvest', Processing_Variables['SEQ_NUM_EXP'])
-    Delete_fields(Processing_Variables['Variable_fields']['HARVEST_SHAPE'],r'in_memory/Harvest')
-
-    #Get the Falling corners for selected blocks
-    Processing_Variables['FC_EXP'] = Processing_Variables['SEQ_NUM_EXP'] + " and HUB_TYPE = 'FC'"
-    arcpy.Select_analysis(Processing_Variables['Falling_Corners'], r'in_memory/FC', Processing_Variables['FC_EXP'])
-    Delete_fields(Processing_Variables['Variable_fields']['FC_SHAPE'],r'in_memory/FC')
-
-    #Get the roads within 100m of selected blocks
-    arcpy.MakeFeatureLayer_management(Processing_Variables['ROAD'], "ROAD_FL")
-    arcpy.MakeRouteEventLayer_lr("ROAD_FL","ROAD_SEQ_NBR", Processing_Variables['ROAD_TABLE'], "ROAD_SEQ_NBR LINE RSTA_START_METRE_NBR RSTA_END_METRE_NBR","ROAD_EV_FL")
-    arcpy.SelectLayerByLocation_management("ROAD_EV_FL", "INTERSECT", r'in_memory/blocks', Processing_Variables['Variables']['ROAD_INT_DIST'], "NEW_SELECTION")
-    arcpy.CopyFeatures_management("ROAD_EV_FL",r'in_memory/roads')
-    Delete_fields(Processing_Variables['Variable_fields']['ROAD_SHAPE'],r'in_memory/roads')
-
-
-def copy_2_FC():
-    #Create FGDB
-    arcpy.CreateFileGDB_management(Processing_Variables['Output_folder'],"Waste_Mgmt_Spatial.gdb","Current")
-    Processing_Variables['Output_gdb'] = Processing_Variables['Output_folder'] +"\\Waste_Mgmt_Spatial.gdb"
+    #Select the blocks, then the other layers one after the other
+    Processing_Variables['Outputs'] = Extraction_Engine.extract(Processing_Variables['Layers'], Expression, log=arcpy.AddMessage)
 
-    #Copy features if there are more than 0 features in layer
-    arcpy.CopyFeatures_management(r'in_memory/blocks',Processing_Variables['Output_gdb'] + r'\Block')
 
-    if int(arcpy.GetCount_management(r'in_memory/SU').getOutput(0)) > 0:
-        arcpy.CopyFeatures_management(r'in_memory/SU',Processing_Variables['Output_gdb'] + r'\SU')
-
-    if int(arcpy.GetCount_management(r'in_memory/Harvest').getOutput(0)) > 0:
-        arcpy.CopyFeatures_management(r'in_memory/Harvest',Processing_Variables['Output_gdb'] + r'\Harvest_Unit')
-
-    if int(arcpy.GetCount_management(r'in_memory/FC').getOutput(0)) > 0:
-        arcpy.CopyFeatures_management(r'in_memory/FC',Processing_Variables['Output_gdb'] + r'\Falling_Corners')
-
-    if int(arcpy.GetCount_management(r'in_memory/roads').getOutput(0)) > 0:
-        arcpy.CopyFeatures_management(r'in_memory/roads',Processing_Variables['Output_gdb'] + r'\Roads')
-
-def copy_2_SHP():
-    #Copy features if there are more than 0 features in layer
-    arcpy.CreateFolder_management(Processing_Variables['Output_folder'],"Shapefiles")
-    Processing_Variables['Shapefile_folder'] = Processing_Variables['Output_folder'] + '\\Shapefiles'
-    arcpy.CopyFeatures_management(r'in_memory/blocks',Processing_Variables['Shapefile_folder'] + r'\Block.shp')
-
-    if int(arcpy.GetCount_management(r'in_memory/SU').getOutput(0)) > 0:
-        arcpy.CopyFeatures_management(r'in_memory/SU',Processing_Variables['Shapefile_folder'] + r'\SU.shp')
-
-    if int(arcpy.GetCount_management(r'in_memory/Harvest').getOutput(0)) > 0:
-        arcpy.CopyFeatures_management(r'in_memory/Harvest',Processing_Variables['Shapefile_folder'] + r'\Harvest_Unit.shp')
-
-    if int(arcpy.GetCount_management(r'in_memory/FC').getOutput(0)) > 0:
-        arcpy.CopyFeatures_management(r'in_memory/FC',Processing_Variables['Shapefile_folder'] + r'\Falling_Corners.shp')
-
-    if int(arcpy.GetCount_management(r'in_memory/roads').getOutput(0)) > 0:
-        arcpy.CopyFeatures_management(r'in_memory/roads',Processing_Variables['Shapefile_folder'] + r'\Roads.shp')
+def Export():
+    #Only the formats the user picked are written, each layer is read once and written to all of them.
+    targets = []
+    if exportgdb == 'true':
+        arcpy.CreateFileGDB_management(Processing_Variables['Output_folder'],"Waste_Mgmt_Spatial.gdb","Current")
+        Processing_Variables['Output_gdb'] = Processing_Variables['Output_folder'] +"\\Waste_Mgmt_Spatial.gdb"
+        targets.append(Extraction_Engine.target('gdb', Processing_Variables['Output_gdb']))
+    if exportshp == 'true':
+        arcpy.CreateFolder_management(Processing_Variables['Output_folder'],"Shapefiles")
+        Processing_Variables['Shapefile_folder'] = Processing_Variables['Output_folder'] + '\\Shapefiles'
+        targets.append(Extraction_Engine.target('shp', Processing_Variables['Shapefile_folder'], '.shp'))
+    if exportgpkg == 'true':
+        Processing_Variables['Output_gpkg'] = Processing_Variables['Output_folder'] +"\\Waste_Mgmt_Spatial.gpkg"
+        targets.append(Extraction_Engine.target('gpkg', Processing_Variables['Output_gpkg']))
+    if exportfgb == 'true':
+        arcpy.CreateFolder_management(Processing_Variables['Output_folder'],"FlatGeobuf")
+        Processing_Variables['FlatGeobuf_folder'] = Processing_Variables['Output_folder'] + '\\FlatGeobuf'
+        targets.append(Extraction_Engine.target('fgb', Processing_Variables['FlatGeobuf_folder'], '.fgb'))
+
+    #Layers with no features aren't written, the blocks always are. Counts, extents and schema go in the manifest.
+    Processing_Variables['Manifest'] = Processing_Variables['Output_folder'] + "\\" + name + "_manifest.json"
+    Processing_Variables['Exported'] = Extraction_Engine.export(Processing_Variables['Outputs'], targets, Processing_Variables['Manifest'],
+                                                                always=['Block'], log=arcpy.AddMessage)
 
 def copy_2_KML():
-    #Add layers to mxd, apply desired symbology and export map to one kmz file
-    #SAVE MXD PROVIDED AND CHANGE PATH TO LOCATION SAVED BELOW
-    mxd = arcpy.mapping.MapDocument(Processing_Variables['Script_Directory_Path'] + r"\Waste_Mgmt_Data_Template.mxd")
-    df = arcpy.mapping.ListDataFrames(mxd, "Layers")[0]
-
-    #Replace data source of layers in mxd template
-    for lyr in arcpy.mapping.ListLayers(mxd):
-        if lyr.name == "Blocks":
-            lyr.replaceDataSource(Processing_Variables['Output_gdb'],'FILEGDB_WORKSPACE',"Block")
-
-        if lyr.name == "SUs":
-            if int(arcpy.GetCount_management(r'in_memory/SU').getOutput(0)) > 0:
-                lyr.replaceDataSource(Processing_Variables['Output_gdb'],'FILEGDB_WORKSPACE',"SU")
-            else:
-                arcpy.mapping.RemoveLayer(df, lyr)
-
-        if lyr.name == "Harvest Units":
-            if int(arcpy.GetCount_management(r'in_memory/Harvest').getOutput(0)) > 0:
-                lyr.replaceDataSource(Processing_Variables['Output_gdb'],'FILEGDB_WORKSPACE',"Harvest_Unit")
-            else:
-                arcpy.mapping.RemoveLayer(df, lyr)
-
-        if lyr.name == "Falling Corners":
-            if int(arcpy.GetCount_management(r'in_memory/FC').getOutput(0)) > 0:
-                lyr.replaceDataSource(Processing_Variables['Output_gdb'],'FILEGDB_WORKSPACE',"Falling_Corners")
-            else:
-                arcpy.mapping.RemoveLayer(df, lyr)
-
-        if lyr.name == "Roads":
-            if int(arcpy.GetCount_management(r'in_memory/roads').getOutput(0)) > 0:
-                lyr.replaceDataSource(Processing_Variables['Output_gdb'],'FILEGDB_WORKSPACE',"Roads")
-            else:
-                arcpy.mapping.RemoveLayer(df, lyr)
-    Processing_Variables['Output_MXD'] = Processing_Variables['Output_folder'] + '\\Waste_Mgmt_Referral_MXD.mxd'
-    mxd.saveACopy(Processing_Variables['Output_MXD'])
-    arcpy.MapToKML_conversion(Processing_Variables['Output_MXD'],"Layers", Processing_Variables['Output_folder'] +"\\"+ name +".kmz", 20000)
-    arcpy.Delete_management(Processing_Variables['Output_MXD'])
+    #Write the extracted layers straight to one kmz in WGS84, one folder per layer styled from the layer list
+    Processing_Variables['Output_KMZ'] = Processing_Variables['Output_folder'] +"\\"+ name +".kmz"
+    Extraction_Engine.export_kml(Processing_Variables['Outputs'], Processing_Variables['Layers'],
+                                 Processing_Variables['Output_KMZ'], name, log=arcpy.AddMessage)
 
 if __name__ == '__main__':
     Create_folder()
     DBP06(DBP06_username,DBP06_password,Processing_Variables['Script_Directory_Path'])
     Initialize()
     copy_features()
-    copy_2_FC()
-    if exportshp == 'true':
-        copy_2_SHP()
+    Export()
     if exportKML == 'true':
         copy_2_KML()
-    if exportgdb == 'false':
-        arcpy.Delete_management(Processing_Variables['Output_gdb'])
 
     os.remove(Processing_Variables['Temp_DBP06'])
-
@@ -0,0 +1,674 @@
+# ---------------------------------------------------------------------------
+# Block_Dissolve.py
+# Created on: Oct 18, 2026
+#
+# Description: Merges block polygons into one multipolygon for the FNCS
+#           uploads, in place of Dissolve_management and the feature classes
+#           around it. The blocks are ordered along an STR tree so neighbours
+#           sit next to each other, then unioned in pairs, the pairs in pairs
+#           and so on up to one geometry (a cascaded union). Each union only
+#           works on the polygons whose boxes meet the other side, the rest
+#           pass through, and shared edges drop out early so the upper levels
+#           handle outlines rather than every block edge.
+#
+#           A union nodes the two outlines against each other (each crossing
+#           computed once and used by both edges, so the pieces meet exactly),
+#           keeps the pieces of each side that are outside the other and one
+#           copy of the edges both sides run along the same way, and links the
+#           kept pieces back into rings. Inside/outside only changes where the
+#           outlines meet, so one point in polygon test covers every piece
+#           between two meeting points. A vertex within a hair of an edge (a
+#           crossing point, rounded, on the edge it was cut from) counts as on
+#           it, so every union sees the same side of it. overlay() uses the
+#           same pieces for an intersection (the pieces of each side inside
+#           the other) or a difference (A outside B, and B inside A reversed).
+#
+#           Adjacent blocks seldom share vertices exactly. Before the union,
+#           vertices within the snapping tolerance are merged and a vertex
+#           that lies within the tolerance of another block's edge is added to
+#           that edge, so shared boundaries become the same edges. The default
+#           is the ArcGIS XY tolerance of 1 mm. Holes narrower than
+#           sliver_width or smaller than sliver_area (the gaps left between
+#           blocks that don't quite meet) are filled and parts smaller than
+#           sliver_area are dropped. Blocks that dissolve to nothing raise
+#           rather than write an empty outline.
+#
+# Usage:    geom = Block_Dissolve.dissolve(geometries)
+#           Block_Dissolve.dissolve_features(source, 'in_memory/Block', where)
+#
+# Author:   Daniel Otto
+# ---------------------------------------------------------------------------
+
+from __future__ import division
+
+import math
+import os
+
+import Geometry_Core
+
+SNAP_TOLERANCE = 0.001
+SLIVER_AREA = 0.0
+SLIVER_WIDTH = 0.0
+#   A vertex this close to another edge, relative to the size of the
+#   coordinates, is on it when the outlines are noded. Crossing points are
+#   rounded, so an edge cut at one is no longer exactly in line with the edge
+#   it was cut from.
+NODE_TOLERANCE = 1e-12
+
+
+# ---------------------------------------------------------------------------
+#   Rings
+# ---------------------------------------------------------------------------
+
+def _ring_area(ring):
+    #Signed area taken about the first vertex, positive when counter-clockwise.
+    #Large projected coordinates would swamp the area of small rings otherwise.
+    if len(ring) < 4:
+        return 0.0
+    ox, oy = ring[0][0], ring[0][1]
+    total = 0.0
+    for i in range(1, len(ring) - 2):
+        total += (ring[i][0] - ox) * (ring[i + 1][1] - oy) - (ring[i + 1][0] - ox) * (ring[i][1] - oy)
+    return total / 2
+
+
+def _ring_length(ring):
+    return sum(math.hypot(ring[i + 1][0] - ring[i][0], ring[i + 1][1] - ring[i][1]) for i in range(len(ring) - 1))
+
+
+def _ring_box(ring):
+    xs = [p[0] for p in ring]
+    ys = [p[1] for p in ring]
+    return (min(xs), min(ys), max(xs), max(ys))
+
+
+def clean_ring(ring):
+    #Closed ring without repeated vertices or spikes (a-b-a), None when less
+    #than a triangle is left
+    points = []
+    for p in ring:
+        p = (p[0], p[1])
+        if points and points[-1] == p:
+            continue
+        points.append(p)
+    if len(points) > 1 and points[0] == points[-1]:
+        points.pop()
+    changed = True
+    while changed and len(points) >= 3:
+        changed = False
+        n = 0
+        while n < len(points) and len(points) >= 3:
+            before, after = points[n - 1], points[(n + 1) % len(points)]
+            if before == after:
+                #Drop the spike tip and the repeated vertex after it
+                del points[n]
+                del points[n % len(points)]
+                changed = True
+            else:
+                n += 1
+    if len(points) < 3:
+        return None
+    return points + [points[0]]
+
+
+def _simplify(ring):
+    #Drops vertices that are exactly in line with their neighbours, the cut
+    #points left behind where shared edges were removed
+    points = ring[:-1]
+    result = []
+    count = len(points)
+    for n, p in enumerate(points):
+        a, b = points[n - 1], points[(n + 1) % count]
+        if Geometry_Core._orientation(a, p, b) == 0 and Geometry_Core._on_segment(a, b, p):
+            continue
+        result.append(p)
+    if len(result) < 3:
+        return ring
+    return result + [result[0]]
+
+
+def oriented_polygons(geom):
+    #Cleaned polygons of a geometry with the exterior counter-clockwise and
+    #holes clockwise, empty and collapsed rings removed
+    result = []
+    for poly in Geometry_Core.polygons(geom):
+        rings = []
+        for n, ring in enumerate(poly):
+            ring = clean_ring(ring)
+            area = _ring_area(ring) if ring is not None else 0
+            if area == 0:
+                if n == 0:
+                    break
+                continue
+            if (n == 0) != (area > 0):
+                ring = list(reversed(ring))
+            rings.append(ring)
+        if rings:
+            result.append(rings)
+    return result
+
+
+# ---------------------------------------------------------------------------
+#   Snapping
+# ---------------------------------------------------------------------------
+
+def _cell(p, size):
+    return int(math.floor(p[0] / size)), int(math.floor(p[1] / size))
+
+
+def snap(polys, tolerance=SNAP_TOLERANCE):
+    #Merges vertices closer than tolerance (to the first one seen) and adds
+    #every vertex to the edges of other rings that pass within tolerance of it
+    if not tolerance or not polys:
+        return polys
+    limit = tolerance * tolerance
+    grid = {}
+    merged = {}
+
+    def representative(p):
+        found = merged.get(p)
+        if found is not None:
+            return found
+        cx, cy = _cell(p, tolerance)
+        best, best_distance = p, None
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for q in grid.get((cx + dx, cy + dy), ()):
+                    distance = (q[0] - p[0]) ** 2 + (q[1] - p[1]) ** 2
+                    if distance <= limit and (best_distance is None or distance < best_distance):
+                        best, best_distance = q, distance
+        if best_distance is None:
+            grid.setdefault((cx, cy), []).append(p)
+        merged[p] = best
+        return best
+
+    rings = [[representative((p[0], p[1])) for p in ring] for poly in polys for ring in poly]
+
+    #Vertices on a grid about as coarse as the edges, each edge looks in the
+    #cells its box covers
+    lengths = sorted(math.hypot(r[i + 1][0] - r[i][0], r[i + 1][1] - r[i][1])
+                     for r in rings for i in range(len(r) - 1))
+    size = max(lengths[len(lengths) // 2] if lengths else tolerance, tolerance)
+    vertices = {}
+    for ring in rings:
+        for p in ring:
+            vertices.setdefault(_cell(p, size), set()).add(p)
+    result = []
+    for ring in rings:
+        points = [ring[0]]
+        for i in range(len(ring) - 1):
+            a, b = ring[i], ring[i + 1]
+            dx, dy = b[0] - a[0], b[1] - a[1]
+            length2 = dx * dx + dy * dy
+            inserts = []
+            if length2 > 0:
+                low = _cell((min(a[0], b[0]) - tolerance, min(a[1], b[1]) - tolerance), size)
+                high = _cell((max(a[0], b[0]) + tolerance, max(a[1], b[1]) + tolerance), size)
+                for cx in range(low[0], high[0] + 1):
+                    for cy in range(low[1], high[1] + 1):
+                        for p in vertices.get((cx, cy), ()):
+                            if p == a or p == b:
+                                continue
+                            t = ((p[0] - a[0]) * dx + (p[1] - a[1]) * dy) / length2
+                            if 0 < t < 1:
+                                x, y = a[0] + t * dx, a[1] + t * dy
+                                if (x - p[0]) ** 2 + (y - p[1]) ** 2 <= limit:
+                                    inserts.append((t, p))
+            for t, p in sorted(inserts):
+                points.append(p)
+            points.append(b)
+        result.append(points)
+    #Back into polygons, rings that collapsed are dropped
+    polys_out = []
+    n = 0
+    for poly in polys:
+        rings_out = []
+        for k in range(len(poly)):
+            ring = clean_ring(result[n + k])
+            if ring is not None and _ring_area(ring) != 0:
+                if (k == 0) != (_ring_area(ring) > 0):
+                    ring = list(reversed(ring))
+                rings_out.append(ring)
+            elif k == 0:
+                rings_out = []
+                break
+        n += len(poly)
+        if rings_out and _ring_area(rings_out[0]) > 0:
+            polys_out.append(rings_out)
+    return polys_out
+
+
+# ---------------------------------------------------------------------------
+#   Union of two sets of polygons
+# ---------------------------------------------------------------------------
+
+def _poly_box(poly):
+    return _ring_box(poly[0])
+
+
+def _edges(polys):
+    #Every edge with the ring it belongs to, rings are numbered in order
+    result = []
+    for poly in polys:
+        for ring in poly:
+            result.append([(ring[i], ring[i + 1]) for i in range(len(ring) - 1)])
+    return result
+
+
+def _side(a, b, p, tolerance):
+    #Which side of the line a-b p is on, 0 when it's within tolerance of it
+    dx, dy = b[0] - a[0], b[1] - a[1]
+    cross = dx * (p[1] - a[1]) - dy * (p[0] - a[0])
+    if abs(cross) <= tolerance * math.hypot(dx, dy):
+        return 0
+    return 1 if cross > 0 else -1
+
+
+def _strictly_on(a, b, p):
+    #p, already on the line a-b, is between its ends and isn't one of them
+    if p == a or p == b:
+        return False
+    dx, dy = b[0] - a[0], b[1] - a[1]
+    t = (p[0] - a[0]) * dx + (p[1] - a[1]) * dy
+    return 0 < t < dx * dx + dy * dy
+
+
+def _crossing_point(p1, p2, q1, q2):
+    rx, ry = p2[0] - p1[0], p2[1] - p1[1]
+    sx, sy = q2[0] - q1[0], q2[1] - q1[1]
+    t = ((q1[0] - p1[0]) * sy - (q1[1] - p1[1]) * sx) / (rx * sy - ry * sx)
+    return (p1[0] + t * rx, p1[1] + t * ry)
+
+
+def _node(rings_a, rings_b):
+    #Cut points for every edge of both sides where the outlines meet. A
+    #crossing is computed once and added to both edges. Also returns the
+    #vertices of each side that touch the other's outline. A vertex within
+    #NODE_TOLERANCE of an edge is on it, so both sides are cut at the same
+    #points even where one outline runs along an edge the other was cut from.
+    scale = max([1.0] + [abs(c) for rings in (rings_a, rings_b) for ring in rings for edge in ring for c in edge[0]])
+    tolerance = NODE_TOLERANCE * scale
+
+    def order(a, b, p):
+        return _side(a, b, p, tolerance)
+
+    flat_b = [(r, e) for r, ring in enumerate(rings_b) for e in range(len(ring))]
+    tree = Geometry_Core.STRtree([(Geometry_Core._segment_box(rings_b[r][e]), (r, e)) for r, e in flat_b])
+    cuts_a = [[[] for _ in ring] for ring in rings_a]
+    cuts_b = [[[] for _ in ring] for ring in rings_b]
+    touch_a = set()
+    touch_b = set()
+    for r, ring in enumerate(rings_a):
+        for e, (p1, p2) in enumerate(ring):
+            for rb, eb in tree.query(Geometry_Core._segment_box((p1, p2))):
+                q1, q2 = rings_b[rb][eb]
+                o1, o2 = order(p1, p2, q1), order(p1, p2, q2)
+                o3, o4 = order(q1, q2, p1), order(q1, q2, p2)
+                if o1 * o2 < 0 and o3 * o4 < 0:
+                    x = _crossing_point(p1, p2, q1, q2)
+                    cuts_a[r][e].append(x)
+                    cuts_b[rb][eb].append(x)
+                    continue
+                for o, q in ((o1, q1), (o2, q2)):
+                    if o == 0 and _strictly_on(p1, p2, q):
+                        cuts_a[r][e].append(q)
+                        touch_b.add(q)
+                for o, p in ((o3, p1), (o4, p2)):
+                    if o == 0 and _strictly_on(q1, q2, p):
+                        cuts_b[rb][eb].append(p)
+                        touch_a.add(p)
+    return cuts_a, cuts_b, touch_a, touch_b, tree
+
+
+def _pieces(rings, cuts):
+    #Edges split at their cut points, per ring in ring order
+    result = []
+    for ring, ring_cuts in zip(rings, cuts):
+        pieces = []
+        for (a, b), points in zip(ring, ring_cuts):
+            if points:
+                dx, dy = b[0] - a[0], b[1] - a[1]
+                points = sorted(set(points), key=lambda p: (p[0] - a[0]) * dx + (p[1] - a[1]) * dy)
+                chain = [a] + [p for p in points if p != a and p != b] + [b]
+            else:
+                chain = [a, b]
+            for i in range(len(chain) - 1):
+                if chain[i] != chain[i + 1]:
+                    pieces.append((chain[i], chain[i + 1]))
+        result.append(pieces)
+    return result
+
+
+def _inside(pt, rings, tree, max_x):
+    #Even-odd ray cast against the edges of the other side
+    x, y = pt
+    inside = False
+    for r, e in tree.query((x, y, max_x, y)):
+        a, b = rings[r][e]
+        if (a[1] > y) != (b[1] > y):
+            if x < a[0] + (y - a[1]) * (b[0] - a[0]) / (b[1] - a[1]):
+                inside = not inside
+    return inside
+
+
+def _keep(pieces, other_pieces, breaks, rings_other, tree, max_x, keep_same, keep_inside=False, keep_opposite=False):
+    #Pieces of one side that are on the result's outline: those outside the
+    #other side (inside with keep_inside) and the shared pieces running the same
+    #way (keep_same) or the opposite way (keep_opposite) as the other side's.
+    #Between two breaks a ring is either all inside or all outside the other
+    #side, so the longest piece of each run is tested for the whole run.
+    kept = []
+    for ring in pieces:
+        if not ring:
+            continue
+        #Start the runs at a break so the first and last run aren't split
+        start = 0
+        for n, piece in enumerate(ring):
+            if piece[0] in breaks:
+                start = n
+                break
+        ordered = ring[start:] + ring[:start]
+        run = []
+        runs = [run]
+        for piece in ordered:
+            if piece in other_pieces or (piece[1], piece[0]) in other_pieces:
+                runs.append([piece])
+                run = []
+                runs.append(run)
+                continue
+            if piece[0] in breaks and run:
+                run = []
+                runs.append(run)
+            run.append(piece)
+        for run in runs:
+            if not run:
+                continue
+            if len(run) == 1 and run[0] in other_pieces:
+                if keep_same:
+                    kept.append(run[0])
+                continue
+            if len(run) == 1 and (run[0][1], run[0][0]) in other_pieces:
+                if keep_opposite:
+                    kept.append(run[0])
+                continue
+            a, b = max(run, key=lambda s: (s[1][0] - s[0][0]) ** 2 + (s[1][1] - s[0][1]) ** 2)
+            if _inside(((a[0] + b[0]) / 2, (a[1] + b[1]) / 2), rings_other, tree, max_x) == keep_inside:
+                kept.extend(run)
+    return kept
+
+
+def _turn(incoming, outgoing):
+    #Angle turned from one direction to the next, left turns positive
+    (a, b), (c, d) = incoming, outgoing
+    ux, uy = b[0] - a[0], b[1] - a[1]
+    vx, vy = d[0] - c[0], d[1] - c[1]
+    return math.atan2(ux * vy - uy * vx, ux * vx + uy * vy)
+
+
+def assemble(pieces):
+    #Links directed pieces into closed rings. Where several pieces leave a
+    #vertex the sharpest left turn is taken, which keeps polygons that only
+    #touch at a point as separate rings.
+    outgoing = {}
+    for piece in pieces:
+        outgoing.setdefault(piece[0], []).append(piece)
+    rings = []
+    for first in pieces:
+        if first[0] not in outgoing or first not in outgoing[first[0]]:
+            continue
+        outgoing[first[0]].remove(first)
+        ring = [first[0], first[1]]
+        current = first
+        while ring[-1] != ring[0]:
+            choices = outgoing.get(ring[-1])
+            if not choices:
+                break
+            if len(choices) == 1:
+                following = choices.pop()
+            else:
+                following = max(choices, key=lambda piece: _turn(current, piece))
+                choices.remove(following)
+            ring.append(following[1])
+            current = following
+        if ring[-1] == ring[0] and len(ring) >= 4:
+            rings.append(ring)
+    return rings
+
+
+def split_ring(ring):
+    #Splits a ring that passes through a vertex more than once into simple
+    #loops, such as two openings that meet at a corner
+    loops = []
+    stack = []
+    position = {}
+    for p in ring:
+        n = position.get(p)
+        if n is None:
+            position[p] = len(stack)
+            stack.append(p)
+            continue
+        loops.append(stack[n:] + [p])
+        for q in stack[n + 1:]:
+            del position[q]
+        del stack[n + 1:]
+    return loops
+
+
+def polygons_from_rings(rings):
+    #Counter-clockwise rings are exteriors, each clockwise ring goes in the
+    #smallest exterior around it
+    shells = []
+    holes = []
+    for ring in (loop for ring in rings for loop in split_ring(ring)):
+        ring = clean_ring(_simplify(ring))
+        if ring is None:
+            continue
+        area = _ring_area(ring)
+        if area > 0:
+            shells.append([area, _ring_box(ring), set(ring), [ring], None])
+        elif area < 0:
+            holes.append(ring)
+    shells.sort(key=lambda s: s[0])
+    tree = Geometry_Core.STRtree([(shell[1], n) for n, shell in enumerate(shells)]) if shells else None
+    for hole in holes:
+        box = _ring_box(hole)
+        for n in sorted(tree.query(box)) if tree else []:
+            area, shell_box, vertices, poly, prepared = shells[n]
+            if not (shell_box[0] <= box[0] and shell_box[1] <= box[1] and shell_box[2] >= box[2] and shell_box[3] >= box[3]):
+                continue
+            #Where a hole meets its shell they share a vertex, so a hole vertex
+            #that isn't one of the shell's is clearly inside or outside. Large
+            #outlines hold many holes, their edges are indexed once.
+            point = next((p for p in hole if p not in vertices), None)
+            if point is None:
+                continue
+            if prepared is None:
+                prepared = shells[n][4] = Geometry_Core.Prepared({'type': 'Polygon', 'coordinates': [poly[0]]})
+            if prepared.locate(point) != Geometry_Core.OUTSIDE:
+                poly.append(hole)
+                break
+    return [shell[3] for shell in shells]
+
+
+#   Overlay operation -> (A outside B kept, B outside A kept, keep rules for A's
+#   pieces and B's pieces as (keep_same, keep_inside, keep_opposite))
+OPERATIONS = {
+    'union': (True, True, (True, False, False), (False, False, False)),
+    'intersection': (False, False, (True, True, False), (False, True, False)),
+    'difference': (True, False, (False, False, True), (False, True, False)),
+}
+
+
+def overlay(a, b, operation='union'):
+    #Union, intersection or difference (a less b) of two lists of polygons that
+    #are each already dissolved. Polygons whose boxes don't meet the other side
+    #pass straight through (or drop out).
+    keep_a, keep_b, rules_a, rules_b = OPERATIONS[operation]
+    if not a or not b:
+        return (a if keep_a else []) + (b if keep_b else [])
+    tree = Geometry_Core.STRtree([(_poly_box(poly), n) for n, poly in enumerate(b)])
+    result = []
+    active_a = []
+    touched = set()
+    for poly in a:
+        hits = tree.query(_poly_box(poly))
+        if hits:
+            active_a.append(poly)
+            touched.update(hits)
+        elif keep_a:
+            result.append(poly)
+    active_b = [poly for n, poly in enumerate(b) if n in touched]
+    if keep_b:
+        result.extend(poly for n, poly in enumerate(b) if n not in touched)
+    if not active_a:
+        return result
+
+    rings_a = _edges(active_a)
+    rings_b = _edges(active_b)
+    cuts_a, cuts_b, touch_a, touch_b, tree_b = _node(rings_a, rings_b)
+    tree_a = Geometry_Core.STRtree([(Geometry_Core._segment_box(rings_a[r][e]), (r, e))
+                                    for r in range(len(rings_a)) for e in range(len(rings_a[r]))])
+    pieces_a = _pieces(rings_a, cuts_a)
+    pieces_b = _pieces(rings_b, cuts_b)
+    set_a = set(p for ring in pieces_a for p in ring)
+    set_b = set(p for ring in pieces_b for p in ring)
+    vertices_a = set(p[0] for p in set_a)
+    vertices_b = set(p[0] for p in set_b)
+    #The outlines meet at cut points, touching vertices and shared vertices
+    cut_points = set(p for ring in cuts_a for edge in ring for p in edge)
+    breaks = cut_points | touch_a | touch_b | (vertices_a & vertices_b)
+    max_x = max(_poly_box(poly)[2] for poly in active_a + active_b)
+    kept = _keep(pieces_a, set_b, breaks, rings_b, tree_b, max_x, *rules_a)
+    kept_b = _keep(pieces_b, set_a, breaks, rings_a, tree_a, max_x, *rules_b)
+    if operation == 'difference':
+        #B's outline inside A becomes the edge of the holes or notches it cuts
+        kept_b = [(piece[1], piece[0]) for piece in kept_b]
+    result.extend(polygons_from_rings(assemble(kept + kept_b)))
+    return result
+
+
+def union(a, b):
+    #Union of two lists of polygons that are each already dissolved
+    return overlay(a, b, 'union')
+
+
+def cascaded_union(polys):
+    #Unions neighbouring polygons in pairs level by level, STR order keeps
+    #each pair close together
+    if not polys:
+        return []
+    tree = Geometry_Core.STRtree([(_poly_box(poly), poly) for poly in polys])
+    parts = [[poly] for poly in tree.items]
+    while len(parts) > 1:
+        parts = [union(parts[n], parts[n + 1]) if n + 1 < len(parts) else parts[n]
+                 for n in range(0, len(parts), 2)]
+    return parts[0]
+
+
+def _net_area(poly):
+    return _ring_area(poly[0]) + sum(_ring_area(hole) for hole in poly[1:])
+
+
+def _within(ring, other):
+    #True when ring lies inside the ring other, tested at a vertex they don't
+    #share (rings of a dissolved outline only meet at vertices)
+    box, other_box = _ring_box(ring), _ring_box(other)
+    if not (other_box[0] <= box[0] and other_box[1] <= box[1] and other_box[2] >= box[2] and other_box[3] >= box[3]):
+        return False
+    vertices = set(other)
+    point = next((p for p in ring if p not in vertices), None)
+    return point is not None and Geometry_Core.point_in_rings(point, [other])
+
+
+def remove_slivers(polys, sliver_area=SLIVER_AREA, sliver_width=SLIVER_WIDTH):
+    #Fills the gaps that are smaller than sliver_area or narrower than
+    #sliver_width (twice the area over the perimeter) and drops parts smaller
+    #than sliver_area. A gap is a hole less the parts inside it, when it's
+    #filled those parts join the polygon around them and their holes become
+    #its holes.
+    if not sliver_area and not sliver_width:
+        return polys
+    tree = Geometry_Core.STRtree([(_poly_box(poly), n) for n, poly in enumerate(polys)])
+    absorbed = set()
+    rings = [[poly[0]] for poly in polys]
+    for n, poly in enumerate(polys):
+        for hole in poly[1:]:
+            inside = [m for m in tree.query(_ring_box(hole)) if m != n and _within(polys[m][0], hole)]
+            #Parts in the holes of other parts in the gap aren't in the gap
+            inside = [m for m in inside if not any(k != m and _within(polys[m][0], polys[k][0]) for k in inside)]
+            area = -_ring_area(hole) - sum(_ring_area(polys[m][0]) for m in inside)
+            length = _ring_length(hole) + sum(_ring_length(polys[m][0]) for m in inside)
+            if not ((sliver_area and area < sliver_area) or (sliver_width and 2 * area / length < sliver_width)):
+                rings[n].append(hole)
+                continue
+            for m in inside:
+                absorbed.add(m)
+                rings[n].extend(polys[m][1:])
+    result = []
+    for n, poly in enumerate(rings):
+        if n in absorbed or (sliver_area and _net_area(poly) < sliver_area):
+            continue
+        result.append(poly)
+    return result
+
+
+def dissolve(geometries, snap_tolerance=SNAP_TOLERANCE, sliver_area=SLIVER_AREA, sliver_width=SLIVER_WIDTH):
+    #One MultiPolygon covering the polygons of every geometry, None when there
+    #are none
+    polys = []
+    for geom in geometries:
+        if geom is not None:
+            polys.extend(oriented_polygons(geom))
+    polys = snap(polys, snap_tolerance)
+    polys = remove_slivers(cascaded_union(polys), sliver_area, sliver_width)
+    if not polys:
+        return None
+    return {'type': 'MultiPolygon', 'coordinates': [[[tuple(p) for p in ring] for ring in poly] for poly in polys]}
+
+
+# ---------------------------------------------------------------------------
+#   ArcGIS
+# ---------------------------------------------------------------------------
+
+def write_polygon(output, geom, spatial_reference):
+    #Creates output (in_memory or a geodatabase) holding geom as one feature,
+    #or no features when geom is None
+    import arcpy
+    workspace, name = os.path.split(output)
+    if arcpy.Exists(output):
+        arcpy.Delete_management(output)
+    arcpy.CreateFeatureclass_management(workspace, name, 'POLYGON', spatial_reference=spatial_reference)
+    if geom is not None:
+        with arcpy.da.InsertCursor(output, ['SHAPE@']) as cursor:
+            cursor.insertRow([Geometry_Core.to_arcpy(geom, spatial_reference)])
+    return output
+
+
+def write_dissolved(output, geometries, spatial_reference, snap_tolerance=SNAP_TOLERANCE,
+                    sliver_area=SLIVER_AREA, sliver_width=SLIVER_WIDTH):
+    #Dissolves geometries into output. Polygons that dissolve to nothing raise
+    #rather than leave output empty. Returns the output.
+    geometries = [geom for geom in geometries if geom is not None]
+    merged = dissolve(geometries, snap_tolerance, sliver_area, sliver_width)
+    if geometries and merged is None:
+        raise ValueError(str(len(geometries)) + ' polygons dissolved to nothing for ' + output)
+    return write_polygon(output, merged, spatial_reference)
+
+
+def dissolve_shapes(shapes, output, spatial_reference, snap_tolerance=SNAP_TOLERANCE,
+                    sliver_area=SLIVER_AREA, sliver_width=SLIVER_WIDTH):
+    #Dissolves arcpy polygons into output. Returns the output.
+    geometries = [Geometry_Core.from_arcpy(shape) for shape in shapes if shape is not None]
+    return write_dissolved(output, geometries, spatial_reference, snap_tolerance, sliver_area, sliver_width)
+
+
+def dissolve_features(source, output, where=None, snap_tolerance=SNAP_TOLERANCE,
+                      sliver_area=SLIVER_AREA, sliver_width=SLIVER_WIDTH):
+    #Reads the shapes of source matching where and writes their dissolved
+    #outline to output. Returns the number of features read.
+    import arcpy
+    spatial_reference = arcpy.Describe(source).spatialReference
+    with arcpy.da.SearchCursor(source, ['SHAPE@'], where) as cursor:
+        shapes = [row[0] for row in cursor]
+    dissolve_shapes(shapes, output, spatial_reference, snap_tolerance, sliver_area, sliver_width)
+    return len(shapes)
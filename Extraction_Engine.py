@@ -0,0 +1,451 @@
+# ---------------------------------------------------------------------------
+# Extraction_Engine.py
+# Created on: Oct 18, 2026
+#
+# Description: Shared select -> delete fields -> copy engine for the BCTS data
+#           extractors. A referral package is a list of layers, each declared
+#           with layer(): where it comes from, what it joins to, how its
+#           features are picked (by key values collected from the first layer,
+#           or within a distance of it) and which fields it keeps.
+#
+#           The first layer drives the package, it's selected with the user's
+#           expression and the key values the other layers need are collected
+#           from it. The other layers are then extracted one after the other,
+#           each into its own in_memory feature class through its own layer
+#           names. arcpy isn't safe to call from several threads and in_memory
+#           belongs to the process, so they all run in the calling process.
+#
+#           Route layers picked by distance (the roads) only build route events
+#           for the routes within the distance of the first layer: the route
+#           lines are searched by bounding box through their spatial index and
+#           measured with Geometry_Core.features_within, and the events of the
+#           other routes are never located.
+#
+#           Dissolved layers are merged by Block_Dissolve. A dissolved first
+#           layer with nothing to join or collect is read straight from its
+#           source into the merged polygon, without a selected copy.
+#
+#           Sources, join tables and kept fields can come from a script controls
+#           table (Script_Variable, Variable_Value, Variable_table_join,
+#           variable_field_list), which is read once.
+#
+#           export() writes the extracted layers out. Each layer is read once
+#           with a search cursor and every row goes to an insert cursor for each
+#           requested format, so only the outputs asked for are written and
+#           layers with no features aren't written at all. The feature count,
+#           extent, schema and outputs of every layer are recorded in a JSON
+#           manifest. The 'gpkg' and 'fgb' formats are written by
+#           Spatial_Packages (a GeoPackage with a table per layer, a FlatGeobuf
+#           file per layer), both with a spatial index.
+#
+# Author:   Daniel Otto
+# ---------------------------------------------------------------------------
+
+import os
+import sys
+import time
+from collections import OrderedDict, namedtuple
+
+sys.path.insert(1, os.path.split(os.path.abspath(sys.argv[0]))[0])
+import Block_Dissolve
+import Geometry_Core
+import Manifest_Files
+import Query_Builder
+import Spatial_Packages
+
+#   name: output name, variable: controls table Script_Variable for the source,
+#   source: feature class (or filled from variable), key: field matched against
+#   the collected key values, collect: field of the first layer whose values the
+#   other layers are selected by, filter: extra where clause, fields: fields to
+#   keep, join_table/join_field: table joined before selecting, dissolve: dissolve
+#   into one feature, near: search distance (or a controls variable holding it)
+#   for a selection by location around the first layer, route: (route id field,
+#   event properties) to build route events from join_table, style: how the
+#   layer is drawn in a KML (KML_Writer.style)
+Layer = namedtuple('Layer', 'name variable source key collect filter fields join_table join_field dissolve near route style')
+
+
+def layer(name, variable=None, source=None, key=None, collect=None, filter=None, fields=None,
+          join_table=None, join_field=None, dissolve=False, near=None, route=None, style=None):
+    return Layer(name, variable, source, key, collect, filter, fields, join_table, join_field,
+                 dissolve, near, route, style)
+
+
+def load_controls(table):
+    #Every row of a script controls table in one read, keyed by Script_Variable
+    import arcpy
+    fields = [f.name for f in arcpy.ListFields(table) if f.type not in ('OID', 'Geometry')]
+    controls = {}
+    with arcpy.da.SearchCursor(table, fields) as cursor:
+        for row in cursor:
+            values = dict(zip(fields, row))
+            controls[values['Script_Variable']] = values
+    return controls
+
+
+def control_value(controls, variable, column='Variable_Value'):
+    return controls[variable][column]
+
+
+def resolve(layers, controls, workspace):
+    #Fills source, join table, kept fields and distance from the controls table
+    resolved = []
+    for item in layers:
+        if item.variable is None:
+            resolved.append(item)
+            continue
+        row = controls[item.variable]
+        changes = {}
+        if item.source is None:
+            changes['source'] = os.path.join(workspace, row['Variable_Value'])
+        if item.join_table is None and (item.join_field or item.route) and row.get('Variable_table_join'):
+            changes['join_table'] = os.path.join(workspace, row['Variable_table_join'])
+        if item.fields is None and row.get('variable_field_list'):
+            changes['fields'] = [f.strip() for f in row['variable_field_list'].split(',') if f.strip()]
+        if item.near in controls:
+            changes['near'] = control_value(controls, item.near)
+        resolved.append(item._replace(**changes))
+    return resolved
+
+
+def keep_fields(dataset, keep):
+    #Deletes every field that isn't required or in keep (None keeps them all)
+    import arcpy
+    if keep is None:
+        return
+    keep = set(k.upper() for k in keep)
+    delete = [f.name for f in arcpy.ListFields(dataset) if not f.required and f.name.upper() not in keep]
+    if delete:
+        arcpy.DeleteField_management(dataset, delete)
+
+
+def count(dataset):
+    import arcpy
+    return int(arcpy.GetCount_management(dataset).getOutput(0))
+
+
+#   Metres in each linear unit a search distance can be given in
+LINEAR_UNITS = {'METERS': 1.0, 'METRES': 1.0, 'KILOMETERS': 1000.0, 'KILOMETRES': 1000.0,
+                'FEET': 0.3048, 'YARDS': 0.9144, 'MILES': 1609.344}
+
+
+def linear_distance(value):
+    #A search distance ('500 Meters', '0.5 Kilometers', 500) in metres, None if
+    #it can't be read
+    parts = str(value).strip().split()
+    try:
+        number = float(parts[0])
+    except (IndexError, ValueError):
+        return None
+    if len(parts) == 1:
+        return number
+    unit = parts[1].upper()
+    if unit in LINEAR_UNITS:
+        return number * LINEAR_UNITS[unit]
+    return None
+
+
+def _box_polygon(box):
+    return {'type': 'Polygon', 'coordinates': [[(box[0], box[1]), (box[0], box[3]), (box[2], box[3]),
+                                                 (box[2], box[1]), (box[0], box[1])]]}
+
+
+def near_keys(source, key_field, near_features, distance, name='near'):
+    #Distinct key_field values of the source features within distance (metres)
+    #of near_features. The source is searched through its spatial index with
+    #the bounding boxes of the near features grown by the distance, and only
+    #the features found are read and measured with Geometry_Core.features_within.
+    import arcpy
+    with arcpy.da.SearchCursor(near_features, ['SHAPE@']) as cursor:
+        targets = [Geometry_Core.from_arcpy(row[0]) for row in cursor if row[0] is not None]
+    if not targets:
+        return []
+    spatial_reference = arcpy.Describe(near_features).spatialReference
+    boxes = [Geometry_Core.expand(Geometry_Core.bbox(t), distance) for t in targets]
+    search = r'in_memory/' + name + '_search'
+    arcpy.CopyFeatures_management([Geometry_Core.to_arcpy(_box_polygon(b), spatial_reference) for b in boxes], search)
+    arcpy.MakeFeatureLayer_management(source, name + '_candidates')
+    try:
+        arcpy.SelectLayerByLocation_management(name + '_candidates', 'INTERSECT', search, '', 'NEW_SELECTION')
+        with arcpy.da.SearchCursor(name + '_candidates', [key_field, 'SHAPE@'],
+                                   spatial_reference=spatial_reference) as cursor:
+            features = [(row[0], Geometry_Core.from_arcpy(row[1])) for row in cursor
+                        if row[0] is not None and row[1] is not None]
+    finally:
+        arcpy.Delete_management(name + '_candidates')
+        arcpy.Delete_management(search)
+    keys = OrderedDict()
+    for key in Geometry_Core.features_within(features, targets, distance):
+        keys[key] = True
+    return list(keys)
+
+
+def _where(item, where):
+    if item.filter:
+        return '(' + where + ') and ' + item.filter if where else item.filter
+    return where
+
+
+def extract_layer(item, where=None, near_features=None):
+    #Extracts one layer to in_memory/<name> and returns its path
+    import arcpy
+    output = r'in_memory/' + item.name
+    if item.route:
+        #Route events selected by distance are only built for the routes within
+        #that distance, an event can't be nearer than the route it lies on
+        route_id, properties = item.route
+        routes = ''
+        distance = linear_distance(item.near) if item.near is not None else None
+        if distance is not None:
+            routes = Query_Builder.where_clause(route_id, near_keys(item.source, route_id, near_features,
+                                                                    distance, item.name))
+        arcpy.MakeFeatureLayer_management(item.source, item.name + '_FL', routes)
+        arcpy.MakeTableView_management(item.join_table, item.name + '_TV', routes)
+        arcpy.MakeRouteEventLayer_lr(item.name + '_FL', route_id, item.name + '_TV', properties, item.name + '_EV')
+        selectable = item.name + '_EV'
+    elif item.join_table:
+        arcpy.MakeFeatureLayer_management(item.source, item.name + '_FL')
+        arcpy.AddJoin_management(item.name + '_FL', item.join_field, item.join_table, item.join_field)
+        selectable = item.name + '_FL'
+    else:
+        selectable = item.source
+    if item.near is not None:
+        if selectable == item.source:
+            arcpy.MakeFeatureLayer_management(item.source, item.name + '_FL')
+            selectable = item.name + '_FL'
+        arcpy.SelectLayerByLocation_management(selectable, 'INTERSECT', near_features, item.near, 'NEW_SELECTION')
+        if item.filter:
+            arcpy.SelectLayerByAttribute_management(selectable, 'SUBSET_SELECTION', item.filter)
+        selected = output + '_select' if item.dissolve else output
+        arcpy.CopyFeatures_management(selectable, selected)
+    else:
+        selected = output + '_select' if item.dissolve else output
+        arcpy.Select_analysis(selectable, selected, _where(item, where))
+    keep_fields(selected, item.fields)
+    for name in (item.name + '_FL', item.name + '_TV', item.name + '_EV'):
+        if arcpy.Exists(name):
+            arcpy.Delete_management(name)
+    return selected
+
+
+def _dissolve(item, selected):
+    import arcpy
+    output = r'in_memory/' + item.name
+    Block_Dissolve.dissolve_features(selected, output)
+    arcpy.Delete_management(selected)
+    return output
+
+
+def _direct(item):
+    #A dissolved layer that can be merged straight from its source
+    return item.dissolve and not (item.collect or item.join_table or item.route or item.near is not None)
+
+
+def collect_keys(dataset, field):
+    #Distinct values of field, in the order they're first read
+    import arcpy
+    keys = OrderedDict()
+    with arcpy.da.SearchCursor(dataset, [field]) as cursor:
+        for row in cursor:
+            if row[0] is not None:
+                keys[row[0]] = True
+    return list(keys)
+
+
+def extract(layers, where, log=None):
+    #Extracts the first layer with where, then the others from its keys or
+    #location. Returns an OrderedDict of name -> (in_memory path, feature count)
+    #in the order the layers were declared.
+    log = log or (lambda msg: None)
+    driver, others = layers[0], list(layers[1:])
+    if _direct(driver):
+        first = r'in_memory/' + driver.name
+        keys = []
+        log(str(Block_Dissolve.dissolve_features(driver.source, first, _where(driver, where))) + ' ' +
+            driver.name + ' selected')
+    else:
+        selected = extract_layer(driver, where)
+        keys = collect_keys(selected, driver.collect) if driver.collect else []
+        log(str(count(selected)) + ' ' + driver.name + ' selected')
+        first = _dissolve(driver, selected) if driver.dissolve else selected
+
+    outputs = OrderedDict([(driver.name, (first, count(first)))])
+    for item in others:
+        if item.near is not None:
+            path = extract_layer(item, near_features=first)
+        else:
+            path = extract_layer(item, Query_Builder.where_clause(item.key, keys))
+        if item.dissolve:
+            path = _dissolve(item, path)
+        outputs[item.name] = (path, count(path))
+        log(str(outputs[item.name][1]) + ' ' + item.name + ' selected')
+    return outputs
+
+
+# ---------------------------------------------------------------------------
+#   Export
+# ---------------------------------------------------------------------------
+
+#   format: manifest name, workspace: geodatabase or folder, extension: added to
+#   the layer name ('.shp' for shapefiles). For 'gpkg' the workspace is the
+#   GeoPackage, for 'fgb' the folder with extension '.fgb'.
+Target = namedtuple('Target', 'format workspace extension')
+
+
+def target(format, workspace, extension=''):
+    return Target(format, workspace, extension)
+
+
+def attribute_fields(dataset):
+    #Fields copied to the outputs, everything but the OID and geometry
+    import arcpy
+    return [{'name': f.name, 'type': f.type, 'length': f.length} for f in arcpy.ListFields(dataset)
+            if f.type not in ('OID', 'Geometry') and not f.required]
+
+
+def _same_field(source, output):
+    #Shapefiles cut names to 10 characters and make repeats unique with _1, _2...
+    source, output = source.upper(), output.upper()
+    if output in (source, source[:10]):
+        return True
+    stem, _, number = output.rpartition('_')
+    return bool(stem) and number.isdigit() and source.startswith(stem)
+
+
+def _output_fields(output, names):
+    #Position of each source field in the output. The output was created from
+    #the source as a template so its fields are in the same order, a source
+    #field the format can't hold is skipped.
+    import arcpy
+    found = [f.name for f in arcpy.ListFields(output) if f.type not in ('OID', 'Geometry') and not f.required]
+    mapping = []
+    for n, name in enumerate(names):
+        if len(mapping) < len(found) and _same_field(name, found[len(mapping)]):
+            mapping.append((n, found[len(mapping)]))
+    return mapping
+
+
+class PackageCursor(object):
+    #Insert cursor over a Spatial_Packages layer, rows are (shape, values...)
+
+    def __init__(self, layer):
+        self.layer = layer
+
+    def insertRow(self, row):
+        shape = row[0]
+        self.layer.insert(Geometry_Core.from_arcpy(shape) if shape is not None else None, row[1:])
+
+    def close(self):
+        self.layer.close()
+
+
+def _open_package(dataset, name, item, fields):
+    import arcpy
+    describe = arcpy.Describe(dataset)
+    spatial_reference = describe.spatialReference
+    if item.format == 'gpkg':
+        output = item.workspace
+    else:
+        output = os.path.join(item.workspace, name + item.extension)
+    package = Spatial_Packages.open_layer(item.format, output, name,
+                                          [(f['name'], Spatial_Packages.field_type(f['type'])) for f in fields],
+                                          Spatial_Packages.SHAPE_TYPES.get(describe.shapeType, 'Unknown'),
+                                          spatial_reference.factoryCode or -1,
+                                          spatial_reference.exportToString().split(';')[0])
+    if item.format == 'gpkg':
+        output = output + '|' + name
+    return output, PackageCursor(package), list(range(len(fields) + 1))
+
+
+def _open_writer(dataset, name, item, fields):
+    import arcpy
+    if item.format in Spatial_Packages.FORMATS:
+        return _open_package(dataset, name, item, fields)
+    names = [f['name'] for f in fields]
+    output = os.path.join(item.workspace, name + item.extension)
+    if arcpy.Exists(output):
+        arcpy.Delete_management(output)
+    describe = arcpy.Describe(dataset)
+    arcpy.CreateFeatureclass_management(item.workspace, name + item.extension, describe.shapeType.upper(),
+                                        dataset, spatial_reference=describe.spatialReference)
+    mapping = _output_fields(output, names)
+    cursor = arcpy.da.InsertCursor(output, ['SHAPE@'] + [m[1] for m in mapping])
+    #Source row positions are shifted by one for the shape
+    return output, cursor, [0] + [m[0] + 1 for m in mapping]
+
+
+def _extent(extent, shape):
+    if shape is None:
+        return extent
+    box = shape.extent
+    if extent is None:
+        return [box.XMin, box.YMin, box.XMax, box.YMax]
+    return [min(extent[0], box.XMin), min(extent[1], box.YMin), max(extent[2], box.XMax), max(extent[3], box.YMax)]
+
+
+def _write(writers, row):
+    for output, insert, positions in writers:
+        insert.insertRow([row[p] for p in positions])
+
+
+def export_layer(dataset, name, targets, always=False):
+    #Streams one layer to every target in a single read. Returns its manifest entry.
+    import arcpy
+    fields = attribute_fields(dataset)
+    names = [f['name'] for f in fields]
+    writers = []
+    features = 0
+    extent = None
+    try:
+        with arcpy.da.SearchCursor(dataset, ['SHAPE@'] + names) as cursor:
+            for row in cursor:
+                if not writers:
+                    writers = [_open_writer(dataset, name, item, fields) for item in targets]
+                _write(writers, row)
+                features += 1
+                extent = _extent(extent, row[0])
+        if not writers and always:
+            writers = [_open_writer(dataset, name, item, fields) for item in targets]
+    finally:
+        #Dropping the insert cursors releases the outputs, the packages are
+        #closed to build their indexes
+        written = list(writer[0] for writer in writers)
+        for writer in writers:
+            if isinstance(writer[1], PackageCursor):
+                writer[1].close()
+        del writers[:]
+    spatial_reference = arcpy.Describe(dataset).spatialReference
+    return {'features': features,
+            'extent': extent,
+            'spatial_reference': spatial_reference.factoryCode or spatial_reference.name,
+            'fields': fields,
+            'outputs': dict((item.format, output) for item, output in zip(targets, written))}
+
+
+def export(outputs, targets, manifest_path=None, always=(), log=None):
+    #Writes every extracted layer to the targets and the manifest to
+    #manifest_path. Returns the manifest, an OrderedDict of layer entries.
+    log = log or (lambda msg: None)
+    layers = OrderedDict()
+    for name, (path, _) in outputs.items():
+        layers[name] = export_layer(path, name, targets, name in always)
+        if layers[name]['outputs']:
+            log(str(layers[name]['features']) + ' ' + name + ' written to ' + ', '.join(sorted(layers[name]['outputs'])))
+    manifest = OrderedDict([('created', time.strftime('%Y-%m-%d %H:%M:%S')),
+                            ('formats', [item.format for item in targets]),
+                            ('layers', layers)])
+    if manifest_path:
+        Manifest_Files.save_manifest(manifest_path, manifest, sort_keys=False)
+    return manifest
+
+
+def export_kml(outputs, layers, path, name, log=None):
+    #Writes the extracted layers with features to a KML or KMZ, each drawn with
+    #the style of its layer spec. Returns the placemark count.
+    import KML_Writer
+    log = log or (lambda msg: None)
+    kml_layers = [KML_Writer.KMLLayer(item.name, item.style, KML_Writer.features_from_dataset(outputs[item.name][0]))
+                  for item in layers if outputs[item.name][1] > 0]
+    count = KML_Writer.write(path, name, kml_layers)
+    log(str(count) + ' features written to ' + path)
+    return count
@@ -0,0 +1,220 @@
+# ---------------------------------------------------------------------------
+# FN_Overlap_Batch.py
+# Created on: Oct 18, 2026
+#
+# Description: Per feature First Nations consultation area overlaps for large
+#           selections (a licence, an operating plan). Every input feature is
+#           joined to the consultation area snapshot in one pass: the snapshot
+#           STR tree gives the candidate areas for each feature's bounding box,
+#           the exact intersect test confirms them and, when asked for, the
+#           overlap area and the percent of the feature it covers are measured.
+#
+#           Rows are written as they are found, so the output can be read while
+#           the batch runs and memory doesn't grow with the size of the input.
+#           Features that don't overlap any consultation area get one row with
+#           a blank organization so every input feature is accounted for.
+#
+#           Input is a feature class or layer (needs arcpy), a GeoJSON file, a
+#           CSV with a WKT column or a text file of WKT, one per line. Output is
+#           a CSV or, for a path inside a file geodatabase, a table.
+#
+# Usage:    python FN_Overlap_Batch.py <input> <output> [--id-field NAME] [--area]
+#                                      [--snapshot PATH]
+#
+# Author:   Daniel Otto
+# ---------------------------------------------------------------------------
+
+from __future__ import division
+
+import csv
+import json
+import os
+import sys
+import time
+from argparse import ArgumentParser
+
+import FN_Overlap_Index
+import Geometry_Core
+import Geometry_Overlay
+
+BASE_FIELDS = ['FEATURE_ID', 'CONTACT_ORGANIZATION_NAME', 'CNSLTN_AREA_NAME']
+AREA_FIELDS = ['OVERLAP_HA', 'OVERLAP_PCT']
+
+#   Input files that are read without arcpy
+GEOJSON_EXTENSIONS = ('.geojson', '.json')
+CSV_EXTENSIONS = ('.csv',)
+WKT_EXTENSIONS = ('.wkt', '.txt')
+
+
+def output_fields(with_area):
+    return BASE_FIELDS + (AREA_FIELDS if with_area else [])
+
+
+# ---------------------------------------------------------------------------
+#   Inputs, each yields (feature id, geometry)
+# ---------------------------------------------------------------------------
+
+def read_geojson(path, id_field=None):
+    with open(path) as f:
+        data = json.load(f)
+    features = data['features'] if data.get('type') == 'FeatureCollection' else [data]
+    for n, feature in enumerate(features):
+        properties = feature.get('properties') or {}
+        if id_field:
+            fid = properties.get(id_field)
+        else:
+            fid = feature.get('id', n + 1)
+        if feature.get('geometry'):
+            yield fid, Geometry_Core.from_geojson(feature)
+
+
+def read_wkt_csv(path, id_field=None):
+    #CSV with a WKT column, the id is id_field or the first other column
+    if sys.version_info[0] < 3:
+        f = open(path, 'rb')
+    else:
+        f = open(path, newline='')
+    with f:
+        reader = csv.DictReader(f)
+        wkt_field = [n for n in reader.fieldnames if n.upper() == 'WKT'][0]
+        if id_field is None:
+            others = [n for n in reader.fieldnames if n != wkt_field]
+            id_field = others[0] if others else None
+        for n, row in enumerate(reader):
+            if row[wkt_field]:
+                yield (row[id_field] if id_field else n + 1), Geometry_Core.from_wkt(row[wkt_field])
+
+
+def read_wkt_lines(path):
+    with open(path) as f:
+        for n, line in enumerate(f):
+            if line.strip():
+                yield n + 1, Geometry_Core.from_wkt(line)
+
+
+def read_feature_class(fc, id_field=None):
+    #Features of a feature class or layer (only the selection of a layer), in BC Albers
+    import arcpy
+    fields = [id_field or 'OID@', 'SHAPE@']
+    sr = arcpy.SpatialReference(FN_Overlap_Index.SPATIAL_REFERENCE)
+    with arcpy.da.SearchCursor(fc, fields, spatial_reference=sr) as cursor:
+        for row in cursor:
+            if row[1] is not None:
+                yield row[0], Geometry_Core.from_arcpy(row[1])
+
+
+def read_features(source, id_field=None):
+    extension = os.path.splitext(source)[1].lower()
+    if os.path.isfile(source) and extension in GEOJSON_EXTENSIONS:
+        return read_geojson(source, id_field)
+    if os.path.isfile(source) and extension in CSV_EXTENSIONS:
+        return read_wkt_csv(source, id_field)
+    if os.path.isfile(source) and extension in WKT_EXTENSIONS:
+        return read_wkt_lines(source)
+    return read_feature_class(source, id_field)
+
+
+# ---------------------------------------------------------------------------
+#   Join
+# ---------------------------------------------------------------------------
+
+def overlap_rows(index, features, with_area=False):
+    #Yields one row per feature and overlapping consultation area, in the
+    #order of output_fields(with_area). Areas are in hectares.
+    for fid, geom in features:
+        if Geometry_Core.is_empty(geom):
+            continue
+        prepared = Geometry_Core.Prepared(geom)
+        feature_area = Geometry_Core.area(geom) if with_area else 0
+        found = False
+        for area in sorted(index.overlaps(prepared), key=lambda a: (a['organization'] or '', a['area_name'] or '')):
+            found = True
+            row = [fid, area['organization'], area['area_name']]
+            if with_area:
+                shared = Geometry_Overlay.intersection_area(prepared, area['prepared'])
+                row.append(round(shared / 10000, 4))
+                row.append(round(100 * shared / feature_area, 2) if feature_area else None)
+            yield row
+        if not found:
+            yield [fid, '', ''] + ([0.0, 0.0] if with_area else [])
+
+
+# ---------------------------------------------------------------------------
+#   Outputs
+# ---------------------------------------------------------------------------
+
+def _cell(value):
+    if sys.version_info[0] < 3 and isinstance(value, unicode):
+        return value.encode('utf-8')
+    return value
+
+
+def write_csv(path, fields, rows):
+    #Streams rows to a CSV, flushing as it goes. Returns the row count.
+    if sys.version_info[0] < 3:
+        f = open(path, 'wb')
+    else:
+        f = open(path, 'w', newline='')
+    count = 0
+    with f:
+        writer = csv.writer(f)
+        writer.writerow(fields)
+        for row in rows:
+            writer.writerow([_cell(v) for v in row])
+            count += 1
+            if count % 500 == 0:
+                f.flush()
+    return count
+
+
+def write_table(path, fields, rows):
+    #Streams rows into a new geodatabase table. Returns the row count.
+    import arcpy
+    if arcpy.Exists(path):
+        arcpy.Delete_management(path)
+    workspace, name = os.path.split(path)
+    arcpy.CreateTable_management(workspace, name)
+    for field in fields:
+        if field in AREA_FIELDS:
+            arcpy.AddField_management(path, field, 'DOUBLE')
+        else:
+            arcpy.AddField_management(path, field, 'TEXT', field_length=255)
+    count = 0
+    with arcpy.da.InsertCursor(path, fields) as cursor:
+        for row in rows:
+            cursor.insertRow([v if f in AREA_FIELDS or v is None else '%s' % (v,) for f, v in zip(fields, row)])
+            count += 1
+    return count
+
+
+def write_rows(output, fields, rows):
+    #Geodatabase table for a path inside a .gdb, CSV otherwise
+    if '.gdb' in output.lower() and not output.lower().endswith('.csv'):
+        return write_table(output, fields, rows)
+    return write_csv(output, fields, rows)
+
+
+def run_batch(source, output, snapshot=FN_Overlap_Index.DEFAULT_SNAPSHOT, id_field=None,
+              with_area=False, log=None):
+    #Writes the per feature overlap table for source to output. Returns the number of rows.
+    log = log or (lambda msg: None)
+    start = time.time()
+    index = FN_Overlap_Index.OverlapIndex(snapshot)
+    fields = output_fields(with_area)
+    rows = overlap_rows(index, read_features(source, id_field), with_area)
+    count = write_rows(output, fields, rows)
+    index.close()
+    log(str(count) + ' overlap rows written to ' + output + ' in ' + str(round(time.time() - start, 1)) + 's')
+    return count
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Per feature FN consultation area overlaps')
+    parser.add_argument('input', help='feature class, GeoJSON, CSV with a WKT column or WKT text file')
+    parser.add_argument('output', help='CSV file or file geodatabase table')
+    parser.add_argument('--id-field', default=None, help='field that identifies each feature')
+    parser.add_argument('--area', action='store_true', help='add overlap hectares and percent of the feature')
+    parser.add_argument('--snapshot', default=FN_Overlap_Index.DEFAULT_SNAPSHOT)
+    args = parser.parse_args()
+    run_batch(args.input, args.output, args.snapshot, args.id_field, args.area,
+              log=lambda msg: sys.stdout.write(msg + '\n'))
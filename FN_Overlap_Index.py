@@ -0,0 +1,223 @@
+# ---------------------------------------------------------------------------
+# FN_Overlap_Index.py
+# Created on: Oct 18, 2026
+#
+# Description: Local snapshot of the First Nations consultation areas
+#           (WHSE_ADMIN_BOUNDARIES.PIP_CONSULTATION_AREAS_SP) for Overlap__FN.py.
+#           The snapshot is a SQLite file holding the geometry of every
+#           consultation area with its CONTACT_ORGANIZATION_NAME and
+#           CNSLTN_AREA_NAME, its bounding box and a packed STR tree over the
+#           bounding boxes. Overlap lookups search the tree, load only the
+#           candidate geometries and run the exact intersect test locally, so no
+#           BCGW connection is needed.
+#
+#           The snapshot is rebuilt with the refresh command and is considered
+#           stale once it is older than MAX_AGE_DAYS.
+#
+# Usage:    python FN_Overlap_Index.py refresh <snapshot.sqlite> <bcgw user> <bcgw password>
+#           python FN_Overlap_Index.py status <snapshot.sqlite>
+#           python FN_Overlap_Index.py query <snapshot.sqlite> <WKT in BC Albers>
+#
+# Author:   Daniel Otto
+# ---------------------------------------------------------------------------
+
+import json
+import os
+import sqlite3
+import sys
+import time
+
+import Geometry_Core
+
+SOURCE = 'WHSE_ADMIN_BOUNDARIES.PIP_CONSULTATION_AREAS_SP'
+FIELDS = ['CONTACT_ORGANIZATION_NAME', 'CNSLTN_AREA_NAME']
+DEFAULT_SNAPSHOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'FN_Consultation_Areas.sqlite')
+MAX_AGE_DAYS = 7
+
+#   BC Albers, the snapshot and every query geometry use it
+SPATIAL_REFERENCE = 3005
+
+#   Shared scripts (environment.Environment creates the BCGW connection)
+PYTHON_REPOSITORY = r'W:\FOR\RSI\TOC\Projects\ESRI_Scripts\Python_Repository'
+
+_SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE areas (id INTEGER PRIMARY KEY, organization TEXT, area_name TEXT,
+                    minx REAL, miny REAL, maxx REAL, maxy REAL, geometry TEXT);
+CREATE TABLE str_nodes (level INTEGER, position INTEGER, minx REAL, miny REAL, maxx REAL, maxy REAL,
+                        start INTEGER, finish INTEGER, PRIMARY KEY (level, position));
+CREATE TABLE str_items (position INTEGER PRIMARY KEY, minx REAL, miny REAL, maxx REAL, maxy REAL,
+                        area_id INTEGER);
+"""
+
+
+def write_snapshot(path, records, source=SOURCE):
+    #Writes a new snapshot from (organization, area name, geometry) records.
+    #The file is built beside the old one and swapped in when complete so
+    #lookups never see a half written snapshot. Returns the number of areas.
+    tmp = path + '.tmp'
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    conn = sqlite3.connect(tmp)
+    conn.executescript(_SCHEMA)
+    entries = []
+    count = 0
+    for organization, area_name, geom in records:
+        if Geometry_Core.is_empty(geom):
+            continue
+        count += 1
+        box = Geometry_Core.bbox(geom)
+        conn.execute('INSERT INTO areas VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                     (count, organization, area_name) + tuple(box) + (Geometry_Core.to_geojson(geom),))
+        entries.append((box, count))
+    nodes, items = Geometry_Core.STRtree(entries).to_rows()
+    conn.executemany('INSERT INTO str_nodes VALUES (?, ?, ?, ?, ?, ?, ?, ?)', nodes)
+    conn.executemany('INSERT INTO str_items VALUES (?, ?, ?, ?, ?, ?)', items)
+    meta = {'source': source, 'refreshed': repr(time.time()), 'count': str(count),
+            'spatial_reference': str(SPATIAL_REFERENCE), 'node_capacity': str(Geometry_Core.NODE_CAPACITY)}
+    conn.executemany('INSERT INTO meta VALUES (?, ?)', sorted(meta.items()))
+    conn.commit()
+    conn.close()
+    if os.path.exists(path):
+        os.remove(path)
+    os.rename(tmp, path)
+    return count
+
+
+def snapshot_info(path):
+    #Snapshot metadata (source, refreshed, count) or None when there is no snapshot
+    if not os.path.exists(path):
+        return None
+    conn = sqlite3.connect(path)
+    try:
+        info = dict(conn.execute('SELECT key, value FROM meta'))
+    finally:
+        conn.close()
+    info['refreshed'] = float(info['refreshed'])
+    info['count'] = int(info['count'])
+    return info
+
+
+def snapshot_age_days(path):
+    info = snapshot_info(path)
+    if info is None:
+        return None
+    return (time.time() - info['refreshed']) / 86400.0
+
+
+def is_stale(path, max_age_days=MAX_AGE_DAYS):
+    #True when the snapshot is missing or older than max_age_days
+    age = snapshot_age_days(path)
+    return age is None or age > max_age_days
+
+
+class OverlapIndex(object):
+    #Read only view of a snapshot. The STR tree is loaded when the index is
+    #opened, geometries are loaded and prepared on first use and kept for
+    #later lookups.
+
+    def __init__(self, path):
+        if not os.path.exists(path):
+            raise IOError('No consultation area snapshot at ' + path + ', run the refresh command first')
+        self.path = path
+        self.info = snapshot_info(path)
+        #The service opens the index in one thread and queries it from another
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        capacity = int(self.info.get('node_capacity', Geometry_Core.NODE_CAPACITY))
+        self.tree = Geometry_Core.STRtree.from_rows(self.conn.execute('SELECT * FROM str_nodes'),
+                                                    self.conn.execute('SELECT * FROM str_items'), capacity)
+        self._areas = {}
+
+    def close(self):
+        self.conn.close()
+
+    def _load(self, ids):
+        missing = [i for i in ids if i not in self._areas]
+        for start in range(0, len(missing), 500):
+            chunk = missing[start:start + 500]
+            sql = ('SELECT id, organization, area_name, minx, miny, maxx, maxy, geometry FROM areas WHERE id IN (' +
+                   ','.join('?' * len(chunk)) + ')')
+            for row in self.conn.execute(sql, chunk):
+                self._areas[row[0]] = {'id': row[0], 'organization': row[1], 'area_name': row[2],
+                                       'bbox': tuple(row[3:7]),
+                                       'prepared': Geometry_Core.Prepared(json.loads(row[7]))}
+        return [self._areas[i] for i in ids]
+
+    def candidates(self, box):
+        #Areas whose bounding box intersects box
+        return self._load(sorted(self.tree.query(box)))
+
+    def overlaps(self, geom):
+        #Areas that intersect the geometry (a geometry or Prepared)
+        prepared = Geometry_Core.prepare(geom)
+        return [area for area in self.candidates(prepared.bbox) if area['prepared'].intersects(prepared)]
+
+    def overlap_names(self, geoms):
+        #Sorted, distinct (organization, area name) pairs overlapped by any of the geometries
+        names = set()
+        for geom in geoms:
+            if Geometry_Core.is_empty(geom):
+                continue
+            for area in self.overlaps(geom):
+                names.add((area['organization'] or '', area['area_name'] or ''))
+        return sorted(names)
+
+
+def read_consultation_areas(bcgw_db):
+    #Reads every consultation area from the BCGW connection as
+    #(organization, area name, geometry) records in BC Albers
+    import arcpy
+    fc = os.path.join(bcgw_db, SOURCE)
+    with arcpy.da.SearchCursor(fc, FIELDS + ['SHAPE@'], spatial_reference=arcpy.SpatialReference(SPATIAL_REFERENCE)) as cursor:
+        for row in cursor:
+            if row[2] is None:
+                continue
+            yield row[0], row[1], Geometry_Core.from_arcpy(row[2])
+
+
+def refresh(path, bcgw_user, bcgw_password, log=None):
+    #Rebuilds the snapshot from the BCGW. Returns the number of areas written.
+    log = log or (lambda msg: None)
+    sys.path.insert(1, PYTHON_REPOSITORY)
+    from environment import Environment
+    sde_folder = 'Database Connections'
+    log('Connecting to the BCGW')
+    bcgw_db = Environment.create_bcgw_connection(location=sde_folder, bcgw_user_name=bcgw_user,
+                                                 bcgw_password=bcgw_password)
+    try:
+        start = time.time()
+        count = write_snapshot(path, read_consultation_areas(bcgw_db))
+        log('Snapshot of ' + str(count) + ' consultation areas written to ' + path +
+            ' in ' + str(round(time.time() - start, 1)) + 's')
+    finally:
+        Environment.delete_bcgw_connection(location=sde_folder)
+    return count
+
+
+def _print(msg):
+    sys.stdout.write(msg + '\n')
+
+
+if __name__ == '__main__':
+    command = sys.argv[1]
+    snapshot = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_SNAPSHOT
+    if command == 'refresh':
+        refresh(snapshot, sys.argv[3], sys.argv[4], log=_print)
+    elif command == 'status':
+        info = snapshot_info(snapshot)
+        if info is None:
+            _print('No snapshot at ' + snapshot)
+            sys.exit(1)
+        age = snapshot_age_days(snapshot)
+        _print(snapshot + ': ' + str(info['count']) + ' areas from ' + info['source'] + ', refreshed ' +
+               time.ctime(info['refreshed']) + ' (' + str(round(age, 1)) + ' days ago)' +
+               (' STALE' if is_stale(snapshot) else ''))
+        sys.exit(1 if is_stale(snapshot) else 0)
+    elif command == 'query':
+        start = time.time()
+        index = OverlapIndex(snapshot)
+        for organization, area_name in index.overlap_names([Geometry_Core.from_wkt(sys.argv[3])]):
+            _print("{:50}{:5}{}".format(organization, "|", area_name))
+        _print('Lookup took ' + str(round(time.time() - start, 3)) + 's')
+    else:
+        raise SystemExit('Unknown command ' + command + ', expected refresh, status or query')
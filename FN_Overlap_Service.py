@@ -0,0 +1,356 @@
+# ---------------------------------------------------------------------------
+# FN_Overlap_Service.py
+# Created on: Oct 18, 2026
+#
+# Description: Optional long running overlap lookup service. It opens the
+#           consultation area snapshot once, keeps the prepared geometries warm
+#           and answers overlap queries over HTTP on localhost, so Overlap__FN.py
+#           doesn't pay for loading the index on every run. Overlap__FN.py asks
+#           the service first and falls back to reading the snapshot itself
+#           when the service isn't running.
+#
+#           POST /overlaps takes JSON with any of
+#               "wkt":      list of WKT geometries
+#               "geojson":  list of GeoJSON geometries or features (with id)
+#               "ids":      list of feature ids from the --features file
+#               "area":     true to add overlap hectares and percent
+#           and returns the combined "overlaps" (organization, area name) and
+#           the per feature "rows" in FN_Overlap_Batch.output_fields order.
+#           GET /status reports the snapshot, request count and latency
+#           percentiles, POST /shutdown stops the service.
+#
+#           The service reopens the snapshot when its file changes, so a
+#           refresh is picked up without a restart. Requests are handled one
+#           at a time.
+#
+# Usage:    python FN_Overlap_Service.py serve [--snapshot PATH] [--port N] [--features FILE]
+#           python FN_Overlap_Service.py status [--port N]
+#           python FN_Overlap_Service.py stop [--port N]
+#           python FN_Overlap_Service.py selftest [--areas N] [--queries N]
+#
+# Author:   Daniel Otto
+# ---------------------------------------------------------------------------
+
+from __future__ import division
+
+import json
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from argparse import ArgumentParser
+from collections import deque
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from urllib.error import HTTPError
+    from urllib.request import Request, urlopen
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from urllib2 import HTTPError, Request, urlopen
+
+import FN_Overlap_Batch
+import FN_Overlap_Index
+import Geometry_Core
+
+HOST = '127.0.0.1'
+DEFAULT_PORT = int(os.environ.get('FN_OVERLAP_PORT', 8765))
+
+#   Latencies kept for the percentiles reported by /status
+LATENCY_WINDOW = 5000
+
+
+def percentiles(values, points=(50, 90, 95, 99)):
+    #Nearest rank percentiles of a list of values, in milliseconds when the
+    #values are seconds
+    if not values:
+        return {}
+    ordered = sorted(values)
+    result = {}
+    for p in points:
+        rank = max(1, int(math.ceil(p / 100 * len(ordered))))
+        result['p' + str(p)] = round(ordered[rank - 1] * 1000, 2)
+    result['max'] = round(ordered[-1] * 1000, 2)
+    return result
+
+
+class OverlapService(object):
+    #Holds the warm index and answers queries, independent of the HTTP layer
+
+    def __init__(self, snapshot, features=None, id_field=None):
+        self.snapshot = snapshot
+        self.started = time.time()
+        self.requests = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.features = {}
+        if features:
+            for fid, geom in FN_Overlap_Batch.read_features(features, id_field):
+                self.features[str(fid)] = geom
+        self.index = None
+        self._stamp = None
+        self._open()
+
+    def _open(self):
+        if self.index is not None:
+            self.index.close()
+        self._stamp = os.path.getmtime(self.snapshot)
+        self.index = FN_Overlap_Index.OverlapIndex(self.snapshot)
+
+    def _current(self):
+        #Reopens the snapshot when it was refreshed since it was opened
+        if os.path.getmtime(self.snapshot) != self._stamp:
+            self._open()
+        return self.index
+
+    def query(self, request):
+        index = self._current()
+        features = []
+        for n, wkt in enumerate(request.get('wkt') or []):
+            features.append(('wkt_' + str(n + 1), Geometry_Core.from_wkt(wkt)))
+        for n, geojson in enumerate(request.get('geojson') or []):
+            #Features keep their own id
+            fid = geojson.get('id') if geojson.get('type') == 'Feature' else None
+            features.append((fid if fid is not None else 'geojson_' + str(n + 1), Geometry_Core.from_geojson(geojson)))
+        missing = []
+        for fid in request.get('ids') or []:
+            if str(fid) in self.features:
+                features.append((fid, self.features[str(fid)]))
+            else:
+                missing.append(fid)
+        with_area = bool(request.get('area'))
+        rows = list(FN_Overlap_Batch.overlap_rows(index, features, with_area))
+        overlaps = sorted(set((r[1], r[2]) for r in rows if r[1] or r[2]))
+        return {'overlaps': [list(o) for o in overlaps], 'rows': rows,
+                'fields': FN_Overlap_Batch.output_fields(with_area), 'missing_ids': missing}
+
+    def record(self, seconds, failed=False):
+        self.requests += 1
+        if failed:
+            self.errors += 1
+        self.latencies.append(seconds)
+
+    def status(self):
+        info = dict(self.index.info)
+        return {'snapshot': self.snapshot, 'areas': info['count'], 'refreshed': info['refreshed'],
+                'uptime_seconds': round(time.time() - self.started, 1), 'requests': self.requests,
+                'errors': self.errors, 'features': len(self.features),
+                'latency_ms': percentiles(list(self.latencies))}
+
+
+def _handler(service):
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def log_message(self, format, *args):
+            #Keep the console quiet, latencies are reported by /status
+            pass
+
+        def _reply(self, code, body):
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == '/status':
+                self._reply(200, service.status())
+            elif self.path == '/ping':
+                self._reply(200, {'ok': True})
+            else:
+                self._reply(404, {'error': 'Unknown path ' + self.path})
+
+        def do_POST(self):
+            start = time.time()
+            if self.path == '/shutdown':
+                self._reply(200, {'ok': True})
+                threading.Thread(target=self.server.shutdown).start()
+                return
+            if self.path != '/overlaps':
+                self._reply(404, {'error': 'Unknown path ' + self.path})
+                return
+            try:
+                length = int(self.headers.get('Content-Length') or 0)
+                request = json.loads(self.rfile.read(length).decode('utf-8'))
+                body = service.query(request)
+            except Exception as e:
+                service.record(time.time() - start, failed=True)
+                self._reply(400, {'error': str(e)})
+                return
+            service.record(time.time() - start)
+            self._reply(200, body)
+
+    return Handler
+
+
+def make_server(service, port=DEFAULT_PORT):
+    #HTTP server bound to localhost only, port 0 picks a free port
+    return HTTPServer((HOST, port), _handler(service))
+
+
+def serve(snapshot, port=DEFAULT_PORT, features=None, id_field=None, log=None):
+    log = log or (lambda msg: None)
+    start = time.time()
+    service = OverlapService(snapshot, features, id_field)
+    server = make_server(service, port)
+    log('Serving ' + str(service.index.info['count']) + ' consultation areas on http://' + HOST + ':' +
+        str(server.server_address[1]) + ' (loaded in ' + str(round(time.time() - start, 2)) + 's)')
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        service.index.close()
+
+
+# ---------------------------------------------------------------------------
+#   Client
+# ---------------------------------------------------------------------------
+
+def _call(path, body=None, port=DEFAULT_PORT, timeout=30):
+    url = 'http://' + HOST + ':' + str(port) + path
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    request = Request(url, data, {'Content-Type': 'application/json'})
+    try:
+        response = urlopen(request, timeout=timeout)
+    except HTTPError as e:
+        raise RuntimeError('Overlap service error: ' + json.loads(e.read().decode('utf-8')).get('error', str(e)))
+    try:
+        return json.loads(response.read().decode('utf-8'))
+    finally:
+        response.close()
+
+
+def is_running(port=DEFAULT_PORT, timeout=0.5):
+    try:
+        return _call('/ping', port=port, timeout=timeout).get('ok', False)
+    except Exception:
+        return False
+
+
+def query(geometries=None, ids=None, area=False, port=DEFAULT_PORT, timeout=30):
+    #Asks the service for the overlaps of GeoJSON geometries (or features)
+    #and/or feature ids
+    return _call('/overlaps', {'geojson': geometries or [], 'ids': ids or [], 'area': area},
+                 port=port, timeout=timeout)
+
+
+def query_features(features, area=False, port=DEFAULT_PORT, timeout=300):
+    #Overlaps of (feature id, geometry) pairs, the rows keep the feature ids
+    return query([{'type': 'Feature', 'id': fid, 'geometry': geom, 'properties': {}} for fid, geom in features],
+                 area=area, port=port, timeout=timeout)
+
+
+def status(port=DEFAULT_PORT):
+    return _call('/status', port=port)
+
+
+def stop(port=DEFAULT_PORT):
+    return _call('/shutdown', {}, port=port)
+
+
+# ---------------------------------------------------------------------------
+#   Self test with synthetic boundaries
+# ---------------------------------------------------------------------------
+
+def synthetic_boundaries(count, seed=0, extent=(200000, 300000, 1800000, 1700000)):
+    #Seeded star shaped consultation areas scattered over BC Albers, yields
+    #(organization, area name, geometry) records like read_consultation_areas
+    rng = random.Random(seed)
+    for i in range(count):
+        cx = rng.uniform(extent[0], extent[2])
+        cy = rng.uniform(extent[1], extent[3])
+        radius = rng.uniform(2000, 60000)
+        vertices = rng.randint(20, 400)
+        angles = sorted(rng.uniform(0, 2 * math.pi) for _ in range(vertices))
+        ring = []
+        for a in angles:
+            r = radius * rng.uniform(0.6, 1.0)
+            ring.append([round(cx + r * math.cos(a), 2), round(cy + r * math.sin(a), 2)])
+        ring.append(ring[0])
+        yield 'Synthetic Nation ' + str(i % 150), 'Area ' + str(i), {'type': 'Polygon', 'coordinates': [ring]}
+
+
+def synthetic_blocks(count, seed=1, extent=(200000, 300000, 1800000, 1700000)):
+    rng = random.Random(seed)
+    for i in range(count):
+        x = rng.uniform(extent[0], extent[2])
+        y = rng.uniform(extent[1], extent[3])
+        w = rng.uniform(100, 1500)
+        h = rng.uniform(100, 1500)
+        yield {'type': 'Polygon', 'coordinates': [[[x, y], [x + w, y], [x + w, y + h], [x, y + h], [x, y]]]}
+
+
+def selftest(areas=2000, queries=300, log=None):
+    #Builds a synthetic snapshot, starts the service on a free port, checks its
+    #answers against direct lookups and brute force, and reports latency.
+    #Returns True when every answer matched.
+    log = log or (lambda msg: None)
+    work = tempfile.mkdtemp(prefix='fn_overlap_')
+    snapshot = os.path.join(work, 'synthetic.sqlite')
+    try:
+        records = list(synthetic_boundaries(areas))
+        FN_Overlap_Index.write_snapshot(snapshot, records, source='synthetic')
+        service = OverlapService(snapshot)
+        server = make_server(service, 0)
+        port = server.server_address[1]
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        log('Service on port ' + str(port) + ' with ' + str(areas) + ' synthetic areas')
+
+        direct = FN_Overlap_Index.OverlapIndex(snapshot)
+        prepared = [(o, n, Geometry_Core.Prepared(g)) for o, n, g in records]
+        mismatches = 0
+        for n, block in enumerate(synthetic_blocks(queries)):
+            answer = [tuple(o) for o in query([block], port=port)['overlaps']]
+            expected = direct.overlap_names([block])
+            if n < 50:
+                brute = sorted(set((o, a) for o, a, p in prepared if p.intersects(block)))
+                if brute != expected:
+                    mismatches += 1
+            if answer != expected:
+                mismatches += 1
+        direct.close()
+
+        report = status(port)
+        log('Requests: ' + str(report['requests']) + ', errors: ' + str(report['errors']) +
+            ', mismatches: ' + str(mismatches))
+        log('Latency (ms): ' + ', '.join(k + '=' + str(v) for k, v in sorted(report['latency_ms'].items())))
+        stop(port)
+        thread.join(5)
+        server.server_close()
+        service.index.close()
+        return mismatches == 0 and report['errors'] == 0
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+def _print(msg):
+    sys.stdout.write(msg + '\n')
+    sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='FN consultation area overlap service')
+    parser.add_argument('command', choices=['serve', 'status', 'stop', 'selftest'])
+    parser.add_argument('--snapshot', default=FN_Overlap_Index.DEFAULT_SNAPSHOT)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--features', default=None, help='features that can be queried by id')
+    parser.add_argument('--id-field', default=None)
+    parser.add_argument('--areas', type=int, default=2000)
+    parser.add_argument('--queries', type=int, default=300)
+    args = parser.parse_args()
+    if args.command == 'serve':
+        serve(args.snapshot, args.port, args.features, args.id_field, log=_print)
+    elif args.command == 'status':
+        _print(json.dumps(status(args.port), indent=2, sort_keys=True))
+    elif args.command == 'stop':
+        stop(args.port)
+    else:
+        sys.exit(0 if selftest(args.areas, args.queries, log=_print) else 1)
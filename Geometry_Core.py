@@ -0,0 +1,653 @@
+# ---------------------------------------------------------------------------
+# Geometry_Core.py
+# Created on: Oct 18, 2026
+#
+# Description: Small pure python geometry library for the tools that work
+#           against local snapshots instead of a database or ArcGIS. Geometries
+#           are GeoJSON style dictionaries ({'type': 'Polygon', 'coordinates':
+#           [...]}) so they can be stored as JSON and read back unchanged.
+#
+#           Provides bounding boxes, area, point in polygon, intersects,
+#           distance and within distance tests, a packed STR tree for bounding
+#           box searches, prepared geometries (edges indexed in an STR tree) for
+#           repeated tests and converters to and from WKT, GeoJSON and arcpy
+#           geometries.
+#
+#           Polygons follow the GeoJSON layout, the first ring is the exterior
+#           and any further rings are holes. Point in polygon uses the even-odd
+#           rule over all rings so ring orientation doesn't matter.
+#
+# Author:   Daniel Otto
+# ---------------------------------------------------------------------------
+
+from __future__ import division
+
+import json
+import math
+import re
+
+#   Nodes per STR tree node
+NODE_CAPACITY = 10
+
+#   Point locations returned by Prepared.locate()
+INSIDE = 1
+BOUNDARY = 0
+OUTSIDE = -1
+
+
+# ---------------------------------------------------------------------------
+#   Geometry parts
+# ---------------------------------------------------------------------------
+
+def polygons(geom):
+    #List of polygons (each a list of rings) in a Polygon or MultiPolygon
+    if geom['type'] == 'Polygon':
+        return [geom['coordinates']]
+    if geom['type'] == 'MultiPolygon':
+        return list(geom['coordinates'])
+    return []
+
+
+def lines(geom):
+    #List of coordinate sequences in a LineString or MultiLineString
+    if geom['type'] == 'LineString':
+        return [geom['coordinates']]
+    if geom['type'] == 'MultiLineString':
+        return list(geom['coordinates'])
+    return []
+
+
+def points(geom):
+    #List of points in a Point or MultiPoint
+    if geom['type'] == 'Point':
+        return [geom['coordinates']]
+    if geom['type'] == 'MultiPoint':
+        return list(geom['coordinates'])
+    return []
+
+
+def vertices(geom):
+    for p in points(geom):
+        yield p
+    for line in lines(geom):
+        for p in line:
+            yield p
+    for poly in polygons(geom):
+        for ring in poly:
+            for p in ring:
+                yield p
+
+
+def edges(geom):
+    #Every segment of the lines and polygon rings as ((x1, y1), (x2, y2)).
+    #Points are returned as zero length segments.
+    for p in points(geom):
+        yield (p, p)
+    for line in lines(geom):
+        for i in range(len(line) - 1):
+            yield (line[i], line[i + 1])
+    for poly in polygons(geom):
+        for ring in poly:
+            for i in range(len(ring) - 1):
+                yield (ring[i], ring[i + 1])
+
+
+def is_empty(geom):
+    for p in vertices(geom):
+        return False
+    return True
+
+
+# ---------------------------------------------------------------------------
+#   Measures
+# ---------------------------------------------------------------------------
+
+def bbox(geom):
+    #(minx, miny, maxx, maxy) of a geometry
+    xs = []
+    ys = []
+    for p in vertices(geom):
+        xs.append(p[0])
+        ys.append(p[1])
+    if not xs:
+        raise ValueError('Empty geometry has no bounding box')
+    return (min(xs), min(ys), max(xs), max(ys))
+
+
+def bbox_intersects(a, b):
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def bbox_union(boxes):
+    boxes = list(boxes)
+    return (min(b[0] for b in boxes), min(b[1] for b in boxes),
+            max(b[2] for b in boxes), max(b[3] for b in boxes))
+
+
+def ring_area(ring):
+    #Signed shoelace area, positive when counter-clockwise
+    total = 0.0
+    for i in range(len(ring) - 1):
+        total += ring[i][0] * ring[i + 1][1] - ring[i + 1][0] * ring[i][1]
+    return total / 2
+
+
+def area(geom):
+    #Area of the polygons in a geometry, holes are subtracted
+    total = 0.0
+    for poly in polygons(geom):
+        total += abs(ring_area(poly[0]))
+        for hole in poly[1:]:
+            total -= abs(ring_area(hole))
+    return total
+
+
+def length(geom):
+    return sum(math.hypot(b[0] - a[0], b[1] - a[1]) for a, b in edges(geom))
+
+
+# ---------------------------------------------------------------------------
+#   Predicates
+# ---------------------------------------------------------------------------
+
+def point_in_rings(pt, rings):
+    #Even-odd ray cast over every ring of a polygon. Points on the boundary
+    #count as inside.
+    x, y = pt[0], pt[1]
+    inside = False
+    for ring in rings:
+        for i in range(len(ring) - 1):
+            x1, y1 = ring[i][0], ring[i][1]
+            x2, y2 = ring[i + 1][0], ring[i + 1][1]
+            if _on_segment((x1, y1), (x2, y2), (x, y)) and _orientation((x1, y1), (x2, y2), (x, y)) == 0:
+                return True
+            if (y1 > y) != (y2 > y):
+                cross = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+                if x < cross:
+                    inside = not inside
+    return inside
+
+
+def point_in_polygon(pt, geom):
+    for poly in polygons(geom):
+        if point_in_rings(pt, poly):
+            return True
+    return False
+
+
+def _orientation(a, b, c):
+    value = (b[1] - a[1]) * (c[0] - b[0]) - (b[0] - a[0]) * (c[1] - b[1])
+    if value > 0:
+        return 1
+    if value < 0:
+        return -1
+    return 0
+
+
+def _on_segment(a, b, c):
+    #c lies within the bounding box of segment a-b
+    return (min(a[0], b[0]) <= c[0] <= max(a[0], b[0]) and
+            min(a[1], b[1]) <= c[1] <= max(a[1], b[1]))
+
+
+def segments_intersect(p1, p2, q1, q2):
+    #True when segment p1-p2 touches or crosses segment q1-q2
+    o1 = _orientation(p1, p2, q1)
+    o2 = _orientation(p1, p2, q2)
+    o3 = _orientation(q1, q2, p1)
+    o4 = _orientation(q1, q2, p2)
+    if o1 != o2 and o3 != o4:
+        return True
+    if o1 == 0 and _on_segment(p1, p2, q1):
+        return True
+    if o2 == 0 and _on_segment(p1, p2, q2):
+        return True
+    if o3 == 0 and _on_segment(q1, q2, p1):
+        return True
+    if o4 == 0 and _on_segment(q1, q2, p2):
+        return True
+    return False
+
+
+def _segment_box(seg):
+    a, b = seg
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[0], b[0]), max(a[1], b[1]))
+
+
+def _first_points(geom):
+    #One vertex of every part, enough to test containment once edges don't cross
+    result = list(points(geom))
+    result.extend(line[0] for line in lines(geom) if line)
+    result.extend(poly[0][0] for poly in polygons(geom) if poly and poly[0])
+    return result
+
+
+def intersects(a, b):
+    #True when the geometries share at least one point. Either can be a
+    #Prepared geometry, which saves re-indexing one that is tested often.
+    return prepare(a).intersects(b)
+
+
+def _point_segment_distance(p, a, b):
+    dx = b[0] - a[0]
+    dy = b[1] - a[1]
+    if dx == 0 and dy == 0:
+        return math.hypot(p[0] - a[0], p[1] - a[1])
+    t = ((p[0] - a[0]) * dx + (p[1] - a[1]) * dy) / (dx * dx + dy * dy)
+    t = max(0.0, min(1.0, t))
+    return math.hypot(p[0] - (a[0] + t * dx), p[1] - (a[1] + t * dy))
+
+
+def segment_distance(p1, p2, q1, q2):
+    if segments_intersect(p1, p2, q1, q2):
+        return 0.0
+    return min(_point_segment_distance(p1, q1, q2), _point_segment_distance(p2, q1, q2),
+               _point_segment_distance(q1, p1, p2), _point_segment_distance(q2, p1, p2))
+
+
+def distance(a, b):
+    #Minimum distance between two geometries, 0 when they intersect
+    if intersects(a, b):
+        return 0.0
+    best = None
+    eb = list(edges(b))
+    for p1, p2 in edges(a):
+        for q1, q2 in eb:
+            d = segment_distance(p1, p2, q1, q2)
+            if best is None or d < best:
+                best = d
+    return best
+
+
+def bbox_distance(a, b):
+    dx = max(0.0, a[0] - b[2], b[0] - a[2])
+    dy = max(0.0, a[1] - b[3], b[1] - a[3])
+    return math.hypot(dx, dy)
+
+
+def expand(box, distance):
+    return (box[0] - distance, box[1] - distance, box[2] + distance, box[3] + distance)
+
+
+# ---------------------------------------------------------------------------
+#   Packed STR tree
+# ---------------------------------------------------------------------------
+
+class STRtree(object):
+    #Sort-Tile-Recursive packed R-tree over (bbox, item) pairs. The tree is
+    #built once and is read only. levels[0] holds the leaf nodes, each node is
+    #(bbox, start, end) indexing into the items (leaves) or the level below.
+
+    def __init__(self, entries=None, capacity=NODE_CAPACITY):
+        self.capacity = capacity
+        self.items = []
+        self.boxes = []
+        self.levels = []
+        if entries is not None:
+            self._build(list(entries))
+
+    def __len__(self):
+        return len(self.items)
+
+    def _build(self, entries):
+        if not entries:
+            return
+        entries = self._pack(entries)
+        self.boxes = [e[0] for e in entries]
+        self.items = [e[1] for e in entries]
+        level = self._group(self.boxes)
+        self.levels.append(level)
+        while len(level) > 1:
+            #Pack the nodes of this level and reorder them so every parent
+            #covers a contiguous run of children
+            packed = self._pack([(node[0], node) for node in level])
+            level[:] = [p[1] for p in packed]
+            level = self._group([node[0] for node in level])
+            self.levels.append(level)
+
+    def _pack(self, entries):
+        #STR ordering, vertical slices by x centre then runs by y centre
+        cap = self.capacity
+        count = len(entries)
+        leaves = int(math.ceil(count / cap))
+        slices = int(math.ceil(math.sqrt(leaves)))
+        per_slice = slices * cap
+        entries.sort(key=lambda e: (e[0][0] + e[0][2]) / 2)
+        ordered = []
+        for s in range(0, count, per_slice):
+            chunk = entries[s:s + per_slice]
+            chunk.sort(key=lambda e: (e[0][1] + e[0][3]) / 2)
+            ordered.extend(chunk)
+        return ordered
+
+    def _group(self, boxes):
+        cap = self.capacity
+        nodes = []
+        for start in range(0, len(boxes), cap):
+            end = min(start + cap, len(boxes))
+            nodes.append((bbox_union(boxes[start:end]), start, end))
+        return nodes
+
+    def query(self, box):
+        #Items whose bounding box intersects box
+        if not self.levels:
+            return []
+        result = []
+        stack = [(len(self.levels) - 1, i) for i in range(len(self.levels[-1]))]
+        while stack:
+            depth, index = stack.pop()
+            node_box, start, end = self.levels[depth][index]
+            if not bbox_intersects(node_box, box):
+                continue
+            if depth == 0:
+                for i in range(start, end):
+                    if bbox_intersects(self.boxes[i], box):
+                        result.append(self.items[i])
+            else:
+                stack.extend((depth - 1, i) for i in range(start, end))
+        return result
+
+    def nearest(self, box, count=1):
+        #The count items with the nearest bounding boxes (best first search)
+        import heapq
+        if not self.levels:
+            return []
+        top = len(self.levels) - 1
+        heap = [(bbox_distance(node[0], box), 0, top, i) for i, node in enumerate(self.levels[top])]
+        heapq.heapify(heap)
+        result = []
+        while heap and len(result) < count:
+            dist, kind, depth, index = heapq.heappop(heap)
+            if kind == 1:
+                result.append(self.items[index])
+                continue
+            node_box, start, end = self.levels[depth][index]
+            for i in range(start, end):
+                if depth == 0:
+                    heapq.heappush(heap, (bbox_distance(self.boxes[i], box), 1, -1, i))
+                else:
+                    heapq.heappush(heap, (bbox_distance(self.levels[depth - 1][i][0], box), 0, depth - 1, i))
+        return result
+
+    def to_rows(self):
+        #Node rows (level, position, minx, miny, maxx, maxy, start, end) and
+        #item rows (position, minx, miny, maxx, maxy, item) for storage
+        nodes = []
+        for depth, level in enumerate(self.levels):
+            for position, (box, start, end) in enumerate(level):
+                nodes.append((depth, position) + tuple(box) + (start, end))
+        items = [(i,) + tuple(self.boxes[i]) + (self.items[i],) for i in range(len(self.items))]
+        return nodes, items
+
+    @classmethod
+    def from_rows(cls, nodes, items, capacity=NODE_CAPACITY):
+        tree = cls(capacity=capacity)
+        items = sorted(items)
+        tree.boxes = [tuple(row[1:5]) for row in items]
+        tree.items = [row[5] for row in items]
+        for row in sorted(nodes):
+            while len(tree.levels) <= row[0]:
+                tree.levels.append([])
+            tree.levels[row[0]].append((tuple(row[2:6]), row[6], row[7]))
+        return tree
+
+
+# ---------------------------------------------------------------------------
+#   Prepared geometries
+# ---------------------------------------------------------------------------
+
+def orient(geom):
+    #Copy of a geometry with polygon exteriors counter-clockwise and holes
+    #clockwise, other geometry types are returned as they are
+    if not polygons(geom):
+        return geom
+    result = []
+    for poly in polygons(geom):
+        rings = []
+        for i, ring in enumerate(poly):
+            if (i == 0) != (ring_area(ring) > 0):
+                ring = list(reversed(ring))
+            rings.append(ring)
+        result.append(rings)
+    if geom['type'] == 'Polygon':
+        return {'type': 'Polygon', 'coordinates': result[0]}
+    return {'type': 'MultiPolygon', 'coordinates': result}
+
+
+class Prepared(object):
+    #A geometry (with oriented rings) plus its bounding box and an STR tree
+    #over its edges, built on first use. Worth it for geometries that are
+    #tested against many others, like the areas of a snapshot.
+
+    def __init__(self, geom):
+        self.geom = orient(geom)
+        self.bbox = bbox(self.geom)
+        self.edges = list(edges(self.geom))
+        self.polygonal = len(polygons(self.geom)) > 0
+        self._tree = None
+
+    @property
+    def tree(self):
+        if self._tree is None:
+            self._tree = STRtree([(_segment_box(e), e) for e in self.edges])
+        return self._tree
+
+    def edges_near(self, box):
+        return self.tree.query(box)
+
+    def locate(self, pt):
+        #INSIDE, BOUNDARY or OUTSIDE. Even-odd ray cast using only the edges
+        #that reach the ray.
+        x, y = pt[0], pt[1]
+        for a, b in self.tree.query((x, y, x, y)):
+            if _orientation(a, b, pt) == 0 and _on_segment(a, b, pt):
+                return BOUNDARY
+        if not self.polygonal:
+            return OUTSIDE
+        inside = False
+        for a, b in self.tree.query((x, y, self.bbox[2], y)):
+            if (a[1] > y) != (b[1] > y):
+                if x < a[0] + (y - a[1]) * (b[0] - a[0]) / (b[1] - a[1]):
+                    inside = not inside
+        return INSIDE if inside else OUTSIDE
+
+    def intersects(self, other):
+        other = prepare(other)
+        if not self.edges or not other.edges or not bbox_intersects(self.bbox, other.bbox):
+            return False
+        #Walk the edges of the smaller geometry against the tree of the larger
+        small, large = (self, other) if len(self.edges) <= len(other.edges) else (other, self)
+        for p1, p2 in small.edges:
+            box = _segment_box((p1, p2))
+            if not bbox_intersects(box, large.bbox):
+                continue
+            for q1, q2 in large.edges_near(box):
+                if segments_intersect(p1, p2, q1, q2):
+                    return True
+        #No boundaries touch, so either one lies inside the other or they are apart
+        for p in _first_points(other.geom):
+            if self.locate(p) != OUTSIDE:
+                return True
+        for p in _first_points(self.geom):
+            if other.locate(p) != OUTSIDE:
+                return True
+        return False
+
+
+def prepare(geom):
+    if isinstance(geom, Prepared):
+        return geom
+    return Prepared(geom)
+
+
+def within_distance(a, b, distance):
+    #True when the geometries come within distance of each other. Only the
+    #edges of the larger geometry near each edge of the smaller are measured.
+    #Either can be a Prepared geometry.
+    a = prepare(a)
+    b = prepare(b)
+    if not a.edges or not b.edges or bbox_distance(a.bbox, b.bbox) > distance:
+        return False
+    small, large = (a, b) if len(a.edges) <= len(b.edges) else (b, a)
+    for p1, p2 in small.edges:
+        box = expand(_segment_box((p1, p2)), distance)
+        if not bbox_intersects(box, large.bbox):
+            continue
+        for q1, q2 in large.edges_near(box):
+            if segment_distance(p1, p2, q1, q2) <= distance:
+                return True
+    #No edges within distance, they can still be inside one another
+    return a.intersects(b)
+
+
+def features_within(features, targets, distance):
+    #Keys of the (key, geometry) features that are within distance of any of
+    #the target geometries, in the order of features. The targets are indexed
+    #in an STR tree so each feature is only measured against the targets whose
+    #bounding box is within distance of its own.
+    prepared = [prepare(t) for t in targets if not is_empty(t)]
+    tree = STRtree([(p.bbox, n) for n, p in enumerate(prepared)])
+    found = []
+    for key, geom in features:
+        if is_empty(geom):
+            continue
+        feature = None
+        for n in tree.query(expand(bbox(geom), distance)):
+            feature = feature or prepare(geom)
+            if within_distance(prepared[n], feature, distance):
+                found.append(key)
+                break
+    return found
+
+
+# ---------------------------------------------------------------------------
+#   Converters
+# ---------------------------------------------------------------------------
+
+def _format_number(value):
+    text = repr(float(value))
+    if text.endswith('.0'):
+        text = text[:-2]
+    return text
+
+
+def _wkt_points(coords):
+    return ', '.join(_format_number(p[0]) + ' ' + _format_number(p[1]) for p in coords)
+
+
+def to_wkt(geom):
+    kind = geom['type']
+    coords = geom['coordinates']
+    if kind == 'Point':
+        return 'POINT (' + _format_number(coords[0]) + ' ' + _format_number(coords[1]) + ')'
+    if kind == 'MultiPoint':
+        return 'MULTIPOINT (' + ', '.join('(' + _wkt_points([p]) + ')' for p in coords) + ')'
+    if kind == 'LineString':
+        return 'LINESTRING (' + _wkt_points(coords) + ')'
+    if kind == 'MultiLineString':
+        return 'MULTILINESTRING (' + ', '.join('(' + _wkt_points(l) + ')' for l in coords) + ')'
+    if kind == 'Polygon':
+        return 'POLYGON (' + ', '.join('(' + _wkt_points(r) + ')' for r in coords) + ')'
+    if kind == 'MultiPolygon':
+        return 'MULTIPOLYGON (' + ', '.join('(' + ', '.join('(' + _wkt_points(r) + ')' for r in poly) + ')'
+                                            for poly in coords) + ')'
+    raise ValueError('Unsupported geometry type ' + kind)
+
+
+_WKT_TOKEN = re.compile(r'\s*(\(|\)|,|[A-Za-z]+|[-+0-9.eE]+)')
+
+
+def _wkt_tokens(text):
+    tokens = []
+    pos = 0
+    text = text.strip()
+    while pos < len(text):
+        match = _WKT_TOKEN.match(text, pos)
+        if not match:
+            raise ValueError('Invalid WKT near: ' + text[pos:pos + 20])
+        tokens.append(match.group(1))
+        pos = match.end()
+    return tokens
+
+
+def _wkt_nested(tokens, pos):
+    #Parses a parenthesised list, returns (value, next position). A list of
+    #numbers becomes a coordinate, anything else a list of nested values.
+    if tokens[pos] != '(':
+        raise ValueError('Expected ( in WKT')
+    pos += 1
+    items = []
+    numbers = []
+    while tokens[pos] != ')':
+        token = tokens[pos]
+        if token == '(':
+            value, pos = _wkt_nested(tokens, pos)
+            items.append(value)
+        elif token == ',':
+            if numbers:
+                items.append(numbers)
+                numbers = []
+            pos += 1
+        else:
+            numbers.append(float(token))
+            pos += 1
+    if numbers:
+        items.append(numbers)
+    return items, pos + 1
+
+
+def _wkt_point(values):
+    return [values[0], values[1]]
+
+
+def from_wkt(text):
+    tokens = _wkt_tokens(text)
+    kind = tokens[0].upper()
+    pos = 1
+    while pos < len(tokens) and tokens[pos].upper() in ('Z', 'M', 'ZM'):
+        pos += 1
+    if tokens[pos].upper() == 'EMPTY':
+        body = []
+    else:
+        body, pos = _wkt_nested(tokens, pos)
+    if kind == 'POINT':
+        return {'type': 'Point', 'coordinates': _wkt_point(body[0]) if body else []}
+    if kind == 'MULTIPOINT':
+        #both MULTIPOINT (1 2, 3 4) and MULTIPOINT ((1 2), (3 4))
+        pts = [p[0] if isinstance(p[0], list) else p for p in body]
+        return {'type': 'MultiPoint', 'coordinates': [_wkt_point(p) for p in pts]}
+    if kind == 'LINESTRING':
+        return {'type': 'LineString', 'coordinates': [_wkt_point(p) for p in body]}
+    if kind == 'MULTILINESTRING':
+        return {'type': 'MultiLineString', 'coordinates': [[_wkt_point(p) for p in l] for l in body]}
+    if kind == 'POLYGON':
+        return {'type': 'Polygon', 'coordinates': [[_wkt_point(p) for p in r] for r in body]}
+    if kind == 'MULTIPOLYGON':
+        return {'type': 'MultiPolygon', 'coordinates': [[[_wkt_point(p) for p in r] for r in poly] for poly in body]}
+    raise ValueError('Unsupported WKT type ' + kind)
+
+
+def to_geojson(geom):
+    return json.dumps(geom, separators=(',', ':'))
+
+
+def from_geojson(text):
+    #Accepts a geometry, a Feature or the JSON text of either
+    if not isinstance(text, dict):
+        text = json.loads(text)
+    if text.get('type') == 'Feature':
+        text = text['geometry']
+    return {'type': text['type'], 'coordinates': text['coordinates']}
+
+
+def from_arcpy(shape):
+    #Converts an arcpy geometry. True curves are densified by arcpy when it
+    #builds the GeoJSON interface.
+    return from_geojson(dict(shape.__geo_interface__))
+
+
+def to_arcpy(geom, spatial_reference=None):
+    import arcpy
+    if spatial_reference is None:
+        return arcpy.AsShape(geom)
+    return arcpy.FromWKT(to_wkt(geom), spatial_reference)
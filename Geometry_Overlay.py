@@ -0,0 +1,123 @@
+# ---------------------------------------------------------------------------
+# Geometry_Overlay.py
+# Created on: Oct 18, 2026
+#
+# Description: Polygon overlay measures on top of Geometry_Core. The rings of
+#           both polygons are noded against each other (every edge is split
+#           where it meets an edge of the other polygon) and each piece is
+#           classified as inside, outside or on the boundary of the other
+#           polygon. The area of the intersection is then the shoelace sum of
+#           the pieces that bound it, so the overlap area is found without
+#           building the intersection polygon.
+#
+#           Both polygons are Prepared (rings oriented exterior counter-
+#           clockwise and holes clockwise, edges in an STR tree) so the pieces
+#           of the intersection boundary always add up to a positive area and
+#           only edges near each other are compared.
+#
+# Author:   Daniel Otto
+# ---------------------------------------------------------------------------
+
+from __future__ import division
+
+import Geometry_Core
+
+INSIDE = Geometry_Core.INSIDE
+BOUNDARY = Geometry_Core.BOUNDARY
+OUTSIDE = Geometry_Core.OUTSIDE
+
+
+def _crossing(p1, p2, q1, q2):
+    #Parameters along p1-p2 where it meets q1-q2 (the crossing point, or the
+    #ends of the overlap when the segments are collinear)
+    rx, ry = p2[0] - p1[0], p2[1] - p1[1]
+    sx, sy = q2[0] - q1[0], q2[1] - q1[1]
+    denom = rx * sy - ry * sx
+    qpx, qpy = q1[0] - p1[0], q1[1] - p1[1]
+    length2 = rx * rx + ry * ry
+    if length2 == 0:
+        return []
+    if denom == 0:
+        if qpx * ry - qpy * rx != 0:
+            return []
+        #Collinear, split at the ends of the other segment
+        result = []
+        for q in (q1, q2):
+            t = ((q[0] - p1[0]) * rx + (q[1] - p1[1]) * ry) / length2
+            if 0 < t < 1:
+                result.append(t)
+        return result
+    t = (qpx * sy - qpy * sx) / denom
+    u = (qpx * ry - qpy * rx) / denom
+    if 0 < t < 1 and 0 <= u <= 1:
+        return [t]
+    return []
+
+
+def node(geom, other, window):
+    #Splits the edges of geom (both Prepared) that reach into the window
+    #where they meet an edge of other and yields the (start, end) pieces
+    for p1, p2 in geom.edges_near(window):
+        params = set()
+        for q1, q2 in other.edges_near(Geometry_Core._segment_box((p1, p2))):
+            params.update(_crossing(p1, p2, q1, q2))
+        cuts = [0.0] + sorted(params) + [1.0]
+        points = [(p1[0] + t * (p2[0] - p1[0]), p1[1] + t * (p2[1] - p1[1])) for t in cuts]
+        for i in range(len(points) - 1):
+            if points[i] != points[i + 1]:
+                yield points[i], points[i + 1]
+
+
+def _same_direction(start, end, geom):
+    #True when a piece on the boundary of geom runs the same way as geom's edge
+    mid = ((start[0] + end[0]) / 2, (start[1] + end[1]) / 2)
+    dx, dy = end[0] - start[0], end[1] - start[1]
+    for a, b in geom.edges_near((mid[0], mid[1], mid[0], mid[1])):
+        if Geometry_Core._orientation(a, b, mid) == 0 and Geometry_Core._on_segment(a, b, mid):
+            return (b[0] - a[0]) * dx + (b[1] - a[1]) * dy > 0
+    return False
+
+
+def classified_pieces(a, b, window):
+    #Noded pieces of a with their location relative to b
+    for start, end in node(a, b, window):
+        mid = ((start[0] + end[0]) / 2, (start[1] + end[1]) / 2)
+        yield start, end, b.locate(mid)
+
+
+def _shoelace(start, end, origin):
+    #Taken about a nearby origin so large projected coordinates don't lose precision
+    x1, y1 = start[0] - origin[0], start[1] - origin[1]
+    x2, y2 = end[0] - origin[0], end[1] - origin[1]
+    return (x1 * y2 - x2 * y1) / 2
+
+
+def intersection_area(a, b):
+    #Area shared by two polygon geometries, either can be Prepared
+    a = Geometry_Core.prepare(a)
+    b = Geometry_Core.prepare(b)
+    box_a, box_b = a.bbox, b.bbox
+    if not Geometry_Core.bbox_intersects(box_a, box_b):
+        return 0.0
+    #Only edges inside the shared bounding box can bound the intersection
+    window = (max(box_a[0], box_b[0]), max(box_a[1], box_b[1]), min(box_a[2], box_b[2]), min(box_a[3], box_b[3]))
+    total = 0.0
+    for start, end, where in classified_pieces(a, b, window):
+        #Shared edges are counted once, from a, when both polygons are on the same side
+        if where == INSIDE or (where == BOUNDARY and _same_direction(start, end, b)):
+            total += _shoelace(start, end, window)
+    for start, end, where in classified_pieces(b, a, window):
+        if where == INSIDE:
+            total += _shoelace(start, end, window)
+    return max(total, 0.0)
+
+
+def union_area(a, b):
+    a = Geometry_Core.prepare(a)
+    b = Geometry_Core.prepare(b)
+    return Geometry_Core.area(a.geom) + Geometry_Core.area(b.geom) - intersection_area(a, b)
+
+
+def difference_area(a, b):
+    a = Geometry_Core.prepare(a)
+    return Geometry_Core.area(a.geom) - intersection_area(a, b)
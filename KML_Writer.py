@@ -0,0 +1,354 @@
+# ---------------------------------------------------------------------------
+# KML_Writer.py
+# Created on: Oct 18, 2026
+#
+# Description: Writes KML and KMZ straight from features, without LayerToKML
+#           or a map document. Features are (name, geometry, attributes) with
+#           GeoJSON style geometries (Geometry_Core), read from a cursor or
+#           any iterator, and are written one at a time so memory doesn't
+#           grow with the number of features. Coordinates are projected from
+#           BC Albers (EPSG:3005) to WGS84 longitude/latitude as they are
+#           written, with the Albers equal area conic on the GRS80 ellipsoid
+#           (NAD83 and WGS84 are treated as the same datum, about a metre).
+#
+#           Each layer is a folder with one shared style (line colour and
+#           width, fill colour and opacity, point icon) and the attributes of
+#           each feature go in its ExtendedData. A .kmz path writes doc.kml
+#           into a zip stream.
+#
+# Usage:    python KML_Writer.py selftest
+#               checks the projection and writes a small KML and KMZ
+#
+# Author:   Daniel Otto
+# ---------------------------------------------------------------------------
+
+from __future__ import division
+
+import math
+import os
+import shutil
+import sys
+import tempfile
+import zipfile
+from collections import namedtuple
+from xml.sax.saxutils import escape
+
+import Geometry_Core
+
+# ---------------------------------------------------------------------------
+#   BC Albers (EPSG:3005) <-> longitude/latitude
+# ---------------------------------------------------------------------------
+
+GRS80_A = 6378137.0
+GRS80_F = 1 / 298.257222101
+
+ALBERS_LAT1 = 50.0
+ALBERS_LAT2 = 58.5
+ALBERS_LAT0 = 45.0
+ALBERS_LON0 = -126.0
+ALBERS_FALSE_EASTING = 1000000.0
+ALBERS_FALSE_NORTHING = 0.0
+
+
+class Albers(object):
+    #Albers equal area conic on an ellipsoid (Snyder, Map Projections - A
+    #Working Manual, p. 101), BC Albers by default
+
+    def __init__(self, lat1=ALBERS_LAT1, lat2=ALBERS_LAT2, lat0=ALBERS_LAT0, lon0=ALBERS_LON0,
+                 false_easting=ALBERS_FALSE_EASTING, false_northing=ALBERS_FALSE_NORTHING,
+                 a=GRS80_A, f=GRS80_F):
+        self.a = a
+        self.e2 = 2 * f - f * f
+        self.e = math.sqrt(self.e2)
+        self.lon0 = math.radians(lon0)
+        self.false_easting = false_easting
+        self.false_northing = false_northing
+        phi1, phi2, phi0 = math.radians(lat1), math.radians(lat2), math.radians(lat0)
+        m1, m2 = self._m(phi1), self._m(phi2)
+        q1, q2, q0 = self._q(phi1), self._q(phi2), self._q(phi0)
+        self.n = (m1 * m1 - m2 * m2) / (q2 - q1)
+        self.c = m1 * m1 + self.n * q1
+        self.rho0 = self.a * math.sqrt(self.c - self.n * q0) / self.n
+
+    def _m(self, phi):
+        s = math.sin(phi)
+        return math.cos(phi) / math.sqrt(1 - self.e2 * s * s)
+
+    def _q(self, phi):
+        s = math.sin(phi)
+        e = self.e
+        return (1 - self.e2) * (s / (1 - self.e2 * s * s) - math.log((1 - e * s) / (1 + e * s)) / (2 * e))
+
+    def forward(self, lon, lat):
+        rho = self.a * math.sqrt(self.c - self.n * self._q(math.radians(lat))) / self.n
+        theta = self.n * (math.radians(lon) - self.lon0)
+        return (self.false_easting + rho * math.sin(theta),
+                self.false_northing + self.rho0 - rho * math.cos(theta))
+
+    def inverse(self, x, y):
+        dx = x - self.false_easting
+        dy = self.rho0 - (y - self.false_northing)
+        rho = math.hypot(dx, dy)
+        theta = math.atan2(dx, dy)
+        q = (self.c - (rho * self.n / self.a) ** 2) / self.n
+        phi = math.asin(max(-1.0, min(1.0, q / 2)))
+        e = self.e
+        for _ in range(15):
+            s = math.sin(phi)
+            w = 1 - self.e2 * s * s
+            step = (w * w / (2 * math.cos(phi))) * (q / (1 - self.e2) - s / w +
+                                                    math.log((1 - e * s) / (1 + e * s)) / (2 * e))
+            phi += step
+            if abs(step) < 1e-12:
+                break
+        return math.degrees(self.lon0 + theta / self.n), math.degrees(phi)
+
+
+BC_ALBERS = Albers()
+
+
+def albers_to_wgs84(x, y):
+    return BC_ALBERS.inverse(x, y)
+
+
+def wgs84_to_albers(lon, lat):
+    return BC_ALBERS.forward(lon, lat)
+
+
+# ---------------------------------------------------------------------------
+#   Styles
+# ---------------------------------------------------------------------------
+
+#   line: '#rrggbb', width: line width in pixels, fill: '#rrggbb' or None for
+#   no fill, opacity: fill opacity 0-1, icon: icon href for points
+Style = namedtuple('Style', 'line width fill opacity icon')
+
+DEFAULT_STYLE = Style('#ff0000', 2, None, 0.0, None)
+
+
+def style(line='#ff0000', width=2, fill=None, opacity=0.25, icon=None):
+    return Style(line, width, fill, opacity, icon)
+
+
+def kml_color(rgb, opacity=1.0):
+    #KML colours are aabbggrr
+    rgb = rgb.lstrip('#')
+    alpha = int(round(max(0.0, min(1.0, opacity)) * 255))
+    return '%02x%s%s%s' % (alpha, rgb[4:6], rgb[2:4], rgb[0:2])
+
+
+def style_xml(style_id, item):
+    item = item or DEFAULT_STYLE
+    parts = ['<Style id="%s">' % escape(style_id),
+             '<LineStyle><color>%s</color><width>%s</width></LineStyle>' % (kml_color(item.line), item.width)]
+    if item.fill:
+        parts.append('<PolyStyle><color>%s</color><fill>1</fill><outline>1</outline></PolyStyle>'
+                     % kml_color(item.fill, item.opacity))
+    else:
+        parts.append('<PolyStyle><fill>0</fill><outline>1</outline></PolyStyle>')
+    if item.icon:
+        parts.append('<IconStyle><Icon><href>%s</href></Icon></IconStyle>' % escape(item.icon))
+    parts.append('</Style>')
+    return ''.join(parts)
+
+
+# ---------------------------------------------------------------------------
+#   Geometry
+# ---------------------------------------------------------------------------
+
+def _coordinates(sequence, transform):
+    if transform is not None:
+        sequence = (transform(p[0], p[1]) for p in sequence)
+    return ' '.join('%.7f,%.7f' % (p[0], p[1]) for p in sequence)
+
+
+def _polygon_xml(rings, transform):
+    parts = ['<Polygon><tessellate>1</tessellate>']
+    for n, ring in enumerate(rings):
+        tag = 'outerBoundaryIs' if n == 0 else 'innerBoundaryIs'
+        parts.append('<%s><LinearRing><coordinates>%s</coordinates></LinearRing></%s>'
+                     % (tag, _coordinates(ring, transform), tag))
+    parts.append('</Polygon>')
+    return ''.join(parts)
+
+
+def geometry_xml(geom, transform=albers_to_wgs84):
+    #KML for a Point, LineString or Polygon (or Multi/GeometryCollection of them)
+    pieces = []
+    for polygon in Geometry_Core.polygons(geom):
+        pieces.append(_polygon_xml(polygon, transform))
+    for line in Geometry_Core.lines(geom):
+        pieces.append('<LineString><tessellate>1</tessellate><coordinates>%s</coordinates></LineString>'
+                      % _coordinates(line, transform))
+    for point in Geometry_Core.points(geom):
+        pieces.append('<Point><coordinates>%s</coordinates></Point>' % _coordinates([point], transform))
+    if geom['type'] == 'GeometryCollection':
+        pieces.extend(geometry_xml(g, transform) for g in geom['geometries'])
+    if len(pieces) == 1:
+        return pieces[0]
+    return '<MultiGeometry>' + ''.join(pieces) + '</MultiGeometry>'
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if sys.version_info[0] < 3 and isinstance(value, str):
+        return value.decode('utf-8', 'replace')
+    return u'%s' % (value,)
+
+
+def placemark_xml(name, geom, attributes, style_id, transform=albers_to_wgs84):
+    parts = [u'<Placemark><name>%s</name><styleUrl>#%s</styleUrl>' % (escape(_text(name)), escape(style_id))]
+    if attributes:
+        parts.append(u'<ExtendedData>')
+        for key, value in attributes:
+            parts.append(u'<Data name="%s"><value>%s</value></Data>'
+                         % (escape(_text(key), {'"': '&quot;'}), escape(_text(value))))
+        parts.append(u'</ExtendedData>')
+    parts.append(geometry_xml(geom, transform))
+    parts.append(u'</Placemark>\n')
+    return u''.join(parts)
+
+
+# ---------------------------------------------------------------------------
+#   Writing
+# ---------------------------------------------------------------------------
+
+#   name: folder name, style: Style (or None), features: iterator of
+#   (name, geometry, [(field, value), ...])
+KMLLayer = namedtuple('KMLLayer', 'name style features')
+
+
+def _style_id(n, name):
+    return 'layer%d_%s' % (n, ''.join(c if c.isalnum() else '_' for c in name))
+
+
+def write_document(stream, name, layers, transform=albers_to_wgs84):
+    #Writes a KML document to a binary stream one feature at a time. Returns
+    #the number of placemarks written.
+    def write(text):
+        stream.write(text.encode('utf-8'))
+
+    layers = list(layers)
+    write(u'<?xml version="1.0" encoding="UTF-8"?>\n'
+          u'<kml xmlns="http://www.opengis.net/kml/2.2"><Document>\n')
+    write(u'<name>%s</name>\n' % escape(_text(name)))
+    for n, item in enumerate(layers):
+        write(_text(style_xml(_style_id(n, item.name), item.style)) + u'\n')
+    count = 0
+    for n, item in enumerate(layers):
+        style_id = _style_id(n, item.name)
+        write(u'<Folder><name>%s</name>\n' % escape(_text(item.name)))
+        for feature_name, geom, attributes in item.features:
+            if geom is None or Geometry_Core.is_empty(geom):
+                continue
+            write(placemark_xml(feature_name, geom, attributes, style_id, transform))
+            count += 1
+        write(u'</Folder>\n')
+    write(u'</Document></kml>\n')
+    return count
+
+
+def write(path, name, layers, transform=albers_to_wgs84):
+    #Writes a .kml file, or doc.kml inside a .kmz. Returns the placemark count.
+    if not path.lower().endswith('.kmz'):
+        with open(path, 'wb') as f:
+            return write_document(f, name, layers, transform)
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as kmz:
+        if sys.version_info >= (3, 6):
+            with kmz.open('doc.kml', 'w') as f:
+                return write_document(f, name, layers, transform)
+        #Older zipfile can't stream into an entry, the KML goes through a temp file
+        fd, temp = tempfile.mkstemp(suffix='.kml')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                count = write_document(f, name, layers, transform)
+            kmz.write(temp, 'doc.kml')
+        finally:
+            os.remove(temp)
+        return count
+
+
+def features_from_dataset(dataset, name_field=None, fields=None):
+    #Streams (name, geometry, attributes) from a feature class or layer in BC
+    #Albers. All attribute fields are written unless fields is given.
+    import arcpy
+    if fields is None:
+        fields = [f.name for f in arcpy.ListFields(dataset) if f.type not in ('OID', 'Geometry', 'Blob', 'Raster')]
+    names = ['OID@', 'SHAPE@'] + list(fields)
+    with arcpy.da.SearchCursor(dataset, names, spatial_reference=arcpy.SpatialReference(3005)) as cursor:
+        for row in cursor:
+            if row[1] is None:
+                continue
+            attributes = list(zip(fields, row[2:]))
+            name = dict(attributes).get(name_field) if name_field else row[0]
+            yield name, Geometry_Core.from_arcpy(row[1]), attributes
+
+
+# ---------------------------------------------------------------------------
+#   Self test
+# ---------------------------------------------------------------------------
+
+def selftest(log=None):
+    log = log or (lambda msg: sys.stdout.write(msg + '\n'))
+    failed = 0
+    #The projection origin is the false easting and northing
+    x, y = wgs84_to_albers(ALBERS_LON0, ALBERS_LAT0)
+    ok = abs(x - ALBERS_FALSE_EASTING) < 1e-6 and abs(y - ALBERS_FALSE_NORTHING) < 1e-6
+    failed += 0 if ok else 1
+    log('origin ' + ('ok' if ok else 'MISMATCH %.3f %.3f' % (x, y)))
+    #Scale along a standard parallel is true: 0.01 degree east at 50N is the
+    #parallel arc length on the ellipsoid
+    x1, y1 = wgs84_to_albers(-124.0, ALBERS_LAT1)
+    x2, y2 = wgs84_to_albers(-123.99, ALBERS_LAT1)
+    expected = BC_ALBERS.a * BC_ALBERS._m(math.radians(ALBERS_LAT1)) * math.radians(0.01)
+    ok = abs(math.hypot(x2 - x1, y2 - y1) - expected) < 0.01
+    failed += 0 if ok else 1
+    log('standard parallel scale ' + ('ok' if ok else 'MISMATCH'))
+    #Round trip across the province
+    worst = 0.0
+    for lon in range(-139, -113, 2):
+        for lat in range(48, 61):
+            back = albers_to_wgs84(*wgs84_to_albers(lon + 0.5, lat + 0.25))
+            worst = max(worst, abs(back[0] - lon - 0.5), abs(back[1] - lat - 0.25))
+    ok = worst < 1e-9
+    failed += 0 if ok else 1
+    log('round trip worst %.2e degrees %s' % (worst, 'ok' if ok else 'MISMATCH'))
+
+    folder = tempfile.mkdtemp()
+    try:
+        cx, cy = wgs84_to_albers(-123.0, 49.5)
+        square = {'type': 'Polygon', 'coordinates': [[(cx, cy), (cx + 500, cy), (cx + 500, cy + 500),
+                                                      (cx, cy + 500), (cx, cy)]]}
+        road = {'type': 'LineString', 'coordinates': [(cx - 100, cy), (cx + 600, cy + 250)]}
+
+        def blocks(count):
+            for n in range(count):
+                yield 'K%05d' % n, square, [('BLOCK_ID', 'K%05d' % n), ('NOTE', 'a < b & "c"')]
+
+        layers = [KMLLayer('Blocks', style('#ffff00', 2, '#ffff00', 0.3), blocks(1000)),
+                  KMLLayer('Roads', style('#000000', 3), iter([('R1', road, [])]))]
+        kml = os.path.join(folder, 'test.kml')
+        count = write(kml, 'Self test', layers)
+        from xml.dom import minidom
+        document = minidom.parse(kml)
+        ok = count == 1001 and len(document.getElementsByTagName('Placemark')) == 1001
+        first = document.getElementsByTagName('coordinates')[0].firstChild.data.split()[0].split(',')
+        ok = ok and abs(float(first[0]) + 123.0) < 1e-6 and abs(float(first[1]) - 49.5) < 1e-6
+        failed += 0 if ok else 1
+        log('kml %d placemarks %s' % (count, 'ok' if ok else 'MISMATCH'))
+        kmz = os.path.join(folder, 'test.kmz')
+        count = write(kmz, 'Self test', [KMLLayer('Blocks', None, blocks(10))])
+        with zipfile.ZipFile(kmz) as z:
+            ok = z.namelist() == ['doc.kml'] and minidom.parseString(z.read('doc.kml')) is not None and count == 10
+        failed += 0 if ok else 1
+        log('kmz ' + ('ok' if ok else 'MISMATCH'))
+    finally:
+        shutil.rmtree(folder)
+    return failed
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] == ['selftest']:
+        sys.exit(1 if selftest() else 0)
+    sys.stdout.write('Usage: python KML_Writer.py selftest\n')
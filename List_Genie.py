@@ -1,15 +1,40 @@
+import io
+import os
+import sys
+from collections import Counter
+
+sys.path.insert(1, os.path.split(os.path.abspath(sys.argv[0]))[0])
+import Query_Builder
+
+if sys.version_info[0] < 3:
+    text_type = unicode
+else:
+    text_type = str
+
+#a list starting with this is read from a text file, '@-' reads standard input
+FILE_PREFIX = '@'
 
 def replace_character(list,replacechar):
     #replaces a given list of characters with a space
     return list.replace(replacechar,' ')
 
-def find_dupes(list):
-    #finds the duplicate values in the list and sorts them alphabetically
-    return sorted([x for n, x in enumerate(list) if x in list[:n]])
+def count_values(list):
+    #counts how often each value appears in one pass over the list
+    return Counter(list)
+
+def find_dupes(list, counts=None):
+    #finds the duplicate values in the list and sorts them alphabetically. A value
+    #that appears n times is returned n - 1 times (every repeat after the first)
+    counts = counts if counts is not None else count_values(list)
+    dupes = []
+    for value in sorted(x for x in counts if counts[x] > 1):
+        dupes.extend([value] * (counts[value] - 1))
+    return dupes
 
-def remove_dupes(list):
+def remove_dupes(list, counts=None):
     #removes duplicates from the list and sorts the list alphabetically
-    return sorted([x for n, x in enumerate(list) if x not in list[:n]])
+    counts = counts if counts is not None else count_values(list)
+    return sorted(counts)
 
 def change_case(input,input_case):
 	if input_case == 'All Upper Case':
@@ -23,39 +48,81 @@ def format_list(list, list_format):
     if list_format == 'Comma Delimited':
         formatted = ",".join(list)
     elif list_format == 'String Definition Query':
-        formatted = "','".join(list)
-        formatted = "('" + formatted + "')"
+        #one (...) list per line, at most 1000 values each
+        formatted = "\n".join(Query_Builder.in_lists(list, numeric=False))
     elif list_format == 'Number Definition Query':
-        formatted = ",".join(list)
-        formatted = "(" + formatted + ")"
+        formatted = "\n".join(Query_Builder.in_lists(list, numeric=True))
     elif list_format == 'Query Builder Format':
         formatted = " | ".join(list)
     return formatted
 
 def find_matching(list1,list2):
-	s = set(list2)
+	#values of list1 (in list1 order) that are also in list2, list2 can be a list,
+	#set or the counts of a list
+	s = list2 if isinstance(list2, (set, dict)) else set(list2)
 	matching = [x for x in list1 if x in s]
 	return matching
 
 def find_unmatched(list1,list2):
-	s = set(list2)
+	#values of list1 (in list1 order) that are not in list2
+	s = list2 if isinstance(list2, (set, dict)) else set(list2)
 	matching = [x for x in list1 if x not in s]
 	return matching
 
-def get_feature_list(layer,field):
-    outer_list = []
-    for row in arcpy.da.SearchCursor(layer,field):
-##        arcpy.AddMessage("test")
-        for item in row:
-            item_replace = item.replace(" ","_")
-            outer_list.append(unicode(item_replace))
-
-##            outer_list.append(unicode(item))
+def exclusion_table(replace_char):
+    #one translate table that turns every excluded character into a space
+    if isinstance(replace_char, bytes) and not isinstance(replace_char, text_type):
+        replace_char = replace_char.decode('utf-8')
+    return dict((ord(char), u' ') for char in text_type(replace_char))
+
+def normalize(value, input_case, table):
+    #case and excluded characters for one value, then its words
+    if isinstance(value, bytes) and not isinstance(value, text_type):
+        value = value.decode('utf-8', 'replace')
+    return change_case(text_type(value), input_case).translate(table).split()
+
+def get_feature_values(layer,field):
+    #streams the field values of a layer, spaces inside a value become underscores
+    #so each value stays one item
+    import arcpy
+    with arcpy.da.SearchCursor(layer,field) as cursor:
+        for row in cursor:
+            for item in row:
+                if item is not None:
+                    yield text_type(item).replace(u' ',u'_')
+
+def get_text_values(path):
+    #streams the lines of a text file, or standard input for '-'
+    if path == '-':
+        for line in sys.stdin:
+            yield line if isinstance(line, text_type) else line.decode('utf-8')
+        return
+    with io.open(path, encoding='utf-8') as f:
+        for line in f:
+            yield line
 
-    list = " ".join(outer_list)
-    return list
+def get_feature_list(layer,field):
+    return u" ".join(get_feature_values(layer,field))
+
+def iter_values(source, field, input_case, replace_char):
+    #normalized values from a layer field, a text file ('@path'), standard input
+    #('@-') or the list typed in the tool. Anything else is the typed list itself,
+    #even when it looks like a path. Values are yielded one at a time so they can
+    #be counted without holding the whole list as a string
+    if field != '#':
+        raw = get_feature_values(source,field)
+    elif source.startswith(FILE_PREFIX):
+        raw = get_text_values(source[len(FILE_PREFIX):])
+    else:
+        raw = [source]
+    table = exclusion_table(replace_char)
+    for value in raw:
+        for word in normalize(value, input_case, table):
+            yield word
 
 if __name__ == '__main__':
+    import arcpy
+
     arcpy.AddMessage('===========================================')
     arcpy.AddMessage('     List Genie                   /)')
     arcpy.AddMessage('       made by           /\___/\ ((')
@@ -64,8 +131,6 @@ if __name__ == '__main__':
     arcpy.AddMessage("------------------------{_}^-'{_}----------")
     arcpy.AddMessage('===========================================')
 
-    import arcpy,sys
-
     list1 = sys.argv[1]# The first user input to turn into a list
     list2 = sys.argv[3] # The second user input to turn into a list, optional
     replace_char = sys.argv[7] # The list of characters to remove from the lists (eg.",;^$@*^)
@@ -75,21 +140,11 @@ if __name__ == '__main__':
     field1 = sys.argv[2]
     field2 = sys.argv[4]
 
-    if field1 is not '#':
-        list1 = get_feature_list(list1,field1)
-    if field2 is not '#':
-        list2 = get_feature_list(list2,field2)
-
-
-    # Change the case of the list if the user wants
-    list1 = change_case(list1,list_case)
-    # Replace the characters specficied in the argument with spaces
-    for char in replace_char:
-    	list1 = replace_character(list1,char)
-    #split the string into a list at the spaces
-    list1split = list1.split()
+    #Each value is changed to the picked case, has the excluded characters replaced
+    #with spaces and is split as it's read, then counted straight away
+    counts1 = count_values(iter_values(list1, field1, list_case, replace_char))
     #Call the find dupes function to find all the duplicate vales
-    dupes1 = find_dupes(list1split)
+    dupes1 = find_dupes(None, counts1)
     #If there is more than 0 duplicates return the duplicates
     if len(dupes1) > 0:
     	arcpy.AddMessage(str(len(dupes1)) + ' duplicate value(s) in list 1:')
@@ -99,9 +154,8 @@ if __name__ == '__main__':
     else:
     	arcpy.AddMessage('There are no duplicate values in list 1')
     arcpy.AddMessage('-------------------------------------------')
-    arcpy.AddMessage(list2)
     # return the list to the user with duplicates removed
-    no_dupes1 = remove_dupes(list1split)
+    no_dupes1 = remove_dupes(None, counts1)
     arcpy.AddMessage (str(len(no_dupes1))+ ' unique items in list 1:')
     arcpy.AddMessage(' ')
     for no_dupe in no_dupes1:
@@ -111,15 +165,14 @@ if __name__ == '__main__':
     arcpy.AddMessage('Here is your list1 formatted in the style you picked:')
     arcpy.AddMessage(' ')
     arcpy.AddMessage(format_list(no_dupes1,list_format))
+    if 'Definition Query' in list_format and len(no_dupes1) > Query_Builder.MAX_IN_ITEMS:
+        arcpy.AddMessage('Split into lists of ' + str(Query_Builder.MAX_IN_ITEMS) + ' values, join them with OR <field> in')
     arcpy.AddMessage('--------------------------------------------')
 
 
-    if list2 is not '#':
-    	list2 = change_case(list2,list_case)
-    	for char in replace_char:
-    		list2 = replace_character(list2,char)
-    	list2split = list2.split()
-    	dupes2 = find_dupes(list2split)
+    if list2 != '#':
+    	counts2 = count_values(iter_values(list2, field2, list_case, replace_char))
+    	dupes2 = find_dupes(None, counts2)
     	if len(dupes2) > 0:
     		arcpy.AddMessage(str(len(dupes2)) + ' duplicate value(s) in list 2:')
     		arcpy.AddMessage(' ')
@@ -128,7 +181,7 @@ if __name__ == '__main__':
     	else:
     		arcpy.AddMessage('There are no duplicate values in list 2')
     	arcpy.AddMessage('-----------------------------------------')
-    	no_dupes2 = remove_dupes(list2split)
+    	no_dupes2 = remove_dupes(None, counts2)
     	arcpy.AddMessage (str(len(no_dupes2))+ ' unique items in list2:')
     	arcpy.AddMessage(' ')
     	for no_dupe in no_dupes2:
@@ -138,6 +191,8 @@ if __name__ == '__main__':
     	arcpy.AddMessage('Here is your list2 formatted in the style you picked:')
     	arcpy.AddMessage(' ')
     	arcpy.AddMessage(format_list(no_dupes2,list_format))
+    	if 'Definition Query' in list_format and len(no_dupes2) > Query_Builder.MAX_IN_ITEMS:
+    		arcpy.AddMessage('Split into lists of ' + str(Query_Builder.MAX_IN_ITEMS) + ' values, join them with OR <field> in')
 
     	arcpy.AddMessage(' ')
     	arcpy.AddMessage('==========================================')
@@ -149,20 +204,20 @@ if __name__ == '__main__':
     	arcpy.AddMessage(' ')
 
     	# find matching between lists
-    	matching = find_matching(no_dupes1,no_dupes2)
+    	matching = find_matching(no_dupes1,counts2)
     	arcpy.AddMessage(str(len(matching))+ ' matching values between the list 1 and list 2:')
     	arcpy.AddMessage(' ')
     	for matched in matching:
     		arcpy.AddMessage(matched)
     	arcpy.AddMessage('-------------------------------------------')
     	# find unmatched between the 2 lists
-    	unmatched1 = find_unmatched(no_dupes1,no_dupes2)
+    	unmatched1 = find_unmatched(no_dupes1,counts2)
     	arcpy.AddMessage(str(len(unmatched1))+ ' values in list 1 not in list 2:')
     	arcpy.AddMessage(' ')
     	for unmatched in unmatched1:
     		arcpy.AddMessage(unmatched)
     	arcpy.AddMessage('-------------------------------------------')
-    	unmatched2 = find_unmatched(no_dupes2,no_dupes1)
+    	unmatched2 = find_unmatched(no_dupes2,counts1)
     	arcpy.AddMessage(str(len(unmatched2))+ ' values in list 2 not in list 1:')
     	arcpy.AddMessage(' ')
     	for unmatched in unmatched2:
@@ -0,0 +1,299 @@
+# ---------------------------------------------------------------------------
+# List_Genie_External.py
+# Created on: Oct 18, 2026
+#
+# Description: Out of core List Genie for lists too big to hold in the ArcGIS
+#           Python process (a few million BLOCK_IDs against a spreadsheet
+#           export). Values are read with the same normalizing as List Genie
+#           and counted in memory until the memory ceiling is reached, then
+#           the counts are written to a temp file sorted by value (a run) and
+#           counting starts again. The runs of each list are merged back into
+#           one sorted stream of (value, count) and the two streams are joined
+#           in a single pass, which writes the duplicates and unique values of
+#           each list, the matching values and the values unmatched on each
+#           side to text files in the output folder.
+#
+#           The files hold the same values in the same order as the lists
+#           List Genie reports, --check runs the in memory path as well and
+#           compares them. Progress and peak memory are logged as it runs.
+#
+# Usage:    python List_Genie_External.py <list1> [<list2>] --output FOLDER
+#                                         [--field1 NAME] [--field2 NAME]
+#                                         [--case "All Upper Case"] [--exclude ",;"]
+#                                         [--memory-mb 256] [--temp FOLDER] [--check]
+#
+#           A list is a text file, '-' for standard input, or a layer or
+#           feature class when its field is given (needs arcpy). Unlike the
+#           List Genie tool there is no typed list, so the file needs no '@'.
+#
+# Author:   Daniel Otto
+# ---------------------------------------------------------------------------
+
+import heapq
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from collections import Counter
+from itertools import groupby
+from operator import itemgetter
+
+sys.path.insert(1, os.path.split(os.path.abspath(sys.argv[0]))[0])
+import List_Genie
+import Memory_Monitor
+
+DEFAULT_MEMORY_MB = 256
+#   Dictionary slot and count for each distinct value, on top of the value itself
+ENTRY_BYTES = 64
+#   Most runs merged at once, more are merged in passes to stay under file limits
+MERGE_FAN_IN = 64
+PROGRESS_EVERY = 1000000
+
+ONE_LIST = ('dupes1', 'unique1')
+TWO_LISTS = ('dupes1', 'unique1', 'dupes2', 'unique2', 'matching', 'unmatched1', 'unmatched2')
+
+
+# ---------------------------------------------------------------------------
+#   Sorted runs
+# ---------------------------------------------------------------------------
+
+def write_run(counts, folder):
+    fd, path = tempfile.mkstemp(suffix='.run', dir=folder)
+    with io.open(fd, 'w', encoding='utf-8') as f:
+        for value in sorted(counts):
+            f.write(value + u'\t' + List_Genie.text_type(counts[value]) + u'\n')
+    return path
+
+
+def read_run(path):
+    #Values never hold whitespace, List Genie splits on it
+    with io.open(path, encoding='utf-8') as f:
+        for line in f:
+            value, count = line.rstrip(u'\n').split(u'\t')
+            yield value, int(count)
+
+
+def spill_runs(values, memory_limit, folder, log, label='list'):
+    #Counts values until their estimated size reaches memory_limit bytes, then
+    #writes the counts as a sorted run. Returns the run paths and the value count.
+    counts = Counter()
+    used = 0
+    paths = []
+    total = 0
+    for value in values:
+        total += 1
+        if value not in counts:
+            used += sys.getsizeof(value) + ENTRY_BYTES
+        counts[value] += 1
+        if used >= memory_limit:
+            paths.append(write_run(counts, folder))
+            counts = Counter()
+            used = 0
+        if total % PROGRESS_EVERY == 0:
+            log(label + ': ' + str(total) + ' values read, ' + str(len(paths)) + ' run(s), ' +
+                Memory_Monitor.format_bytes(Memory_Monitor.current_rss()) + ' in use')
+    if counts or not paths:
+        paths.append(write_run(counts, folder))
+    return paths, total
+
+
+def _merge(paths):
+    #One sorted (value, count) stream from sorted runs, equal values summed
+    for value, group in groupby(heapq.merge(*[read_run(p) for p in paths]), itemgetter(0)):
+        yield value, sum(count for _, count in group)
+
+
+def merged_counts(paths, folder):
+    #Merges runs in passes of MERGE_FAN_IN until one pass can merge the rest
+    while len(paths) > MERGE_FAN_IN:
+        merged = []
+        for n in range(0, len(paths), MERGE_FAN_IN):
+            group = paths[n:n + MERGE_FAN_IN]
+            merged.append(_write_stream(_merge(group), folder))
+            for path in group:
+                os.remove(path)
+        paths = merged
+    return _merge(paths)
+
+
+def _write_stream(stream, folder):
+    fd, path = tempfile.mkstemp(suffix='.run', dir=folder)
+    with io.open(fd, 'w', encoding='utf-8') as f:
+        for value, count in stream:
+            f.write(value + u'\t' + List_Genie.text_type(count) + u'\n')
+    return path
+
+
+# ---------------------------------------------------------------------------
+#   Merge join
+# ---------------------------------------------------------------------------
+
+def join(stream1, stream2):
+    #Yields (value, count in list 1, count in list 2) in value order
+    end = object()
+    a = next(stream1, end)
+    b = next(stream2, end)
+    while a is not end or b is not end:
+        if b is end or (a is not end and a[0] < b[0]):
+            yield a[0], a[1], 0
+            a = next(stream1, end)
+        elif a is end or b[0] < a[0]:
+            yield b[0], 0, b[1]
+            b = next(stream2, end)
+        else:
+            yield a[0], a[1], b[1]
+            a = next(stream1, end)
+            b = next(stream2, end)
+
+
+def compare(joined, sink, two_lists=True):
+    #Sends each value to sink(category, value, times), the List Genie results
+    for value, count1, count2 in joined:
+        if count1:
+            sink('unique1', value, 1)
+            if count1 > 1:
+                sink('dupes1', value, count1 - 1)
+        if not two_lists:
+            continue
+        if count2:
+            sink('unique2', value, 1)
+            if count2 > 1:
+                sink('dupes2', value, count2 - 1)
+        if count1 and count2:
+            sink('matching', value, 1)
+        elif count1:
+            sink('unmatched1', value, 1)
+        else:
+            sink('unmatched2', value, 1)
+
+
+class FileSink(object):
+    #Writes each category to <category>.txt in folder, one value per line
+
+    def __init__(self, folder, categories):
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+        self.paths = dict((c, os.path.join(folder, c + '.txt')) for c in categories)
+        self.files = dict((c, io.open(self.paths[c], 'w', encoding='utf-8')) for c in categories)
+        self.counts = dict((c, 0) for c in categories)
+
+    def __call__(self, category, value, times):
+        line = value + u'\n'
+        f = self.files[category]
+        for _ in range(times):
+            f.write(line)
+        self.counts[category] += times
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+
+
+def read_results(folder, categories):
+    results = {}
+    for category in categories:
+        with io.open(os.path.join(folder, category + '.txt'), encoding='utf-8') as f:
+            results[category] = [line.rstrip(u'\n') for line in f]
+    return results
+
+
+def in_memory_results(values1, values2=None):
+    #The List Genie in memory path, for checking
+    counts1 = List_Genie.count_values(values1)
+    results = {'dupes1': List_Genie.find_dupes(None, counts1),
+               'unique1': List_Genie.remove_dupes(None, counts1)}
+    if values2 is not None:
+        counts2 = List_Genie.count_values(values2)
+        results['dupes2'] = List_Genie.find_dupes(None, counts2)
+        results['unique2'] = List_Genie.remove_dupes(None, counts2)
+        results['matching'] = List_Genie.find_matching(results['unique1'], counts2)
+        results['unmatched1'] = List_Genie.find_unmatched(results['unique1'], counts2)
+        results['unmatched2'] = List_Genie.find_unmatched(results['unique2'], counts1)
+    return results
+
+
+def _progress(joined, log):
+    for n, item in enumerate(joined, 1):
+        if n % PROGRESS_EVERY == 0:
+            log('merged ' + str(n) + ' distinct values')
+        yield item
+
+
+def external_compare(values1, values2, output_folder, memory_mb=DEFAULT_MEMORY_MB,
+                     temp_folder=None, log=None):
+    #Writes the List Genie results for one or two value streams to output_folder.
+    #Returns a summary with the size of each result, the values read, the runs
+    #spilled and the peak memory.
+    log = log or (lambda msg: None)
+    start = time.time()
+    memory_limit = int(memory_mb * 1024 * 1024)
+    #The lists are counted one after the other, each under the full ceiling
+    categories = TWO_LISTS if values2 is not None else ONE_LIST
+    folder = tempfile.mkdtemp(prefix='list_genie_', dir=temp_folder)
+    monitor = Memory_Monitor.Monitor().start()
+    sink = None
+    try:
+        runs1, total1 = spill_runs(values1, memory_limit, folder, log, 'list 1')
+        log('list 1: ' + str(total1) + ' values in ' + str(len(runs1)) + ' run(s)')
+        runs2, total2 = [], 0
+        if values2 is not None:
+            runs2, total2 = spill_runs(values2, memory_limit, folder, log, 'list 2')
+            log('list 2: ' + str(total2) + ' values in ' + str(len(runs2)) + ' run(s)')
+        stream1 = merged_counts(runs1, folder)
+        stream2 = merged_counts(runs2, folder) if runs2 else iter(())
+        sink = FileSink(output_folder, categories)
+        compare(_progress(join(stream1, stream2), log), sink, values2 is not None)
+    finally:
+        if sink is not None:
+            sink.close()
+        monitor.stop()
+        shutil.rmtree(folder, ignore_errors=True)
+    summary = dict(sink.counts)
+    summary.update({'values1': total1, 'values2': total2, 'runs1': len(runs1), 'runs2': len(runs2),
+                    'peak_rss': monitor.peak, 'process_peak_rss': Memory_Monitor.peak_rss(),
+                    'seconds': round(time.time() - start, 1)})
+    for category in categories:
+        log(str(summary[category]) + ' ' + category + ' -> ' + sink.paths[category])
+    log('peak memory ' + Memory_Monitor.format_bytes(monitor.peak) + ' (process peak ' +
+        Memory_Monitor.format_bytes(summary['process_peak_rss']) + ') in ' + str(summary['seconds']) + 's')
+    return summary
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Out of core List Genie comparison')
+    parser.add_argument('list1', help="text file, '-' for standard input, or a layer with --field1")
+    parser.add_argument('list2', nargs='?', default=None, help='optional second list')
+    parser.add_argument('--output', required=True, help='folder for the result files')
+    parser.add_argument('--field1', default='#')
+    parser.add_argument('--field2', default='#')
+    parser.add_argument('--case', default='#', help="'All Upper Case' or 'All Lower Case'")
+    parser.add_argument('--exclude', default='', help='characters treated as separators')
+    parser.add_argument('--memory-mb', type=float, default=DEFAULT_MEMORY_MB)
+    parser.add_argument('--temp', default=None, help='folder for the sorted runs')
+    parser.add_argument('--check', action='store_true', help='compare against the in memory path')
+    args = parser.parse_args()
+    if args.check and '-' in (args.list1, args.list2):
+        parser.error('--check reads the lists twice, standard input can only be read once')
+
+    def values(source, field):
+        if field == '#':
+            source = List_Genie.FILE_PREFIX + source
+        return List_Genie.iter_values(source, field, args.case, args.exclude)
+
+    log = lambda msg: sys.stdout.write(msg + '\n')
+    second = values(args.list2, args.field2) if args.list2 else None
+    summary = external_compare(values(args.list1, args.field1), second, args.output,
+                               args.memory_mb, args.temp, log)
+    if args.check:
+        categories = TWO_LISTS if args.list2 else ONE_LIST
+        expected = in_memory_results(values(args.list1, args.field1),
+                                     values(args.list2, args.field2) if args.list2 else None)
+        found = read_results(args.output, categories)
+        different = [c for c in categories if found[c] != expected[c]]
+        if different:
+            log('MISMATCH with the in memory path: ' + ', '.join(different))
+            sys.exit(1)
+        log('same results as the in memory path')
@@ -0,0 +1,27 @@
+# ---------------------------------------------------------------------------
+# Manifest_Files.py
+# Created on: Oct 18, 2026
+#
+# Description: The JSON manifests the tools keep between runs (stage
+#           checkpoints, constraint and depletion caches, map jobs, extract
+#           manifests) are all written here. A manifest is written to a temp
+#           file next to it and then renamed over the old one, so a run that
+#           is interrupted never leaves a half written manifest behind.
+#
+# Usage:    Manifest_Files.save_manifest(path, manifest)
+#
+# Author:   Daniel Otto
+# ---------------------------------------------------------------------------
+
+import json
+import os
+
+
+def save_manifest(path, manifest, sort_keys=True):
+    #sort_keys=False keeps the order of an OrderedDict manifest
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=sort_keys)
+    if os.path.exists(path):
+        os.remove(path)
+    os.rename(tmp, path)
@@ -0,0 +1,138 @@
+# ---------------------------------------------------------------------------
+# Memory_Monitor.py
+# Created on: Oct 18, 2026
+#
+# Description: Memory use of the running process for the long running tools.
+#           current_rss and peak_rss read the resident set (working set on
+#           Windows) from the operating system without any extra packages.
+#           Monitor samples current_rss on a background thread so the peak of
+#           one step can be reported, the process peak only ever goes up.
+#
+# Usage:    with Memory_Monitor.Monitor() as monitor:
+#               ...
+#           log('peak ' + Memory_Monitor.format_bytes(monitor.peak))
+#
+# Author:   Daniel Otto
+# ---------------------------------------------------------------------------
+
+import os
+import sys
+import threading
+
+SAMPLE_SECONDS = 0.1
+
+
+def _windows_counters():
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [('cb', wintypes.DWORD),
+                    ('PageFaultCount', wintypes.DWORD),
+                    ('PeakWorkingSetSize', ctypes.c_size_t),
+                    ('WorkingSetSize', ctypes.c_size_t),
+                    ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                    ('PagefileUsage', ctypes.c_size_t),
+                    ('PeakPagefileUsage', ctypes.c_size_t)]
+
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+    process = ctypes.windll.kernel32.GetCurrentProcess()
+    ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb)
+    return counters
+
+
+def _maxrss():
+    #ru_maxrss is in kilobytes on Linux and bytes on macOS
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def current_rss():
+    #Resident memory of this process in bytes, None if it can't be read
+    try:
+        if sys.platform == 'win32':
+            return _windows_counters().WorkingSetSize
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except Exception:
+        try:
+            return _maxrss()
+        except Exception:
+            return None
+
+
+def peak_rss():
+    #Largest resident memory of this process so far in bytes, None if it can't be read
+    try:
+        if sys.platform == 'win32':
+            return _windows_counters().PeakWorkingSetSize
+        return _maxrss()
+    except Exception:
+        return None
+
+
+def format_bytes(size):
+    if size is None:
+        return 'unknown'
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return str(round(size, 1)) + ' ' + unit
+        size = size / 1024.0
+    return str(round(size, 2)) + ' GB'
+
+
+class Monitor(object):
+    #Samples current_rss until stopped, peak is the largest sample (and the
+    #reading at start and stop)
+
+    def __init__(self, interval=SAMPLE_SECONDS):
+        self.interval = interval
+        self.start_rss = None
+        self.peak = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        rss = current_rss()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self.start_rss = current_rss()
+        self.peak = self.start_rss
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._sample()
+        return self.peak
+
+    @property
+    def growth(self):
+        #Peak above the memory in use when the monitor started
+        if self.peak is None or self.start_rss is None:
+            return None
+        return self.peak - self.start_rss
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
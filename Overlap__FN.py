@@ -12,32 +12,63 @@
 import arcpy,sys,logging,os
 from argparse import ArgumentParser
 
-arcpy.Delete_management("in_memory")
-arcpy.env.overwriteOutput = True
-#   Set the workspace to be in memory so no extra data is created
-arcpy.env.workspace = 'in_memory'
+#   Helper modules are kept in the same folder as this script
+sys.path.insert(1, os.path.split(os.path.abspath(sys.argv[0]))[0])
+import FN_Overlap_Batch
+import FN_Overlap_Index
+import FN_Overlap_Service
+import Geometry_Core
 
-sys.path.insert(1, r'W:\FOR\RSI\TOC\Projects\ESRI_Scripts\Python_Repository')
-from environment import Environment
-
-sde_folder = 'Database Connections'
 input_lyr = arcpy.GetParameterAsText(0)
 b_un = arcpy.GetParameterAsText(1)
 b_pw = arcpy.GetParameterAsText(2)
-
-bcgw_db = Environment.create_bcgw_connection(location=sde_folder, bcgw_user_name=b_un,
-                                                      bcgw_password=b_pw)
-
-
-FN_Bndry = os.path.join(bcgw_db, 'WHSE_ADMIN_BOUNDARIES.PIP_CONSULTATION_AREAS_SP')
-
-arcpy.MakeFeatureLayer_management(input_lyr,r"in_memory\input_feature")
-arcpy.MakeFeatureLayer_management(FN_Bndry,"in_memory\FN_feature")
-
-arcpy.SelectLayerByLocation_management(r"in_memory\FN_feature", 'INTERSECT', r"in_memory\input_feature", selection_type="NEW_SELECTION")
-
-result = arcpy.GetCount_management(r"in_memory\input_feature")
-count = str(result.getOutput(0))
+#   Optional local snapshot of the consultation areas and whether to rebuild it
+#   from the BCGW before the lookup
+snapshot = arcpy.GetParameterAsText(3) or FN_Overlap_Index.DEFAULT_SNAPSHOT
+refresh = arcpy.GetParameterAsText(4).lower() == 'true'
+#   Optional per feature overlap table (CSV or FGDB table), with the overlap
+#   hectares and percent of each feature when asked for
+batch_output = arcpy.GetParameterAsText(5)
+batch_area = arcpy.GetParameterAsText(6).lower() == 'true'
+
+#   Read the selected features in BC Albers to match the snapshot
+input_features = []
+for row in arcpy.da.SearchCursor(input_lyr, ['OID@', 'SHAPE@'], spatial_reference=arcpy.SpatialReference(FN_Overlap_Index.SPATIAL_REFERENCE)):
+    if row[1] is not None:
+        input_features.append((row[0], Geometry_Core.from_arcpy(row[1])))
+
+#   Ask the overlap service first when it is running (index already loaded) and
+#   no refresh or other snapshot was asked for, the service picks up a refreshed
+#   snapshot on its own
+use_service = not arcpy.GetParameterAsText(3) and not refresh and FN_Overlap_Service.is_running()
+if use_service:
+    arcpy.AddMessage("Using the overlap service on port {}".format(FN_Overlap_Service.DEFAULT_PORT))
+    answer = FN_Overlap_Service.query_features(input_features, area=batch_area)
+    rows = answer['rows']
+else:
+    #   Fall back to looking the features up in the snapshot directly
+    arcpy.Delete_management("in_memory")
+    arcpy.env.overwriteOutput = True
+    #   Set the workspace to be in memory so no extra data is created
+    arcpy.env.workspace = 'in_memory'
+
+    #   The BCGW is only used to refresh the snapshot, lookups run against the
+    #   local copy of PIP_CONSULTATION_AREAS_SP
+    if refresh or FN_Overlap_Index.is_stale(snapshot):
+        if b_un and b_pw:
+            arcpy.AddMessage("Refreshing consultation area snapshot " + snapshot)
+            FN_Overlap_Index.refresh(snapshot, b_un, b_pw, log=arcpy.AddMessage)
+        elif os.path.exists(snapshot):
+            arcpy.AddWarning("The consultation area snapshot is {:.0f} days old, enter BCGW credentials to refresh it".format(FN_Overlap_Index.snapshot_age_days(snapshot)))
+        else:
+            raise Exception("No consultation area snapshot at " + snapshot + ", enter BCGW credentials to create it")
+
+    index = FN_Overlap_Index.OverlapIndex(snapshot)
+    rows = list(FN_Overlap_Batch.overlap_rows(index, input_features, batch_area))
+    index.close()
+overlaps = sorted(set((row[1], row[2]) for row in rows if row[1] or row[2]))
+
+count = str(len(input_features))
 arcpy.AddMessage("-------------------------------------------------------------------------------------------------------------------------------------------------")
 
 arcpy.AddMessage("You have {} feature(s) selected from {}. Below are the FN overlaps for these feature(s)".format(count,input_lyr))
@@ -47,9 +78,14 @@ arcpy.AddMessage("{:50}{:5}{}".format("Contact Organization","|","Consultation A
 arcpy.AddMessage("-------------------------------------------------------------------------------------------------------------------------------------------------")
 
 
-for row in arcpy.da.SearchCursor("in_memory\FN_feature",['CONTACT_ORGANIZATION_NAME', 'CNSLTN_AREA_NAME'],sql_clause=(None, 'ORDER BY CONTACT_ORGANIZATION_NAME, CNSLTN_AREA_NAME')):
+for row in overlaps:
     arcpy.AddMessage("{:50}{:5}{}".format(row[0],"|",row[1]))
 
 
-arcpy.Delete_management('in_memory')
-Environment.delete_bcgw_connection(location=sde_folder)
+if batch_output:
+    arcpy.AddMessage("-------------------------------------------------------------------------------------------------------------------------------------------------")
+    count = FN_Overlap_Batch.write_rows(batch_output, FN_Overlap_Batch.output_fields(batch_area), rows)
+    arcpy.AddMessage("{} overlap rows for each feature written to {}".format(count, batch_output))
+
+if not use_service:
+    arcpy.Delete_management('in_memory')
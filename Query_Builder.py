@@ -0,0 +1,202 @@
+# ---------------------------------------------------------------------------
+# Query_Builder.py
+# Created on: Oct 18, 2026
+#
+# Description: Definition queries for long ID lists. Oracle rejects an IN list
+#           of more than 1000 items and a single huge literal query plans
+#           badly, so the IDs are split into IN lists of at most MAX_IN_ITEMS.
+#           where_clause joins the chunks with OR for tools that take one
+#           expression (Select_analysis, definition queries). run_chunked runs
+#           one select per chunk on a thread pool and merges the results, for
+#           database connections that can be opened once per thread (cx_Oracle,
+#           sqlite3).
+#
+#           Numeric keys are written bare and string keys quoted, detected from
+#           the IDs unless the caller says which.
+#
+# Usage:    python Query_Builder.py selftest [--ids N] [--chunk N] [--workers N]
+#               checks the chunked selects against a local SQLite stand-in
+#
+# Author:   Daniel Otto
+# ---------------------------------------------------------------------------
+
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from argparse import ArgumentParser
+from multiprocessing.pool import ThreadPool
+
+MAX_IN_ITEMS = 1000
+DEFAULT_WORKERS = 4
+
+#   Plain integers and decimals, a leading zero means the ID is a code (0123)
+NUMBER = re.compile(r'^-?(0|[1-9][0-9]*)(\.[0-9]+)?$')
+
+
+def parse_ids(text, separators=',;', upper=True):
+    #IDs typed in a tool (A12345, A12346 ...), spaces removed and repeats dropped
+    for separator in separators:
+        text = text.replace(separator, ' ')
+    ids = []
+    seen = set()
+    for value in text.split():
+        value = value.upper() if upper else value
+        if value not in seen:
+            seen.add(value)
+            ids.append(value)
+    return ids
+
+
+def is_numeric(values):
+    #True when every value is a number, so the key can be compared unquoted
+    found = False
+    for value in values:
+        found = True
+        if isinstance(value, bool):
+            return False
+        if isinstance(value, (int, float)):
+            continue
+        if not NUMBER.match(str(value).strip()):
+            return False
+    return found
+
+
+def literal(value, numeric):
+    if numeric:
+        if isinstance(value, float) and value.is_integer():
+            return str(int(value))
+        return str(value).strip()
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def chunks(values, size=MAX_IN_ITEMS):
+    values = list(values)
+    return [values[n:n + size] for n in range(0, len(values), size)]
+
+
+def in_lists(values, size=MAX_IN_ITEMS, numeric=None):
+    #The "(...)" lists for the values, at most size items each
+    values = list(values)
+    if numeric is None:
+        numeric = is_numeric(values)
+    return ['(' + ','.join(literal(v, numeric) for v in chunk) + ')' for chunk in chunks(values, size)]
+
+
+def in_clauses(field, values, size=MAX_IN_ITEMS, numeric=None):
+    return [field + ' in ' + items for items in in_lists(values, size, numeric)]
+
+
+def where_clause(field, values, size=MAX_IN_ITEMS, numeric=None):
+    #One expression for all the values, IN lists of at most size items joined with
+    #OR. An empty list selects nothing.
+    clauses = in_clauses(field, values, size, numeric)
+    if not clauses:
+        return '1 = 0'
+    if len(clauses) == 1:
+        return clauses[0]
+    return '(' + ' OR '.join(clauses) + ')'
+
+
+def run_chunked(select, field, values, workers=DEFAULT_WORKERS, size=MAX_IN_ITEMS, numeric=None):
+    #Calls select(where) for every chunk of values on a pool of workers and returns
+    #the rows of all chunks, in chunk order
+    clauses = in_clauses(field, values, size, numeric)
+    if not clauses:
+        return []
+    if workers <= 1 or len(clauses) == 1:
+        results = [select(clause) for clause in clauses]
+    else:
+        pool = ThreadPool(min(workers, len(clauses)))
+        try:
+            results = pool.map(select, clauses)
+        finally:
+            pool.close()
+            pool.join()
+    rows = []
+    for result in results:
+        rows.extend(result)
+    return rows
+
+
+def dbapi_select(connect, table, columns):
+    #Returns a select(where) function for run_chunked. Each thread opens its own
+    #connection with connect() and keeps it for the following chunks.
+    local = threading.local()
+    sql = 'SELECT ' + ', '.join(columns) + ' FROM ' + table + ' WHERE '
+
+    def select(where):
+        if getattr(local, 'connection', None) is None:
+            local.connection = connect()
+        cursor = local.connection.cursor()
+        try:
+            cursor.execute(sql + where)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    return select
+
+
+# ---------------------------------------------------------------------------
+#   SQLite stand-in
+# ---------------------------------------------------------------------------
+
+def make_standin(path, count, table='SV_BLOCK'):
+    #A table shaped like the block view: BLOCK_ID text, CUTB_SEQ_NBR number
+    if os.path.exists(path):
+        os.remove(path)
+    connection = sqlite3.connect(path)
+    connection.execute('CREATE TABLE ' + table + ' (BLOCK_ID TEXT, CUTB_SEQ_NBR INTEGER, LICENCE_ID TEXT)')
+    connection.executemany('INSERT INTO ' + table + ' VALUES (?, ?, ?)',
+                           (('K%06d' % n, 100000 + n, 'A%05d' % (n // 20)) for n in range(count)))
+    connection.commit()
+    connection.close()
+
+
+def selftest(ids=20000, chunk=MAX_IN_ITEMS, workers=DEFAULT_WORKERS, log=None):
+    log = log or (lambda msg: sys.stdout.write(msg + '\n'))
+    folder = tempfile.mkdtemp()
+    path = os.path.join(folder, 'standin.sqlite')
+    try:
+        make_standin(path, ids * 2)
+        connect = lambda: sqlite3.connect(path)
+        select = dbapi_select(connect, 'SV_BLOCK', ['BLOCK_ID', 'CUTB_SEQ_NBR'])
+        #Every other block, by text key and by number key
+        block_ids = ['K%06d' % n for n in range(0, ids * 2, 2)]
+        seq_nbrs = [str(100000 + n) for n in range(0, ids * 2, 2)]
+        failed = 0
+        for field, values in (('BLOCK_ID', block_ids), ('CUTB_SEQ_NBR', seq_nbrs)):
+            start = time.time()
+            rows = run_chunked(select, field, values, workers, chunk)
+            seconds = time.time() - start
+            expected = set(zip(block_ids, [int(v) for v in seq_nbrs]))
+            ok = set(rows) == expected and len(rows) == len(expected)
+            failed += 0 if ok else 1
+            log(field + ': ' + str(len(values)) + ' IDs in ' + str(len(chunks(values, chunk))) + ' chunks, ' +
+                str(len(rows)) + ' rows in ' + str(round(seconds, 3)) + 's ' + ('ok' if ok else 'MISMATCH'))
+        #The single expression form gives the same rows
+        connection = connect()
+        rows = connection.execute('SELECT BLOCK_ID FROM SV_BLOCK WHERE ' + where_clause('BLOCK_ID', block_ids, chunk)).fetchall()
+        connection.close()
+        ok = sorted(r[0] for r in rows) == block_ids
+        failed += 0 if ok else 1
+        log('where_clause: ' + str(len(rows)) + ' rows ' + ('ok' if ok else 'MISMATCH'))
+        return failed
+    finally:
+        for name in os.listdir(folder):
+            os.remove(os.path.join(folder, name))
+        os.rmdir(folder)
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Chunked definition queries')
+    parser.add_argument('command', choices=['selftest'])
+    parser.add_argument('--ids', type=int, default=20000)
+    parser.add_argument('--chunk', type=int, default=MAX_IN_ITEMS)
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    args = parser.parse_args()
+    sys.exit(1 if selftest(args.ids, args.chunk, args.workers) else 0)
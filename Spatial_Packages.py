@@ -0,0 +1,804 @@
+# ---------------------------------------------------------------------------
+# Spatial_Packages.py
+# Created on: Oct 18, 2026
+#
+# Description: GeoPackage and FlatGeobuf output for the extractor packages,
+#           written with the standard library only (sqlite3 and struct) so
+#           they can be made without GDAL. Both formats carry a spatial index,
+#           so whoever loads the package can read only the features in the
+#           area they're looking at instead of the whole layer.
+#
+#           GeoPackage: one table per layer, geometries as GeoPackage binary
+#           (header and envelope then WKB), with an R-tree (the
+#           gpkg_rtree_index extension) filled as the features are inserted.
+#
+#           FlatGeobuf: one file per layer, a header and a packed Hilbert
+#           R-tree followed by the features in Hilbert order. The features
+#           stream to a temp file as they come in and only their bounding
+#           boxes are kept, the sort and index are built when the layer is
+#           closed and the features are copied after the index.
+#
+#           Both writers take GeoJSON style geometries (Geometry_Core) and a
+#           list of values per feature. The readers are here for checking a
+#           package and for the benchmark, both can read by bounding box.
+#
+# Author:   Daniel Otto
+# ---------------------------------------------------------------------------
+
+from __future__ import division
+
+import math
+import os
+import sqlite3
+import struct
+import sys
+import tempfile
+import time
+
+import Geometry_Core
+
+FORMATS = ('gpkg', 'fgb')
+SPATIAL_REFERENCE = 3005
+
+#   Field types used by the writers, from the arcpy field types
+FIELD_TYPES = {'String': 'text', 'GUID': 'text', 'GlobalID': 'text',
+               'SmallInteger': 'integer', 'Integer': 'integer',
+               'Single': 'real', 'Double': 'real', 'Date': 'datetime'}
+
+#   Layer geometry types from the arcpy shape types, single parts are promoted
+#   to multi so every feature in a layer has the same type
+SHAPE_TYPES = {'Polygon': 'MultiPolygon', 'Polyline': 'MultiLineString',
+               'Point': 'Point', 'Multipoint': 'MultiPoint'}
+
+BC_ALBERS_WKT = ('PROJCS["NAD83 / BC Albers",GEOGCS["NAD83",DATUM["North_American_Datum_1983",'
+                 'SPHEROID["GRS 1980",6378137,298.257222101,AUTHORITY["EPSG","7019"]],'
+                 'TOWGS84[0,0,0,0,0,0,0],AUTHORITY["EPSG","6269"]],PRIMEM["Greenwich",0,AUTHORITY["EPSG","8901"]],'
+                 'UNIT["degree",0.0174532925199433,AUTHORITY["EPSG","9122"]],AUTHORITY["EPSG","4269"]],'
+                 'PROJECTION["Albers_Conic_Equal_Area"],PARAMETER["latitude_of_center",45],'
+                 'PARAMETER["longitude_of_center",-126],PARAMETER["standard_parallel_1",50],'
+                 'PARAMETER["standard_parallel_2",58.5],PARAMETER["false_easting",1000000],'
+                 'PARAMETER["false_northing",0],UNIT["metre",1,AUTHORITY["EPSG","9001"]],'
+                 'AXIS["Easting",EAST],AXIS["Northing",NORTH],AUTHORITY["EPSG","3005"]]')
+
+WGS84_WKT = ('GEOGCS["WGS 84",DATUM["WGS_1984",SPHEROID["WGS 84",6378137,298.257223563,AUTHORITY["EPSG","7030"]],'
+             'AUTHORITY["EPSG","6326"]],PRIMEM["Greenwich",0,AUTHORITY["EPSG","8901"]],'
+             'UNIT["degree",0.0174532925199433,AUTHORITY["EPSG","9122"]],AUTHORITY["EPSG","4326"]]')
+
+
+def field_type(arcpy_type):
+    return FIELD_TYPES.get(arcpy_type, 'text')
+
+
+def promote(geom, geometry_type):
+    #Single part geometry as the multi part type of its layer
+    if geometry_type == 'MultiPolygon' and geom['type'] == 'Polygon':
+        return {'type': 'MultiPolygon', 'coordinates': [geom['coordinates']]}
+    if geometry_type == 'MultiLineString' and geom['type'] == 'LineString':
+        return {'type': 'MultiLineString', 'coordinates': [geom['coordinates']]}
+    if geometry_type == 'MultiPoint' and geom['type'] == 'Point':
+        return {'type': 'MultiPoint', 'coordinates': [geom['coordinates']]}
+    return geom
+
+
+def _value(value):
+    #Dates are written as ISO 8601 text
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+# ---------------------------------------------------------------------------
+#   WKB
+# ---------------------------------------------------------------------------
+
+WKB_TYPES = {'Point': 1, 'LineString': 2, 'Polygon': 3, 'MultiPoint': 4,
+             'MultiLineString': 5, 'MultiPolygon': 6, 'GeometryCollection': 7}
+WKB_NAMES = dict((v, k) for k, v in WKB_TYPES.items())
+
+
+def _wkb_points(points):
+    points = list(points)
+    return struct.pack('<I', len(points)) + b''.join(struct.pack('<2d', p[0], p[1]) for p in points)
+
+
+def to_wkb(geom):
+    kind = geom['type']
+    head = struct.pack('<BI', 1, WKB_TYPES[kind])
+    if kind == 'Point':
+        return head + struct.pack('<2d', geom['coordinates'][0], geom['coordinates'][1])
+    if kind == 'LineString':
+        return head + _wkb_points(geom['coordinates'])
+    if kind == 'Polygon':
+        rings = geom['coordinates']
+        return head + struct.pack('<I', len(rings)) + b''.join(_wkb_points(r) for r in rings)
+    if kind == 'GeometryCollection':
+        parts = geom['geometries']
+        return head + struct.pack('<I', len(parts)) + b''.join(to_wkb(g) for g in parts)
+    part = {'MultiPoint': 'Point', 'MultiLineString': 'LineString', 'MultiPolygon': 'Polygon'}[kind]
+    parts = geom['coordinates']
+    return head + struct.pack('<I', len(parts)) + b''.join(to_wkb({'type': part, 'coordinates': p}) for p in parts)
+
+
+def _read_wkb(data, pos):
+    order = '<' if bytearray(data[pos:pos + 1])[0] == 1 else '>'
+    kind = WKB_NAMES[struct.unpack_from(order + 'I', data, pos + 1)[0] % 1000]
+    pos += 5
+
+    def points(pos):
+        count = struct.unpack_from(order + 'I', data, pos)[0]
+        values = struct.unpack_from(order + '%dd' % (2 * count), data, pos + 4)
+        return [(values[i], values[i + 1]) for i in range(0, 2 * count, 2)], pos + 4 + 16 * count
+
+    if kind == 'Point':
+        return {'type': kind, 'coordinates': struct.unpack_from(order + '2d', data, pos)}, pos + 16
+    if kind == 'LineString':
+        coords, pos = points(pos)
+        return {'type': kind, 'coordinates': coords}, pos
+    count = struct.unpack_from(order + 'I', data, pos)[0]
+    pos += 4
+    if kind == 'Polygon':
+        rings = []
+        for _ in range(count):
+            ring, pos = points(pos)
+            rings.append(ring)
+        return {'type': kind, 'coordinates': rings}, pos
+    parts = []
+    for _ in range(count):
+        part, pos = _read_wkb(data, pos)
+        parts.append(part)
+    if kind == 'GeometryCollection':
+        return {'type': kind, 'geometries': parts}, pos
+    return {'type': kind, 'coordinates': [p['coordinates'] for p in parts]}, pos
+
+
+def from_wkb(data):
+    return _read_wkb(data, 0)[0]
+
+
+# ---------------------------------------------------------------------------
+#   GeoPackage
+# ---------------------------------------------------------------------------
+
+GPKG_APPLICATION_ID = 0x47504B47
+GPKG_USER_VERSION = 10200
+GPKG_COLUMN_TYPES = {'text': 'TEXT', 'integer': 'INTEGER', 'real': 'DOUBLE', 'datetime': 'DATETIME'}
+
+RTREE_TRIGGERS = [
+    'CREATE TRIGGER "rtree_{t}_{c}_insert" AFTER INSERT ON "{t}" WHEN (new."{c}" NOT NULL AND NOT ST_IsEmpty(NEW."{c}")) '
+    'BEGIN INSERT OR REPLACE INTO "rtree_{t}_{c}" VALUES (NEW."{i}", ST_MinX(NEW."{c}"), ST_MaxX(NEW."{c}"), '
+    'ST_MinY(NEW."{c}"), ST_MaxY(NEW."{c}")); END',
+    'CREATE TRIGGER "rtree_{t}_{c}_update1" AFTER UPDATE OF "{c}" ON "{t}" WHEN OLD."{i}" = NEW."{i}" AND '
+    '(NEW."{c}" NOTNULL AND NOT ST_IsEmpty(NEW."{c}")) BEGIN INSERT OR REPLACE INTO "rtree_{t}_{c}" VALUES '
+    '(NEW."{i}", ST_MinX(NEW."{c}"), ST_MaxX(NEW."{c}"), ST_MinY(NEW."{c}"), ST_MaxY(NEW."{c}")); END',
+    'CREATE TRIGGER "rtree_{t}_{c}_update2" AFTER UPDATE OF "{c}" ON "{t}" WHEN OLD."{i}" = NEW."{i}" AND '
+    '(NEW."{c}" ISNULL OR ST_IsEmpty(NEW."{c}")) BEGIN DELETE FROM "rtree_{t}_{c}" WHERE id = OLD."{i}"; END',
+    'CREATE TRIGGER "rtree_{t}_{c}_update3" AFTER UPDATE ON "{t}" WHEN OLD."{i}" != NEW."{i}" AND '
+    '(NEW."{c}" NOTNULL AND NOT ST_IsEmpty(NEW."{c}")) BEGIN DELETE FROM "rtree_{t}_{c}" WHERE id = OLD."{i}"; '
+    'INSERT OR REPLACE INTO "rtree_{t}_{c}" VALUES (NEW."{i}", ST_MinX(NEW."{c}"), ST_MaxX(NEW."{c}"), '
+    'ST_MinY(NEW."{c}"), ST_MaxY(NEW."{c}")); END',
+    'CREATE TRIGGER "rtree_{t}_{c}_update4" AFTER UPDATE ON "{t}" WHEN OLD."{i}" != NEW."{i}" AND '
+    '(NEW."{c}" ISNULL OR ST_IsEmpty(NEW."{c}")) BEGIN DELETE FROM "rtree_{t}_{c}" WHERE id IN (OLD."{i}", NEW."{i}"); END',
+    'CREATE TRIGGER "rtree_{t}_{c}_delete" AFTER DELETE ON "{t}" WHEN old."{c}" NOT NULL '
+    'BEGIN DELETE FROM "rtree_{t}_{c}" WHERE id = OLD."{i}"; END',
+]
+
+
+def _create_geopackage(connection):
+    connection.execute('PRAGMA application_id = %d' % GPKG_APPLICATION_ID)
+    connection.execute('PRAGMA user_version = %d' % GPKG_USER_VERSION)
+    connection.execute('CREATE TABLE gpkg_spatial_ref_sys (srs_name TEXT NOT NULL, srs_id INTEGER NOT NULL PRIMARY KEY, '
+                       'organization TEXT NOT NULL, organization_coordsys_id INTEGER NOT NULL, '
+                       'definition TEXT NOT NULL, description TEXT)')
+    connection.executemany('INSERT INTO gpkg_spatial_ref_sys VALUES (?, ?, ?, ?, ?, ?)', [
+        ('Undefined cartesian SRS', -1, 'NONE', -1, 'undefined', None),
+        ('Undefined geographic SRS', 0, 'NONE', 0, 'undefined', None),
+        ('WGS 84 geodetic', 4326, 'EPSG', 4326, WGS84_WKT, None),
+        ('NAD83 / BC Albers', 3005, 'EPSG', 3005, BC_ALBERS_WKT, None)])
+    connection.execute('CREATE TABLE gpkg_contents (table_name TEXT NOT NULL PRIMARY KEY, data_type TEXT NOT NULL, '
+                       'identifier TEXT UNIQUE, description TEXT DEFAULT \'\', '
+                       'last_change DATETIME NOT NULL DEFAULT (strftime(\'%Y-%m-%dT%H:%M:%fZ\',\'now\')), '
+                       'min_x DOUBLE, min_y DOUBLE, max_x DOUBLE, max_y DOUBLE, srs_id INTEGER, '
+                       'CONSTRAINT fk_gc_r_srs_id FOREIGN KEY (srs_id) REFERENCES gpkg_spatial_ref_sys(srs_id))')
+    connection.execute('CREATE TABLE gpkg_geometry_columns (table_name TEXT NOT NULL, column_name TEXT NOT NULL, '
+                       'geometry_type_name TEXT NOT NULL, srs_id INTEGER NOT NULL, z TINYINT NOT NULL, '
+                       'm TINYINT NOT NULL, CONSTRAINT pk_geom_cols PRIMARY KEY (table_name, column_name), '
+                       'CONSTRAINT fk_gc_tn FOREIGN KEY (table_name) REFERENCES gpkg_contents(table_name), '
+                       'CONSTRAINT fk_gc_srs FOREIGN KEY (srs_id) REFERENCES gpkg_spatial_ref_sys (srs_id))')
+    connection.execute('CREATE TABLE gpkg_extensions (table_name TEXT, column_name TEXT, extension_name TEXT NOT NULL, '
+                       'definition TEXT NOT NULL, scope TEXT NOT NULL, '
+                       'CONSTRAINT ge_tce UNIQUE (table_name, column_name, extension_name))')
+
+
+def geopackage_blob(geom, srs_id=SPATIAL_REFERENCE):
+    #GeoPackage binary: magic, version, flags (little endian, xy envelope), srs id, envelope, WKB
+    box = Geometry_Core.bbox(geom)
+    return (b'GP' + struct.pack('<BBi', 0, 0x03, srs_id) +
+            struct.pack('<4d', box[0], box[2], box[1], box[3]) + to_wkb(geom))
+
+
+def read_geopackage_blob(blob):
+    blob = bytes(blob)
+    flags = bytearray(blob[3:4])[0]
+    envelope = {0: 0, 1: 32, 2: 48, 3: 48, 4: 64}[(flags >> 1) & 0x07]
+    return from_wkb(blob[8 + envelope:])
+
+
+class GeoPackageLayer(object):
+    #One feature table in a GeoPackage, created (with the GeoPackage itself if
+    #it doesn't exist yet) when the layer is opened. fields is a list of
+    #(name, type) with the types in FIELD_TYPES.
+
+    def __init__(self, path, table, fields, geometry_type='Unknown', srs_id=SPATIAL_REFERENCE, srs_wkt=None):
+        self.path = path
+        self.table = table
+        self.fields = list(fields)
+        self.geometry_type = geometry_type
+        self.srs_id = srs_id
+        self.count = 0
+        self.extent = None
+        new = not os.path.exists(path)
+        self.connection = sqlite3.connect(path)
+        if new:
+            _create_geopackage(self.connection)
+        if srs_wkt and not self.connection.execute('SELECT 1 FROM gpkg_spatial_ref_sys WHERE srs_id = ?',
+                                                   (srs_id,)).fetchone():
+            self.connection.execute('INSERT INTO gpkg_spatial_ref_sys VALUES (?, ?, ?, ?, ?, ?)',
+                                    (table, srs_id, 'EPSG' if srs_id > 0 else 'NONE', srs_id, srs_wkt, None))
+        self.connection.execute('DROP TABLE IF EXISTS "%s"' % table)
+        self.connection.execute('DROP TABLE IF EXISTS "rtree_%s_geom"' % table)
+        for name in ('gpkg_contents', 'gpkg_geometry_columns', 'gpkg_extensions'):
+            self.connection.execute('DELETE FROM %s WHERE table_name = ?' % name, (table,))
+        columns = ''.join(', "%s" %s' % (name, GPKG_COLUMN_TYPES[kind]) for name, kind in self.fields)
+        self.column_type = 'GEOMETRY' if geometry_type == 'Unknown' else geometry_type.upper()
+        self.connection.execute('CREATE TABLE "%s" (fid INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL, geom %s%s)'
+                                % (table, self.column_type, columns))
+        self.connection.execute('CREATE VIRTUAL TABLE "rtree_%s_geom" USING rtree(id, minx, maxx, miny, maxy)' % table)
+        self._insert = 'INSERT INTO "%s" (geom%s) VALUES (?%s)' % (
+            table, ''.join(', "%s"' % name for name, _ in self.fields), ', ?' * len(self.fields))
+        self._index = 'INSERT INTO "rtree_%s_geom" VALUES (?, ?, ?, ?, ?)' % table
+
+    def insert(self, geom, values):
+        #A feature without a geometry gets a NULL geom and no index entry
+        if geom is None:
+            self.connection.execute(self._insert, [None] + [_value(v) for v in values])
+            self.count += 1
+            return
+        geom = promote(geom, self.geometry_type)
+        box = Geometry_Core.bbox(geom)
+        cursor = self.connection.execute(self._insert, [sqlite3.Binary(geopackage_blob(geom, self.srs_id))] +
+                                         [_value(v) for v in values])
+        self.connection.execute(self._index, (cursor.lastrowid, box[0], box[2], box[1], box[3]))
+        self.extent = box if self.extent is None else Geometry_Core.bbox_union([self.extent, box])
+        self.count += 1
+
+    def close(self):
+        extent = self.extent or (None, None, None, None)
+        self.connection.execute('INSERT INTO gpkg_contents (table_name, data_type, identifier, min_x, min_y, max_x, max_y, '
+                                'srs_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                                (self.table, 'features', self.table) + tuple(extent) + (self.srs_id,))
+        self.connection.execute('INSERT INTO gpkg_geometry_columns VALUES (?, ?, ?, ?, 0, 0)',
+                                (self.table, 'geom', self.column_type, self.srs_id))
+        self.connection.execute('INSERT INTO gpkg_extensions VALUES (?, ?, ?, ?, ?)',
+                                (self.table, 'geom', 'gpkg_rtree_index',
+                                 'http://www.geopackage.org/spec120/#extension_rtree', 'write-only'))
+        #The triggers keep the index current when other software edits the table,
+        #they use functions GeoPackage readers provide so they go in last
+        for trigger in RTREE_TRIGGERS:
+            self.connection.execute(trigger.format(t=self.table, c='geom', i='fid'))
+        self.connection.commit()
+        self.connection.close()
+        return self.count
+
+
+def read_geopackage(path, table, box=None):
+    #Yields (fid, geometry, {field: value}), only the features whose bounding box
+    #meets box (min x, min y, max x, max y) when it's given, found with the R-tree
+    connection = sqlite3.connect(path)
+    try:
+        cursor = connection.execute('SELECT * FROM "%s" LIMIT 0' % table)
+        names = [d[0] for d in cursor.description]
+        if box is None:
+            cursor = connection.execute('SELECT * FROM "%s"' % table)
+        else:
+            cursor = connection.execute('SELECT t.* FROM "%s" t JOIN "rtree_%s_geom" r ON t.fid = r.id '
+                                        'WHERE r.minx <= ? AND r.maxx >= ? AND r.miny <= ? AND r.maxy >= ?'
+                                        % (table, table), (box[2], box[0], box[3], box[1]))
+        for row in cursor:
+            values = dict(zip(names, row))
+            fid = values.pop('fid')
+            blob = values.pop('geom')
+            yield fid, read_geopackage_blob(blob) if blob is not None else None, values
+    finally:
+        connection.close()
+
+
+# ---------------------------------------------------------------------------
+#   FlatBuffers, just enough to write and read the FlatGeobuf tables. Buffers
+#   are laid out front to back: vtable, table, then the strings, vectors and
+#   tables it refers to, each aligned from the start of the buffer.
+# ---------------------------------------------------------------------------
+
+_SCALARS = {'bool': ('<B', 1), 'ubyte': ('<B', 1), 'ushort': ('<H', 2), 'int': ('<i', 4),
+            'uint': ('<I', 4), 'ulong': ('<Q', 8), 'double': ('<d', 8)}
+
+
+def _pad(buf, align, extra=0):
+    #Pads buf so that len(buf) + extra is a multiple of align
+    while (len(buf) + extra) % align:
+        buf.append(0)
+
+
+def _fb_table(buf, fields):
+    #fields: list of (slot, kind, value), kind is a _SCALARS name or 'string',
+    #('vector', element kind), 'table' (a fields list) or 'tables'
+    present = [f for f in fields if f[2] is not None]
+    sizes = [(_SCALARS[k][1] if k in _SCALARS else 4) for _, k, _ in present]
+    layout = []
+    offset = 4
+    for (slot, kind, value), size in sorted(zip(present, sizes), key=lambda p: -p[1]):
+        while offset % size:
+            offset += 1
+        layout.append((slot, kind, value, offset))
+        offset += size
+    slots = max([f[0] for f in present] or [-1]) + 1
+    vtable = [4 + 2 * slots, offset] + [0] * slots
+    for slot, kind, value, field_offset in layout:
+        vtable[2 + slot] = field_offset
+    _pad(buf, 2)
+    vtable_pos = len(buf)
+    buf.extend(struct.pack('<%dH' % len(vtable), *vtable))
+    _pad(buf, 8)
+    table_pos = len(buf)
+    buf.extend(b'\0' * offset)
+    struct.pack_into('<i', buf, table_pos, table_pos - vtable_pos)
+    children = []
+    for slot, kind, value, field_offset in layout:
+        if kind in _SCALARS:
+            struct.pack_into(_SCALARS[kind][0], buf, table_pos + field_offset, value)
+        else:
+            children.append((table_pos + field_offset, kind, value))
+    for field_pos, kind, value in children:
+        struct.pack_into('<I', buf, field_pos, _fb_child(buf, kind, value) - field_pos)
+    return table_pos
+
+
+def _fb_child(buf, kind, value):
+    if kind == 'string':
+        data = value.encode('utf-8') if not isinstance(value, bytes) else value
+        _pad(buf, 4)
+        pos = len(buf)
+        buf.extend(struct.pack('<I', len(data)) + data + b'\0')
+        return pos
+    if kind == 'table':
+        return _fb_table(buf, value)
+    if kind == 'tables':
+        _pad(buf, 4)
+        pos = len(buf)
+        buf.extend(struct.pack('<I', len(value)) + b'\0' * (4 * len(value)))
+        for n, fields in enumerate(value):
+            slot = pos + 4 + 4 * n
+            struct.pack_into('<I', buf, slot, _fb_table(buf, fields) - slot)
+        return pos
+    fmt, size = _SCALARS[kind[1]]
+    _pad(buf, max(4, size), 4)
+    pos = len(buf)
+    if isinstance(value, (bytes, bytearray)):
+        buf.extend(struct.pack('<I', len(value)) + bytes(value))
+    else:
+        buf.extend(struct.pack('<I%d%s' % (len(value), fmt[1]), len(value), *value))
+    return pos
+
+
+def fb_buffer(fields):
+    #A size prefixed buffer with fields as the root table
+    buf = bytearray(8)
+    root = _fb_table(buf, fields)
+    _pad(buf, 8)
+    struct.pack_into('<I', buf, 4, root - 4)
+    struct.pack_into('<I', buf, 0, len(buf) - 4)
+    return bytes(buf)
+
+
+class _FBTable(object):
+    #Reads fields of a table in buf (the buffer after its size prefix)
+
+    def __init__(self, buf, pos):
+        self.buf = buf
+        self.pos = pos
+        self.vtable = pos - struct.unpack_from('<i', buf, pos)[0]
+        self.vtable_size = struct.unpack_from('<H', buf, self.vtable)[0]
+
+    def _field(self, slot):
+        entry = 4 + 2 * slot
+        if entry >= self.vtable_size:
+            return None
+        offset = struct.unpack_from('<H', self.buf, self.vtable + entry)[0]
+        return self.pos + offset if offset else None
+
+    def _target(self, slot):
+        pos = self._field(slot)
+        return None if pos is None else pos + struct.unpack_from('<I', self.buf, pos)[0]
+
+    def scalar(self, slot, kind, default=0):
+        pos = self._field(slot)
+        return default if pos is None else struct.unpack_from(_SCALARS[kind][0], self.buf, pos)[0]
+
+    def string(self, slot):
+        pos = self._target(slot)
+        if pos is None:
+            return None
+        length = struct.unpack_from('<I', self.buf, pos)[0]
+        return bytes(self.buf[pos + 4:pos + 4 + length]).decode('utf-8')
+
+    def vector(self, slot, kind):
+        pos = self._target(slot)
+        if pos is None:
+            return None
+        length = struct.unpack_from('<I', self.buf, pos)[0]
+        if kind == 'ubyte':
+            return bytes(self.buf[pos + 4:pos + 4 + length])
+        return struct.unpack_from('<%d%s' % (length, _SCALARS[kind][0][1]), self.buf, pos + 4)
+
+    def table(self, slot):
+        pos = self._target(slot)
+        return None if pos is None else _FBTable(self.buf, pos)
+
+    def tables(self, slot):
+        pos = self._target(slot)
+        if pos is None:
+            return []
+        length = struct.unpack_from('<I', self.buf, pos)[0]
+        result = []
+        for n in range(length):
+            item = pos + 4 + 4 * n
+            result.append(_FBTable(self.buf, item + struct.unpack_from('<I', self.buf, item)[0]))
+        return result
+
+
+def fb_root(buf):
+    #Root table of a buffer without its size prefix
+    return _FBTable(buf, struct.unpack_from('<I', buf, 0)[0])
+
+
+# ---------------------------------------------------------------------------
+#   FlatGeobuf
+# ---------------------------------------------------------------------------
+
+FGB_MAGIC = b'fgb\x03fgb\x01'
+FGB_NODE_SIZE = 16
+FGB_NODE_ITEM = struct.Struct('<4dQ')
+FGB_GEOMETRY_TYPES = {'Unknown': 0, 'Point': 1, 'LineString': 2, 'Polygon': 3, 'MultiPoint': 4,
+                      'MultiLineString': 5, 'MultiPolygon': 6, 'GeometryCollection': 7}
+FGB_GEOMETRY_NAMES = dict((v, k) for k, v in FGB_GEOMETRY_TYPES.items())
+#   ColumnType: Long, Double, String, DateTime
+FGB_COLUMN_TYPES = {'integer': 7, 'real': 10, 'text': 11, 'datetime': 13}
+
+
+def hilbert(x, y):
+    #Position of (x, y), both 0-65535, along a Hilbert curve
+    a = x ^ y
+    b = 0xFFFF ^ a
+    c = 0xFFFF ^ (x | y)
+    d = x & (y ^ 0xFFFF)
+    A = a | (b >> 1)
+    B = (a >> 1) ^ a
+    C = ((c >> 1) ^ (b & (d >> 1))) ^ c
+    D = ((a & (c >> 1)) ^ (d >> 1)) ^ d
+    for shift in (2, 4):
+        a, b, c, d = A, B, C, D
+        A = (a & (a >> shift)) ^ (b & (b >> shift))
+        B = (a & (b >> shift)) ^ (b & ((a ^ b) >> shift))
+        C ^= (a & (c >> shift)) ^ (b & (d >> shift))
+        D ^= (b & (c >> shift)) ^ ((a ^ b) & (d >> shift))
+    a, b, c, d = A, B, C, D
+    C ^= (a & (c >> 8)) ^ (b & (d >> 8))
+    D ^= (b & (c >> 8)) ^ ((a ^ b) & (d >> 8))
+    a = C ^ (C >> 1)
+    b = D ^ (D >> 1)
+    i0 = x ^ y
+    i1 = b | (0xFFFF ^ (i0 | a))
+
+    def spread(v):
+        v = (v | (v << 8)) & 0x00FF00FF
+        v = (v | (v << 4)) & 0x0F0F0F0F
+        v = (v | (v << 2)) & 0x33333333
+        return (v | (v << 1)) & 0x55555555
+
+    return (spread(i1) << 1) | spread(i0)
+
+
+def level_bounds(count, node_size=FGB_NODE_SIZE):
+    #(start, end) of each level of the packed tree in node items, leaves first.
+    #The root is item 0 and the leaves are the last count items.
+    sizes = [count]
+    n = count
+    total = count
+    while True:
+        n = int(math.ceil(n / node_size))
+        total += n
+        sizes.append(n)
+        if n == 1:
+            break
+    bounds = []
+    end = total
+    for size in sizes:
+        bounds.append((end - size, end))
+        end -= size
+    return bounds, total
+
+
+def packed_tree(boxes, offsets, node_size=FGB_NODE_SIZE):
+    #Node items (min x, min y, max x, max y, offset) of a packed R-tree over
+    #the sorted leaf boxes. Parents point at the index of their first child.
+    bounds, total = level_bounds(len(boxes), node_size)
+    nodes = [None] * total
+    start = bounds[0][0]
+    for n, (box, offset) in enumerate(zip(boxes, offsets)):
+        nodes[start + n] = (box[0], box[1], box[2], box[3], offset)
+    for level in range(len(bounds) - 1):
+        pos, end = bounds[level]
+        parent = bounds[level + 1][0]
+        while pos < end:
+            first = pos
+            box = list(nodes[pos][:4])
+            pos += 1
+            while pos < end and pos - first < node_size:
+                item = nodes[pos]
+                box = [min(box[0], item[0]), min(box[1], item[1]), max(box[2], item[2]), max(box[3], item[3])]
+                pos += 1
+            nodes[parent] = (box[0], box[1], box[2], box[3], first)
+            parent += 1
+    return nodes
+
+
+def _fgb_geometry(geom):
+    #Geometry table fields: ends 0, xy 1, type 6, parts 7
+    kind = geom['type']
+    fields = [(6, 'ubyte', FGB_GEOMETRY_TYPES[kind])]
+    if kind == 'Point':
+        return fields + [(1, ('vector', 'double'), list(geom['coordinates'][:2]))]
+    if kind in ('LineString', 'MultiPoint'):
+        sequences = [geom['coordinates']]
+    elif kind in ('Polygon', 'MultiLineString'):
+        sequences = geom['coordinates']
+    elif kind == 'MultiPolygon':
+        return fields + [(7, 'tables', [_fgb_geometry({'type': 'Polygon', 'coordinates': p})
+                                        for p in geom['coordinates']])]
+    else:
+        return fields + [(7, 'tables', [_fgb_geometry(g) for g in geom['geometries']])]
+    xy = []
+    ends = []
+    for sequence in sequences:
+        for p in sequence:
+            xy.append(p[0])
+            xy.append(p[1])
+        ends.append(len(xy) // 2)
+    fields.append((1, ('vector', 'double'), xy))
+    if len(ends) > 1:
+        fields.append((0, ('vector', 'uint'), ends))
+    return fields
+
+
+def _fgb_properties(columns, values):
+    data = bytearray()
+    for n, ((name, kind), value) in enumerate(zip(columns, values)):
+        value = _value(value)
+        if value is None:
+            continue
+        data.extend(struct.pack('<H', n))
+        if kind == 'integer':
+            data.extend(struct.pack('<q', int(value)))
+        elif kind == 'real':
+            data.extend(struct.pack('<d', float(value)))
+        else:
+            text = value if isinstance(value, bytes) else (u'%s' % (value,)).encode('utf-8')
+            data.extend(struct.pack('<I', len(text)) + text)
+    return bytes(data)
+
+
+def _read_geometry(table, kind=None):
+    kind = FGB_GEOMETRY_NAMES[table.scalar(6, 'ubyte', 0)] if table.scalar(6, 'ubyte', 0) else kind
+    if kind == 'MultiPolygon':
+        return {'type': kind, 'coordinates': [_read_geometry(p, 'Polygon')['coordinates'] for p in table.tables(7)]}
+    if kind == 'GeometryCollection':
+        return {'type': kind, 'geometries': [_read_geometry(p) for p in table.tables(7)]}
+    xy = table.vector(1, 'double') or ()
+    points = [(xy[i], xy[i + 1]) for i in range(0, len(xy), 2)]
+    if kind == 'Point':
+        return {'type': kind, 'coordinates': points[0]}
+    if kind in ('LineString', 'MultiPoint'):
+        return {'type': kind, 'coordinates': points}
+    ends = table.vector(0, 'uint') or (len(points),)
+    sequences = []
+    start = 0
+    for end in ends:
+        sequences.append(points[start:end])
+        start = end
+    return {'type': kind, 'coordinates': sequences}
+
+
+class FlatGeobufLayer(object):
+    #Writes one FlatGeobuf file. Features go to a temp file as they're inserted,
+    #close() sorts them along a Hilbert curve, writes the header and packed
+    #R-tree and copies the features in after it.
+
+    def __init__(self, path, name, fields, geometry_type='Unknown', srs_id=SPATIAL_REFERENCE):
+        self.path = path
+        self.name = name
+        self.fields = list(fields)
+        self.geometry_type = geometry_type
+        self.srs_id = srs_id
+        self.count = 0
+        self.extent = None
+        folder = os.path.dirname(os.path.abspath(path))
+        fd, self.temp_path = tempfile.mkstemp(suffix='.fgbtmp', dir=folder)
+        self.temp = os.fdopen(fd, 'w+b')
+        #(min x, min y, max x, max y, temp offset, size) per feature
+        self.items = []
+
+    def insert(self, geom, values):
+        properties = (1, ('vector', 'ubyte'), _fgb_properties(self.fields, values))
+        if geom is None:
+            #Indexed with an empty box at the origin, no search ever meets it
+            data = fb_buffer([properties])
+            self.items.append((0.0, 0.0, 0.0, 0.0, self.temp.tell(), len(data)))
+        else:
+            geom = promote(geom, self.geometry_type)
+            box = Geometry_Core.bbox(geom)
+            data = fb_buffer([(0, 'table', _fgb_geometry(geom)), properties])
+            self.items.append((box[0], box[1], box[2], box[3], self.temp.tell(), len(data)))
+            self.extent = box if self.extent is None else Geometry_Core.bbox_union([self.extent, box])
+        self.temp.write(data)
+        self.count += 1
+
+    def _header(self, node_size):
+        columns = [[(0, 'string', name), (1, 'ubyte', FGB_COLUMN_TYPES[kind])] for name, kind in self.fields]
+        return fb_buffer([(0, 'string', self.name),
+                          (1, ('vector', 'double'), list(self.extent) if self.extent else None),
+                          (2, 'ubyte', FGB_GEOMETRY_TYPES[self.geometry_type]),
+                          (7, 'tables', columns or None),
+                          (8, 'ulong', self.count),
+                          (9, 'ushort', node_size),
+                          (10, 'table', [(0, 'string', 'EPSG'), (1, 'int', self.srs_id)])])
+
+    def close(self):
+        node_size = FGB_NODE_SIZE if self.count else 0
+        items = self.items
+        if items and self.extent:
+            ex = self.extent
+            width = (ex[2] - ex[0]) or 1.0
+            height = (ex[3] - ex[1]) or 1.0
+
+            def key(item):
+                x = int(65535 * ((item[0] + item[2]) / 2 - ex[0]) / width)
+                y = int(65535 * ((item[1] + item[3]) / 2 - ex[1]) / height)
+                return hilbert(min(max(x, 0), 65535), min(max(y, 0), 65535))
+
+            items.sort(key=key)
+        offsets = []
+        position = 0
+        for item in items:
+            offsets.append(position)
+            position += item[5]
+        with open(self.path, 'wb') as f:
+            f.write(FGB_MAGIC)
+            f.write(self._header(node_size))
+            if items:
+                for node in packed_tree([item[:4] for item in items], offsets):
+                    f.write(FGB_NODE_ITEM.pack(*node))
+            for item in items:
+                self.temp.seek(item[4])
+                f.write(self.temp.read(item[5]))
+        self.temp.close()
+        os.remove(self.temp_path)
+        self.items = []
+        return self.count
+
+
+class FlatGeobufReader(object):
+    #Reads the header of a FlatGeobuf file, features() yields (geometry,
+    #{field: value}) for all features or, through the index, the ones whose
+    #bounding box meets box (min x, min y, max x, max y)
+
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        if self.file.read(8)[:4] != FGB_MAGIC[:4]:
+            raise ValueError(path + ' is not a FlatGeobuf file')
+        size = struct.unpack('<I', self.file.read(4))[0]
+        header = fb_root(self.file.read(size))
+        self.name = header.string(0)
+        self.extent = header.vector(1, 'double')
+        self.geometry_type = FGB_GEOMETRY_NAMES[header.scalar(2, 'ubyte', 0)]
+        self.fields = [(c.string(0), c.scalar(1, 'ubyte', 0)) for c in header.tables(7)]
+        self.count = header.scalar(8, 'ulong', 0)
+        self.node_size = header.scalar(9, 'ushort', FGB_NODE_SIZE)
+        crs = header.table(10)
+        self.srs_id = crs.scalar(1, 'int', 0) if crs else None
+        self.index_start = 12 + size
+        self.nodes = 0
+        if self.node_size and self.count:
+            self.bounds, self.nodes = level_bounds(self.count, self.node_size)
+        self.features_start = self.index_start + self.nodes * FGB_NODE_ITEM.size
+
+    def _properties(self, data):
+        values = {}
+        pos = 0
+        while pos < len(data):
+            n = struct.unpack_from('<H', data, pos)[0]
+            name, kind = self.fields[n]
+            pos += 2
+            if kind == 7:
+                values[name] = struct.unpack_from('<q', data, pos)[0]
+                pos += 8
+            elif kind == 10:
+                values[name] = struct.unpack_from('<d', data, pos)[0]
+                pos += 8
+            else:
+                length = struct.unpack_from('<I', data, pos)[0]
+                values[name] = data[pos + 4:pos + 4 + length].decode('utf-8')
+                pos += 4 + length
+        return values
+
+    def _feature(self, offset=None):
+        if offset is not None:
+            self.file.seek(self.features_start + offset)
+        size = struct.unpack('<I', self.file.read(4))[0]
+        feature = fb_root(self.file.read(size))
+        geometry = feature.table(0)
+        geom = _read_geometry(geometry, self.geometry_type) if geometry else None
+        return geom, self._properties(feature.vector(1, 'ubyte') or b'')
+
+    def _node_items(self, start, end):
+        self.file.seek(self.index_start + start * FGB_NODE_ITEM.size)
+        data = self.file.read((end - start) * FGB_NODE_ITEM.size)
+        return [FGB_NODE_ITEM.unpack_from(data, n * FGB_NODE_ITEM.size) for n in range(end - start)]
+
+    def search(self, box):
+        #Byte offsets of the features whose box meets box, in file order
+        leaves = self.nodes - self.count
+        found = []
+        queue = [(0, len(self.bounds) - 1)]
+        while queue:
+            start, level = queue.pop()
+            end = min(start + self.node_size, self.bounds[level][1])
+            for n, item in enumerate(self._node_items(start, end)):
+                if item[0] > box[2] or item[2] < box[0] or item[1] > box[3] or item[3] < box[1]:
+                    continue
+                if start + n >= leaves:
+                    found.append(item[4])
+                else:
+                    queue.append((item[4], level - 1))
+        return sorted(found)
+
+    def features(self, box=None):
+        if box is None or not self.nodes:
+            self.file.seek(self.features_start)
+            for _ in range(self.count):
+                geom, values = self._feature()
+                if box is None or (geom is not None and Geometry_Core.bbox_intersects(Geometry_Core.bbox(geom), box)):
+                    yield geom, values
+            return
+        for offset in self.search(box):
+            yield self._feature(offset)
+
+    def close(self):
+        self.file.close()
+
+
+def read_flatgeobuf(path, box=None):
+    reader = FlatGeobufReader(path)
+    try:
+        for feature in reader.features(box):
+            yield feature
+    finally:
+        reader.close()
+
+
+def open_layer(format, path, name, fields, geometry_type, srs_id=SPATIAL_REFERENCE, srs_wkt=None):
+    #A GeoPackage table or FlatGeobuf file with insert(geometry, values) and close().
+    #srs_wkt describes srs_id when the GeoPackage doesn't know it yet.
+    if format == 'gpkg':
+        return GeoPackageLayer(path, name, fields, geometry_type, srs_id, srs_wkt)
+    if format == 'fgb':
+        return FlatGeobufLayer(path, name, fields, geometry_type, srs_id)
+    raise ValueError('Unknown package format ' + format)
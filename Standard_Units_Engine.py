@@ -0,0 +1,288 @@
+# ---------------------------------------------------------------------------
+# Standard_Units_Engine.py
+# Created on: Oct 18, 2026
+#
+# Description: Standard units for many blocks at once, the CoP_example steps
+#           (buffer the roads by 10 m, clip to the block, dissolve the PAS,
+#           erase it from the block, merge with the Productive remainder) done
+#           block by block in pure python. Each block only gets the road
+#           segments that come within the buffer width of it, found through an
+#           STR tree over the roads, and its PAS and Productive polygons are
+#           worked out with Block_Dissolve: the segment buffers are unioned,
+#           then intersected with and subtracted from the block.
+#
+#           The geometry core (road_buffer, standard_units, run_job) has no
+#           arcpy dependency. Blocks are processed independently on the
+#           Worker_Pool processes running this file (python.exe, so the pool
+#           also works inside ArcMap), each writing its results as it goes. A
+#           block that fails is reported and the others carry on.
+#
+#           Output is one feature class with a PAS and a Productive polygon
+#           per block (BLOCK_ID, STUN_ID, AREA_HA) and the time each block took
+#           is logged and can be written to a CSV.
+#
+# Usage:    python Standard_Units_Engine.py <blocks> <roads> <output feature class>
+#               [--id-field CUTB_SEQ_NBR] [--where EXPR] [--width 10] [--processes 4] [--timings CSV]
+#
+# Author:   Daniel Otto
+# ---------------------------------------------------------------------------
+
+from __future__ import division
+
+import csv
+import math
+import os
+import sys
+import time
+import traceback
+from argparse import ArgumentParser
+
+sys.path.insert(1, os.path.dirname(os.path.abspath(__file__)))
+import Block_Dissolve
+import Geometry_Core
+import Worker_Pool
+
+ROAD_BUFFER = 10.0
+#   Straight segments used for each quarter circle of a buffer end
+QUADRANT_SEGMENTS = 8
+PAS = 'PAS'
+PRODUCTIVE = 'Productive'
+TIMING_FIELDS = ['BLOCK_ID', 'STATUS', 'ROAD_SEGMENTS', 'SECONDS', 'ERROR']
+
+
+# ---------------------------------------------------------------------------
+#   Geometry
+# ---------------------------------------------------------------------------
+
+def capsule(a, b, width, quadrant_segments=QUADRANT_SEGMENTS):
+    #Buffer of the segment a-b, counter-clockwise ring with round ends
+    theta = math.atan2(b[1] - a[1], b[0] - a[0])
+    steps = 2 * quadrant_segments
+    ring = []
+    for centre, start in ((b, theta - math.pi / 2), (a, theta + math.pi / 2)):
+        for k in range(steps + 1):
+            angle = start + math.pi * k / steps
+            ring.append((centre[0] + width * math.cos(angle), centre[1] + width * math.sin(angle)))
+    ring.append(ring[0])
+    return ring
+
+
+def road_segments(lines, box=None):
+    #Segments of the lines, only those whose box meets box when it's given
+    segments = []
+    for line in lines:
+        for i in range(len(line) - 1):
+            a, b = (line[i][0], line[i][1]), (line[i + 1][0], line[i + 1][1])
+            if a == b:
+                continue
+            if box is None or Geometry_Core.bbox_intersects(Geometry_Core._segment_box((a, b)), box):
+                segments.append((a, b))
+    return segments
+
+
+def road_buffer(segments, width=ROAD_BUFFER):
+    #Dissolved buffer of the road segments as a list of oriented polygons
+    capsules = [{'type': 'Polygon', 'coordinates': [capsule(a, b, width)]} for a, b in segments]
+    merged = Block_Dissolve.dissolve(capsules)
+    return Block_Dissolve.oriented_polygons(merged) if merged else []
+
+
+def _multipolygon(polys):
+    if not polys:
+        return None
+    return {'type': 'MultiPolygon', 'coordinates': [[[tuple(p) for p in ring] for ring in poly] for poly in polys]}
+
+
+def standard_units(block, lines, width=ROAD_BUFFER):
+    #PAS (road buffer within the block) and Productive (the rest of the block)
+    #for one block and the road lines near it. Returns [(STUN_ID, geometry or
+    #None, area in m2)] and the number of road segments used.
+    block_polys = Block_Dissolve.oriented_polygons(Block_Dissolve.dissolve([block]) or block)
+    box = Geometry_Core.expand(Geometry_Core.bbox(block), width)
+    segments = road_segments(lines, box)
+    buffer_polys = road_buffer(segments, width)
+    pas = _multipolygon(Block_Dissolve.overlay(block_polys, buffer_polys, 'intersection'))
+    productive = _multipolygon(Block_Dissolve.overlay(block_polys, buffer_polys, 'difference'))
+    units = [(PAS, pas, Geometry_Core.area(pas) if pas else 0.0),
+             (PRODUCTIVE, productive, Geometry_Core.area(productive) if productive else 0.0)]
+    return units, len(segments)
+
+
+def near_roads(blocks, roads, width=ROAD_BUFFER):
+    #For each block the indexes of the roads whose box is within width of it.
+    #blocks and roads are geometries, roads are indexed once in an STR tree.
+    tree = Geometry_Core.STRtree([(Geometry_Core.bbox(road), n) for n, road in enumerate(roads)
+                                  if not Geometry_Core.is_empty(road)])
+    return [sorted(tree.query(Geometry_Core.expand(Geometry_Core.bbox(block), width))) for block in blocks]
+
+
+def build_jobs(blocks, roads, width=ROAD_BUFFER):
+    #blocks is [(block id, geometry)], roads [geometry]. One JSON-able job per
+    #block carrying only the road lines near it. A block id can be repeated or
+    #NULL, results are matched to jobs by position.
+    nearby = near_roads([geom for _, geom in blocks], roads, width)
+    jobs = []
+    for (block_id, geom), indexes in zip(blocks, nearby):
+        lines = [line for n in indexes for line in Geometry_Core.lines(roads[n])]
+        jobs.append({'block_id': block_id, 'block': geom, 'lines': lines, 'width': width})
+    return jobs
+
+
+def run_job(job):
+    #Standard units of one job, errors are returned rather than raised
+    start = time.time()
+    result = {'block_id': job['block_id'], 'status': 'ok', 'units': [], 'segments': 0,
+              'seconds': None, 'error': None}
+    try:
+        units, result['segments'] = standard_units(job['block'], job['lines'], job['width'])
+        result['units'] = [[stun_id, geom, area] for stun_id, geom, area in units]
+    except Exception:
+        result['status'] = 'failed'
+        result['error'] = traceback.format_exc()
+    result['seconds'] = round(time.time() - start, 3)
+    return result
+
+
+# ---------------------------------------------------------------------------
+#   Worker processes
+# ---------------------------------------------------------------------------
+
+def _worker_failed(job, code):
+    return {'block_id': job['block_id'], 'status': 'failed', 'units': [], 'segments': 0, 'seconds': None,
+            'error': 'Standard units worker exited with code ' + str(code)}
+
+
+def generate(jobs, processes=None, log=None):
+    #Runs the jobs, processes=1 runs them in this process. Returns the results
+    #in job order.
+    log = log or (lambda msg: None)
+    if processes is None:
+        processes = min(4, Worker_Pool.cpu_count())
+    processes = max(1, min(processes, len(jobs)))
+    log('Generating standard units for ' + str(len(jobs)) + ' block(s) with ' + str(processes) + ' process(es)')
+    if processes <= 1:
+        ordered = [run_job(job) for job in jobs]
+    else:
+        ordered = Worker_Pool.run_workers(__file__, jobs, processes, _worker_failed, prefix='Standard_Units_')
+    for result in ordered:
+        if result['status'] == 'ok':
+            log('Block ' + str(result['block_id']) + ': ' + str(result['segments']) + ' road segments, ' +
+                ', '.join(u[0] + ' ' + str(round(u[2] / 10000.0, 2)) + ' ha' for u in result['units']) +
+                ' in ' + str(result['seconds']) + 's')
+        else:
+            log('Block ' + str(result['block_id']) + ' FAILED\n' + (result['error'] or ''))
+    return ordered
+
+
+def write_timings(path, results):
+    if sys.version_info[0] < 3:
+        f = open(path, 'wb')
+    else:
+        f = open(path, 'w', newline='')
+    with f:
+        writer = csv.writer(f)
+        writer.writerow(TIMING_FIELDS)
+        for r in results:
+            writer.writerow([r['block_id'], r['status'], r['segments'], r['seconds'], (r['error'] or '').strip()])
+
+
+def _worker(job_file, result_file):
+    #Worker process entry point, appends each block's result as soon as it's known
+    Worker_Pool.run_worker(job_file, result_file, run_job)
+
+
+# ---------------------------------------------------------------------------
+#   ArcGIS
+# ---------------------------------------------------------------------------
+
+def read_blocks(source, id_field, where=None):
+    #[(block id, geometry)] of the blocks matching where
+    import arcpy
+    with arcpy.da.SearchCursor(source, [id_field, 'SHAPE@'], where) as cursor:
+        return [(row[0], Geometry_Core.from_arcpy(row[1])) for row in cursor if row[1] is not None]
+
+
+def read_roads(source, blocks, width=ROAD_BUFFER, spatial_reference=None):
+    #Road geometries within width of the blocks' boxes, read through the road
+    #layer's spatial index
+    import arcpy
+    if not blocks:
+        return []
+    box = Geometry_Core.expand(Geometry_Core.bbox_union([Geometry_Core.bbox(g) for _, g in blocks]), width)
+    search = {'type': 'Polygon', 'coordinates': [[(box[0], box[1]), (box[0], box[3]), (box[2], box[3]),
+                                                  (box[2], box[1]), (box[0], box[1])]]}
+    arcpy.MakeFeatureLayer_management(source, 'standard_units_roads')
+    try:
+        arcpy.SelectLayerByLocation_management('standard_units_roads', 'INTERSECT',
+                                               Geometry_Core.to_arcpy(search, spatial_reference))
+        with arcpy.da.SearchCursor('standard_units_roads', ['SHAPE@'], spatial_reference=spatial_reference) as cursor:
+            return [Geometry_Core.from_arcpy(row[0]) for row in cursor if row[0] is not None]
+    finally:
+        arcpy.Delete_management('standard_units_roads')
+
+
+def write_units(output, results, spatial_reference, id_type='TEXT'):
+    #One feature class with every PAS and Productive polygon
+    import arcpy
+    workspace, name = os.path.split(output)
+    if arcpy.Exists(output):
+        arcpy.Delete_management(output)
+    arcpy.CreateFeatureclass_management(workspace, name, 'POLYGON', spatial_reference=spatial_reference)
+    arcpy.AddField_management(output, 'BLOCK_ID', id_type)
+    arcpy.AddField_management(output, 'STUN_ID', 'TEXT')
+    arcpy.AddField_management(output, 'AREA_HA', 'DOUBLE')
+    count = 0
+    with arcpy.da.InsertCursor(output, ['SHAPE@', 'BLOCK_ID', 'STUN_ID', 'AREA_HA']) as cursor:
+        for result in results:
+            for stun_id, geom, area in result['units']:
+                if geom is not None:
+                    cursor.insertRow([Geometry_Core.to_arcpy(geom, spatial_reference), result['block_id'],
+                                      stun_id, round(area / 10000.0, 4)])
+                    count += 1
+    return count
+
+
+def run(blocks_fc, roads_fc, output, id_field, where=None, width=ROAD_BUFFER, processes=None,
+        timings=None, log=None):
+    #Standard units for every block in blocks_fc matching where. Returns the results.
+    import arcpy
+    log = log or (lambda msg: None)
+    spatial_reference = arcpy.Describe(blocks_fc).spatialReference
+    start = time.time()
+    blocks = read_blocks(blocks_fc, id_field, where)
+    roads = read_roads(roads_fc, blocks, width, spatial_reference)
+    log(str(len(blocks)) + ' blocks and ' + str(len(roads)) + ' nearby roads read in ' +
+        str(round(time.time() - start, 1)) + 's')
+    results = generate(build_jobs(blocks, roads, width), processes, log)
+    id_type = [f.type for f in arcpy.ListFields(blocks_fc) if f.name.upper() == id_field.upper()][0]
+    id_type = {'String': 'TEXT', 'Integer': 'LONG', 'SmallInteger': 'SHORT', 'Double': 'DOUBLE'}.get(id_type, 'TEXT')
+    count = write_units(output, results, spatial_reference, id_type)
+    if timings:
+        write_timings(timings, results)
+    failed = sum(1 for r in results if r['status'] != 'ok')
+    log(str(count) + ' standard units written to ' + output + ', ' + str(failed) + ' block(s) failed, ' +
+        str(round(time.time() - start, 1)) + 's in total')
+    return results
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'worker':
+        _worker(sys.argv[2], sys.argv[3])
+        sys.exit(0)
+    parser = ArgumentParser(description='PAS and Productive standard units for many blocks')
+    parser.add_argument('blocks', help='block feature class')
+    parser.add_argument('roads', help='road line feature class')
+    parser.add_argument('output', help='output feature class')
+    parser.add_argument('--id-field', default='CUTB_SEQ_NBR')
+    parser.add_argument('--where', default=None)
+    parser.add_argument('--width', type=float, default=ROAD_BUFFER, help='road buffer in metres')
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--timings', default=None, help='CSV of the time taken for each block')
+    args = parser.parse_args()
+
+    def _print(msg):
+        sys.stdout.write(msg + '\n')
+
+    results = run(args.blocks, args.roads, args.output, args.id_field, args.where, args.width, args.processes,
+                  args.timings, _print)
+    sys.exit(1 if any(r['status'] != 'ok' for r in results) else 0)
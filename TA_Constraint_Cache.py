@@ -0,0 +1,176 @@
+# ---------------------------------------------------------------------------
+# TA_Constraint_Cache.py
+# Created on: Oct 18, 2026
+#
+# Description: Builds the single exclusion mask that TimberAvailabilty() erases
+#           from the THLB. Every active LUT_Processing constraint is selected
+#           with its Definition_Query, clipped to the operating areas and
+#           dissolved into its own mask feature class in a cache geodatabase.
+#           The masks are merged and dissolved into one exclusion mask so the
+#           THLB only needs one Erase.
+#
+#           Each cached mask is keyed by the constraint source path, its
+#           definition query, the modification stamp of the source and a
+#           fingerprint of the clip boundary. When none of those change the
+#           cached mask is reused and the source is not read again. Sources
+#           without a modification stamp (database connections) are rebuilt on
+#           every run.
+#
+# Author:   Daniel Otto
+# ---------------------------------------------------------------------------
+
+import hashlib
+import json
+import os
+import time
+
+import Manifest_Files
+
+#   Files that make up a shapefile, all of them count towards its stamp
+SHAPEFILE_PARTS = ('.shp', '.shx', '.dbf', '.prj', '.cpg', '.sbn', '.sbx')
+
+
+def source_stamp(source):
+    #Returns a modification stamp for a constraint source or None when it
+    #can't be determined. File geodatabase feature classes use the newest
+    #file in the geodatabase (lock files are left out, they come and go with
+    #every reader), shapefiles the newest of their part files.
+    lowered = source.lower()
+    if '.gdb' in lowered:
+        gdb = source[:lowered.index('.gdb') + 4]
+        if os.path.isdir(gdb):
+            return max([os.path.getmtime(os.path.join(gdb, f)) for f in os.listdir(gdb)
+                        if not f.lower().endswith('.lock')] or [0])
+        return None
+    if os.path.isfile(source):
+        base = os.path.splitext(source)[0]
+        parts = [base + ext for ext in SHAPEFILE_PARTS if os.path.isfile(base + ext)]
+        return max(os.path.getmtime(p) for p in parts + [source])
+    return None
+
+
+def cache_key(source, query, stamp, clip_stamp):
+    #sha1 of everything that changes the contents of a constraint mask
+    text = json.dumps([os.path.normcase(source), query or '', stamp, clip_stamp])
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def mask_name(key):
+    #feature class names have to start with a letter
+    return 'mask_' + key[:20]
+
+
+def load_manifest(path):
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {}
+
+
+def plan_masks(constraints, manifest, clip_stamp, stamp=source_stamp, exists=os.path.exists):
+    #Decides which constraint masks can be reused from the cache.
+    #constraints is a list of (item, source, definition query). Returns a list
+    #of dicts with item, source, query, key, name, action ('reuse'/'rebuild')
+    #and reason.
+    plan = []
+    for item, source, query in constraints:
+        source_time = stamp(source)
+        if source_time is None:
+            key = cache_key(source, query, 'run-' + str(time.time()), clip_stamp)
+            action, reason = 'rebuild', 'source has no modification stamp'
+        else:
+            key = cache_key(source, query, source_time, clip_stamp)
+            entry = manifest.get(key)
+            if entry is None:
+                action, reason = 'rebuild', 'source, query or boundary changed'
+            elif not exists(entry['path']):
+                action, reason = 'rebuild', 'cached mask is missing'
+            else:
+                action, reason = 'reuse', 'unchanged since ' + time.ctime(entry['built'])
+        plan.append({'item': item, 'source': source, 'query': query, 'boundary': clip_stamp, 'key': key,
+                     'name': mask_name(key), 'action': action, 'reason': reason,
+                     'cacheable': source_time is not None})
+    return plan
+
+
+def stale_entries(manifest, plan):
+    #Cache entries for the same source, query and boundary that were replaced by a rebuild
+    rebuilt = set((p['source'], p['query'] or '', p['boundary']) for p in plan if p['action'] == 'rebuild')
+    current = set(p['key'] for p in plan)
+    return [key for key, entry in manifest.items()
+            if key not in current and (entry['source'], entry['query'] or '', entry['boundary']) in rebuilt]
+
+
+def boundary_stamp(fc):
+    #Fingerprint of the clip boundary geometry
+    import arcpy
+    with arcpy.da.SearchCursor(fc, ['SHAPE@WKT']) as cursor:
+        shapes = sorted(row[0] or '' for row in cursor)
+    digest = hashlib.sha1()
+    for wkt in shapes:
+        digest.update(wkt.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def build_mask(source, query, clip_fc, out_fc):
+    #Selects the constraint features, clips them to the boundary and dissolves
+    #them into a single mask
+    import arcpy
+    if query == None or query == "":
+        arcpy.MakeFeatureLayer_management(source, "constraint_FL")
+    else:
+        arcpy.MakeFeatureLayer_management(source, "constraint_FL", query)
+    arcpy.Clip_analysis("constraint_FL", clip_fc, r'in_memory\constraint_clip')
+    arcpy.Dissolve_management(r'in_memory\constraint_clip', out_fc)
+    arcpy.Delete_management("constraint_FL")
+    arcpy.Delete_management(r'in_memory\constraint_clip')
+
+
+def exclusion_mask(constraints, clip_fc, cache_gdb, out_fc, log=None):
+    #Builds the combined exclusion mask for the active constraints. Unchanged
+    #constraint masks come from cache_gdb, the rest are rebuilt and cached.
+    #Returns out_fc, or None when there are no active constraints.
+    import arcpy
+    log = log or (lambda msg: None)
+    if len(constraints) == 0:
+        return None
+
+    folder, gdb_name = os.path.split(cache_gdb)
+    if not arcpy.Exists(cache_gdb):
+        arcpy.CreateFileGDB_management(folder, gdb_name)
+    manifest_path = os.path.splitext(cache_gdb)[0] + '.json'
+    manifest = load_manifest(manifest_path)
+
+    clip_stamp = boundary_stamp(clip_fc)
+    plan = plan_masks(constraints, manifest, clip_stamp, exists=arcpy.Exists)
+    masks = []
+    for p in plan:
+        path = os.path.join(cache_gdb, p['name'])
+        if p['action'] == 'reuse':
+            log('Reused cached mask for ' + p['item'] + ' (' + p['reason'] + ')')
+        else:
+            log('Rebuilding mask for ' + p['item'] + ' (' + p['reason'] + ')')
+            build_mask(p['source'], p['query'], clip_fc, path)
+            if p['cacheable']:
+                manifest[p['key']] = {'item': p['item'], 'source': p['source'], 'query': p['query'],
+                                      'boundary': clip_stamp, 'path': path, 'built': time.time()}
+        masks.append(path)
+
+    #Drop cached masks that have been replaced
+    for key in stale_entries(manifest, plan):
+        if arcpy.Exists(manifest[key]['path']):
+            arcpy.Delete_management(manifest[key]['path'])
+        del manifest[key]
+    Manifest_Files.save_manifest(manifest_path, manifest)
+
+    #Combine every constraint into one dissolved mask
+    log('Combining ' + str(len(masks)) + ' constraint mask(s) into one exclusion mask')
+    arcpy.Merge_management(masks, r'in_memory\constraint_merge')
+    arcpy.Dissolve_management(r'in_memory\constraint_merge', out_fc)
+    arcpy.Delete_management(r'in_memory\constraint_merge')
+
+    #Masks for sources that can't be stamped are only good for this run
+    for p in plan:
+        if not p['cacheable']:
+            arcpy.Delete_management(os.path.join(cache_gdb, p['name']))
+    return out_fc
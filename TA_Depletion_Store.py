@@ -0,0 +1,242 @@
+# ---------------------------------------------------------------------------
+# TA_Depletion_Store.py
+# Created on: Oct 18, 2026
+#
+# Description: Persistent depletion store for Timber Availability. The CutBlk
+#           layer is intersected with every operating area once and split into
+#           one feature class per HARVEST_YEAR (Depletion_<year>) in a store
+#           geodatabase, each with an attribute index on OPERATING_AREA. The
+#           manifest beside the store records the block count of every year and
+#           operating area.
+#
+#           A lookback of any number of years is then the merge of the yearly
+#           slices from the cutoff year on, limited to the operating areas
+#           asked for. Slices with no blocks in those operating areas are not
+#           opened. Changing deplete_years, or comparing several lookbacks in
+#           one run, no longer clips the whole CutBlk layer.
+#
+#           The store is keyed like TA_Constraint_Cache: the CutBlk source, its
+#           modification stamp and a fingerprint of the operating area
+#           boundaries. Sources without a modification stamp (database
+#           connections) are stamped from their object IDs and harvest years,
+#           so a cutblock refresh rebuilds the store but a geometry only edit
+#           of an existing block does not.
+#
+# Author:   Daniel Otto
+# ---------------------------------------------------------------------------
+
+import csv
+import datetime
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+
+import Manifest_Files
+import TA_Constraint_Cache
+
+YEAR_FIELD = 'HARVEST_YEAR'
+AREA_FIELD = 'OPERATING_AREA'
+SLICE_PREFIX = 'Depletion_'
+#   Empty feature class with the slice schema, copied when a lookback has no blocks
+TEMPLATE_NAME = 'Depletion_template'
+
+
+def cutoff_year(lookback, now=None):
+    #First harvest year that is depleted for a lookback of that many years
+    now = now or datetime.datetime.now().year
+    return int(now) - int(lookback)
+
+
+def slice_name(year):
+    return SLICE_PREFIX + str(int(year))
+
+
+def store_key(source, stamp, boundary):
+    #sha1 of everything that changes the contents of the store
+    text = json.dumps([os.path.normcase(source), stamp, boundary])
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def plan_lookback(slices, cutoff, areas=None):
+    #Slice names to merge for the cutoff year, oldest first. slices is the
+    #manifest {year: {'name': ..., 'areas': {oa: count}}}, areas limits the
+    #slices to those with blocks in the listed operating areas (None for all).
+    names = []
+    for year in sorted(slices, key=int):
+        if int(year) < cutoff:
+            continue
+        counts = slices[year]['areas']
+        if areas is None or any(counts.get(oa) for oa in areas):
+            names.append(slices[year]['name'])
+    return names
+
+
+def block_counts(slices, cutoff, areas):
+    #{oa: depleted block count} for the cutoff year, read from the manifest
+    counts = OrderedDict((oa, 0) for oa in areas)
+    for year, entry in slices.items():
+        if int(year) >= cutoff:
+            for oa in areas:
+                counts[oa] += entry['areas'].get(oa, 0)
+    return counts
+
+
+def load_manifest(path):
+    return TA_Constraint_Cache.load_manifest(path)
+
+
+def attribute_stamp(source):
+    #Stamp for sources without a modification time, from the object IDs and
+    #harvest years of every block
+    import arcpy
+    with arcpy.da.SearchCursor(source, ['OID@', YEAR_FIELD]) as cursor:
+        rows = sorted(cursor)
+    digest = hashlib.sha1()
+    for row in rows:
+        digest.update(('%s:%s;' % row).encode('utf-8'))
+    return 'rows-' + digest.hexdigest()
+
+
+def _where_areas(areas):
+    return AREA_FIELD + " in ('" + "','".join([a.replace("'", "''") for a in areas]) + "')"
+
+
+def build(source, areas_fc, store_gdb, log=None):
+    #Intersects the blocks with a harvest year with the operating areas and
+    #writes one indexed slice per harvest year. Returns the slices manifest.
+    import arcpy
+    log = log or (lambda msg: None)
+    folder, gdb_name = os.path.split(store_gdb)
+    if arcpy.Exists(store_gdb):
+        arcpy.Delete_management(store_gdb)
+    arcpy.CreateFileGDB_management(folder, gdb_name)
+
+    arcpy.MakeFeatureLayer_management(source, "depletion_FL", YEAR_FIELD + ' IS NOT NULL')
+    arcpy.Intersect_analysis(["depletion_FL", areas_fc], r'in_memory\depletion_OA', 'ALL')
+    arcpy.Delete_management("depletion_FL")
+    #Keep the CutBlk fields and the operating area name only
+    keep = set(f.name.upper() for f in arcpy.ListFields(source)) | set([AREA_FIELD])
+    drop = [f.name for f in arcpy.ListFields(r'in_memory\depletion_OA')
+            if f.name.upper() not in keep and not f.required]
+    if drop:
+        arcpy.DeleteField_management(r'in_memory\depletion_OA', drop)
+
+    counts = {}
+    with arcpy.da.SearchCursor(r'in_memory\depletion_OA', [YEAR_FIELD, AREA_FIELD]) as cursor:
+        for year, oa in cursor:
+            counts.setdefault(int(year), {})
+            counts[int(year)][oa] = counts[int(year)].get(oa, 0) + 1
+
+    arcpy.CreateFeatureclass_management(store_gdb, TEMPLATE_NAME, 'POLYGON', r'in_memory\depletion_OA',
+                                        spatial_reference=arcpy.Describe(r'in_memory\depletion_OA').spatialReference)
+    slices = {}
+    for year in sorted(counts):
+        name = slice_name(year)
+        arcpy.Select_analysis(r'in_memory\depletion_OA', os.path.join(store_gdb, name), YEAR_FIELD + ' = ' + str(year))
+        arcpy.AddIndex_management(os.path.join(store_gdb, name), [AREA_FIELD], 'OA_IDX')
+        slices[str(year)] = {'name': name, 'areas': counts[year]}
+    arcpy.Delete_management(r'in_memory\depletion_OA')
+    log('Depletion store built with ' + str(sum(sum(c.values()) for c in counts.values())) + ' blocks in ' +
+        str(len(slices)) + ' harvest years')
+    return slices
+
+
+def refresh(source, areas_fc, store_gdb, log=None):
+    #Rebuilds the store when the cutblocks or operating areas have changed since
+    #it was built. Returns the manifest.
+    import arcpy
+    log = log or (lambda msg: None)
+    manifest_path = os.path.splitext(store_gdb)[0] + '.json'
+    manifest = load_manifest(manifest_path)
+    stamp = TA_Constraint_Cache.source_stamp(source)
+    if stamp is None:
+        stamp = attribute_stamp(source)
+    key = store_key(source, stamp, TA_Constraint_Cache.boundary_stamp(areas_fc))
+
+    if manifest.get('key') == key and arcpy.Exists(os.path.join(store_gdb, TEMPLATE_NAME)) and \
+            all(arcpy.Exists(os.path.join(store_gdb, s['name'])) for s in manifest['slices'].values()):
+        log('Using the depletion store built ' + time.ctime(manifest['built']))
+        return manifest
+    log('Cutblocks or operating areas changed, rebuilding the depletion store')
+    manifest = {'key': key, 'source': source, 'built': time.time(),
+                'slices': build(source, areas_fc, store_gdb, log)}
+    Manifest_Files.save_manifest(manifest_path, manifest)
+    return manifest
+
+
+def lookback(manifest, store_gdb, cutoff, areas, out_fc, log=None):
+    #Merges the slices harvested from the cutoff year on into out_fc, limited
+    #to the listed operating areas. Returns out_fc.
+    import arcpy
+    log = log or (lambda msg: None)
+    names = plan_lookback(manifest['slices'], cutoff, areas)
+    where = _where_areas(areas)
+    layers = []
+    for name in names:
+        layer = 'depletion_' + name
+        arcpy.MakeFeatureLayer_management(os.path.join(store_gdb, name), layer, where)
+        layers.append(layer)
+    if layers:
+        arcpy.Merge_management(layers, out_fc)
+    else:
+        arcpy.CopyFeatures_management(os.path.join(store_gdb, TEMPLATE_NAME), out_fc)
+    for layer in layers:
+        arcpy.Delete_management(layer)
+    log('Depletion since ' + str(cutoff) + ' from ' + str(len(names)) + ' yearly slice(s)')
+    return out_fc
+
+
+def footprint_areas(fc, areas):
+    #{oa: depleted hectares}, overlapping blocks counted once
+    import arcpy
+    hectares = OrderedDict((oa, 0.0) for oa in areas)
+    arcpy.Dissolve_management(fc, r'in_memory\depletion_footprint', [AREA_FIELD])
+    with arcpy.da.SearchCursor(r'in_memory\depletion_footprint', [AREA_FIELD, 'SHAPE@AREA']) as cursor:
+        for oa, area in cursor:
+            if oa in hectares:
+                hectares[oa] += area / 10000.0
+    arcpy.Delete_management(r'in_memory\depletion_footprint')
+    return hectares
+
+
+def compare_lookbacks(manifest, store_gdb, lookbacks, areas, out_gdb, now=None, log=None):
+    #Depletion for several lookbacks side by side. Each lookback is written to
+    #Depleted_<years>yr in out_gdb. Returns {years: {'blocks': {oa: n}, 'hectares': {oa: ha}}}.
+    log = log or (lambda msg: None)
+    comparison = OrderedDict()
+    for years in lookbacks:
+        cutoff = cutoff_year(years, now)
+        log('What-if depletion, harvested in the last ' + str(years) + ' years')
+        fc = lookback(manifest, store_gdb, cutoff, areas, os.path.join(out_gdb, 'Depleted_' + str(years) + 'yr'), log)
+        comparison[years] = {'blocks': block_counts(manifest['slices'], cutoff, areas),
+                             'hectares': footprint_areas(fc, areas)}
+    return comparison
+
+
+def comparison_rows(comparison, areas):
+    #Header and one row per operating area, block count and hectares for each lookback
+    header = [AREA_FIELD]
+    for years in comparison:
+        header += ['BLOCKS_' + str(years) + 'YR', 'DEPLETED_HA_' + str(years) + 'YR']
+    rows = []
+    for oa in areas:
+        row = [oa]
+        for years in comparison:
+            row += [comparison[years]['blocks'][oa], round(comparison[years]['hectares'][oa], 2)]
+        rows.append(row)
+    return header, rows
+
+
+def write_comparison_csv(path, comparison, areas):
+    header, rows = comparison_rows(comparison, areas)
+    if sys.version_info[0] < 3:
+        f = open(path, 'wb')
+    else:
+        f = open(path, 'w', newline='')
+    with f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
@@ -0,0 +1,131 @@
+# ---------------------------------------------------------------------------
+# TA_Incremental.py
+# Created on: Oct 18, 2026
+#
+# Description: Operating area fingerprints for incremental Timber Availability
+#           runs. Each operating area's fingerprint covers its own geometry,
+#           the THLB, VRI and depletion features whose extent overlaps it, the
+#           active LUT_Processing rows (with their source stamps) and the
+#           depletion year. Only operating areas whose fingerprint differs from
+#           the last successful run are recomputed; the Mature_VRI_/
+#           Immature_VRI_ feature classes, summary rows and PDFs of the others
+#           are kept as they are.
+#
+#           Feature contributions are summed rather than hashed in sequence so
+#           the fingerprint doesn't depend on cursor order, and only one running
+#           total is kept per operating area.
+#
+# Author:   Daniel Otto
+# ---------------------------------------------------------------------------
+
+import hashlib
+import json
+import os
+
+_MODULUS = 2 ** 160
+
+
+def _digest(value):
+    #sha1 of a JSON-able value as an integer
+    text = json.dumps(value, sort_keys=True, default=str)
+    return int(hashlib.sha1(text.encode('utf-8')).hexdigest(), 16)
+
+
+def _round(value):
+    if isinstance(value, float):
+        return round(value, 6)
+    return value
+
+
+def boxes_overlap(a, b):
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def fingerprint_rows(rows, boxes):
+    #rows is an iterable of (bbox, signature) for one layer, boxes maps each
+    #operating area to its bbox. Every row counts towards each operating area
+    #its bbox overlaps. Returns {operating area: 'sum:count'}.
+    sums = dict((oa, 0) for oa in boxes)
+    counts = dict((oa, 0) for oa in boxes)
+    for bbox, signature in rows:
+        value = None
+        for oa, box in boxes.items():
+            if boxes_overlap(bbox, box):
+                if value is None:
+                    value = _digest([_round(v) for v in signature])
+                sums[oa] = (sums[oa] + value) % _MODULUS
+                counts[oa] += 1
+    return dict((oa, '%040x:%d' % (sums[oa], counts[oa])) for oa in boxes)
+
+
+def combine(area_parts, layer_parts, shared):
+    #Builds the final fingerprint of every operating area.
+    #area_parts is {oa: geometry fingerprint}, layer_parts is {layer name:
+    #{oa: fingerprint}} and shared is anything that applies to every
+    #operating area (LUT rows, depletion year).
+    shared_digest = _digest(shared)
+    fingerprints = {}
+    for oa, geometry in area_parts.items():
+        parts = [geometry, shared_digest] + [[name, layer_parts[name][oa]] for name in sorted(layer_parts)]
+        fingerprints[oa] = '%040x' % _digest(parts)
+    return fingerprints
+
+
+def changed_areas(current, previous):
+    #Operating areas that are new or whose fingerprint changed, in the order of current
+    return [oa for oa in current if previous.get(oa) != current[oa]]
+
+
+def load_state(path):
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {}
+
+
+def save_state(path, fingerprints):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(fingerprints, f, indent=2, sort_keys=True)
+    if os.path.exists(path):
+        os.remove(path)
+    os.rename(tmp, path)
+
+
+def _extent(shape):
+    ext = shape.extent
+    return (ext.XMin, ext.YMin, ext.XMax, ext.YMax)
+
+
+def area_fingerprints(fc, name_field='OPERATING_AREA'):
+    #Returns ({oa: bbox}, {oa: geometry fingerprint}) for the operating areas
+    import arcpy
+    boxes = {}
+    geometry = {}
+    with arcpy.da.SearchCursor(fc, [name_field, 'SHAPE@']) as cursor:
+        for row in cursor:
+            boxes[row[0]] = _extent(row[1])
+            geometry[row[0]] = '%040x' % _digest(row[1].WKT)
+    return boxes, geometry
+
+
+def layer_fingerprints(layer, where, fields, boundary_fc, boxes):
+    #Fingerprints the features of a layer that meet the where clause and
+    #intersect the operating areas. The geometry is represented by its area,
+    #length, vertex count and extent and the listed attribute fields.
+    import arcpy
+    if where:
+        arcpy.MakeFeatureLayer_management(layer, "fingerprint_FL", where)
+    else:
+        arcpy.MakeFeatureLayer_management(layer, "fingerprint_FL")
+    arcpy.SelectLayerByLocation_management("fingerprint_FL", "INTERSECT", boundary_fc)
+
+    def rows():
+        with arcpy.da.SearchCursor("fingerprint_FL", ['SHAPE@'] + list(fields)) as cursor:
+            for row in cursor:
+                bbox = _extent(row[0])
+                yield bbox, [row[0].area, row[0].length, row[0].pointCount] + list(bbox) + list(row[1:])
+
+    fingerprints = fingerprint_rows(rows(), boxes)
+    arcpy.Delete_management("fingerprint_FL")
+    return fingerprints
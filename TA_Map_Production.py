@@ -0,0 +1,220 @@
+# ---------------------------------------------------------------------------
+# TA_Map_Production.py
+# Created on: Oct 18, 2026
+#
+# Description: Map production stage for the Timber Availability tool. The tool
+#           builds one job per OA_4_mapping feature (template, extent, scale,
+#           text element values and layer sources) and this module renders the
+#           jobs to PDF in a bounded pool of worker processes.
+#
+#           Workers are separate python.exe processes running this file, so
+#           they never have to re-import the tool script and the pool also
+#           works when the tool runs inside ArcMap. Each job is rendered on its
+#           own so one failed map does not stop the rest. Results are recorded
+#           in a JSON manifest beside the PDFs so a rerun can retry only the
+#           maps that failed.
+#
+#           The renderer is passed as a 'module:function' name. render_pdf uses
+#           arcpy.mapping; stub_renderer writes a placeholder PDF so the stage
+#           can be exercised without ArcGIS.
+#
+# Usage:    python TA_Map_Production.py retry <manifest.json> [processes]
+#
+# Author:   Daniel Otto
+# ---------------------------------------------------------------------------
+
+import json
+import os
+import re
+import sys
+import time
+import traceback
+
+import Manifest_Files
+import Worker_Pool
+
+DEFAULT_RENDERER = 'TA_Map_Production:render_pdf'
+STUB_RENDERER = 'TA_Map_Production:stub_renderer'
+MANIFEST_NAME = 'Map_Jobs.json'
+
+#   Map template layer name -> output GDB feature class (OA name is appended
+#   to the VRI feature classes)
+DEPLETED_LAYER = 'Depleted Blocks'
+MATURE_LAYER = 'Species - Mature (>80 years)'
+IMMATURE_LAYER = 'Species - Approaching Mature (60-80 years)'
+
+
+def pdf_name(map_name, scale):
+    #Deterministic PDF name for a map, characters that are not valid in a
+    #Windows file name are replaced with '_'
+    name = map_name + "_Timber_Availability_" + str(int(scale)) + "K.pdf"
+    return re.sub(r'[\\/:*?"<>|]', '_', name)
+
+
+def build_job(map_name, operating_area, orientation, scale, extent, settings, texts):
+    #Builds one render job for an OA_4_mapping feature.
+    #settings holds Portrait_MXD, Landscape_MXD, Pdf_folder, outGDB and author,
+    #texts is the volume summary text for the operating area.
+    oa_name = operating_area.replace(" ", "_")
+    if orientation == "P":
+        template = settings['Portrait_MXD']
+    else:
+        template = settings['Landscape_MXD']
+
+    job_texts = dict(texts)
+    job_texts['Title'] = map_name
+    job_texts['file_path'] = 'Path: ' + settings['Pdf_folder']
+    job_texts['author'] = 'Created by: ' + settings['author']
+
+    output = os.path.join(settings['Pdf_folder'], pdf_name(map_name, scale))
+    return {
+        'job_id': os.path.splitext(os.path.basename(output))[0],
+        'operating_area': operating_area,
+        'map_name': map_name,
+        'template': template,
+        'scale': int(scale),
+        'extent': [float(v) for v in extent],
+        'texts': job_texts,
+        'layers': [[DEPLETED_LAYER, settings['outGDB'], 'Depleted'],
+                   [MATURE_LAYER, settings['outGDB'], 'Mature_VRI_' + oa_name],
+                   [IMMATURE_LAYER, settings['outGDB'], 'Immature_VRI_' + oa_name]],
+        'output': output,
+    }
+
+
+def render_pdf(job):
+    #Renders one job to PDF with arcpy.mapping
+    import arcpy
+    mxd = arcpy.mapping.MapDocument(job['template'])
+    df = arcpy.mapping.ListDataFrames(mxd)[0]
+
+    #Zoom to the operating area at the map scale
+    df.extent = arcpy.Extent(*job['extent'])
+    df.scale = job['scale']
+
+    #Update title, path, author and the volume summary tables
+    for elm in arcpy.mapping.ListLayoutElements(mxd, "TEXT_ELEMENT"):
+        if elm.name in job['texts']:
+            elm.text = job['texts'][elm.name]
+
+    #Point the depletion and VRI layers at this operating area's outputs
+    for layer_name, workspace, dataset in job['layers']:
+        lyr = arcpy.mapping.ListLayers(mxd, layer_name, df)[0]
+        lyr.replaceDataSource(workspace, "FILEGDB_WORKSPACE", dataset)
+
+    arcpy.mapping.ExportToPDF(mxd, job['output'])
+    del mxd
+
+
+def stub_renderer(job):
+    #Stand-in for render_pdf that writes a one page placeholder PDF holding the
+    #job details. Set the TA_STUB_FAIL environment variable to a job_id to make
+    #that job fail.
+    if os.environ.get('TA_STUB_FAIL') == job['job_id']:
+        raise RuntimeError('Stub failure for ' + job['job_id'])
+    details = json.dumps(job, sort_keys=True)
+    with open(job['output'], 'wb') as f:
+        f.write(b'%PDF-1.4\n% ' + details.encode('utf-8') + b'\n')
+        f.write(b'1 0 obj << /Type /Catalog /Pages 2 0 R >> endobj\n')
+        f.write(b'2 0 obj << /Type /Pages /Kids [3 0 R] /Count 1 >> endobj\n')
+        f.write(b'3 0 obj << /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] >> endobj\n')
+        f.write(b'trailer << /Root 1 0 R >>\n%%EOF\n')
+
+
+def _load_renderer(name):
+    module_name, function_name = name.split(':')
+    module = __import__(module_name)
+    return getattr(module, function_name)
+
+
+def run_job(renderer, job):
+    #Renders one job and returns its result record, errors are caught and
+    #recorded so they never reach the other jobs
+    start = time.time()
+    try:
+        renderer(job)
+        status, error = 'ok', None
+    except Exception:
+        status, error = 'failed', traceback.format_exc()
+    return {'job_id': job['job_id'], 'status': status, 'output': job['output'],
+            'seconds': round(time.time() - start, 2), 'error': error}
+
+
+def load_manifest(path):
+    if path and os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {'jobs': {}, 'results': {}}
+
+
+def _worker_failed(job, code):
+    return {'job_id': job['job_id'], 'status': 'failed', 'output': job['output'],
+            'seconds': None, 'error': 'Map worker exited with code ' + str(code)}
+
+
+def _run_workers(jobs, renderer, processes):
+    #Renders the jobs on the worker pool, returns {job_id: result}
+    results = Worker_Pool.run_workers(__file__, jobs, processes, _worker_failed, [renderer], prefix='TA_maps_')
+    return dict((job['job_id'], result) for job, result in zip(jobs, results))
+
+
+def render_jobs(jobs=None, manifest_path=None, renderer=DEFAULT_RENDERER, processes=None,
+                retry_failed_only=False, log=None):
+    #Renders the map jobs and records the outcome of each one in the manifest.
+    #jobs defaults to the jobs stored in the manifest. With retry_failed_only
+    #only jobs that have not yet rendered successfully are run. processes=1
+    #renders in this process. Returns {job_id: result}.
+    log = log or (lambda msg: None)
+    manifest = load_manifest(manifest_path)
+    if jobs is not None:
+        for job in jobs:
+            manifest['jobs'][job['job_id']] = job
+        job_ids = [job['job_id'] for job in jobs]
+    else:
+        job_ids = sorted(manifest['jobs'])
+
+    if retry_failed_only:
+        job_ids = [j for j in job_ids if manifest['results'].get(j, {}).get('status') != 'ok']
+    pending = [manifest['jobs'][j] for j in job_ids]
+    if processes is None:
+        processes = min(4, Worker_Pool.cpu_count())
+    log('Rendering ' + str(len(pending)) + ' map(s) with ' + str(max(1, min(processes, len(pending)))) + ' process(es)')
+
+    if not pending:
+        results = {}
+    elif processes <= 1:
+        render = _load_renderer(renderer)
+        results = dict((job['job_id'], run_job(render, job)) for job in pending)
+    else:
+        results = _run_workers(pending, renderer, processes)
+
+    for job_id in job_ids:
+        result = results[job_id]
+        manifest['results'][job_id] = result
+        if result['status'] == 'ok':
+            log('Map complete: ' + result['output'] + ' (' + str(result['seconds']) + 's)')
+        else:
+            log('Map FAILED: ' + job_id + '\n' + (result['error'] or ''))
+    if manifest_path:
+        Manifest_Files.save_manifest(manifest_path, manifest)
+    return results
+
+
+def _worker(renderer, job_file, result_file):
+    #Worker process entry point, renders its share of the jobs one at a time
+    #and appends each result as soon as it is known
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    render = _load_renderer(renderer)
+    Worker_Pool.run_worker(job_file, result_file, lambda job: run_job(render, job))
+
+
+if __name__ == '__main__':
+    if sys.argv[1] == 'worker':
+        _worker(sys.argv[2], sys.argv[3], sys.argv[4])
+    elif sys.argv[1] == 'retry':
+        processes = int(sys.argv[3]) if len(sys.argv) > 3 else None
+        def _print(msg):
+            sys.stdout.write(msg + '\n')
+        results = render_jobs(manifest_path=sys.argv[2], processes=processes, retry_failed_only=True, log=_print)
+        failed = [r for r in results.values() if r['status'] != 'ok']
+        sys.exit(1 if failed else 0)
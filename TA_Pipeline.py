@@ -0,0 +1,201 @@
+# ---------------------------------------------------------------------------
+# TA_Pipeline.py
+# Created on: Oct 18, 2026
+#
+# Description: Checkpointed stage runner for the Timber Availability tool. The
+#           tool is declared as a list of stages, each with the
+#           Processing_Variables keys it needs (inputs) and the datasets and
+#           values it produces. After a stage finishes its datasets are copied
+#           out of in_memory into a scratch geodatabase, its values are stored
+#           in a JSON manifest and the stage is marked complete.
+#
+#           If a run fails the next run with the same parameters resumes at
+#           the first stage that did not complete, restoring the earlier
+#           outputs from the scratch geodatabase instead of recomputing them.
+#           A run can also be started at a named stage as long as the stages
+#           before it completed with the same parameters. Keys listed in record
+#           (the outputs a run creates) are kept in the manifest even when a
+#           stage fails, so a run is only resumed into outputs it made itself.
+#
+# Author:   Daniel Otto
+# ---------------------------------------------------------------------------
+
+import hashlib
+import json
+import os
+import time
+from collections import namedtuple
+
+import Manifest_Files
+
+#   name: stage name, function: callable run for the stage, inputs: keys that
+#   must be set before it runs, datasets: keys holding feature classes to
+#   persist, values: keys holding JSON-able values to persist
+Stage = namedtuple('Stage', 'name function inputs datasets values')
+
+#   A stage function can return STOP to end the run early (nothing left to do)
+STOP = 'STOP'
+
+
+def stage(name, function, inputs=(), datasets=(), values=()):
+    return Stage(name, function, list(inputs), list(datasets), list(values))
+
+
+def run_key(params):
+    #Key for the run parameters, checkpoints are only reused for the same key
+    text = json.dumps(params, sort_keys=True)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def stage_names(stages):
+    return [s.name for s in stages]
+
+
+def load_manifest(path):
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return None
+
+
+def plan(stages, manifest, key, start_at=None, exists=os.path.exists):
+    #Decides which stages are restored from checkpoints and which are run.
+    #Returns a list of (stage, 'restore'|'run'). Raises ValueError when
+    #start_at can't be honoured.
+    names = stage_names(stages)
+    if start_at is not None and start_at not in names:
+        raise ValueError('Unknown stage ' + start_at + ', expected one of ' + ', '.join(names))
+
+    usable = manifest is not None and manifest.get('run_key') == key
+    if start_at is None and usable and manifest.get('finished'):
+        #The last run with these parameters finished, start again from scratch
+        usable = False
+
+    def restorable(s):
+        entry = usable and manifest['stages'].get(s.name)
+        if not entry or entry.get('status') != 'complete':
+            return False
+        return all(exists(entry['datasets'][k]) for k in s.datasets)
+
+    steps = []
+    running = False
+    for s in stages:
+        if start_at is not None:
+            if s.name == start_at:
+                running = True
+            if running:
+                steps.append((s, 'run'))
+            elif restorable(s):
+                steps.append((s, 'restore'))
+            else:
+                raise ValueError('Can not start at ' + start_at + ': stage ' + s.name +
+                                 ' has no completed checkpoint for these parameters')
+        else:
+            #Resume at the first stage that did not complete, everything after it reruns
+            if not running and restorable(s):
+                steps.append((s, 'restore'))
+            else:
+                running = True
+                steps.append((s, 'run'))
+    return steps
+
+
+def resuming(manifest_path, params, created=None):
+    #True when the last run with these parameters stopped before it finished.
+    #created names a recorded key that run must have set, the output it made.
+    manifest = load_manifest(manifest_path)
+    return (manifest is not None and manifest.get('run_key') == run_key(params)
+            and not manifest.get('finished')
+            and (created is None or bool(manifest.get('recorded', {}).get(created))))
+
+
+def run_stages(stages, state, manifest_path, params, persist, start_at=None,
+               exists=os.path.exists, record=(), log=None):
+    #Runs the stages against the state dictionary (Processing_Variables).
+    #persist(stage name, key, dataset) copies a dataset to the scratch store and
+    #returns its new path. The state keys in record are stored in the manifest
+    #every time it is saved, including when a stage fails. Returns the list of
+    #stage names that were run.
+    log = log or (lambda msg: None)
+    key = run_key(params)
+    manifest = load_manifest(manifest_path)
+    steps = plan(stages, manifest, key, start_at, exists)
+    if manifest is None or manifest.get('run_key') != key or (start_at is None and manifest.get('finished')):
+        manifest = {'run_key': key, 'params': params, 'stages': {}}
+    manifest['finished'] = False
+
+    def save():
+        recorded = manifest.setdefault('recorded', {})
+        recorded.update((k, state[k]) for k in record if k in state)
+        Manifest_Files.save_manifest(manifest_path, manifest)
+
+    #Saved before the first stage runs, resuming() still needs the run to have
+    #recorded its outputs before it is resumed
+    save()
+
+    ran = []
+    for s, action in steps:
+        if action == 'restore':
+            entry = manifest['stages'][s.name]
+            state.update(entry['datasets'])
+            state.update(entry['values'])
+            log('Stage ' + s.name + ': restored from checkpoint (' + time.ctime(entry['finished']) + ')')
+            continue
+
+        missing = [k for k in s.inputs if k not in state]
+        if missing:
+            raise ValueError('Stage ' + s.name + ' is missing its inputs: ' + ', '.join(missing))
+
+        log('Stage ' + s.name + ': running')
+        start = time.time()
+        try:
+            result = s.function()
+        except Exception:
+            #Keep what the failed stage recorded, e.g. an output it created
+            save()
+            raise
+        ran.append(s.name)
+
+        #Persist the stage outputs, a dataset shared by several keys is copied once
+        copied = {}
+        datasets = {}
+        for k in s.datasets:
+            if state[k] not in copied:
+                copied[state[k]] = persist(s.name, k, state[k])
+            datasets[k] = copied[state[k]]
+        state.update(datasets)
+        manifest['stages'][s.name] = {'status': 'complete', 'finished': time.time(),
+                                      'seconds': round(time.time() - start, 1),
+                                      'datasets': datasets,
+                                      'values': dict((k, state[k]) for k in s.values)}
+        #Later checkpoints were built from the old outputs of this stage
+        names = stage_names(stages)
+        for later in names[names.index(s.name) + 1:]:
+            manifest['stages'].pop(later, None)
+        save()
+        log('Stage ' + s.name + ': complete in ' + str(manifest['stages'][s.name]['seconds']) + 's')
+        if result == STOP:
+            break
+
+    manifest['finished'] = True
+    save()
+    return ran
+
+
+def scratch_persist(scratch_gdb):
+    #Returns a persist function that copies in_memory datasets into scratch_gdb
+    import arcpy
+
+    def persist(stage_name, key, dataset):
+        if not arcpy.Exists(scratch_gdb):
+            folder, name = os.path.split(scratch_gdb)
+            arcpy.CreateFileGDB_management(folder, name)
+        target = os.path.join(scratch_gdb, stage_name + '_' + key)
+        if dataset.lower().startswith(scratch_gdb.lower()):
+            return dataset
+        arcpy.CopyFeatures_management(dataset, target)
+        if dataset.lower().startswith('in_memory'):
+            arcpy.Delete_management(dataset)
+        return target
+
+    return persist
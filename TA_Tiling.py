@@ -0,0 +1,275 @@
+# ---------------------------------------------------------------------------
+# TA_Tiling.py
+# Created on: Oct 18, 2026
+#
+# Description: Tiled execution of the Timber Availability overlay for field
+#           teams too large to clip and intersect in in_memory at once. The
+#           run areas are split into tiles, by operating area or by a fixed
+#           grid, and each tile is clipped, erased, intersected and given its
+#           volumes on its own. Its result is appended to a feature class on
+#           disk and its in_memory data deleted before the next tile starts.
+#
+#           Edges: every VRI polygon belongs to exactly one tile. In operating
+#           area tiles the polygon is cut at the operating area boundary, the
+#           same as the Intersect of the untiled run, so each (VRI polygon,
+#           operating area) piece is made once. Grid tiles own the VRI polygons
+#           whose centre falls in the cell (cells are half open, a centre on a
+#           shared edge goes to the cell above/right) and bring in every THLB,
+#           depletion and constraint feature that touches them, so a polygon
+#           crossing a cell edge is processed whole, once.
+#
+#           Memory budget: a tile is split into quarters, by the same centre
+#           rule, while its VRI vertex count times the bytes used per vertex is
+#           over the budget. Bytes per vertex starts at BYTES_PER_VERTEX and is
+#           raised from the peak memory measured on each tile. The peak of
+#           every tile is logged.
+#
+# Author:   Daniel Otto
+# ---------------------------------------------------------------------------
+
+from __future__ import division
+
+import os
+import time
+from collections import namedtuple
+
+import Memory_Monitor
+import Query_Builder
+
+MODES = ('OperatingArea', 'Grid')
+DEFAULT_TILE_SIZE = 20000.0
+DEFAULT_BUDGET_MB = 512
+#   Starting estimate of the memory a VRI vertex costs through clip, erase and intersect
+BYTES_PER_VERTEX = 400
+#   Tiles are not split below this width (metres) or below one VRI polygon
+MIN_TILE_SIZE = 250.0
+#   Tiles with fewer vertices than this don't change the bytes per vertex estimate
+CALIBRATE_VERTICES = 20000
+
+#   name: tile name used in the log, bbox: (xmin, ymin, xmax, ymax), areas: where
+#   clause on the run areas (None for all of them), features: [(oid, x, y, vertices)]
+#   of the candidate VRI polygons, owned: True when the tile only takes the VRI
+#   polygons in features, False when it takes every one touching its areas
+Tile = namedtuple('Tile', 'name bbox areas features owned')
+
+
+def vertices(tile):
+    return sum(f[3] for f in tile.features)
+
+
+def max_vertices(budget_bytes, bytes_per_vertex):
+    return max(1, int(budget_bytes / bytes_per_vertex))
+
+
+def _quarter(bbox, features):
+    #Features split into the four quarters of bbox by their centre, half open
+    xmid = (bbox[0] + bbox[2]) / 2.0
+    ymid = (bbox[1] + bbox[3]) / 2.0
+    quarters = [((bbox[0], bbox[1], xmid, ymid), []), ((xmid, bbox[1], bbox[2], ymid), []),
+                ((bbox[0], ymid, xmid, bbox[3]), []), ((xmid, ymid, bbox[2], bbox[3]), [])]
+    for feature in features:
+        quarters[(1 if feature[1] >= xmid else 0) + (2 if feature[2] >= ymid else 0)][1].append(feature)
+    return quarters
+
+
+def split(tile, limit, min_size=MIN_TILE_SIZE):
+    #Splits the tile into quarters until each has at most limit vertices.
+    #Returns the tiles, a tile that fits comes back unchanged.
+    if vertices(tile) <= limit or len(tile.features) <= 1 or \
+            max(tile.bbox[2] - tile.bbox[0], tile.bbox[3] - tile.bbox[1]) < min_size:
+        return [tile]
+    tiles = []
+    for n, (bbox, features) in enumerate(_quarter(tile.bbox, tile.features)):
+        if features:
+            part = Tile(tile.name + '.' + str(n + 1), bbox, tile.areas, features, True)
+            tiles += split(part, limit, min_size)
+    return tiles
+
+
+def grid(features, extent, size):
+    #Fixed grid cells of size metres over extent, each owning the features
+    #whose centre falls in it. Returns [(column, row, bbox, features)] for the
+    #cells with features.
+    columns = max(1, int((extent[2] - extent[0]) // size) + 1)
+    rows = max(1, int((extent[3] - extent[1]) // size) + 1)
+    cells = {}
+    for feature in features:
+        column = min(columns - 1, max(0, int((feature[1] - extent[0]) // size)))
+        row = min(rows - 1, max(0, int((feature[2] - extent[1]) // size)))
+        cells.setdefault((column, row), []).append(feature)
+    result = []
+    for column, row in sorted(cells):
+        x = extent[0] + column * size
+        y = extent[1] + row * size
+        result.append((column, row, (x, y, x + size, y + size), cells[(column, row)]))
+    return result
+
+
+def calibrate(bytes_per_vertex, growth, tile_vertices):
+    #Raises the bytes per vertex estimate when a tile used more than expected
+    if growth is None or tile_vertices < CALIBRATE_VERTICES:
+        return bytes_per_vertex
+    return max(bytes_per_vertex, growth / tile_vertices)
+
+
+# ---------------------------------------------------------------------------
+#   arcpy
+# ---------------------------------------------------------------------------
+
+def _where_name(name):
+    return "OPERATING_AREA = '" + name.replace("'", "''") + "'"
+
+
+def read_features(layer):
+    #[(oid, x, y, vertices)] for the features of a layer, x/y is the centroid
+    import arcpy
+    with arcpy.da.SearchCursor(layer, ['OID@', 'SHAPE@XY', 'SHAPE@']) as cursor:
+        return [(row[0], row[1][0], row[1][1], row[2].pointCount) for row in cursor]
+
+
+def _vri_layer(vri, vri_exp, name):
+    import arcpy
+    if vri_exp:
+        arcpy.MakeFeatureLayer_management(vri, name, vri_exp)
+    else:
+        arcpy.MakeFeatureLayer_management(vri, name)
+    return name
+
+
+def operating_area_tiles(areas_fc, vri, vri_exp):
+    #One tile per operating area with the VRI polygons that touch it
+    import arcpy
+    tiles = []
+    layer = _vri_layer(vri, vri_exp, "tile_vri_FL")
+    with arcpy.da.SearchCursor(areas_fc, ['OPERATING_AREA', 'SHAPE@']) as cursor:
+        for name, shape in cursor:
+            arcpy.SelectLayerByLocation_management(layer, "INTERSECT", shape)
+            extent = shape.extent
+            tiles.append(Tile(name, (extent.XMin, extent.YMin, extent.XMax, extent.YMax), _where_name(name),
+                              read_features(layer), False))
+    arcpy.Delete_management(layer)
+    return tiles
+
+
+def grid_tiles(areas_fc, vri, vri_exp, size):
+    #One tile per grid cell with VRI polygons centred in it
+    import arcpy
+    layer = _vri_layer(vri, vri_exp, "tile_vri_FL")
+    arcpy.SelectLayerByLocation_management(layer, "INTERSECT", areas_fc)
+    features = read_features(layer)
+    arcpy.Delete_management(layer)
+    extent = arcpy.Describe(areas_fc).extent
+    return [Tile('cell_' + str(column) + '_' + str(row), bbox, None, owned, True)
+            for column, row, bbox, owned in grid(features, (extent.XMin, extent.YMin, extent.XMax, extent.YMax), size)]
+
+
+def overlay_tile(tile, areas_fc, thlb, thlb_exp, vri, vri_exp, erase, out_fc):
+    #The untiled TimberAvailabilty() overlay for one tile: THLB clipped to the
+    #run areas, erase layers removed, VRI clipped to what is left and
+    #intersected with the run areas. Writes out_fc, with no features when the
+    #tile has no VRI polygons.
+    import arcpy
+    temp = []
+
+    def scratch(name):
+        temp.append(r'in_memory\tile_' + name)
+        return temp[-1]
+
+    try:
+        areas = areas_fc
+        if tile.areas:
+            areas = scratch('areas')
+            arcpy.Select_analysis(areas_fc, areas, tile.areas)
+
+        if not tile.features:
+            #An empty selection would be treated as every feature, the VRI is
+            #queried for none instead so out_fc still gets the overlay's fields
+            vri_fl = _vri_layer(vri, '1 = 0', "tile_vri_FL")
+            temp.append(vri_fl)
+            arcpy.Intersect_analysis([vri_fl, areas], out_fc)
+            return out_fc
+
+        #VRI of the tile, owned polygons by object ID, otherwise everything touching the areas
+        vri_fl = _vri_layer(vri, vri_exp, "tile_vri_FL")
+        temp.append(vri_fl)
+        if tile.owned:
+            oid_field = arcpy.Describe(vri_fl).OIDFieldName
+            arcpy.SelectLayerByAttribute_management(vri_fl, "NEW_SELECTION",
+                                                    Query_Builder.where_clause(oid_field, [f[0] for f in tile.features], numeric=True))
+        else:
+            arcpy.SelectLayerByLocation_management(vri_fl, "INTERSECT", areas)
+        tile_vri = scratch('vri')
+        arcpy.CopyFeatures_management(vri_fl, tile_vri)
+
+        #THLB touching the tile VRI, clipped to the run areas
+        thlb_fl = "tile_thlb_FL"
+        if thlb_exp:
+            arcpy.MakeFeatureLayer_management(thlb, thlb_fl, thlb_exp)
+        else:
+            arcpy.MakeFeatureLayer_management(thlb, thlb_fl)
+        temp.append(thlb_fl)
+        arcpy.SelectLayerByLocation_management(thlb_fl, "INTERSECT", tile_vri)
+        tile_thlb = scratch('thlb')
+        arcpy.Clip_analysis(thlb_fl, areas, tile_thlb)
+
+        #Depletion and constraint masks, only the features touching the tile THLB
+        for n, layer in enumerate(erase):
+            erase_fl = "tile_erase_FL_" + str(n)
+            arcpy.MakeFeatureLayer_management(layer, erase_fl)
+            temp.append(erase_fl)
+            arcpy.SelectLayerByLocation_management(erase_fl, "INTERSECT", tile_thlb)
+            erased = scratch('thlb_erase_' + str(n))
+            arcpy.Erase_analysis(tile_thlb, erase_fl, erased)
+            tile_thlb = erased
+
+        tile_ta_vri = scratch('ta_vri')
+        arcpy.Clip_analysis(tile_vri, tile_thlb, tile_ta_vri)
+        arcpy.Intersect_analysis([tile_ta_vri, areas], out_fc)
+    finally:
+        for dataset in temp:
+            if arcpy.Exists(dataset):
+                arcpy.Delete_management(dataset)
+    return out_fc
+
+
+def run_tiles(tiles, process, output_fc, budget_mb=DEFAULT_BUDGET_MB, log=None):
+    #Runs process(tile, out_fc) for every tile, splitting tiles that are over
+    #the memory budget, and appends each tile's out_fc to output_fc. With no
+    #tiles process is run once on a tile with no features, so output_fc is
+    #still created with the overlay's fields. Returns a list of {'tile',
+    #'features', 'vertices', 'peak', 'growth', 'seconds'}.
+    import arcpy
+    log = log or (lambda msg: None)
+    budget = budget_mb * 1024 * 1024
+    bytes_per_vertex = BYTES_PER_VERTEX
+    tile_out = r'in_memory\tile_result'
+    stats = []
+    pending = list(tiles) or [Tile('empty', None, None, [], True)]
+    while pending:
+        parts = split(pending.pop(0), max_vertices(budget, bytes_per_vertex))
+        if len(parts) > 1:
+            log('Tile ' + parts[0].name.split('.')[0] + ' is over the memory budget, split into ' +
+                str(len(parts)) + ' tiles')
+        #Parts not yet run are split again after the estimate is updated
+        tile = parts[0]
+        pending[0:0] = parts[1:]
+
+        start = time.time()
+        with Memory_Monitor.Monitor() as monitor:
+            process(tile, tile_out)
+            if arcpy.Exists(output_fc):
+                arcpy.Append_management(tile_out, output_fc, 'NO_TEST')
+            else:
+                arcpy.CopyFeatures_management(tile_out, output_fc)
+            arcpy.Delete_management(tile_out)
+        tile_vertices = vertices(tile)
+        bytes_per_vertex = calibrate(bytes_per_vertex, monitor.growth, tile_vertices)
+        stats.append({'tile': tile.name, 'features': len(tile.features), 'vertices': tile_vertices,
+                      'peak': monitor.peak, 'growth': monitor.growth, 'seconds': round(time.time() - start, 1)})
+        msg = ('Tile ' + tile.name + ': ' + str(len(tile.features)) + ' VRI polygons, peak memory ' +
+               Memory_Monitor.format_bytes(monitor.peak) + ' (+' + Memory_Monitor.format_bytes(monitor.growth) +
+               ') in ' + str(stats[-1]['seconds']) + 's')
+        if monitor.growth is not None and monitor.growth > budget:
+            msg += ', over the ' + str(budget_mb) + ' MB budget'
+        log(msg)
+    return stats
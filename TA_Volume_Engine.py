@@ -0,0 +1,324 @@
+# ---------------------------------------------------------------------------
+# TA_Volume_Engine.py
+# Created on: Oct 18, 2026
+#
+# Description: Columnar volume engine used by VolumeCalculator() in the Timber
+#           Availability tool. The VRI columns needed for the volume summary are
+#           read once into NumPy arrays, hectares, species areas, live/dead
+#           volumes, species groups and the per-group Vol/Area totals are
+#           calculated in vectorized form, and the results are written back to
+#           the feature class in a single update pass.
+#
+#           compute_volumes() has no arcpy dependency so it can be run against
+#           synthetic arrays. It follows the same rules as the original
+#           field-by-field CalculateField logic, including NULL propagation
+#           (a NULL volume per hectare gives a NULL stand volume and a NULL
+#           group total, the same as the VB expressions did).
+#
+# Author:   Daniel Otto
+# ---------------------------------------------------------------------------
+
+from __future__ import division
+import csv
+import sys
+from collections import OrderedDict
+
+import numpy as np
+
+# np.isin only exists in newer NumPy builds, ArcMap ships an older one
+_isin = getattr(np, 'isin', None) or np.in1d
+
+SPECIES_SLOTS = range(1, 7)
+
+#   Species codes that are calculated at the lower (12.5cm) utilization level,
+#   everything else with a species code uses the 17.5cm level
+LOW_UTILIZATION_CODES = ('PL', 'PLI', 'AT', 'AC', 'ACT', 'E', 'ES', 'EP', 'MB', 'DR')
+
+#   Species group -> (field prefix, species codes) used to build SPCn_GRP and
+#   the <prefix>Vol / <prefix>Area totals. Codes not listed here are 'OTHER'.
+SPECIES_GROUPS = OrderedDict([
+    ('PINE', ('Pine', ['PL', 'PLI', 'P', 'PW', 'PF', 'PA', 'PY', 'PJ'])),
+    ('FIR', ('Fir', ['FD', 'FDI'])),
+    ('HEMLOCK', ('Hemlock', ['HW', 'H', 'HM'])),
+    ('LARCH', ('Larch', ['L', 'LA', 'LT', 'LW'])),
+    ('CEDAR', ('Cedar', ['CW', 'C', 'YC'])),
+    ('SPRUCE', ('Spruce', ['SX', 'S', 'SS', 'SB', 'SE', 'SW'])),
+    ('BALSAM', ('Balsam', ['BL', 'BA', 'B', 'BG'])),
+    ('DECIDUOUS', ('Decid', ['AC', 'AT', 'ACT', 'DR', 'E', 'EP', 'EA', 'MB'])),
+])
+OTHER_GROUP = 'OTHER'
+
+#   Output fields added to the VRI feature class
+GROUP_FIELDS = ['SPC' + str(i) + '_GRP' for i in SPECIES_SLOTS]
+VOLUME_FIELDS = (['HECTARES'] +
+                 ['SPC' + str(i) + '_VOL_LIVE' for i in SPECIES_SLOTS] +
+                 ['SPC' + str(i) + '_VOL_DEAD' for i in SPECIES_SLOTS] +
+                 ['SPC' + str(i) + '_AREA' for i in SPECIES_SLOTS])
+TOTAL_FIELDS = []
+for _prefix in [p for p, codes in SPECIES_GROUPS.values()] + ['Other']:
+    TOTAL_FIELDS += [_prefix + 'Vol', _prefix + 'Area']
+TOTAL_FIELDS.append('PineVolDead')
+DOUBLE_FIELDS = VOLUME_FIELDS + TOTAL_FIELDS
+
+#   SPECIES_PCT_n is written back as well, NULL percentages become zero
+PERCENT_FIELDS = ['SPECIES_PCT_' + str(i) for i in SPECIES_SLOTS]
+OUTPUT_FIELDS = PERCENT_FIELDS + GROUP_FIELDS + DOUBLE_FIELDS
+
+#   Fields summed for each operating area and age class (the SUM_* values shown
+#   in the map volume tables) and the fields the summary is grouped on
+STAT_FIELDS = ['HECTARES', 'PineArea', 'PineVol', 'FirArea', 'FirVol', 'HemlockArea', 'HemlockVol',
+               'LarchArea', 'LarchVol', 'CedarArea', 'CedarVol', 'SpruceArea', 'SpruceVol',
+               'BalsamArea', 'BalsamVol', 'DecidArea', 'DecidVol', 'OtherArea', 'OtherVol']
+SUMMARY_FIELDS = ['OPERATING_AREA', 'PROJ_AGE_1']
+
+#   Age class -> (PROJ_AGE_1 lower bound (exclusive), upper bound (inclusive))
+AGE_CLASSES = OrderedDict([('Mature', (80, None)), ('Immature', (60, 80))])
+
+#   Map text element tag for each age class and label for each species group
+MAP_AGE_TAGS = {'Mature': 'ma', 'Immature': 'im'}
+MAP_SPECIES_LABELS = [('pine', 'Pine'), ('fir', 'Fir'), ('hemlock', 'Hemlock'), ('larch', 'Larch'),
+                      ('cedar', 'Cedar'), ('spruce', 'Spruce'), ('balsam', 'Balsam'),
+                      ('deciduous', 'Decid'), ('other', 'Other')]
+
+
+def input_fields():
+    #returns the VRI attribute fields needed by compute_volumes()
+    fields = []
+    for i in SPECIES_SLOTS:
+        fields += ['SPECIES_CD_' + str(i), 'SPECIES_PCT_' + str(i)]
+        for util in ('125', '175'):
+            fields += ['LIVE_VOL_PER_HA_SPP' + str(i) + '_' + util,
+                       'DEAD_VOL_PER_HA_SPP' + str(i) + '_' + util]
+    return fields
+
+
+def _float_column(values):
+    #float array with NaN standing in for NULL
+    return np.array(values, dtype=float)
+
+
+def _code_column(values):
+    #returns the species codes as an array ('' for NULL) and a NULL mask
+    values = list(values)
+    is_null = np.array([v is None for v in values], dtype=bool)
+    codes = np.array([u'' if v is None else v for v in values], dtype=object)
+    return codes, is_null
+
+
+def compute_volumes(hectares, columns):
+    #Calculates the VolumeCalculator() fields for every stand at once.
+    #hectares is a sequence of stand areas, columns maps each field from
+    #input_fields() to a sequence of values (None for NULL). Returns an
+    #OrderedDict of OUTPUT_FIELDS -> array, NaN/None mark NULL results.
+    hectares = _float_column(hectares)
+    n = len(hectares)
+    results = OrderedDict()
+    totals = OrderedDict((f, np.zeros(n)) for f in TOTAL_FIELDS)
+
+    results['HECTARES'] = hectares
+    for i in SPECIES_SLOTS:
+        slot = str(i)
+        codes, is_null = _code_column(columns['SPECIES_CD_' + slot])
+
+        #NULL species percent is calculated to zero before the area is worked out
+        pct = _float_column(columns['SPECIES_PCT_' + slot])
+        pct[np.isnan(pct)] = 0
+        results['SPECIES_PCT_' + slot] = pct
+        area = hectares * pct / 100
+
+        #Pine and deciduous use the 12.5cm utilization volumes, all other coded species 17.5cm
+        low = _isin(codes, LOW_UTILIZATION_CODES) & ~is_null
+        high = ~low & ~is_null
+        live = np.zeros(n)
+        dead = np.zeros(n)
+        live[low] = (_float_column(columns['LIVE_VOL_PER_HA_SPP' + slot + '_125']) * hectares)[low]
+        dead[low] = (_float_column(columns['DEAD_VOL_PER_HA_SPP' + slot + '_125']) * hectares)[low]
+        live[high] = (_float_column(columns['LIVE_VOL_PER_HA_SPP' + slot + '_175']) * hectares)[high]
+        dead[high] = (_float_column(columns['DEAD_VOL_PER_HA_SPP' + slot + '_175']) * hectares)[high]
+
+        #Species groups and the running volume/area total for each group
+        group = np.empty(n, dtype=object)
+        for grp, (prefix, grp_codes) in SPECIES_GROUPS.items():
+            in_group = _isin(codes, grp_codes) & ~is_null
+            group[in_group] = grp
+            totals[prefix + 'Vol'] += np.where(in_group, live, 0)
+            totals[prefix + 'Area'] += np.where(in_group, area, 0)
+            if grp == 'PINE':
+                totals['PineVolDead'] += np.where(in_group, dead, 0)
+
+        #Anything coded but not in a group is 'OTHER'. OtherArea has never been
+        #accumulated by the tool so it stays at zero to keep the map totals the same
+        other = ~is_null & np.equal(group, None)
+        group[other] = OTHER_GROUP
+        totals['OtherVol'] += np.where(other, live, 0)
+
+        results['SPC' + slot + '_GRP'] = group
+        results['SPC' + slot + '_VOL_LIVE'] = live
+        results['SPC' + slot + '_VOL_DEAD'] = dead
+        results['SPC' + slot + '_AREA'] = area
+
+    results.update(totals)
+    return OrderedDict((f, results[f]) for f in OUTPUT_FIELDS)
+
+
+def summarize(operating_areas, ages, results, oa_names=()):
+    #Groups every stand by (OPERATING_AREA, age class) in a single pass and sums
+    #STAT_FIELDS. NULL values are ignored like Statistics_analysis does. Every
+    #name in oa_names gets an entry even if it has no stands so the maps show
+    #zeros. Returns {OA: {age class: OrderedDict(FREQUENCY, SUM_<field>...)}}
+    index = OrderedDict((oa, n) for n, oa in enumerate(oa_names))
+    group = np.array([index.setdefault(oa, len(index)) for oa in operating_areas], dtype=int)
+    ages = _float_column(ages)
+    known = ~np.isnan(ages)
+
+    sums = {}
+    for age_class, (low, high) in AGE_CLASSES.items():
+        in_class = known.copy()
+        in_class[known] = ages[known] > low
+        if high is not None:
+            in_class[known] &= ages[known] <= high
+        sums[age_class] = [('FREQUENCY', np.bincount(group[in_class], minlength=len(index)))]
+        for field in STAT_FIELDS:
+            values = np.nan_to_num(_float_column(results[field]))[in_class]
+            sums[age_class].append(('SUM_' + field, np.bincount(group[in_class], weights=values, minlength=len(index))))
+
+    summary = OrderedDict()
+    for oa, n in index.items():
+        summary[oa] = OrderedDict()
+        for age_class in AGE_CLASSES:
+            summary[oa][age_class] = OrderedDict((name, col[n].item()) for name, col in sums[age_class])
+    return summary
+
+
+def summary_rows(summary):
+    #flattens the summary into tidy rows of OPERATING_AREA, AGE_CLASS, FREQUENCY, SUM_*
+    for oa, classes in summary.items():
+        for age_class, stats in classes.items():
+            yield [oa, age_class] + list(stats.values())
+
+
+def summary_header():
+    return ['OPERATING_AREA', 'AGE_CLASS', 'FREQUENCY'] + ['SUM_' + f for f in STAT_FIELDS]
+
+
+def write_summary_csv(path, summary):
+    #writes the summary once as a CSV for downstream reporting
+    if sys.version_info[0] < 3:
+        f = open(path, 'wb')
+    else:
+        f = open(path, 'w', newline='')
+    with f:
+        writer = csv.writer(f)
+        writer.writerow(summary_header())
+        for row in summary_rows(summary):
+            writer.writerow(row)
+
+
+def read_summary_csv(path):
+    #reads a summary written by write_summary_csv() back into the summarize() structure
+    if sys.version_info[0] < 3:
+        f = open(path, 'rb')
+    else:
+        f = open(path, newline='')
+    summary = OrderedDict()
+    with f:
+        reader = csv.reader(f)
+        header = next(reader)
+        for row in reader:
+            stats = OrderedDict([(header[2], int(row[2]))])
+            stats.update((name, float(value)) for name, value in zip(header[3:], row[3:]))
+            summary.setdefault(row[0], OrderedDict())[row[1]] = stats
+    return summary
+
+
+def merge_summaries(previous, current, oa_names):
+    #current summary with the previous rows filled in for operating areas that
+    #were not recomputed, in oa_names order
+    merged = OrderedDict()
+    for oa in list(oa_names) + [oa for oa in current if oa not in oa_names]:
+        if oa in current:
+            merged[oa] = current[oa]
+        elif oa in previous:
+            merged[oa] = previous[oa]
+    return merged
+
+
+def add_summaries(summaries, oa_names=()):
+    #Adds summaries of separate sets of stands (tiles) together, in oa_names
+    #order and with the stats in the summarize() order
+    stats = ['FREQUENCY'] + ['SUM_' + f for f in STAT_FIELDS]
+    total = OrderedDict()
+    for oa in list(oa_names) + [oa for s in summaries for oa in s if oa not in oa_names]:
+        total.setdefault(oa, OrderedDict((c, OrderedDict((name, 0) for name in stats)) for c in AGE_CLASSES))
+    for summary in summaries:
+        for oa, classes in summary.items():
+            for age_class, values in classes.items():
+                for name in stats:
+                    total[oa][age_class][name] += values[name]
+    return total
+
+
+def write_summary_table(table, summary):
+    #writes the summary as a geodatabase table alongside the VRI outputs
+    import arcpy
+    if arcpy.Exists(table):
+        arcpy.Delete_management(table)
+    dtype = [('OPERATING_AREA', '<U100'), ('AGE_CLASS', '<U20'), ('FREQUENCY', '<i4')]
+    dtype += [('SUM_' + f, '<f8') for f in STAT_FIELDS]
+    rows = [tuple([row[0] or u''] + row[1:]) for row in summary_rows(summary)]
+    arcpy.da.NumPyArrayToTable(np.array(rows, dtype=dtype), table)
+
+
+def summary_text(classes):
+    #Map text element name -> text for one operating area's summary, covering
+    #the area_<ma|im>_<species> / vol_<ma|im>_<species> boxes and their totals
+    texts = {}
+    for age_class, stats in classes.items():
+        tag = MAP_AGE_TAGS[age_class]
+        texts['area_' + tag + '_total'] = str(int(stats['SUM_HECTARES']))
+        total_vol = 0
+        for label, prefix in MAP_SPECIES_LABELS:
+            texts['area_' + tag + '_' + label] = str(int(stats['SUM_' + prefix + 'Area']))
+            texts['vol_' + tag + '_' + label] = str(int(stats['SUM_' + prefix + 'Vol']))
+            total_vol += stats['SUM_' + prefix + 'Vol']
+        texts['vol_' + tag + '_total'] = str(int(total_vol))
+    return texts
+
+
+def _to_cell(value):
+    #converts an array value back to something a cursor can write
+    if value is None:
+        return None
+    if isinstance(value, (float, np.floating)):
+        return None if np.isnan(value) else float(value)
+    return value
+
+
+def read_vri(fc):
+    #Reads the stand areas (ha), volume inputs and summary fields from the VRI
+    #feature class in one cursor pass. Returns (object ids, hectares, columns).
+    import arcpy
+    fields = input_fields() + SUMMARY_FIELDS
+    oids = []
+    hectares = []
+    values = [[] for f in fields]
+    with arcpy.da.SearchCursor(fc, ['OID@', 'SHAPE@AREA'] + fields) as cursor:
+        for row in cursor:
+            oids.append(row[0])
+            #Albers output is in metres so the shape area is converted to hectares
+            hectares.append(row[1] / 10000)
+            for col, value in zip(values, row[2:]):
+                col.append(value)
+    return oids, hectares, dict(zip(fields, values))
+
+
+def write_results(fc, oids, results):
+    #Writes the calculated fields back to the feature class in one update pass
+    import arcpy
+    fields = list(results.keys())
+    row_index = dict((oid, n) for n, oid in enumerate(oids))
+    columns = [results[f] for f in fields]
+    with arcpy.da.UpdateCursor(fc, ['OID@'] + fields) as cursor:
+        for row in cursor:
+            n = row_index[row[0]]
+            cursor.updateRow([row[0]] + [_to_cell(col[n]) for col in columns])
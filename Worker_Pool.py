@@ -0,0 +1,92 @@
+# ---------------------------------------------------------------------------
+# Worker_Pool.py
+# Created on: Oct 18, 2026
+#
+# Description: Pool of worker processes shared by the tools that split their
+#           jobs across python.exe processes (map production, standard units,
+#           FNCS batch packages). Jobs must be JSON-able. The jobs are dealt
+#           out to up to <processes> workers, each given a JSON file of its
+#           jobs and their positions. A worker runs the tool's own script with
+#           'worker' and appends the result of each job to its result file as
+#           soon as it's known.
+#
+#           Workers are separate python.exe processes, not threads, so arcpy
+#           is only ever called from one thread of a process and the pool also
+#           works when the tool runs inside ArcMap. A worker that dies takes
+#           only its unfinished jobs with it, failed(job, exit code) gives
+#           their results.
+#
+# Usage:    results = Worker_Pool.run_workers(__file__, jobs, processes, failed, args)
+#           and in the script, for 'worker <args...> <job file> <result file>':
+#           Worker_Pool.run_worker(job_file, result_file, run_job)
+#
+# Author:   Daniel Otto
+# ---------------------------------------------------------------------------
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+
+def python_executable():
+    #Inside ArcMap sys.executable is ArcMap.exe, the workers need python.exe
+    if os.path.basename(sys.executable).lower().startswith('python'):
+        return sys.executable
+    return os.path.join(sys.exec_prefix, 'python.exe')
+
+
+def cpu_count():
+    try:
+        import multiprocessing
+        return multiprocessing.cpu_count()
+    except (ImportError, NotImplementedError):
+        return 1
+
+
+def run_workers(script, jobs, processes, failed, args=(), prefix='workers_'):
+    #Runs the jobs on up to <processes> workers, each started as
+    #    python <script> worker <args...> <job file> <result file>
+    #Returns the results in job order, matched by position so jobs don't need
+    #a unique key.
+    work_dir = tempfile.mkdtemp(prefix=prefix)
+    script = os.path.abspath(script).replace('.pyc', '.py')
+    numbered = list(enumerate(jobs))
+    workers = []
+    for n in range(min(processes, len(jobs))):
+        job_file = os.path.join(work_dir, 'jobs_' + str(n) + '.json')
+        result_file = os.path.join(work_dir, 'results_' + str(n) + '.json')
+        with open(job_file, 'w') as f:
+            json.dump(numbered[n::processes], f)
+        proc = subprocess.Popen([python_executable(), script, 'worker'] + list(args) + [job_file, result_file],
+                                cwd=os.path.dirname(script))
+        workers.append((proc, job_file, result_file, numbered[n::processes]))
+
+    results = {}
+    for proc, job_file, result_file, worker_jobs in workers:
+        code = proc.wait()
+        if os.path.exists(result_file):
+            with open(result_file) as f:
+                for line in f:
+                    position, result = json.loads(line)
+                    results[position] = result
+        for position, job in worker_jobs:
+            if position not in results:
+                results[position] = failed(job, code)
+        for path in (job_file, result_file):
+            if os.path.exists(path):
+                os.remove(path)
+    os.rmdir(work_dir)
+    return [results[position] for position in range(len(jobs))]
+
+
+def run_worker(job_file, result_file, run):
+    #Worker process entry point, runs run(job) for its share of the jobs one at
+    #a time and appends each result as soon as it is known
+    with open(job_file) as f:
+        jobs = json.load(f)
+    for position, job in jobs:
+        result = run(job)
+        with open(result_file, 'a') as f:
+            f.write(json.dumps([position, result]) + '\n')
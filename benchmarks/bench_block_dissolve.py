@@ -0,0 +1,212 @@
+# ---------------------------------------------------------------------------
+# bench_block_dissolve.py
+# Created on: Oct 18, 2026
+#
+# Description: Times Block_Dissolve on seeded synthetic block sets of 10 to
+#           10,000 polygons. The blocks are cells of a jittered grid in BC
+#           Albers, about 70% of the cells taken so the licence has separate
+#           clusters, openings and blocks meeting at a corner. Each block
+#           carries its own copy of the shared boundary, moved by up to half
+#           a millimetre, and some blocks have an extra vertex part way along
+#           a shared edge, like blocks digitised one at a time. Openings the
+#           size of a cell are real holes and must survive.
+#
+#           The blocks don't overlap, so the dissolved area must equal the sum
+#           of the block areas and there is one part per group of blocks that
+#           share an edge. A one at a time union (each block added to the
+#           running outline) is timed on the smaller sets for comparison.
+#
+#           Overlapping triangles are then dissolved and checked against the
+#           union area worked out by inclusion-exclusion of their clipped
+#           intersections. The triangles share corners and edges, so crossing
+#           points land near the edges of other triangles. Three triangles
+#           that once dissolved to nothing are always checked.
+#
+# Usage:    python benchmarks/bench_block_dissolve.py [--sizes 10,100,1000,10000] [--seed 0] [--triangles 500]
+#
+# Author:   Daniel Otto
+# ---------------------------------------------------------------------------
+
+from __future__ import division
+
+import math
+import os
+import random
+import sys
+import time
+from argparse import ArgumentParser
+
+sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import Block_Dissolve
+import Geometry_Core
+
+ORIGIN = (1150000.0, 520000.0)
+CELL = 400.0
+FILL = 0.7
+JITTER = 0.0005
+SEQUENTIAL_LIMIT = 1000
+#   Overlapping triangles that dissolved to nothing, about 35.704 m2 together
+TRIANGLES = [[(2.5, 7.5902), (3.3844, 0.8605), (7.5, 7.5)],
+             [(7.2600, 0), (2.0940, 7.5), (10, 7.5)],
+             [(2.5, 7.5902), (3.3844, 0.8605), (2.5, 10)]]
+
+
+def make_blocks(size, seed):
+    #Returns (block geometries, grid cells used)
+    rng = random.Random(seed)
+    side = int(math.ceil(math.sqrt(size / FILL)))
+    corners = {}
+    for i in range(side + 1):
+        for j in range(side + 1):
+            corners[(i, j)] = (ORIGIN[0] + i * CELL + rng.uniform(-60, 60), ORIGIN[1] + j * CELL + rng.uniform(-60, 60))
+    cells = [(i, j) for i in range(side) for j in range(side)]
+    rng.shuffle(cells)
+    cells = cells[:size]
+
+    def near(p):
+        return (p[0] + rng.uniform(-JITTER, JITTER), p[1] + rng.uniform(-JITTER, JITTER))
+
+    blocks = []
+    for i, j in cells:
+        ring = []
+        for a, b in (((i, j), (i + 1, j)), ((i + 1, j), (i + 1, j + 1)),
+                     ((i + 1, j + 1), (i, j + 1)), ((i, j + 1), (i, j))):
+            p, q = corners[a], corners[b]
+            ring.append(near(p))
+            if rng.random() < 0.3:
+                t = rng.uniform(0.2, 0.8)
+                ring.append(near((p[0] + t * (q[0] - p[0]), p[1] + t * (q[1] - p[1]))))
+        ring.append(ring[0])
+        blocks.append({'type': 'Polygon', 'coordinates': [ring]})
+    return blocks, set(cells)
+
+
+def groups(cells):
+    #Blocks that share an edge, joined
+    remaining = set(cells)
+    count = 0
+    while remaining:
+        count += 1
+        stack = [remaining.pop()]
+        while stack:
+            i, j = stack.pop()
+            for neighbour in ((i + 1, j), (i - 1, j), (i, j + 1), (i, j - 1)):
+                if neighbour in remaining:
+                    remaining.remove(neighbour)
+                    stack.append(neighbour)
+    return count
+
+
+def sequential(blocks):
+    #Each block unioned into the running outline
+    polys = Block_Dissolve.snap([p for g in blocks for p in Block_Dissolve.oriented_polygons(g)])
+    result = []
+    for poly in polys:
+        result = Block_Dissolve.union(result, [poly])
+    return result
+
+
+def ring_area(ring):
+    #Signed area of an open ring, positive when anticlockwise
+    return sum(ring[i - 1][0] * ring[i][1] - ring[i][0] * ring[i - 1][1] for i in range(len(ring))) / 2
+
+
+def clip(subject, clipper):
+    #The part of convex ring subject inside convex anticlockwise ring clipper
+    for i in range(len(clipper)):
+        a, b = clipper[i - 1], clipper[i]
+        inside = [(b[0] - a[0]) * (p[1] - a[1]) - (b[1] - a[1]) * (p[0] - a[0]) for p in subject]
+        result = []
+        for j in range(len(subject)):
+            p, q, sp, sq = subject[j - 1], subject[j], inside[j - 1], inside[j]
+            if (sp >= 0) != (sq >= 0):
+                t = sp / (sp - sq)
+                result.append((p[0] + t * (q[0] - p[0]), p[1] + t * (q[1] - p[1])))
+            if sq >= 0:
+                result.append(q)
+        subject = result
+        if len(subject) < 3:
+            return []
+    return subject
+
+
+def union_area(triangles):
+    #Inclusion-exclusion over every intersection of the anticlockwise triangles
+    total = 0.0
+    stack = [(i, triangles[i], 1) for i in range(len(triangles))]
+    while stack:
+        last, ring, count = stack.pop()
+        total += ring_area(ring) if count % 2 else -ring_area(ring)
+        for k in range(last + 1, len(triangles)):
+            part = clip(ring, triangles[k])
+            if part:
+                stack.append((k, part, count + 1))
+    return total
+
+
+def make_triangles(rng):
+    #Three to six triangles on a 10m square, most corners shared
+    corners = [(round(rng.uniform(0, 10), 4), round(rng.uniform(0, 10), 4)) for _ in range(4)]
+    count = rng.randint(3, 6)
+    triangles = []
+    while len(triangles) < count:
+        ring = rng.sample(corners, 2) + [(round(rng.uniform(0, 10), 4), round(rng.uniform(0, 10), 4))]
+        if abs(ring_area(ring)) > 0.01:
+            triangles.append(ring if ring_area(ring) > 0 else ring[::-1])
+    return triangles
+
+
+def check_triangles(count, seed):
+    #Returns the number of triangle sets whose dissolved area is wrong
+    rng = random.Random(seed)
+    sets = [[ring if ring_area(ring) > 0 else ring[::-1] for ring in TRIANGLES]]
+    sets += [make_triangles(rng) for _ in range(count)]
+    wrong = 0
+    worst = 0.0
+    for triangles in sets:
+        merged = Block_Dissolve.dissolve([{'type': 'Polygon', 'coordinates': [ring + ring[:1]]} for ring in triangles],
+                                         snap_tolerance=0)
+        error = abs((Geometry_Core.area(merged) if merged else 0.0) - union_area(triangles))
+        worst = max(worst, error)
+        wrong += 0 if error < 1e-6 else 1
+    sys.stdout.write('%d overlapping triangle sets, %d wrong, largest area error %.2gm2  %s\n' % (
+        len(sets), wrong, worst, 'ok' if not wrong else 'MISMATCH'))
+    return wrong
+
+
+def main():
+    parser = ArgumentParser(description='Block dissolve benchmark')
+    parser.add_argument('--sizes', default='10,100,1000,10000')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--triangles', type=int, default=500, help='random overlapping triangle sets')
+    args = parser.parse_args()
+
+    failed = 0
+    sys.stdout.write('%7s %9s %9s %11s %7s %7s %8s  %s\n' %
+                     ('blocks', 'vertices', 'cascaded', 'one by one', 'parts', 'holes', 'area err', 'check'))
+    for size in [int(s) for s in args.sizes.split(',')]:
+        blocks, cells = make_blocks(size, args.seed)
+        vertices = sum(len(b['coordinates'][0]) for b in blocks)
+        start = time.time()
+        merged = Block_Dissolve.dissolve(blocks)
+        cascaded = time.time() - start
+        one_by_one = ''
+        if size <= SEQUENTIAL_LIMIT:
+            start = time.time()
+            sequential(blocks)
+            one_by_one = '%10.2fs' % (time.time() - start)
+        expected = sum(Geometry_Core.area(b) for b in blocks)
+        polys = Geometry_Core.polygons(merged)
+        error = abs(Geometry_Core.area(merged) - expected)
+        holes = sum(len(p) - 1 for p in polys)
+        #Snapping moves each shared edge by up to the jitter either way
+        ok = len(polys) == groups(cells) and error < 2 * JITTER * CELL * 4 * size
+        failed += 0 if ok else 1
+        sys.stdout.write('%7d %9d %8.2fs %11s %7d %7d %7.3fm2  %s\n' % (
+            size, vertices, cascaded, one_by_one or 'skipped', len(polys), holes, error, 'ok' if ok else 'MISMATCH'))
+    failed += 1 if check_triangles(args.triangles, args.seed) else 0
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,133 @@
+# ---------------------------------------------------------------------------
+# bench_fn_overlap_service.py
+# Created on: Oct 18, 2026
+#
+# Description: Checks FN_Overlap_Service against the direct lookup that
+#           Overlap__FN.py falls back to. A snapshot of the synthetic
+#           consultation areas is served on a free localhost port and the
+#           synthetic cut blocks are asked for, all at once and one block per
+#           request, with the overlap hectares and percent. Every answer must
+#           give the same rows as FN_Overlap_Batch.overlap_rows on a cold
+#           index of the same snapshot.
+#
+#           The snapshot is then rewritten with every other area and the
+#           service, still running, must answer from the new snapshot.
+#
+# Usage:    python benchmarks/bench_fn_overlap_service.py [--scale small] [--seed 0] [--requests 200]
+#
+# Author:   Daniel Otto
+# ---------------------------------------------------------------------------
+
+from __future__ import division
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from argparse import ArgumentParser
+
+sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(1, os.path.dirname(os.path.abspath(__file__)))
+import FN_Overlap_Batch
+import FN_Overlap_Index
+import FN_Overlap_Service
+import synthetic_data
+
+
+def records(dataset, step=1):
+    features = dataset.layers['ConsultationAreas'].features[::step]
+    return [(values[0], values[1], geom) for geom, values in features]
+
+
+def direct_rows(snapshot, features):
+    #The fallback of Overlap__FN.py, a cold index opened for the lookup
+    index = FN_Overlap_Index.OverlapIndex(snapshot)
+    try:
+        return list(FN_Overlap_Batch.overlap_rows(index, features, with_area=True))
+    finally:
+        index.close()
+
+
+def differences(expected, answer):
+    #Feature ids whose rows differ, the rows are compared as JSON gives them back
+    by_feature = {}
+    for rows, side in ((expected, 0), (answer, 1)):
+        for row in rows:
+            by_feature.setdefault(row[0], ([], []))[side].append([row[0]] + list(row[1:]))
+    return sorted(fid for fid, (a, b) in by_feature.items() if a != b)
+
+
+def main():
+    parser = ArgumentParser(description='Overlap service against the direct overlap lookup')
+    parser.add_argument('--scale', choices=list(synthetic_data.SCALES), default='small')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--requests', type=int, default=200, help='blocks asked for one per request')
+    args = parser.parse_args()
+
+    dataset = synthetic_data.generate(args.scale, args.seed)
+    features = [(values[0], geom) for geom, values in dataset.layers['CutBlk'].features]
+    work = tempfile.mkdtemp(prefix='bench_fn_service_')
+    snapshot = os.path.join(work, 'snapshot.sqlite')
+    server = None
+    service = None
+    try:
+        FN_Overlap_Index.write_snapshot(snapshot, records(dataset), source='synthetic')
+        service = FN_Overlap_Service.OverlapService(snapshot)
+        server = FN_Overlap_Service.make_server(service, 0)
+        port = server.server_address[1]
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+        start = time.time()
+        expected = direct_rows(snapshot, features)
+        direct_time = time.time() - start
+        start = time.time()
+        answer = FN_Overlap_Service.query_features(features, area=True, port=port)
+        service_time = time.time() - start
+        batch_differ = differences(expected, answer['rows'])
+
+        single_differ = []
+        for fid, geom in features[:args.requests]:
+            rows = FN_Overlap_Service.query_features([(fid, geom)], area=True, port=port)['rows']
+            single_differ += differences([r for r in expected if r[0] == fid], rows)
+
+        #A refreshed snapshot is picked up without a restart, the modified time
+        #is moved on so the change is seen on file systems with coarse times
+        stamp = os.path.getmtime(snapshot)
+        FN_Overlap_Index.write_snapshot(snapshot, records(dataset, 2), source='synthetic')
+        os.utime(snapshot, (stamp + 10, stamp + 10))
+        refreshed = direct_rows(snapshot, features)
+        refresh_differ = differences(refreshed, FN_Overlap_Service.query_features(features, area=True,
+                                                                                  port=port)['rows'])
+
+        report = FN_Overlap_Service.status(port)
+        sys.stdout.write('%d blocks, %d consultation areas, %d overlap rows\n' %
+                         (len(features), len(records(dataset)), len(expected)))
+        sys.stdout.write('direct (cold index) %.3fs, service %.3fs, %d single block requests p50 %sms p99 %sms\n' % (
+            direct_time, service_time, min(args.requests, len(features)), report['latency_ms'].get('p50'),
+            report['latency_ms'].get('p99')))
+        problems = [('service batch differs', batch_differ), ('service single differs', single_differ),
+                    ('service after refresh differs', refresh_differ)]
+        if report['errors']:
+            problems.append(('service errors', [report['errors']]))
+        FN_Overlap_Service.stop(port)
+        thread.join(5)
+    finally:
+        if server is not None:
+            server.server_close()
+        if service is not None:
+            service.index.close()
+        shutil.rmtree(work, ignore_errors=True)
+
+    for name, ids in problems:
+        if ids:
+            sys.stdout.write('%s: %s\n' % (name, ', '.join(str(i) for i in ids[:10])))
+    sys.stdout.write('check %s\n' % ('ok' if not any(ids for _, ids in problems) else 'FAILED'))
+    return 1 if any(ids for _, ids in problems) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,107 @@
+# ---------------------------------------------------------------------------
+# bench_list_genie.py
+# Created on: Oct 18, 2026
+#
+# Description: Times the List Genie duplicate and matching functions on large
+#           seeded lists of block style IDs and checks them against the
+#           original slice and scan implementations on a small sample. The
+#           original versions are quadratic, so they are only timed on a few
+#           thousand items. The streamed reader is timed on a text file of the
+#           same values.
+#
+# Usage:    python benchmarks/bench_list_genie.py [--size 1000000] [--seed 0]
+#
+# Author:   Daniel Otto
+# ---------------------------------------------------------------------------
+
+from __future__ import division
+
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+
+sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import List_Genie
+
+
+def legacy_find_dupes(list):
+    return sorted([x for n, x in enumerate(list) if x in list[:n]])
+
+
+def legacy_remove_dupes(list):
+    return sorted([x for n, x in enumerate(list) if x not in list[:n]])
+
+
+def make_ids(size, seed, prefix='K'):
+    #About 1 in 5 values is repeated, like a licence list pasted from several reports
+    rng = random.Random(seed)
+    distinct = int(size * 0.8) or 1
+    return [prefix + '%07d' % rng.randrange(distinct) for _ in range(size)]
+
+
+def timed(label, function, *args):
+    start = time.time()
+    result = function(*args)
+    seconds = time.time() - start
+    sys.stdout.write('%-34s %9.3fs  (%d values)\n' % (label, seconds, len(result)))
+    return result, seconds
+
+
+def main():
+    parser = ArgumentParser(description='List Genie benchmark')
+    parser.add_argument('--size', type=int, default=1000000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--legacy-size', type=int, default=5000)
+    args = parser.parse_args()
+
+    #Same answers as the original functions
+    sample = make_ids(args.legacy_size, args.seed)
+    old_dupes, old_dupes_time = timed('legacy find_dupes (' + str(args.legacy_size) + ')', legacy_find_dupes, sample)
+    old_unique, old_unique_time = timed('legacy remove_dupes (' + str(args.legacy_size) + ')', legacy_remove_dupes, sample)
+    new_dupes, _ = timed('find_dupes (' + str(args.legacy_size) + ')', List_Genie.find_dupes, sample)
+    new_unique, _ = timed('remove_dupes (' + str(args.legacy_size) + ')', List_Genie.remove_dupes, sample)
+    if old_dupes != new_dupes or old_unique != new_unique:
+        sys.stdout.write('MISMATCH between the legacy and counting implementations\n')
+        return 1
+
+    list1 = make_ids(args.size, args.seed)
+    list2 = make_ids(args.size, args.seed + 1)
+    sys.stdout.write('\n%d values per list\n' % args.size)
+    total = time.time()
+    counts1, _ = timed('count_values list 1', List_Genie.count_values, list1)
+    counts2, _ = timed('count_values list 2', List_Genie.count_values, list2)
+    timed('find_dupes list 1', List_Genie.find_dupes, list1, counts1)
+    unique1, _ = timed('remove_dupes list 1', List_Genie.remove_dupes, list1, counts1)
+    unique2, _ = timed('remove_dupes list 2', List_Genie.remove_dupes, list2, counts2)
+    timed('find_matching', List_Genie.find_matching, unique1, counts2)
+    timed('find_unmatched list 1', List_Genie.find_unmatched, unique1, counts2)
+    timed('find_unmatched list 2', List_Genie.find_unmatched, unique2, counts1)
+    sys.stdout.write('%-34s %9.3fs\n' % ('total', time.time() - total))
+
+    #Streaming from a text file, one normalize and translate per line
+    folder = tempfile.mkdtemp()
+    try:
+        path = os.path.join(folder, 'list1.txt')
+        with open(path, 'w') as f:
+            for n in range(0, len(list1), 8):
+                f.write(','.join(list1[n:n + 8]).lower() + '\n')
+        streamed, _ = timed('count_values streamed text file', lambda: List_Genie.count_values(
+            List_Genie.iter_values(List_Genie.FILE_PREFIX + path, '#', 'All Upper Case', ',;')))
+        if streamed != counts1:
+            sys.stdout.write('MISMATCH between the streamed and in memory counts\n')
+            return 1
+    finally:
+        shutil.rmtree(folder)
+
+    #The legacy functions grow with the square of the list size
+    scale = (args.size / args.legacy_size) ** 2
+    sys.stdout.write('%-34s %9.0fs\n' % ('legacy estimate for list 1', (old_dupes_time + old_unique_time) * scale))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,147 @@
+# ---------------------------------------------------------------------------
+# bench_road_proximity.py
+# Created on: Oct 18, 2026
+#
+# Description: Checks and times Geometry_Core.features_within, the "roads
+#           within distance of the blocks" search the extractors use before
+#           building route events, on a seeded synthetic road network. The
+#           network is a jittered grid of long main roads with short spurs
+#           (many vertices each, like road centrelines) over a 100 km square of
+#           BC Albers; a licence is a cluster of blocks in one corner of it.
+#
+#           The roads found are checked against Geometry_Core.distance measured
+#           for every road and block whose bounding boxes are within the
+#           distance (the others can't be). Spurs that end just inside and just
+#           outside the distance are added so the test is exact at the
+#           boundary. Measuring every road against every block, as a search
+#           without an index would, is timed on the smallest network only.
+#
+# Usage:    python benchmarks/bench_road_proximity.py [--roads 200,2000,20000] [--blocks 12] [--distance 100] [--seed 0]
+#
+# Author:   Daniel Otto
+# ---------------------------------------------------------------------------
+
+from __future__ import division
+
+import math
+import os
+import random
+import sys
+import time
+from argparse import ArgumentParser
+
+sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import Geometry_Core
+
+ORIGIN = (1150000.0, 480000.0)
+SPAN = 100000.0
+BRUTE_FORCE_LIMIT = 200
+
+
+def make_road(rng, start, heading, length, step=50.0):
+    #A wandering centreline of about length metres
+    points = [start]
+    x, y = start
+    for _ in range(max(1, int(length / step))):
+        heading += rng.uniform(-0.15, 0.15)
+        x += step * math.cos(heading)
+        y += step * math.sin(heading)
+        points.append((round(x, 2), round(y, 2)))
+    return {'type': 'LineString', 'coordinates': points}
+
+
+def make_blocks(count, seed):
+    #A licence of irregular blocks about 2 km across near the network's south west corner
+    rng = random.Random(seed)
+    centre = (ORIGIN[0] + SPAN * 0.2, ORIGIN[1] + SPAN * 0.2)
+    blocks = []
+    for _ in range(count):
+        x = centre[0] + rng.uniform(-1000, 1000)
+        y = centre[1] + rng.uniform(-1000, 1000)
+        radius = rng.uniform(100, 300)
+        ring = []
+        for k in range(16):
+            angle = 2 * math.pi * k / 16
+            r = radius * rng.uniform(0.7, 1.0)
+            ring.append((x + r * math.cos(angle), y + r * math.sin(angle)))
+        ring.append(ring[0])
+        blocks.append({'type': 'Polygon', 'coordinates': [ring]})
+    return blocks
+
+
+def make_network(count, blocks, distance, seed):
+    #Returns [(ROAD_SEQ_NBR, geometry)]: main roads, spurs and boundary spurs
+    rng = random.Random(seed)
+    roads = []
+    mains = max(2, int(math.sqrt(count / 10)))
+    for n in range(mains):
+        offset = (n + 0.5) * SPAN / mains
+        roads.append(make_road(rng, (ORIGIN[0], ORIGIN[1] + offset), 0.0, SPAN))
+        roads.append(make_road(rng, (ORIGIN[0] + offset, ORIGIN[1]), math.pi / 2, SPAN))
+    while len(roads) < count - 2 * len(blocks):
+        main = rng.choice(roads[:2 * mains])['coordinates']
+        start = main[rng.randrange(len(main))]
+        roads.append(make_road(rng, start, rng.uniform(0, 2 * math.pi), rng.uniform(200, 3000)))
+    #Straight spurs ending 1 m inside and 1 m outside the distance of a block vertex
+    for block in blocks:
+        x, y = block['coordinates'][0][0]
+        cx = sum(p[0] for p in block['coordinates'][0][:-1]) / 16
+        cy = sum(p[1] for p in block['coordinates'][0][:-1]) / 16
+        dx, dy = x - cx, y - cy
+        scale = math.hypot(dx, dy)
+        for gap in (distance - 1.0, distance + 1.0):
+            end = (x + dx / scale * gap, y + dy / scale * gap)
+            far = (x + dx / scale * (gap + 800), y + dy / scale * (gap + 800))
+            roads.append({'type': 'LineString', 'coordinates': [far, end]})
+    return [(100000 + n, road) for n, road in enumerate(roads)]
+
+
+def brute_force(roads, blocks, distance):
+    return [key for key, road in roads if any(Geometry_Core.distance(road, b) <= distance for b in blocks)]
+
+
+def reference(roads, blocks, distance):
+    #Exact distances, skipping only the pairs whose bounding boxes are too far apart
+    boxes = [Geometry_Core.bbox(b) for b in blocks]
+    found = []
+    for key, road in roads:
+        box = Geometry_Core.bbox(road)
+        if any(Geometry_Core.bbox_distance(box, bb) <= distance and Geometry_Core.distance(road, b) <= distance
+               for b, bb in zip(blocks, boxes)):
+            found.append(key)
+    return found
+
+
+def main():
+    parser = ArgumentParser(description='Roads within distance of blocks benchmark')
+    parser.add_argument('--roads', default='200,2000,20000')
+    parser.add_argument('--blocks', type=int, default=12)
+    parser.add_argument('--distance', type=float, default=100.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    blocks = make_blocks(args.blocks, args.seed)
+    failed = 0
+    sys.stdout.write('%7s %9s %7s %11s %12s  %s\n' % ('roads', 'vertices', 'found', 'prefilter', 'brute force', 'check'))
+    for size in [int(s) for s in args.roads.split(',')]:
+        roads = make_network(size, blocks, args.distance, args.seed)
+        vertices = sum(len(r['coordinates']) for _, r in roads)
+        start = time.time()
+        found = Geometry_Core.features_within(roads, blocks, args.distance)
+        prefilter = time.time() - start
+        expected = reference(roads, blocks, args.distance)
+        brute = 'skipped'
+        if size <= BRUTE_FORCE_LIMIT:
+            start = time.time()
+            failed += 0 if brute_force(roads, blocks, args.distance) == expected else 1
+            brute = '%11.2fs' % (time.time() - start)
+        #Every block has one spur just inside the distance, the one just outside must not be found
+        ok = found == expected and len(found) >= len(blocks)
+        failed += 0 if ok else 1
+        sys.stdout.write('%7d %9d %7d %10.3fs %12s  %s\n' % (len(roads), vertices, len(found), prefilter, brute,
+                                                             'ok' if ok else 'MISMATCH'))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,217 @@
+# ---------------------------------------------------------------------------
+# bench_spatial_packages.py
+# Created on: Oct 18, 2026
+#
+# Description: Round trip of seeded synthetic cutblocks through the GeoPackage
+#           and FlatGeobuf writers in Spatial_Packages: time to write, time to
+#           read everything back, time for bounding box queries through the
+#           spatial index against a full scan, and file size. Every feature read
+#           back is checked against what was written. The shapefile path is
+#           timed the same way when arcpy is available and skipped otherwise.
+#
+# Usage:    python benchmarks/bench_spatial_packages.py [--size 20000] [--queries 50] [--seed 0]
+#
+# Author:   Daniel Otto
+# ---------------------------------------------------------------------------
+
+from __future__ import division
+
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+
+sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import Geometry_Core
+import Spatial_Packages
+
+FIELDS = [('BLOCK_ID', 'text'), ('CUTB_SEQ_NBR', 'integer'), ('AREA_HA', 'real'), ('STATUS', 'text')]
+#   Synthetic blocks are spread over a 200 km square of BC Albers
+ORIGIN = (1100000.0, 450000.0)
+SPAN = 200000.0
+
+
+def make_blocks(size, seed):
+    #Irregular blocks of 5-60 ha, one in ten in two parts and one in ten with a reserve hole
+    rng = random.Random(seed)
+    blocks = []
+    for n in range(size):
+        x = ORIGIN[0] + rng.random() * SPAN
+        y = ORIGIN[1] + rng.random() * SPAN
+        radius = rng.uniform(120, 440)
+        ring = []
+        for k in range(rng.randint(8, 24)):
+            angle = 2 * math.pi * k / 24.0 + rng.random() * 0.2
+            r = radius * rng.uniform(0.7, 1.0)
+            ring.append((round(x + r * math.cos(angle), 2), round(y + r * math.sin(angle), 2)))
+        ring.append(ring[0])
+        rings = [ring]
+        if n % 10 == 3:
+            rings.append([(x - 20, y - 20), (x - 20, y + 20), (x + 20, y + 20), (x + 20, y - 20), (x - 20, y - 20)])
+        polygons = [rings]
+        if n % 10 == 7:
+            polygons.append([[(px + 2 * radius + 50, py) for px, py in ring]])
+        geom = {'type': 'MultiPolygon', 'coordinates': polygons}
+        values = ['K%06d' % n, 100000 + n, round(Geometry_Core.area(geom) / 10000.0, 3),
+                  None if n % 13 == 0 else rng.choice(['HARVESTED', 'PLANNED', 'RESERVE'])]
+        blocks.append((geom, values))
+    return blocks
+
+
+def make_queries(count, seed, width=5000.0):
+    #Square windows of width metres, about 0.06% of the area each
+    rng = random.Random(seed + 1)
+    queries = []
+    for _ in range(count):
+        x = ORIGIN[0] + rng.random() * (SPAN - width)
+        y = ORIGIN[1] + rng.random() * (SPAN - width)
+        queries.append((x, y, x + width, y + width))
+    return queries
+
+
+def expected_ids(blocks, box):
+    return set(values[0] for geom, values in blocks if Geometry_Core.bbox_intersects(Geometry_Core.bbox(geom), box))
+
+
+def same_geometry(a, b):
+    a = Spatial_Packages.promote(a, 'MultiPolygon')['coordinates']
+    b = Spatial_Packages.promote(b, 'MultiPolygon')['coordinates']
+    return [[[tuple(p) for p in ring] for ring in polygon] for polygon in a] == \
+        [[[tuple(p) for p in ring] for ring in polygon] for polygon in b]
+
+
+def check(blocks, features):
+    #features: (geometry, {field: value}) read back, in any order
+    written = dict((values[0], (geom, values)) for geom, values in blocks)
+    bad = 0
+    count = 0
+    for geom, properties in features:
+        count += 1
+        geom_in, values = written[properties['BLOCK_ID']]
+        if not same_geometry(geom_in, geom):
+            bad += 1
+        elif [properties.get(name) for name, _ in FIELDS] != values:
+            bad += 1
+    return bad + abs(count - len(blocks))
+
+
+def _timed(function):
+    start = time.time()
+    result = function()
+    return result, time.time() - start
+
+
+def bench_format(format, folder, blocks, queries):
+    path = os.path.join(folder, 'blocks.' + format)
+
+    def write():
+        layer = Spatial_Packages.open_layer(format, path, 'Block', FIELDS, 'MultiPolygon')
+        for geom, values in blocks:
+            layer.insert(geom, values)
+        return layer.close()
+
+    if format == 'gpkg':
+        read = lambda box=None: [(g, p) for _, g, p in Spatial_Packages.read_geopackage(path, 'Block', box)]
+    else:
+        read = lambda box=None: list(Spatial_Packages.read_flatgeobuf(path, box))
+
+    _, write_time = _timed(write)
+    features, read_time = _timed(read)
+    bad = check(blocks, features)
+
+    def query():
+        return [set(p['BLOCK_ID'] for _, p in read(box)) for box in queries]
+
+    def scan():
+        return [set(p['BLOCK_ID'] for g, p in read() if Geometry_Core.bbox_intersects(Geometry_Core.bbox(g), box))
+                for box in queries[:3]]
+
+    found, query_time = _timed(query)
+    _, scan_time = _timed(scan)
+    bad += sum(1 for box, ids in zip(queries, found) if ids != expected_ids(blocks, box))
+    return {'write': write_time, 'read': read_time, 'query': query_time / len(queries),
+            'scan': scan_time / 3, 'size': os.path.getsize(path), 'bad': bad,
+            'hits': sum(len(ids) for ids in found) / len(queries)}
+
+
+def bench_shapefile(folder, blocks, queries):
+    #The existing shapefile path through arcpy cursors, None without arcpy
+    try:
+        import arcpy
+    except ImportError:
+        return None
+    path = os.path.join(folder, 'blocks.shp')
+    names = [name for name, _ in FIELDS]
+    types = {'text': 'TEXT', 'integer': 'LONG', 'real': 'DOUBLE'}
+
+    def write():
+        arcpy.CreateFeatureclass_management(folder, 'blocks.shp', 'POLYGON',
+                                            spatial_reference=arcpy.SpatialReference(3005))
+        for name, kind in FIELDS:
+            arcpy.AddField_management(path, name, types[kind])
+        with arcpy.da.InsertCursor(path, ['SHAPE@'] + names) as cursor:
+            for geom, values in blocks:
+                cursor.insertRow([Geometry_Core.to_arcpy(geom, arcpy.SpatialReference(3005))] + values)
+        return len(blocks)
+
+    def read():
+        with arcpy.da.SearchCursor(path, ['SHAPE@'] + names) as cursor:
+            return [(Geometry_Core.from_arcpy(row[0]), dict(zip(names, row[1:]))) for row in cursor]
+
+    def query():
+        found = []
+        for box in queries:
+            with arcpy.da.SearchCursor(path, ['SHAPE@', 'BLOCK_ID']) as cursor:
+                found.append(set(row[1] for row in cursor
+                                 if Geometry_Core.bbox_intersects((row[0].extent.XMin, row[0].extent.YMin,
+                                                                   row[0].extent.XMax, row[0].extent.YMax), box)))
+        return found
+
+    _, write_time = _timed(write)
+    features, read_time = _timed(read)
+    found, query_time = _timed(query)
+    size = sum(os.path.getsize(os.path.join(folder, name)) for name in os.listdir(folder)
+               if name.startswith('blocks.') and name.split('.')[-1] not in Spatial_Packages.FORMATS)
+    #Shapefiles have no NULL text and store doubles as text, so only the geometry count is checked
+    return {'write': write_time, 'read': read_time, 'query': query_time / len(queries),
+            'scan': query_time / len(queries), 'size': size, 'bad': abs(len(features) - len(blocks)),
+            'hits': sum(len(ids) for ids in found) / len(queries)}
+
+
+def main():
+    parser = ArgumentParser(description='GeoPackage and FlatGeobuf round trip benchmark')
+    parser.add_argument('--size', type=int, default=20000)
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    blocks, seconds = _timed(lambda: make_blocks(args.size, args.seed))
+    queries = make_queries(args.queries, args.seed)
+    sys.stdout.write('%d synthetic blocks in %.2fs, %d query windows\n' % (len(blocks), seconds, len(queries)))
+    folder = tempfile.mkdtemp()
+    failed = 0
+    try:
+        sys.stdout.write('%-6s %9s %9s %11s %11s %8s %10s  %s\n' %
+                         ('format', 'write', 'read', 'query', 'full scan', 'hits', 'size', 'check'))
+        results = [(format, bench_format(format, folder, blocks, queries)) for format in Spatial_Packages.FORMATS]
+        results.append(('shp', bench_shapefile(folder, blocks, queries)))
+        for format, result in results:
+            if result is None:
+                sys.stdout.write('%-6s skipped, arcpy is not available\n' % format)
+                continue
+            failed += 1 if result['bad'] else 0
+            sys.stdout.write('%-6s %8.2fs %8.2fs %9.1fms %9.1fms %8.1f %8.1fMB  %s\n' % (
+                format, result['write'], result['read'], result['query'] * 1000, result['scan'] * 1000,
+                result['hits'], result['size'] / 1048576.0, 'ok' if not result['bad'] else
+                str(result['bad']) + ' MISMATCHED'))
+    finally:
+        shutil.rmtree(folder)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,142 @@
+# ---------------------------------------------------------------------------
+# bench_standard_units.py
+# Created on: Oct 18, 2026
+#
+# Description: Runs the Standard_Units_Engine geometry core on seeded synthetic
+#           blocks and roads, in this process and on a pool of worker
+#           processes. The blocks are irregular polygons of 5-60 ha scattered
+#           over a 40 km square of BC Albers, some with a reserve hole; the
+#           roads are wandering centrelines crossing the square with spurs
+#           into some of the blocks.
+#
+#           Checks: every block's PAS and Productive areas add up to the block
+#           area, the worker pool gives the same areas as the single process,
+#           and a sample of blocks given every road (no near road search) gives
+#           the same PAS area as with only the roads near it.
+#
+# Usage:    python benchmarks/bench_standard_units.py [--blocks 400] [--roads 300] [--processes 4] [--seed 0]
+#
+# Author:   Daniel Otto
+# ---------------------------------------------------------------------------
+
+from __future__ import division
+
+import math
+import os
+import random
+import sys
+import time
+from argparse import ArgumentParser
+
+sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import Geometry_Core
+import Standard_Units_Engine
+
+ORIGIN = (1200000.0, 560000.0)
+SPAN = 40000.0
+SAMPLE = 20
+
+
+def make_blocks(count, seed):
+    rng = random.Random(seed)
+    blocks = []
+    for n in range(count):
+        x = ORIGIN[0] + rng.random() * SPAN
+        y = ORIGIN[1] + rng.random() * SPAN
+        radius = rng.uniform(130, 440)
+        ring = []
+        for k in range(24):
+            angle = 2 * math.pi * k / 24
+            r = radius * rng.uniform(0.75, 1.0)
+            ring.append((round(x + r * math.cos(angle), 2), round(y + r * math.sin(angle), 2)))
+        ring.append(ring[0])
+        rings = [ring]
+        if n % 7 == 0:
+            rings.append([(x - 30, y - 30), (x - 30, y + 30), (x + 30, y + 30), (x + 30, y - 30), (x - 30, y - 30)])
+        blocks.append((100000 + n, {'type': 'Polygon', 'coordinates': rings}))
+    return blocks
+
+
+def make_roads(count, blocks, seed):
+    rng = random.Random(seed + 1)
+    roads = []
+    for n in range(count):
+        if n % 3 == 0:
+            #Spur from outside a block to its middle
+            _, block = rng.choice(blocks)
+            box = Geometry_Core.bbox(block)
+            x, y = (box[0] + box[2]) / 2, (box[1] + box[3]) / 2
+            heading = rng.uniform(0, 2 * math.pi)
+            start = (x + 800 * math.cos(heading), y + 800 * math.sin(heading))
+            points = [start, (x + rng.uniform(-20, 20), y + rng.uniform(-20, 20))]
+        else:
+            x, y = ORIGIN[0] + rng.random() * SPAN, ORIGIN[1] + rng.random() * SPAN
+            heading = rng.uniform(0, 2 * math.pi)
+            points = [(x, y)]
+            for _ in range(rng.randint(20, 120)):
+                heading += rng.uniform(-0.2, 0.2)
+                x += 60 * math.cos(heading)
+                y += 60 * math.sin(heading)
+                points.append((round(x, 2), round(y, 2)))
+        roads.append({'type': 'LineString', 'coordinates': points})
+    return roads
+
+
+def areas(results):
+    return dict((r['block_id'], dict((u[0], u[2]) for u in r['units'])) for r in results)
+
+
+def main():
+    parser = ArgumentParser(description='Standard units engine benchmark')
+    parser.add_argument('--blocks', type=int, default=400)
+    parser.add_argument('--roads', type=int, default=300)
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    blocks = make_blocks(args.blocks, args.seed)
+    roads = make_roads(args.roads, blocks, args.seed)
+    start = time.time()
+    jobs = Standard_Units_Engine.build_jobs(blocks, roads)
+    search = time.time() - start
+    sys.stdout.write('%d blocks, %d roads, near road search %.3fs, %d blocks with roads\n' %
+                     (len(blocks), len(roads), search, sum(1 for j in jobs if j['lines'])))
+
+    start = time.time()
+    single = Standard_Units_Engine.generate(jobs, 1)
+    single_time = time.time() - start
+    start = time.time()
+    pooled = Standard_Units_Engine.generate(jobs, args.processes)
+    pooled_time = time.time() - start
+
+    failed = [r['block_id'] for r in single + pooled if r['status'] != 'ok']
+    block_areas = dict((block_id, Geometry_Core.area(geom)) for block_id, geom in blocks)
+    single_areas = areas(single)
+    unbalanced = [b for b, units in single_areas.items() if abs(sum(units.values()) - block_areas[b]) > 1e-6 * block_areas[b]]
+    pooled_areas = areas(pooled)
+    differ = [b for b in single_areas if any(abs(single_areas[b][k] - pooled_areas[b][k]) > 1e-6 for k in single_areas[b])]
+    #The near road search mustn't drop any road that reaches the block
+    sample = [job for job in jobs if job['lines']][:SAMPLE]
+    every_road = [line for road in roads for line in Geometry_Core.lines(road)]
+    missed = []
+    for job in sample:
+        units, _ = Standard_Units_Engine.standard_units(job['block'], every_road, job['width'])
+        if abs(units[0][2] - single_areas[job['block_id']]['PAS']) > 1e-6:
+            missed.append(job['block_id'])
+
+    seconds = sorted(r['seconds'] for r in single)
+    pas = sum(units['PAS'] for units in single_areas.values()) / 10000.0
+    sys.stdout.write('1 process %.2fs, %d processes %.2fs, per block median %.3fs max %.3fs, PAS %.1f ha of %.1f ha\n' % (
+        single_time, args.processes, pooled_time, seconds[len(seconds) // 2], seconds[-1], pas,
+        sum(block_areas.values()) / 10000.0))
+    problems = [('failed', failed), ('PAS + Productive != block', unbalanced), ('pool differs', differ),
+                ('near road search missed roads', missed)]
+    for name, ids in problems:
+        if ids:
+            sys.stdout.write('%s: %s\n' % (name, ', '.join(str(i) for i in ids[:10])))
+    sys.stdout.write('check %s\n' % ('ok' if not any(ids for _, ids in problems) else 'FAILED'))
+    return 1 if any(ids for _, ids in problems) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,621 @@
+# ---------------------------------------------------------------------------
+# run_benchmarks.py
+# Created on: Oct 18, 2026
+#
+# Description: Benchmark suite for the hot paths of the tools, run on the
+#           seeded synthetic data from synthetic_data.py with the pure python
+#           backends only (no arcpy, no BCGW/DBP06), so it runs on plain Linux
+#           as well as on an ArcGIS machine.
+#
+#           Timber Availability   volume engine and age class summary, THLB x
+#                                 VRI overlay area, tile planning, operating
+#                                 area fingerprints for incremental runs
+#           Overlap_FN            consultation area snapshot build, batch
+#                                 overlap table with overlap areas
+#           Extractors            roads near the blocks, chunked ID queries,
+#                                 KML and GeoPackage writing, FNCS dissolve,
+#                                 standard units
+#           List Genie            duplicates and matching, streamed text lists
+#
+#           Every case is timed as the best of --repeat runs after an untimed
+#           setup, and its result is checked (a wrong answer fails the run
+#           whatever the time). Times are compared with baselines.json: the
+#           stored times are scaled by a calibration loop timed on this machine
+#           against the one timed when they were stored, and a case that is
+#           slower than its scaled baseline by more than its threshold (and by
+#           more than min_seconds, so the quickest cases don't fail on noise) is
+#           a regression. --update stores the times of this run as the
+#           baselines of its scale. Baselines are kept for small and medium,
+#           large has none and is run by hand when sizing a change.
+#
+#           The bench_*.py scripts next to this one go deeper on one module
+#           each, with reference implementations to compare against.
+#
+# Usage:    python benchmarks/run_benchmarks.py [--scale small] [--seed 0] [--repeat 3]
+#               [--cases ta_volumes,list_genie] [--update] [--output results.json]
+#
+# Author:   Daniel Otto
+# ---------------------------------------------------------------------------
+
+from __future__ import division
+
+import gc
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from collections import namedtuple, OrderedDict
+
+sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(1, os.path.dirname(os.path.abspath(__file__)))
+import numpy as np
+
+import Block_Dissolve
+import FN_Overlap_Batch
+import FN_Overlap_Index
+import Geometry_Core
+import Geometry_Overlay
+import KML_Writer
+import List_Genie
+import Query_Builder
+import Spatial_Packages
+import Standard_Units_Engine
+import TA_Incremental
+import TA_Tiling
+import TA_Volume_Engine
+import synthetic_data
+
+BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+DEFAULT_THRESHOLD = 1.5
+MIN_SECONDS = 0.05
+#   Licences whose blocks make up one FNCS package, and one standard units batch
+BATCH_LICENCES = 10
+UNITS_LICENCES = 3
+ROAD_DISTANCE = 100.0
+#   Blocks checked against every consultation area without the index
+OVERLAP_SAMPLE = 30
+
+#   name: case name, tool: tool it stands in for, setup(dataset, folder) -> state
+#   (untimed), run(state) -> result (timed), check(state, result) -> (ok, detail)
+Case = namedtuple('Case', 'name tool setup run check')
+
+
+def _close(a, b, tolerance=1e-9):
+    return abs(a - b) <= tolerance * max(1.0, abs(a), abs(b))
+
+
+def _centre(geom):
+    box = Geometry_Core.bbox(geom)
+    return ((box[0] + box[2]) / 2, (box[1] + box[3]) / 2)
+
+
+def _batch(dataset, count=BATCH_LICENCES):
+    #[(BLOCK_ID, geometry)] of the blocks of the first count licences, by licence
+    licences = OrderedDict()
+    for geom, values in dataset.layers['CutBlk'].features:
+        licences.setdefault(values[2], []).append((values[0], geom))
+    return OrderedDict(list(licences.items())[:count])
+
+
+# ---------------------------------------------------------------------------
+#   Timber Availability
+# ---------------------------------------------------------------------------
+
+def setup_volumes(dataset, folder):
+    #VRI columns as read by read_vri() and the operating area of each stand
+    #(the one holding its centre, standing in for the Intersect)
+    layer = dataset.layers['VRI']
+    areas = [(values[0], Geometry_Core.Prepared(geom)) for geom, values in dataset.layers['OperatingAreas'].features]
+    operating_areas = []
+    for geom in synthetic_data.geometries(layer):
+        centre = _centre(geom)
+        operating_areas.append(next((name for name, area in areas if area.locate(centre) != Geometry_Core.OUTSIDE),
+                                    None))
+    return {'hectares': [Geometry_Core.area(g) / 10000.0 for g in synthetic_data.geometries(layer)],
+            'columns': dict((f, synthetic_data.column(layer, f)) for f in TA_Volume_Engine.input_fields()),
+            'ages': synthetic_data.column(layer, 'PROJ_AGE_1'), 'operating_areas': operating_areas,
+            'names': [name for name, _ in areas]}
+
+
+def run_volumes(state):
+    results = TA_Volume_Engine.compute_volumes(state['hectares'], state['columns'])
+    return results, TA_Volume_Engine.summarize(state['operating_areas'], state['ages'], results, state['names'])
+
+
+def check_volumes(state, result):
+    #Every live volume lands in exactly one group total, and every aged stand
+    #over 60 in exactly one summary row
+    results, summary = result
+    live = sum(np.asarray(results['SPC' + str(i) + '_VOL_LIVE'], dtype=float) for i in TA_Volume_Engine.SPECIES_SLOTS)
+    groups = sum(np.asarray(results[p + 'Vol'], dtype=float)
+                 for p in [p for p, _ in TA_Volume_Engine.SPECIES_GROUPS.values()] + ['Other'])
+    known = ~np.isnan(live)
+    frequency = sum(stats['FREQUENCY'] for classes in summary.values() for stats in classes.values())
+    expected = sum(1 for age in state['ages'] if age is not None and age > 60)
+    ok = np.allclose(live[known], groups[known]) and frequency == expected
+    return ok, '%d stands, %d mature/immature' % (len(state['hectares']), frequency)
+
+
+def setup_overlay(dataset, folder):
+    thlb = dataset.layers['THLB'].features
+    return {'thlb': [(geom, values[1]) for geom, values in thlb],
+            'vri': synthetic_data.geometries(dataset.layers['VRI']),
+            'thlb_area': sum(Geometry_Core.area(geom) for geom, _ in thlb)}
+
+
+def run_overlay(state):
+    #THLB area and effective (THLB_FACT weighted) area of every VRI polygon
+    thlb = [(Geometry_Core.Prepared(geom), fact) for geom, fact in state['thlb']]
+    tree = Geometry_Core.STRtree([(p.bbox, n) for n, (p, _) in enumerate(thlb)])
+    areas = []
+    for geom in state['vri']:
+        vri = Geometry_Core.Prepared(geom)
+        area = effective = 0.0
+        for n in tree.query(vri.bbox):
+            shared = Geometry_Overlay.intersection_area(vri, thlb[n][0])
+            area += shared
+            effective += shared * thlb[n][1]
+        areas.append((area, effective))
+    return areas
+
+
+def check_overlay(state, areas):
+    #VRI covers the landscape without overlaps, so the pieces add up to the THLB
+    total = sum(a for a, _ in areas)
+    return _close(total, state['thlb_area'], 1e-9), '%.1f ha THLB, %.1f ha effective' % (
+        total / 10000.0, sum(e for _, e in areas) / 10000.0)
+
+
+def setup_tiling(dataset, folder):
+    features = []
+    for n, geom in enumerate(synthetic_data.geometries(dataset.layers['VRI'])):
+        x, y = _centre(geom)
+        features.append((n + 1, x, y, len(list(Geometry_Core.vertices(geom)))))
+    span = dataset.extent[2] - dataset.extent[0]
+    #A budget of about 1/64 of the VRI vertices per tile
+    return {'features': features, 'extent': dataset.extent, 'size': span / 4,
+            'limit': max(1, sum(f[3] for f in features) // 64)}
+
+
+def run_tiling(state):
+    tiles = []
+    for column, row, bbox, owned in TA_Tiling.grid(state['features'], state['extent'], state['size']):
+        tile = TA_Tiling.Tile('cell_' + str(column) + '_' + str(row), bbox, None, owned, True)
+        tiles += TA_Tiling.split(tile, state['limit'])
+    return tiles
+
+
+def check_tiling(state, tiles):
+    owned = sorted(f[0] for tile in tiles for f in tile.features)
+    fits = all(TA_Tiling.vertices(t) <= state['limit'] or len(t.features) == 1 for t in tiles)
+    return owned == [f[0] for f in state['features']] and fits, '%d tiles' % len(tiles)
+
+
+def setup_fingerprints(dataset, folder):
+    #VRI rows as TA_Incremental reads them: the bbox and the attribute values
+    rows = [(Geometry_Core.bbox(geom), values) for geom, values in dataset.layers['VRI'].features]
+    boxes = dict((values[0], Geometry_Core.bbox(geom)) for geom, values in dataset.layers['OperatingAreas'].features)
+    return {'rows': rows, 'boxes': boxes}
+
+
+def run_fingerprints(state):
+    return TA_Incremental.fingerprint_rows(state['rows'], state['boxes'])
+
+
+def check_fingerprints(state, fingerprints):
+    #Changing one stand changes the fingerprint of the operating areas it overlaps and no others
+    rows = list(state['rows'])
+    n = len(rows) // 2
+    rows[n] = (rows[n][0], rows[n][1][:-1] + [(rows[n][1][-1] or 0) + 5])
+    changed = TA_Incremental.fingerprint_rows(rows, state['boxes'])
+    expected = set(oa for oa, box in state['boxes'].items() if TA_Incremental.boxes_overlap(rows[n][0], box))
+    found = set(oa for oa in fingerprints if fingerprints[oa] != changed[oa])
+    return found == expected, '%d operating areas' % len(fingerprints)
+
+
+# ---------------------------------------------------------------------------
+#   Overlap_FN
+# ---------------------------------------------------------------------------
+
+def _records(dataset):
+    return [(values[0], values[1], geom) for geom, values in dataset.layers['ConsultationAreas'].features]
+
+
+def setup_snapshot(dataset, folder):
+    return {'records': _records(dataset), 'path': os.path.join(folder, 'snapshot_build.sqlite')}
+
+
+def run_snapshot(state):
+    return FN_Overlap_Index.write_snapshot(state['path'], state['records'])
+
+
+def check_snapshot(state, count):
+    index = FN_Overlap_Index.OverlapIndex(state['path'])
+    try:
+        ok = count == len(state['records']) and index.info['count'] == count
+    finally:
+        index.close()
+    return ok, '%d areas' % count
+
+
+def setup_overlap(dataset, folder):
+    path = os.path.join(folder, 'snapshot.sqlite')
+    FN_Overlap_Index.write_snapshot(path, _records(dataset))
+    features = [(values[0], geom) for geom, values in dataset.layers['CutBlk'].features]
+    return {'path': path, 'features': features, 'records': _records(dataset)}
+
+
+def run_overlap(state):
+    #A cold index, as the batch tool opens it
+    index = FN_Overlap_Index.OverlapIndex(state['path'])
+    try:
+        return list(FN_Overlap_Batch.overlap_rows(index, state['features'], with_area=True))
+    finally:
+        index.close()
+
+
+def check_overlap(state, rows):
+    found = {}
+    for row in rows:
+        if row[1] or row[2]:
+            found.setdefault(row[0], set()).add((row[1], row[2]))
+    areas = [(organization, name, Geometry_Core.Prepared(geom)) for organization, name, geom in state['records']]
+    bad = 0
+    for fid, geom in state['features'][:OVERLAP_SAMPLE]:
+        expected = set((o, n) for o, n, area in areas if area.intersects(geom))
+        bad += 0 if found.get(fid, set()) == expected else 1
+    bad += sum(1 for row in rows if row[4] is not None and not 0 <= row[4] <= 100.0001)
+    return not bad, '%d rows, %d blocks overlapping' % (len(rows), len(found))
+
+
+# ---------------------------------------------------------------------------
+#   Extractors
+# ---------------------------------------------------------------------------
+
+def setup_road_proximity(dataset, folder):
+    blocks = [geom for licence in _batch(dataset).values() for _, geom in licence]
+    roads = [(values[0], geom) for geom, values in dataset.layers['Roads'].features]
+    return {'blocks': blocks, 'roads': roads}
+
+
+def run_road_proximity(state):
+    return Geometry_Core.features_within(state['roads'], state['blocks'], ROAD_DISTANCE)
+
+
+def check_road_proximity(state, found):
+    #Exact distances for every road and block whose boxes are close enough
+    boxes = [Geometry_Core.bbox(b) for b in state['blocks']]
+    expected = [key for key, road in state['roads']
+                if any(Geometry_Core.bbox_distance(Geometry_Core.bbox(road), box) <= ROAD_DISTANCE and
+                       Geometry_Core.distance(road, block) <= ROAD_DISTANCE
+                       for block, box in zip(state['blocks'], boxes))]
+    return found == expected, '%d of %d roads' % (len(found), len(state['roads']))
+
+
+def setup_where(dataset, folder):
+    #The block view stood in by SQLite, queried for the unique block IDs and
+    #licences of the lists
+    path = os.path.join(folder, 'blocks.sqlite')
+    connection = sqlite3.connect(path)
+    connection.execute('CREATE TABLE SV_BLOCK (BLOCK_ID TEXT, CUTB_SEQ_NBR INTEGER, LICENCE_ID TEXT)')
+    connection.executemany('INSERT INTO SV_BLOCK VALUES (?, ?, ?)',
+                           (values[:3] for _, values in dataset.layers['CutBlk'].features))
+    connection.commit()
+    connection.close()
+    ids = List_Genie.remove_dupes(dataset.lists['Block_IDs'])
+    licences = List_Genie.remove_dupes(dataset.lists['Licence_IDs'])
+    layer = dataset.layers['CutBlk']
+    known = set(synthetic_data.column(layer, 'BLOCK_ID'))
+    return {'select': Query_Builder.dbapi_select(lambda: sqlite3.connect(path), 'SV_BLOCK', ['BLOCK_ID', 'LICENCE_ID']),
+            'ids': ids, 'licences': licences, 'expected': sorted(i for i in ids if i in known),
+            'licence_blocks': sum(1 for licence in synthetic_data.column(layer, 'LICENCE_ID') if licence in set(licences))}
+
+
+def run_where(state):
+    return (Query_Builder.run_chunked(state['select'], 'BLOCK_ID', state['ids']),
+            Query_Builder.run_chunked(state['select'], 'LICENCE_ID', state['licences']))
+
+
+def check_where(state, result):
+    blocks, licences = result
+    ok = sorted(r[0] for r in blocks) == state['expected'] and len(licences) == state['licence_blocks']
+    return ok, '%d IDs and %d licences, %d + %d rows' % (len(state['ids']), len(state['licences']),
+                                                         len(blocks), len(licences))
+
+
+def setup_kml(dataset, folder):
+    fields = [name for name, _ in dataset.layers['CutBlk'].fields]
+    features = [(values[0], geom, list(zip(fields, values))) for geom, values in dataset.layers['CutBlk'].features]
+    return {'features': features}
+
+
+def run_kml(state):
+    stream = io.BytesIO()
+    count = KML_Writer.write_document(stream, 'CutBlk', [KML_Writer.KMLLayer('CutBlk', KML_Writer.style(), iter(state['features']))])
+    return count, len(stream.getvalue())
+
+
+def check_kml(state, result):
+    count, size = result
+    return count == len(state['features']), '%d placemarks, %.1f MB' % (count, size / 1048576.0)
+
+
+def setup_gpkg(dataset, folder):
+    return {'path': os.path.join(folder, 'extract.gpkg'),
+            'layers': [dataset.layers['CutBlk'], dataset.layers['Roads']]}
+
+
+def run_gpkg(state):
+    if os.path.exists(state['path']):
+        os.remove(state['path'])
+    counts = []
+    for layer in state['layers']:
+        writer = Spatial_Packages.open_layer('gpkg', state['path'], layer.name, layer.fields, layer.geometry_type)
+        for geom, values in layer.features:
+            writer.insert(geom, values)
+        counts.append(writer.close())
+    return counts
+
+
+def check_gpkg(state, counts):
+    read = [sum(1 for _ in Spatial_Packages.read_geopackage(state['path'], layer.name)) for layer in state['layers']]
+    expected = [len(layer.features) for layer in state['layers']]
+    return counts == expected and read == expected, '%d features, %.1f MB' % (
+        sum(counts), os.path.getsize(state['path']) / 1048576.0)
+
+
+def setup_dissolve(dataset, folder):
+    return {'licences': _batch(dataset)}
+
+
+def run_dissolve(state):
+    return [Block_Dissolve.dissolve([geom for _, geom in blocks]) for blocks in state['licences'].values()]
+
+
+def check_dissolve(state, merged):
+    #A licence outline is no bigger than its blocks and no smaller than the largest
+    bad = 0
+    for blocks, geom in zip(state['licences'].values(), merged):
+        areas = [Geometry_Core.area(g) for _, g in blocks]
+        area = Geometry_Core.area(geom) if geom else 0.0
+        bad += 0 if max(areas) - 1 <= area <= sum(areas) + 1 else 1
+    return not bad, '%d licences, %d blocks' % (len(merged), sum(len(b) for b in state['licences'].values()))
+
+
+def setup_standard_units(dataset, folder):
+    blocks = [block for licence in _batch(dataset, UNITS_LICENCES).values() for block in licence]
+    return {'blocks': blocks, 'roads': synthetic_data.geometries(dataset.layers['Roads'])}
+
+
+def run_standard_units(state):
+    jobs = Standard_Units_Engine.build_jobs(state['blocks'], state['roads'])
+    return Standard_Units_Engine.generate(jobs, 1)
+
+
+def check_standard_units(state, results):
+    areas = dict((block_id, Geometry_Core.area(geom)) for block_id, geom in state['blocks'])
+    bad = sum(1 for r in results if r['status'] != 'ok' or
+              not _close(sum(u[2] for u in r['units']), areas[r['block_id']], 1e-6))
+    pas = sum(u[2] for r in results for u in r['units'] if u[0] == Standard_Units_Engine.PAS)
+    return not bad, '%d blocks, %.1f ha PAS' % (len(results), pas / 10000.0)
+
+
+# ---------------------------------------------------------------------------
+#   List Genie
+# ---------------------------------------------------------------------------
+
+def setup_list_genie(dataset, folder):
+    return {'list1': dataset.lists['Block_IDs'], 'list2': dataset.lists['Compare_IDs']}
+
+
+def run_list_genie(state):
+    counts1 = List_Genie.count_values(state['list1'])
+    counts2 = List_Genie.count_values(state['list2'])
+    unique1 = List_Genie.remove_dupes(state['list1'], counts1)
+    return (List_Genie.find_dupes(state['list1'], counts1), unique1,
+            List_Genie.find_matching(unique1, counts2), List_Genie.find_unmatched(unique1, counts2))
+
+
+def check_list_genie(state, result):
+    dupes, unique, matching, unmatched = result
+    second = set(state['list2'])
+    ok = (len(dupes) + len(unique) == len(state['list1']) and unique == sorted(set(state['list1'])) and
+          matching == [v for v in unique if v in second] and len(matching) + len(unmatched) == len(unique))
+    return ok, '%d values, %d duplicates, %d matching' % (len(state['list1']), len(dupes), len(matching))
+
+
+def setup_list_stream(dataset, folder):
+    #The list as pasted from a report: lower case, several values per line
+    path = os.path.join(folder, 'Block_IDs.txt')
+    values = dataset.lists['Block_IDs']
+    with io.open(path, 'w', encoding='utf-8') as f:
+        for n in range(0, len(values), 8):
+            f.write(u';'.join(values[n:n + 8]).lower() + u'\n')
+    return {'path': path, 'values': values}
+
+
+def run_list_stream(state):
+    return List_Genie.count_values(List_Genie.iter_values(List_Genie.FILE_PREFIX + state['path'], '#', 'All Upper Case', ',;'))
+
+
+def check_list_stream(state, counts):
+    return counts == List_Genie.count_values(state['values']), '%d distinct' % len(counts)
+
+
+CASES = [
+    Case('ta_volumes', 'Timber Availability', setup_volumes, run_volumes, check_volumes),
+    Case('ta_overlay', 'Timber Availability', setup_overlay, run_overlay, check_overlay),
+    Case('ta_tiling', 'Timber Availability', setup_tiling, run_tiling, check_tiling),
+    Case('ta_fingerprints', 'Timber Availability', setup_fingerprints, run_fingerprints, check_fingerprints),
+    Case('fn_snapshot', 'Overlap_FN', setup_snapshot, run_snapshot, check_snapshot),
+    Case('fn_overlap', 'Overlap_FN', setup_overlap, run_overlap, check_overlap),
+    Case('extract_road_proximity', 'Extractors', setup_road_proximity, run_road_proximity, check_road_proximity),
+    Case('extract_where', 'Extractors', setup_where, run_where, check_where),
+    Case('extract_kml', 'Extractors', setup_kml, run_kml, check_kml),
+    Case('extract_gpkg', 'Extractors', setup_gpkg, run_gpkg, check_gpkg),
+    Case('fncs_dissolve', 'Extractors', setup_dissolve, run_dissolve, check_dissolve),
+    Case('standard_units', 'Extractors', setup_standard_units, run_standard_units, check_standard_units),
+    Case('list_genie', 'List Genie', setup_list_genie, run_list_genie, check_list_genie),
+    Case('list_genie_stream', 'List Genie', setup_list_stream, run_list_stream, check_list_stream),
+]
+
+
+# ---------------------------------------------------------------------------
+#   Baselines
+# ---------------------------------------------------------------------------
+
+def calibrate(repeat=5):
+    #Best time of a fixed pure python workload (sorting, hashing, float maths),
+    #the yardstick that makes baselines from another machine comparable
+    rng = random.Random(0)
+    values = [rng.random() for _ in range(200000)]
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        counts = {}
+        for v in sorted(values):
+            key = int(v * 1000)
+            counts[key] = counts.get(key, 0) + v * v
+        seconds = time.time() - start
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+def load_baselines(path=BASELINES):
+    if not os.path.exists(path):
+        return {'thresholds': {'default': DEFAULT_THRESHOLD, 'min_seconds': MIN_SECONDS, 'cases': {}}, 'scales': {}}
+    with open(path) as f:
+        return json.load(f, object_pairs_hook=OrderedDict)
+
+
+def save_baselines(baselines, path=BASELINES):
+    with open(path, 'w') as f:
+        json.dump(baselines, f, indent=2)
+        f.write('\n')
+
+
+def threshold(baselines, name):
+    thresholds = baselines.get('thresholds', {})
+    return thresholds.get('cases', {}).get(name, thresholds.get('default', DEFAULT_THRESHOLD))
+
+
+def compare(seconds, baseline, factor, limit, min_seconds):
+    #'ok', 'SLOWER' or 'faster' for a time against its baseline scaled by factor
+    if baseline is None:
+        return 'new'
+    expected = baseline * factor
+    if seconds > expected * limit and seconds - expected > min_seconds:
+        return 'SLOWER'
+    if seconds * limit < expected and expected - seconds > min_seconds:
+        return 'faster'
+    return 'ok'
+
+
+def time_case(case, dataset, folder, repeat):
+    #Best of repeat runs and the check of the last result. The garbage
+    #collector is off while a run is timed, like timeit, so a collection
+    #set off by the data of the earlier cases isn't timed.
+    state = case.setup(dataset, folder)
+    best = None
+    result = None
+    for _ in range(repeat):
+        result = None
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.time()
+            result = case.run(state)
+            seconds = time.time() - start
+        finally:
+            gc.enable()
+        best = seconds if best is None else min(best, seconds)
+    ok, detail = case.check(state, result)
+    return best, ok, detail
+
+
+def main():
+    parser = ArgumentParser(description='Benchmark suite on synthetic forestry data')
+    parser.add_argument('--scale', choices=list(synthetic_data.SCALES), default='small')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--cases', default=None, help='comma separated case names or name prefixes')
+    parser.add_argument('--update', action='store_true', help='store this run as the baselines of its scale')
+    parser.add_argument('--output', default=None, help='JSON file for the results of this run')
+    parser.add_argument('--baselines', default=BASELINES)
+    args = parser.parse_args()
+
+    cases = CASES
+    if args.cases:
+        wanted = [c.strip() for c in args.cases.split(',') if c.strip()]
+        cases = [case for case in CASES if any(case.name.startswith(w) for w in wanted)]
+    baselines = load_baselines(args.baselines)
+    stored = baselines.get('scales', {}).get(args.scale, {})
+    if stored and stored.get('seed', args.seed) != args.seed:
+        sys.stdout.write('Baselines for %s were stored with seed %s, not compared\n' % (args.scale, stored['seed']))
+        stored = {}
+    calibration = calibrate()
+    factor = calibration / stored['calibration'] if stored.get('calibration') else 1.0
+    min_seconds = baselines.get('thresholds', {}).get('min_seconds', MIN_SECONDS)
+
+    start = time.time()
+    dataset = synthetic_data.generate(args.scale, args.seed)
+    sys.stdout.write('%s synthetic data (seed %d) in %.2fs, calibration %.3fs (x%.2f of the baselines)\n\n' % (
+        args.scale, args.seed, time.time() - start, calibration, factor))
+    sys.stdout.write('%-20s %-23s %9s %9s %7s  %-7s %s\n' % ('tool', 'case', 'seconds', 'baseline', 'ratio',
+                                                            'status', 'check'))
+    folder = tempfile.mkdtemp(prefix='benchmarks_')
+    results = OrderedDict()
+    failed = 0
+    try:
+        for case in cases:
+            try:
+                seconds, ok, detail = time_case(case, dataset, folder, args.repeat)
+            except Exception as e:
+                seconds, ok, detail = None, False, 'error: %s' % e
+            baseline = stored.get('cases', {}).get(case.name)
+            if seconds is None:
+                status = 'ERROR'
+            elif not ok:
+                status = 'WRONG'
+            else:
+                status = compare(seconds, baseline, factor, threshold(baselines, case.name), min_seconds)
+            failed += 1 if status in ('ERROR', 'WRONG', 'SLOWER') else 0
+            results[case.name] = {'tool': case.tool, 'seconds': seconds, 'status': status, 'check': detail}
+            sys.stdout.write('%-20s %-23s %9s %9s %7s  %-7s %s\n' % (
+                case.tool, case.name, '-' if seconds is None else '%.3f' % seconds,
+                '-' if baseline is None else '%.3f' % (baseline * factor),
+                '-' if baseline is None or seconds is None else '%.2f' % (seconds / (baseline * factor or 1e-9)),
+                status, detail))
+    finally:
+        shutil.rmtree(folder)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'scale': args.scale, 'seed': args.seed, 'calibration': calibration,
+                       'python': platform.python_version(), 'platform': platform.platform(), 'cases': results},
+                      f, indent=2)
+    if args.update:
+        entry = baselines.setdefault('scales', OrderedDict()).setdefault(args.scale, OrderedDict())
+        entry['seed'] = args.seed
+        entry['calibration'] = round(calibration, 4)
+        entry['python'] = platform.python_version()
+        times = entry.setdefault('cases', OrderedDict())
+        for name, result in results.items():
+            if result['seconds'] is not None and result['status'] not in ('ERROR', 'WRONG'):
+                times[name] = round(result['seconds'], 4)
+        save_baselines(baselines, args.baselines)
+        sys.stdout.write('\nBaselines for %s stored in %s\n' % (args.scale, args.baselines))
+        return 1 if any(r['status'] in ('ERROR', 'WRONG') for r in results.values()) else 0
+    sys.stdout.write('\n%d case(s) failed\n' % failed if failed else '\nAll cases within their thresholds\n')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,430 @@
+# ---------------------------------------------------------------------------
+# synthetic_data.py
+# Created on: Oct 18, 2026
+#
+# Description: Seeded synthetic forestry data shaped like the BCGW/DBP06
+#           layers the tools read, for benchmarking without production data or
+#           ArcGIS. One landscape in BC Albers holds:
+#
+#           OperatingAreas   coarse tessellation, OPERATING_AREA, FIELD_TEAM
+#           VRI              fine tessellation of the same landscape, species
+#                            codes and percents, live/dead volumes per hectare
+#                            at both utilization levels, PROJ_AGE_1
+#           THLB             a second, offset tessellation with about 70% of its
+#                            cells kept, THLB_FACT
+#           CutBlk           irregular blocks clustered by licence, BLOCK_ID,
+#                            CUTB_SEQ_NBR, LICENCE_ID, HARVEST_YEAR
+#           ConsultationAreas large overlapping areas with the PIP field names
+#           Roads            wandering centrelines and spurs into blocks,
+#                            ROAD_SEQ_NBR
+#
+#           and ID lists (block IDs with repeats and unknown IDs, a second list
+#           overlapping the first, licence IDs) like the ones pasted into List
+#           Genie and the extractors.
+#
+#           Tessellations share their edges exactly (each edge is made once
+#           and used by the cells on both sides), so VRI covers the landscape
+#           without gaps or overlaps, like the real inventory. Every feature
+#           is (geometry, [values in field order]), the same records the
+#           Spatial_Packages writers take. The same scale and seed always give
+#           the same data.
+#
+# Usage:    python benchmarks/synthetic_data.py [--scale small] [--seed 0] [--out folder]
+#               writes <folder>/Synthetic_<scale>.gpkg with every layer and a
+#               text file per ID list
+#
+# Author:   Daniel Otto
+# ---------------------------------------------------------------------------
+
+from __future__ import division
+
+import datetime
+import math
+import os
+import random
+import sys
+import time
+from argparse import ArgumentParser
+from collections import namedtuple, OrderedDict
+
+sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import Geometry_Core
+import Spatial_Packages
+import TA_Volume_Engine
+
+ORIGIN = (1150000.0, 500000.0)
+
+#   span: landscape width (m), areas: operating areas per side, vri: VRI
+#   polygons per side, thlb: THLB cells per side, blocks, licences,
+#   consultation: consultation areas, roads, ids: length of the ID lists
+SCALES = OrderedDict([
+    ('small', {'span': 12000.0, 'areas': 2, 'vri': 40, 'thlb': 17, 'blocks': 300, 'licences': 15,
+               'consultation': 12, 'roads': 150, 'ids': 20000}),
+    ('medium', {'span': 36000.0, 'areas': 3, 'vri': 120, 'thlb': 51, 'blocks': 3000, 'licences': 150,
+                'consultation': 40, 'roads': 1500, 'ids': 200000}),
+    ('large', {'span': 96000.0, 'areas': 4, 'vri': 320, 'thlb': 137, 'blocks': 30000, 'licences': 1500,
+               'consultation': 100, 'roads': 15000, 'ids': 2000000}),
+])
+
+#   Leading species codes and how often they lead a stand. XX is not in any
+#   species group and ends up in OTHER.
+SPECIES = [('PL', 20), ('PLI', 8), ('FD', 14), ('FDI', 6), ('SX', 12), ('SE', 4), ('BL', 10), ('CW', 6),
+           ('HW', 6), ('LW', 5), ('AT', 4), ('AC', 2), ('EP', 2), ('XX', 1)]
+FIRST_HARVEST_YEAR = 1985
+
+#   name: layer name, geometry_type: Spatial_Packages geometry type, fields:
+#   [(name, type)] in the Spatial_Packages field types, features: [(geometry, values)]
+Layer = namedtuple('Layer', 'name geometry_type fields features')
+#   layers: OrderedDict of Layer, lists: OrderedDict of ID lists
+Dataset = namedtuple('Dataset', 'scale seed extent layers lists')
+
+
+def _vri_fields():
+    fields = [('FEATURE_ID', 'integer')]
+    for i in TA_Volume_Engine.SPECIES_SLOTS:
+        fields += [('SPECIES_CD_' + str(i), 'text'), ('SPECIES_PCT_' + str(i), 'real')]
+    for name in TA_Volume_Engine.input_fields():
+        if name.startswith('LIVE_') or name.startswith('DEAD_'):
+            fields.append((name, 'real'))
+    return fields + [('PROJ_AGE_1', 'integer')]
+
+
+FIELDS = OrderedDict([
+    ('OperatingAreas', [('OPERATING_AREA', 'text'), ('FIELD_TEAM', 'text')]),
+    ('VRI', _vri_fields()),
+    ('THLB', [('THLB_ID', 'integer'), ('THLB_FACT', 'real')]),
+    ('CutBlk', [('BLOCK_ID', 'text'), ('CUTB_SEQ_NBR', 'integer'), ('LICENCE_ID', 'text'),
+                ('HARVEST_YEAR', 'integer')]),
+    ('ConsultationAreas', [('CONTACT_ORGANIZATION_NAME', 'text'), ('CNSLTN_AREA_NAME', 'text')]),
+    ('Roads', [('ROAD_SEQ_NBR', 'integer')]),
+])
+GEOMETRY_TYPES = {'Roads': 'MultiLineString'}
+
+
+def column(layer, field):
+    #Values of one field for every feature of the layer
+    n = [name for name, _ in layer.fields].index(field)
+    return [values[n] for _, values in layer.features]
+
+
+def geometries(layer):
+    return [geom for geom, _ in layer.features]
+
+
+# ---------------------------------------------------------------------------
+#   Tessellation
+# ---------------------------------------------------------------------------
+
+def _edge_rng(seed, salt, index):
+    #Each edge gets its own generator so it is the same from both sides
+    return random.Random(seed * 7919 + salt * 1000003 + index)
+
+
+def tessellation(extent, cells, seed, wiggle=3, jitter=0.2):
+    #cells x cells polygons covering extent. Interior nodes are moved by up to
+    #jitter of a cell and every interior edge gets wiggle extra vertices, the
+    #landscape boundary stays straight. Returns {(column, row): ring}, rings
+    #counter-clockwise.
+    rng = random.Random(seed)
+    size_x = (extent[2] - extent[0]) / cells
+    size_y = (extent[3] - extent[1]) / cells
+    nodes = {}
+    for j in range(cells + 1):
+        for i in range(cells + 1):
+            x = extent[0] + i * size_x
+            y = extent[1] + j * size_y
+            if 0 < i < cells:
+                x += rng.uniform(-jitter, jitter) * size_x
+            if 0 < j < cells:
+                y += rng.uniform(-jitter, jitter) * size_y
+            nodes[(i, j)] = (round(x, 2), round(y, 2))
+
+    def edge(a, b, index, boundary):
+        #Vertices from node a to node b, excluding b
+        start, end = nodes[a], nodes[b]
+        if boundary or not wiggle:
+            return [start]
+        r = _edge_rng(seed, cells, index)
+        dx, dy = end[0] - start[0], end[1] - start[1]
+        length = math.hypot(dx, dy)
+        points = [start]
+        for k in range(1, wiggle + 1):
+            t = k / (wiggle + 1)
+            offset = r.uniform(-0.06, 0.06) * length
+            points.append((round(start[0] + dx * t - dy / length * offset, 2),
+                           round(start[1] + dy * t + dx / length * offset, 2)))
+        return points
+
+    #Horizontal edges run left to right, vertical edges bottom to top
+    horizontal = {}
+    vertical = {}
+    for j in range(cells + 1):
+        for i in range(cells):
+            horizontal[(i, j)] = edge((i, j), (i + 1, j), 2 * (j * (cells + 1) + i), j in (0, cells))
+    for j in range(cells):
+        for i in range(cells + 1):
+            vertical[(i, j)] = edge((i, j), (i, j + 1), 2 * (j * (cells + 1) + i) + 1, i in (0, cells))
+
+    def reverse(points, end):
+        #The same edge walked the other way, from end back to its start
+        return [end] + points[:0:-1]
+
+    rings = {}
+    for j in range(cells):
+        for i in range(cells):
+            ring = (horizontal[(i, j)] + vertical[(i + 1, j)] +
+                    reverse(horizontal[(i, j + 1)], nodes[(i + 1, j + 1)]) +
+                    reverse(vertical[(i, j)], nodes[(i, j + 1)]))
+            rings[(i, j)] = ring + [ring[0]]
+    return rings
+
+
+def _polygon(ring):
+    return {'type': 'Polygon', 'coordinates': [ring]}
+
+
+def _blob(rng, x, y, radius, count, roughness=0.25):
+    #Irregular star shaped ring of count vertices around (x, y)
+    ring = []
+    for k in range(count):
+        angle = 2 * math.pi * k / count
+        r = radius * rng.uniform(1 - roughness, 1.0)
+        ring.append((round(x + r * math.cos(angle), 2), round(y + r * math.sin(angle), 2)))
+    return ring + [ring[0]]
+
+
+# ---------------------------------------------------------------------------
+#   Layers
+# ---------------------------------------------------------------------------
+
+def operating_areas(extent, count, seed):
+    features = []
+    for (i, j), ring in sorted(tessellation(extent, count, seed, wiggle=12).items(), key=lambda c: (c[0][1], c[0][0])):
+        name = 'OA_' + chr(ord('A') + j) + str(i + 1)
+        features.append((_polygon(ring), [name, 'Team_' + str(1 + (i + j) % 3)]))
+    return features
+
+
+def _stand(rng):
+    #Species composition, volumes per hectare and age of one stand
+    codes = [code for code, weight in SPECIES for _ in range(weight)]
+    count = rng.choice([1, 1, 2, 2, 3, 3, 4, 5, 6])
+    species = []
+    while len(species) < count:
+        code = rng.choice(codes)
+        if code not in species:
+            species.append(code)
+    #Percents in steps of 5 adding up to 100, largest first
+    cuts = sorted(rng.sample(range(1, 20), count - 1)) if count > 1 else []
+    percents = sorted([(b - a) * 5 for a, b in zip([0] + cuts, cuts + [20])], reverse=True)
+    age = None if rng.random() < 0.02 else rng.randrange(5, 250, 5)
+    stand_volume = 0 if age is None else min(650.0, age * rng.uniform(1.5, 3.5))
+    slots = []
+    for i in TA_Volume_Engine.SPECIES_SLOTS:
+        if i > count:
+            slots.append((None, None if rng.random() < 0.5 else 0, None, None, None, None))
+            continue
+        pct = percents[i - 1]
+        live_125 = round(stand_volume * pct / 100.0, 3)
+        live_175 = round(live_125 * rng.uniform(0.8, 0.97), 3)
+        dead_125 = round(live_125 * rng.uniform(0, 0.3), 3)
+        dead_175 = round(dead_125 * rng.uniform(0.8, 0.97), 3)
+        #An occasional NULL volume, which the volume engine carries through as NULL
+        if rng.random() < 0.01:
+            live_175 = None
+        slots.append((species[i - 1], pct, live_125, dead_125, live_175, dead_175))
+    return slots, age
+
+
+def vri(extent, cells, seed):
+    rng = random.Random(seed + 1)
+    features = []
+    rings = tessellation(extent, cells, seed + 1)
+    for n, key in enumerate(sorted(rings, key=lambda c: (c[1], c[0]))):
+        slots, age = _stand(rng)
+        values = [n + 1]
+        for code, pct, _, _, _, _ in slots:
+            values += [code, pct]
+        #Volumes in input_fields() order: 125 live/dead then 175 live/dead for each slot
+        for _, _, live_125, dead_125, live_175, dead_175 in slots:
+            values += [live_125, dead_125, live_175, dead_175]
+        features.append((_polygon(rings[key]), values + [age]))
+    return features
+
+
+def thlb(extent, cells, seed):
+    #Offset from the landscape by a third of a cell so its edges never line up
+    #with VRI, cells falling outside the landscape are dropped
+    rng = random.Random(seed + 2)
+    size = (extent[2] - extent[0]) / cells
+    shifted = (extent[0] + size / 3, extent[1] + size / 3, extent[2] + size / 3, extent[3] + size / 3)
+    features = []
+    rings = tessellation(shifted, cells, seed + 2)
+    for key in sorted(rings, key=lambda c: (c[1], c[0])):
+        i, j = key
+        keep = rng.random() < 0.7
+        fact = 1.0 if rng.random() < 0.6 else round(rng.uniform(0.3, 0.95), 2)
+        if keep and i < cells - 1 and j < cells - 1:
+            features.append((_polygon(rings[key]), [len(features) + 1, fact]))
+    return features
+
+
+def cutblocks(extent, count, licences, seed):
+    #Blocks of 5-60 ha within a few km of their licence centre, one in eight
+    #with a reserve hole. Some blocks aren't harvested yet (no HARVEST_YEAR).
+    rng = random.Random(seed + 3)
+    span = extent[2] - extent[0]
+    this_year = datetime.datetime.now().year
+    centres = [(extent[0] + rng.uniform(0.05, 0.95) * span, extent[1] + rng.uniform(0.05, 0.95) * span)
+               for _ in range(licences)]
+    features = []
+    for n in range(count):
+        licence = n % licences
+        cx, cy = centres[licence]
+        x = min(extent[2] - 500, max(extent[0] + 500, cx + rng.gauss(0, 1200)))
+        y = min(extent[3] - 500, max(extent[1] + 500, cy + rng.gauss(0, 1200)))
+        radius = rng.uniform(130, 440)
+        rings = [_blob(rng, x, y, radius, rng.randint(12, 32))]
+        if n % 8 == 5:
+            rings.append([(x - 25, y - 25), (x - 25, y + 25), (x + 25, y + 25), (x + 25, y - 25), (x - 25, y - 25)])
+        year = None if rng.random() < 0.1 else rng.randint(FIRST_HARVEST_YEAR, this_year)
+        features.append(({'type': 'Polygon', 'coordinates': rings},
+                         ['K%s%04d' % (chr(ord('A') + licence % 26), n), 100000 + n, 'A%05d' % (80000 + licence),
+                          year]))
+    return features
+
+
+def consultation_areas(extent, count, seed):
+    #Large overlapping areas, several per organization, with detailed outlines
+    rng = random.Random(seed + 4)
+    span = extent[2] - extent[0]
+    features = []
+    for n in range(count):
+        x = extent[0] + rng.uniform(-0.1, 1.1) * span
+        y = extent[1] + rng.uniform(-0.1, 1.1) * span
+        ring = _blob(rng, x, y, span * rng.uniform(0.08, 0.35), rng.randint(120, 400), roughness=0.1)
+        organization = 'First Nation ' + str(1 + n // 3)
+        features.append((_polygon(ring), [organization, organization + ' Area ' + str(1 + n % 3)]))
+    return features
+
+
+def roads(extent, count, blocks, seed):
+    #Two in three roads wander across the landscape in 60 m steps, the rest
+    #are spurs from outside a block to near its middle
+    rng = random.Random(seed + 5)
+    span = extent[2] - extent[0]
+    features = []
+    for n in range(count):
+        if n % 3 == 2 and blocks:
+            box = Geometry_Core.bbox(rng.choice(blocks)[0])
+            x, y = (box[0] + box[2]) / 2, (box[1] + box[3]) / 2
+            heading = rng.uniform(0, 2 * math.pi)
+            points = [(round(x + 800 * math.cos(heading), 2), round(y + 800 * math.sin(heading), 2)),
+                      (round(x + rng.uniform(-20, 20), 2), round(y + rng.uniform(-20, 20), 2))]
+        else:
+            x, y = extent[0] + rng.random() * span, extent[1] + rng.random() * span
+            heading = rng.uniform(0, 2 * math.pi)
+            points = [(round(x, 2), round(y, 2))]
+            for _ in range(rng.randint(20, 120)):
+                heading += rng.uniform(-0.2, 0.2)
+                x += 60 * math.cos(heading)
+                y += 60 * math.sin(heading)
+                points.append((round(x, 2), round(y, 2)))
+        features.append(({'type': 'LineString', 'coordinates': points}, [200000 + n]))
+    return features
+
+
+def id_lists(blocks, size, seed):
+    #Block_IDs: IDs with about one in five repeated, including every CutBlk
+    #block ID about once and 2% that are mistyped, Compare_IDs: a second list
+    #sharing about half of them, Licence_IDs: the licences of the CutBlk blocks
+    #in the first list
+    rng = random.Random(seed + 6)
+    block_ids = [values[0] for _, values in blocks]
+    licences = dict((values[0], values[2]) for _, values in blocks)
+    from_blocks = min(0.5, len(block_ids) / size)
+
+    def draw(count, offset):
+        values = []
+        for _ in range(count):
+            if rng.random() < 0.02:
+                values.append('X%07d' % rng.randrange(size))
+            elif rng.random() < from_blocks:
+                values.append(rng.choice(block_ids))
+            else:
+                values.append('K%07d' % (offset + rng.randrange(int(size * 0.8) or 1)))
+        return values
+
+    first = draw(size, 0)
+    second = draw(size, size // 2)
+    return OrderedDict([('Block_IDs', first), ('Compare_IDs', second),
+                        ('Licence_IDs', [licences[v] for v in first if v in licences])])
+
+
+def generate(scale='small', seed=0):
+    #The whole synthetic dataset for a scale name (or a dict like SCALES values)
+    params = SCALES[scale] if not isinstance(scale, dict) else scale
+    span = params['span']
+    extent = (ORIGIN[0], ORIGIN[1], ORIGIN[0] + span, ORIGIN[1] + span)
+    features = OrderedDict()
+    features['OperatingAreas'] = operating_areas(extent, params['areas'], seed)
+    features['VRI'] = vri(extent, params['vri'], seed)
+    features['THLB'] = thlb(extent, params['thlb'], seed)
+    features['CutBlk'] = cutblocks(extent, params['blocks'], params['licences'], seed)
+    features['ConsultationAreas'] = consultation_areas(extent, params['consultation'], seed)
+    features['Roads'] = roads(extent, params['roads'], features['CutBlk'], seed)
+    layers = OrderedDict((name, Layer(name, GEOMETRY_TYPES.get(name, 'MultiPolygon'), FIELDS[name], records))
+                         for name, records in features.items())
+    lists = id_lists(features['CutBlk'], params['ids'], seed)
+    return Dataset(scale if not isinstance(scale, dict) else 'custom', seed, extent, layers, lists)
+
+
+def write(dataset, folder):
+    #Every layer into one GeoPackage and every ID list into a text file, one
+    #value per line. Returns the GeoPackage path.
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+    path = os.path.join(folder, 'Synthetic_' + dataset.scale + '.gpkg')
+    if os.path.exists(path):
+        os.remove(path)
+    for layer in dataset.layers.values():
+        writer = Spatial_Packages.open_layer('gpkg', path, layer.name, layer.fields, layer.geometry_type)
+        for geom, values in layer.features:
+            writer.insert(geom, values)
+        writer.close()
+    for name, values in dataset.lists.items():
+        with open(os.path.join(folder, name + '.txt'), 'w') as f:
+            for value in values:
+                f.write(value + '\n')
+    return path
+
+
+def describe(dataset):
+    #(layer, features, vertices) for every layer and (list, values) for every list
+    rows = [(layer.name, len(layer.features), 
+             sum(len(list(Geometry_Core.vertices(g))) for g, _ in layer.features))
+            for layer in dataset.layers.values()]
+    return rows + [(name, len(values), None) for name, values in dataset.lists.items()]
+
+
+def main():
+    parser = ArgumentParser(description='Seeded synthetic forestry data')
+    parser.add_argument('--scale', choices=list(SCALES), default='small')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default=None, help='folder for the GeoPackage and ID lists')
+    args = parser.parse_args()
+
+    start = time.time()
+    dataset = generate(args.scale, args.seed)
+    sys.stdout.write('%s landscape, seed %d, generated in %.2fs\n' % (args.scale, args.seed, time.time() - start))
+    for name, count, vertices in describe(dataset):
+        sys.stdout.write('%-18s %9d %s\n' % (name, count, '' if vertices is None else '%11d vertices' % vertices))
+    if args.out:
+        start = time.time()
+        path = write(dataset, args.out)
+        sys.stdout.write('Written to %s in %.2fs\n' % (path, time.time() - start))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())